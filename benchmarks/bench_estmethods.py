@@ -0,0 +1,76 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Benchmarks for the error estimates."""
+
+import multiprocessing
+
+from sherpa.estmethods import Confidence, Covariance, Projection
+from sherpa.fit import Fit
+from sherpa.models.basic import Gauss1D, Polynom1D
+from sherpa.stats import Chi2
+
+from .bench_fit import make_data1d
+
+
+NCORES = sorted({1, 2, multiprocessing.cpu_count()})
+
+
+class ErrorEstimates:
+    """Estimate the parameter errors with different numbers of cores."""
+
+    params = [['confidence', 'projection'], NCORES]
+    param_names = ['method', 'numcores']
+    timeout = 600
+
+    def setup(self, method, numcores):
+        line = Gauss1D()
+        line.pos = 1
+        line.fwhm = 3
+        line.ampl = 20
+        cont = Polynom1D()
+        cont.c1.thaw()
+
+        estmethod = {'confidence': Confidence,
+                     'projection': Projection}[method]()
+        estmethod.numcores = numcores
+        self.fit = Fit(make_data1d(), cont + line, Chi2(),
+                       estmethod=estmethod)
+        self.fit.fit()
+
+    def time_est_errors(self, method, numcores):
+        self.fit.est_errors()
+
+
+class CovarianceEstimate:
+    """Estimate the parameter errors with the covariance method."""
+
+    def setup(self):
+        line = Gauss1D()
+        line.pos = 1
+        line.fwhm = 3
+        line.ampl = 20
+        cont = Polynom1D()
+        cont.c1.thaw()
+        self.fit = Fit(make_data1d(), cont + line, Chi2(),
+                       estmethod=Covariance())
+        self.fit.fit()
+
+    def time_est_errors(self):
+        self.fit.est_errors()
@@ -0,0 +1,93 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Benchmarks for fitting."""
+
+import numpy as np
+
+from sherpa.astro.instrument import Response1D
+from sherpa.data import Data1D
+from sherpa.fit import Fit
+from sherpa.models.basic import Gauss1D, Polynom1D, PowLaw1D
+from sherpa.optmethods import LevMar, MonCar, NelderMead
+from sherpa.stats import Chi2, Cash
+
+from .common import make_pha
+
+
+METHODS = {'levmar': LevMar, 'neldermead': NelderMead, 'moncar': MonCar}
+
+
+def make_data1d(npts=1000, seed=9283):
+    """A gaussian line on a linear continuum."""
+
+    rng = np.random.RandomState(seed)
+    x = np.linspace(-10, 10, npts)
+    y = 5 + 0.2 * x + 20 * np.exp(-0.5 * (x - 1.3)**2 / 1.2**2)
+    y += rng.normal(0, 1, npts)
+    return Data1D('bench', x, y, staterror=np.ones(npts))
+
+
+class Fit1D:
+    """Fit a gaussian and polynomial to a Data1D data set."""
+
+    params = ['levmar', 'neldermead', 'moncar']
+    param_names = ['method']
+    timeout = 300
+
+    def setup(self, method):
+        self.data = make_data1d()
+        self.method = METHODS[method]()
+        if method == 'moncar':
+            self.method.maxfev = 2000
+
+    def _make_fit(self):
+        line = Gauss1D()
+        line.pos = 0
+        line.fwhm = 3
+        line.ampl = 10
+        cont = Polynom1D()
+        cont.c1.thaw()
+        return Fit(self.data, cont + line, Chi2(), self.method)
+
+    def time_fit(self, method):
+        self._make_fit().fit()
+
+    def track_nfev(self, method):
+        return self._make_fit().fit().nfev
+
+    track_nfev.unit = 'evaluations'
+
+
+class FitPHA:
+    """Fit a power law to a PHA data set with an ARF and RMF."""
+
+    params = ['levmar', 'neldermead']
+    param_names = ['method']
+    timeout = 300
+
+    def setup(self, method):
+        self.pha = make_pha()
+        self.method = METHODS[method]()
+
+    def time_fit(self, method):
+        src = PowLaw1D()
+        src.ampl = 1e-3
+        rsp = Response1D(self.pha)
+        Fit(self.pha, rsp(src), Cash(), self.method).fit()
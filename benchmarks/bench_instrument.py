@@ -0,0 +1,66 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Benchmarks for folding models through responses."""
+
+import numpy as np
+
+from sherpa.astro.utils import rmf_fold
+
+from .common import data_path, make_rmf, require_fits
+
+
+class RMFFold:
+    """Fold a model through a synthetic RMF of different sizes."""
+
+    params = [[256, 1024, 4096], [10, 100]]
+    param_names = ['nenergy', 'width']
+
+    def setup(self, nenergy, width):
+        self.rmf = make_rmf(nenergy, 1024, width=min(width, 1024))
+        self.src = np.ones(nenergy)
+        self.many = np.ones((50, nenergy))
+
+    def time_rmf_fold(self, nenergy, width):
+        rmf = self.rmf
+        rmf_fold(self.src, rmf.n_grp, rmf.f_chan, rmf.n_chan, rmf.matrix,
+                 rmf.detchans, rmf.offset)
+
+    def time_apply_rmf(self, nenergy, width):
+        self.rmf.apply_rmf(self.src)
+
+    def time_apply_rmf_many(self, nenergy, width):
+        self.rmf.apply_rmf(self.many)
+
+
+class RMFFoldData:
+    """Fold a model through RMFs from the Sherpa test data."""
+
+    params = ['3c273.rmf', '9774.rmf', '3c120_heg_-1.rmf']
+    param_names = ['rmf']
+
+    def setup(self, rmfname):
+        require_fits()
+        from sherpa.astro.io import read_rmf
+
+        self.rmf = read_rmf(data_path(rmfname))
+        self.src = np.ones(self.rmf.energ_lo.size)
+
+    def time_apply_rmf(self, rmfname):
+        self.rmf.apply_rmf(self.src)
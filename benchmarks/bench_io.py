@@ -0,0 +1,69 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Benchmarks for reading and grouping PHA data."""
+
+from .common import data_path, make_pha, require_fits
+
+
+class GroupCounts:
+    """Group a PHA data set so each group has a minimum number of counts."""
+
+    params = [5, 20]
+    param_names = ['counts']
+
+    def setup(self, counts):
+        from sherpa.astro.data import groupstatus
+        if not groupstatus:
+            raise NotImplementedError("the group module is not installed")
+
+        self.pha = make_pha()
+
+    def time_group_counts(self, counts):
+        self.pha.group_counts(counts)
+
+
+class ReadPHA:
+    """Read in a PHA file from the Sherpa test data."""
+
+    params = ['3c273.pi', '9774.pi']
+    param_names = ['filename']
+
+    def setup(self, filename):
+        require_fits()
+        self.filename = data_path(filename)
+
+    def time_read_pha(self, filename):
+        from sherpa.astro.io import read_pha
+        read_pha(self.filename)
+
+
+class ReadRMF:
+    """Read in a RMF file from the Sherpa test data."""
+
+    params = ['3c273.rmf', '9774.rmf', '3c120_heg_-1.rmf']
+    param_names = ['filename']
+
+    def setup(self, filename):
+        require_fits()
+        self.filename = data_path(filename)
+
+    def time_read_rmf(self, filename):
+        from sherpa.astro.io import read_rmf
+        read_rmf(self.filename)
@@ -0,0 +1,56 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Benchmarks for the model cache."""
+
+import numpy as np
+
+from sherpa.models.basic import Gauss1D
+
+
+class ModelCache:
+    """The cost of a hit or a miss in the model cache."""
+
+    params = [100, 10000]
+    param_names = ['npts']
+
+    def setup(self, npts):
+        self.x = np.linspace(-5, 5, npts)
+        self.mdl = Gauss1D()
+        self.mdl.startup(cache=True)
+        self.mdl(self.x)
+        self.pars = [self.mdl.fwhm.val, self.mdl.pos.val, self.mdl.ampl.val]
+        self.niter = 0
+
+    def teardown(self, npts):
+        self.mdl.teardown()
+
+    def time_cache_hit(self, npts):
+        self.mdl.calc(self.pars, self.x)
+
+    def time_cache_miss(self, npts):
+        self.niter += 1
+        self.mdl.calc([1 + self.niter * 1e-6, 0, 1], self.x)
+
+    def time_no_cache(self, npts):
+        self.mdl._use_caching = False
+        try:
+            self.mdl.calc(self.pars, self.x)
+        finally:
+            self.mdl._use_caching = True
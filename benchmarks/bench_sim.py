@@ -0,0 +1,76 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Benchmarks for the MCMC and flux simulations."""
+
+import numpy as np
+
+from sherpa.astro.flux import sample_flux
+from sherpa.astro.instrument import Response1D
+from sherpa.estmethods import Covariance
+from sherpa.fit import Fit
+from sherpa.models.basic import PowLaw1D
+from sherpa.sim import MCMC
+from sherpa.stats import Cash, Chi2Gehrels
+
+from .common import make_pha
+
+
+def make_pha_fit(stat):
+    pha = make_pha(nenergy=512, nchans=512)
+    src = PowLaw1D()
+    src.ampl = 1e-3
+    mdl = Response1D(pha)(src)
+    fit = Fit(pha, mdl, stat)
+    fit.fit()
+    return pha, src, fit
+
+
+class GetDraws:
+    """Run the MCMC chain."""
+
+    params = [1000, 5000]
+    param_names = ['niter']
+    timeout = 600
+
+    def setup(self, niter):
+        _, _, self.fit = make_pha_fit(Cash())
+        self.fit.estmethod = Covariance()
+        self.sigma = self.fit.est_errors().extra_output
+        self.mcmc = MCMC()
+
+    def time_get_draws(self, niter):
+        np.random.seed(8723)
+        self.mcmc.get_draws(self.fit, self.sigma, niter=niter)
+
+
+class SampleFlux:
+    """Calculate the flux distribution from the covariance matrix."""
+
+    params = [100, 1000]
+    param_names = ['num']
+    timeout = 600
+
+    def setup(self, num):
+        self.pha, self.src, self.fit = make_pha_fit(Chi2Gehrels())
+
+    def time_sample_flux(self, num):
+        np.random.seed(2734)
+        sample_flux(self.fit, self.pha, self.src, num=num, lo=0.5, hi=7,
+                    numcores=1)
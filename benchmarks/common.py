@@ -0,0 +1,120 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Support code for the benchmarks.
+
+Benchmarks which need optional components - such as the Sherpa test
+data or a FITS I/O backend - are skipped, by raising
+NotImplementedError in the setup method, when they are not available.
+"""
+
+import numpy as np
+
+from sherpa.astro.data import DataPHA, DataRMF
+from sherpa.astro.instrument import create_arf
+from sherpa.utils.testing import DATADIR
+
+
+def data_path(name):
+    """Return the path to a file in the Sherpa test data.
+
+    Raises
+    ------
+    NotImplementedError
+        The test data is not installed, which means the benchmark is
+        skipped.
+    """
+
+    if DATADIR is None:
+        raise NotImplementedError("sherpa test data is not installed")
+
+    return '{}/{}'.format(DATADIR, name)
+
+
+def require_fits():
+    """Skip the benchmark if there is no FITS I/O backend."""
+
+    try:
+        import sherpa.astro.io
+    except ImportError:
+        raise NotImplementedError("no FITS I/O backend")
+
+
+def make_rmf(nenergy, nchans, width=20, seed=3848):
+    """Create a RMF where each energy bin covers width channels.
+
+    Parameters
+    ----------
+    nenergy, nchans : int
+        The number of energy bins and channels.
+    width : int, optional
+        The number of channels each energy bin maps to.
+    seed : int, optional
+        The seed for the random numbers used for the response.
+
+    Returns
+    -------
+    rmf : DataRMF
+    """
+
+    rng = np.random.RandomState(seed)
+    egrid = np.linspace(0.1, 11.0, nenergy + 1)
+    elo = egrid[:-1]
+    ehi = egrid[1:]
+
+    n_grp = np.ones(nenergy, dtype=np.uint32)
+    centre = np.arange(nenergy) * nchans // nenergy
+    f_chan = np.clip(centre - width // 2, 0, nchans - width) + 1
+    n_chan = np.full(nenergy, width, dtype=np.uint32)
+    matrix = rng.uniform(0, 1, size=(nenergy, width))
+    matrix /= matrix.sum(axis=1)[:, np.newaxis]
+
+    ebounds = np.linspace(0.1, 11.0, nchans + 1)
+    return DataRMF('bench-rmf', nchans, elo, ehi, n_grp, f_chan, n_chan,
+                   matrix.flatten(), e_min=ebounds[:-1], e_max=ebounds[1:])
+
+
+def make_pha(nenergy=1024, nchans=1024, seed=2342):
+    """Create a PHA data set with an ARF and RMF.
+
+    The counts are drawn from an absorbed power law, so it can be
+    used for fitting.
+
+    Returns
+    -------
+    pha : DataPHA
+    """
+
+    rmf = make_rmf(nenergy, nchans)
+    specresp = 400 * np.exp(-0.5 * (rmf.energ_lo - 2)**2 / 4)
+    arf = create_arf(rmf.energ_lo, rmf.energ_hi, specresp,
+                     exposure=20000)
+
+    src = 1e-3 * (rmf.energ_lo + rmf.energ_hi)**-1.7 * \
+        (rmf.energ_hi - rmf.energ_lo)
+    expected = rmf.apply_rmf(arf.apply_arf(src)) * arf.exposure
+    counts = np.random.RandomState(seed).poisson(expected)
+
+    chans = np.arange(1, nchans + 1, dtype=np.int16)
+    pha = DataPHA('bench-pha', chans, counts, exposure=arf.exposure)
+    pha.set_arf(arf)
+    pha.set_rmf(rmf)
+    pha.set_analysis('energy')
+    pha.notice(0.5, 7.0)
+    return pha
@@ -107,7 +107,8 @@ from sherpa.astro import hc
 # There are currently (Sep 2015) no tests that exercise the code that
 # uses the compile_energy_grid symbols.
 from sherpa.astro.utils import arf_fold, rmf_fold, filter_resp, \
-    compile_energy_grid, do_group, expand_grouped_mask
+    compile_energy_grid, do_group, expand_grouped_mask, RMFMatrix, \
+    _writeable
 
 info = logging.getLogger(__name__).info
 warning = logging.getLogger(__name__).warning
@@ -1014,10 +1015,16 @@ class DataARF(DataOgipResponse):
         self._specresp = val
         self._rsp = val
 
+        # Keep any filter applied by notice.
+        bin_mask = getattr(self, '_bin_mask', None)
+        if bin_mask is not None:
+            self._rsp = val[bin_mask]
+
     specresp = property(_get_specresp, _set_specresp)
 
     def __init__(self, name, energ_lo, energ_hi, specresp, bin_lo=None,
                  bin_hi=None, exposure=None, header=None, ethresh=None):
+        self._bin_mask = None
         self.specresp = specresp
         self.bin_lo = bin_lo
         self.bin_hi = bin_hi
@@ -1057,7 +1064,7 @@ class DataARF(DataOgipResponse):
 
         # an external function must be called so all ARFs go through
         # a single entry point in order for caching to 'work'
-        model = arf_fold(src, self._rsp)
+        model = arf_fold(src, _writeable(self._rsp))
 
         # Rebin the high-res source model folded through ARF down to the size
         # the PHA or RMF expects.
@@ -1069,6 +1076,7 @@ class DataARF(DataOgipResponse):
         return model
 
     def notice(self, bin_mask=None):
+        self._bin_mask = bin_mask
         self._rsp = self.specresp
         self._lo = self.energ_lo
         self._hi = self.energ_hi
@@ -1134,6 +1142,8 @@ class DataRMF(DataOgipResponse):
     _fields = ("name", "detchans", "energ_lo", "energ_hi", "n_grp", "f_chan", "n_chan", "matrix", "offset", "e_min",
                "e_max", "ethresh")
 
+    _fold = None
+
     def __init__(self, name, detchans, energ_lo, energ_hi, n_grp, f_chan,
                  n_chan, matrix, offset=1, e_min=None, e_max=None,
                  header=None, ethresh=None):
@@ -1159,6 +1169,7 @@ class DataRMF(DataOgipResponse):
         self._rsp = matrix
         self._lo = energ_lo
         self._hi = energ_hi
+        self._fold = None
         Data1DInt.__init__(self, name, energ_lo, energ_hi, matrix)
 
     def __str__(self):
@@ -1183,6 +1194,12 @@ class DataRMF(DataOgipResponse):
             self.header = {}
         self.__dict__.update(state)
 
+    def __getstate__(self):
+        # The matrix is re-created when needed.
+        state = self.__dict__.copy()
+        state.pop('_fold', None)
+        return state
+
     def _validate(self, name, energy_lo, energy_hi, ethresh):
         """
         Validate energy ranges and, if necessary, make adjustments.
@@ -1205,25 +1222,61 @@ class DataRMF(DataOgipResponse):
         """
         return self._validate_energy_ranges(name, energy_lo, energy_hi, ethresh)
 
+    def get_rmf_matrix(self):
+        """Return the response for the noticed channels as a matrix.
+
+        The matrix is cached until the noticed channels change.
+
+        .. versionadded:: 4.14.0
+
+        Returns
+        -------
+        matrix : sherpa.astro.utils.RMFMatrix
+
+        """
+
+        if self._fold is None:
+            self._fold = RMFMatrix(self._grp, self._fch, self._nch,
+                                   self._rsp, self.detchans, self.offset)
+
+        return self._fold
+
     def apply_rmf(self, src, *args, **kwargs):
-        "Fold the source array src through the RMF and return the result"
+        """Fold the source array src through the RMF and return the result.
+
+        The source array can be two-dimensional, with shape (nsamples,
+        nenergy), in which case each row is folded through the
+        response and the return value has shape (nsamples, nchans).
+        """
+
+        src = numpy.asarray(src)
 
         # Rebin the high-res source model from the PHA down to the size
         # the RMF expects.
         if args != ():
             (rmf, pha) = args
             if pha != () and len(pha[0]) > len(rmf[0]):
-                src = rebin(src, pha[0], pha[1], rmf[0], rmf[1])
+                if src.ndim == 2:
+                    src = numpy.asarray([rebin(row, pha[0], pha[1],
+                                               rmf[0], rmf[1])
+                                         for row in src])
+                else:
+                    src = rebin(src, pha[0], pha[1], rmf[0], rmf[1])
 
-        if len(src) != len(self._lo):
+        if src.ndim == 0 or src.shape[-1] != len(self._lo):
             raise TypeError("Mismatched filter between ARF and RMF " +
                             "or PHA and RMF")
 
-        return rmf_fold(src, self._grp, self._fch, self._nch, self._rsp,
+        if src.ndim == 2:
+            return self.get_rmf_matrix().fold(src)
+
+        return rmf_fold(src, _writeable(self._grp), _writeable(self._fch),
+                        _writeable(self._nch), _writeable(self._rsp),
                         self.detchans, self.offset)
 
     def notice(self, noticed_chans=None):
         bin_mask = None
+        self._fold = None
         self._fch = self.f_chan
         self._nch = self.n_chan
         self._grp = self.n_grp
@@ -1232,8 +1285,10 @@ class DataRMF(DataOgipResponse):
         self._hi = self.energ_hi
         if noticed_chans is not None:
             (self._grp, self._fch, self._nch, self._rsp,
-             bin_mask) = filter_resp(noticed_chans, self.n_grp, self.f_chan,
-                                     self.n_chan, self.matrix, self.offset)
+             bin_mask) = filter_resp(noticed_chans, _writeable(self.n_grp),
+                                     _writeable(self.f_chan),
+                                     _writeable(self.n_chan),
+                                     _writeable(self.matrix), self.offset)
             self._lo = self.energ_lo[bin_mask]
             self._hi = self.energ_hi[bin_mask]
         return bin_mask
@@ -31,8 +31,9 @@ import logging
 import numpy
 import numpy.random
 
-from sherpa.astro.utils import calc_energy_flux
-from sherpa.utils import parallel_map
+from sherpa.astro.utils import calc_energy_flux, calc_photon_flux, \
+    _flux_weights
+from sherpa.utils import parallel_map, split_array, _multi, _ncpus
 from sherpa.utils.err import ArgumentErr, FitErr, ModelErr
 from sherpa.sim import NormalParameterSampleFromScaleMatrix, \
     NormalParameterSampleFromScaleVector
@@ -42,6 +43,10 @@ info = logging.getLogger(__name__).info
 
 __all__ = ['calc_flux', 'sample_flux', 'calc_sample_flux']
 
+# The maximum number of model values to evaluate at once when
+# calc_flux uses calc_batch.
+_BATCH_SIZE = 2**21
+
 
 class CalcFluxWorker():
     """Internal class for use by calc_flux.
@@ -68,6 +73,82 @@ class CalcFluxWorker():
         return numpy.asarray([flux] + list(sample))
 
 
+class CalcFluxBatchWorker():
+    """Internal class for use by calc_flux.
+
+    The flux is calculated for a block of samples by evaluating the
+    model for all the samples at once (with calc_batch) and then
+    multiplying by the flux weights.
+    """
+
+    def __init__(self, src, grid, weights, subset=None):
+        self.src = src
+        self.grid = grid
+        self.weights = weights
+        self.subset = subset
+        self.base = numpy.asarray([p.val for p in src.pars])
+        self.thawed = numpy.asarray([i for i, p in enumerate(src.pars)
+                                     if not p.frozen], dtype=int)
+
+    def __call__(self, samples):
+        pars = numpy.tile(self.base, (samples.shape[0], 1))
+        if self.subset is None:
+            pars[:, self.thawed] = samples
+        else:
+            pars[:, self.thawed] = samples[:, self.subset]
+
+        vals = self.src.calc_batch(pars, *self.grid)
+        vals = numpy.broadcast_to(vals, (samples.shape[0],
+                                         self.weights.size))
+        fluxes = vals @ self.weights
+        return numpy.column_stack((fluxes, samples))
+
+
+class CalcFluxWeightWorker(CalcFluxWorker):
+    """Internal class for use by calc_flux.
+
+    The flux is calculated by multiplying the model by the flux
+    weights, rather than by calling the flux method.
+    """
+
+    def __init__(self, src, grid, weights, subset=None):
+        CalcFluxWorker.__init__(self, None, None, src, None, None,
+                                subset=subset)
+        self.grid = grid
+        self.weights = weights
+
+    def __call__(self, sample):
+        if self.subset is None:
+            self.src.thawedpars = sample
+        else:
+            self.src.thawedpars = sample[self.subset]
+
+        flux = (self.weights * self.src(*self.grid)).sum()
+        return numpy.asarray([flux] + list(sample))
+
+
+def _can_batch(src, samples, subset):
+    """Can calc_flux evaluate the samples with calc_batch?
+
+    This is not possible if a parameter is linked, since the link
+    has to be evaluated for each sample, or if a sample lies outside
+    the hard limits, since setting thawedpars then changes the
+    value (and warns the user).
+    """
+
+    if any(p.link is not None for p in src.pars):
+        return False
+
+    tpars = [p for p in src.pars if not p.frozen]
+    vals = samples if subset is None else samples[:, subset]
+    if vals.ndim != 2 or vals.shape[1] != len(tpars):
+        return False
+
+    hmin = numpy.asarray([p.hard_min for p in tpars])
+    hmax = numpy.asarray([p.hard_max for p in tpars])
+    return bool(numpy.all((vals >= hmin) & (vals <= hmax)))
+
+
 def calc_flux(data, src, samples, method=calc_energy_flux,
               lo=None, hi=None, numcores=None, subset=None):
     """Calculate model fluxes from a sample of parameter values.
@@ -75,6 +156,11 @@ def calc_flux(data, src, samples, method=calc_energy_flux,
     Given a set of parameter values, calculate the model flux for
     each set.
 
+    .. versionchanged:: 4.14.0
+       The flux weights are calculated once, and the model is
+       evaluated for blocks of samples with calc_batch when method
+       is calc_energy_flux or calc_photon_flux.
+
     .. versionchanged:: 4.12.2
        The subset parameter was added.
 
@@ -125,16 +211,58 @@ def calc_flux(data, src, samples, method=calc_energy_flux,
     --------
     sample_flux
 
+    Notes
+    -----
+    When method is calc_energy_flux or calc_photon_flux the weight
+    of each bin of the flux integral is calculated once, so that
+    each flux is the sum of the model multiplied by the weights.
+    If no parameter is linked, and the samples lie within the hard
+    limits of the parameters, the samples are evaluated in blocks
+    with the calc_batch method of the model, which is vectorised
+    for many models.
+
     """
 
-    old_vals = src.thawedpars
-    worker = CalcFluxWorker(method, data, src, lo, hi, subset)
-    try:
-        fluxes = parallel_map(worker, samples, numcores)
-    finally:
-        src.thawedpars = old_vals
+    eflux = {calc_energy_flux: True,
+             calc_photon_flux: False}.get(method)
 
-    return numpy.asarray(fluxes)
+    old_vals = src.thawedpars
+    if eflux is None:
+        worker = CalcFluxWorker(method, data, src, lo, hi, subset)
+        try:
+            fluxes = parallel_map(worker, samples, numcores)
+        finally:
+            src.thawedpars = old_vals
+
+        return numpy.asarray(fluxes)
+
+    samples = numpy.asarray(samples)
+    grid, weights = _flux_weights(data, lo, hi, eflux=eflux)
+    if weights is None:
+        return numpy.column_stack((numpy.zeros(samples.shape[0]),
+                                   samples))
+
+    if not _can_batch(src, samples, subset):
+        worker = CalcFluxWeightWorker(src, grid, weights, subset)
+        try:
+            fluxes = parallel_map(worker, samples, numcores)
+        finally:
+            src.thawedpars = old_vals
+
+        return numpy.asarray(fluxes)
+
+    # Limit the size of the model array evaluated at once, and
+    # create at least one block per process.
+    nrows = max(1, _BATCH_SIZE // max(1, weights.size))
+    nblocks = -(-samples.shape[0] // nrows)
+    if _multi:
+        ncores = _ncpus if numcores is None else numcores
+        nblocks = max(nblocks, ncores)
+
+    nblocks = max(1, min(nblocks, samples.shape[0]))
+    worker = CalcFluxBatchWorker(src, grid, weights, subset)
+    fluxes = parallel_map(worker, split_array(samples, nblocks), numcores)
+    return numpy.concatenate(fluxes)
 
 
 def _sample_flux_get_samples_with_scales(fit, src, correlated, scales,
@@ -638,13 +766,16 @@ def calc_sample_flux(lo, hi, fit, data, samples, modelcomponent,
     oflx = samples[:, 0]       # observed/absorbed flux
     iflx = numpy.zeros(nrows)  # intrinsic/unabsorbed flux
 
+    # The flux weights only need to be calculated once.
+    grid, weights = _flux_weights(data, lo, hi, eflux=True)
+
     mystat = numpy.zeros((nrows, 1), dtype=samples.dtype)
     try:
         for nn in range(nrows):
             # Need to extract the subset that contains the parameters
             fit.model.thawedpars = samples[nn, 1:-1]
-            if valid[nn]:
-                iflx[nn] = calc_energy_flux(data, modelcomponent, lo=lo, hi=hi)
+            if valid[nn] and weights is not None:
+                iflx[nn] = (weights * modelcomponent(*grid)).sum()
 
             mystat[nn, 0] = fit.calc_stat()
 
@@ -115,6 +115,10 @@ class RMFModel(CompositeModel, ArithmeticModel):
     """Base class for expressing RMF convolution in model expressions.
     """
 
+    # The response can be changed during a fit (e.g. by PragBayes),
+    # so the output can not be cached by compositeCacher.
+    _memo_static = False
+
     def __init__(self, rmf, model):
         self.rmf = rmf
         self.model = model
@@ -166,6 +170,10 @@ class ARFModel(CompositeModel, ArithmeticModel):
     """Base class for expressing ARF convolution in model expressions.
     """
 
+    # The response can be changed during a fit (e.g. by PragBayes),
+    # so the output can not be cached by compositeCacher.
+    _memo_static = False
+
     def __init__(self, arf, model):
         self.arf = arf
         self.model = model
@@ -215,6 +223,10 @@ class RSPModel(CompositeModel, ArithmeticModel):
     """Base class for expressing RMF + ARF convolution in model expressions
     """
 
+    # The response can be changed during a fit (e.g. by PragBayes),
+    # so the output can not be cached by compositeCacher.
+    _memo_static = False
+
     def __init__(self, arf, rmf, model):
         self.arf = arf
         self.rmf = rmf
@@ -482,6 +494,12 @@ class RSPModelPHA(RSPModel):
     -----
     Scaling by the AREASCAL setting (scalar or array) is included in
     this model.
+
+    When the ARF and RMF use the same energy grid the source model is
+    multiplied by the ARF and then folded through the response cached
+    by the RMF (`sherpa.astro.data.DataRMF.get_rmf_matrix`), which is
+    shared by all the models that use the RMF, so the response is
+    neither copied nor converted for each evaluation.
     """
 
     def __init__(self, arf, rmf, pha, model):
@@ -490,6 +508,26 @@ class RSPModelPHA(RSPModel):
         self._rmf = rmf
         RSPModel.__init__(self, arf, rmf, model)
 
+    def _get_response(self):
+        """Return the response cached by the RMF, or None.
+
+        None is returned if the ARF and RMF grids do not match.
+        """
+
+        if self.arfargs != () or self.rmfargs != ():
+            return None
+
+        try:
+            rsp = self.arf._rsp
+            rmat = self.rmf.get_rmf_matrix()
+        except AttributeError:
+            return None
+
+        if len(rsp) != rmat.nenergy:
+            return None
+
+        return rmat
+
     def filter(self):
 
         RSPModel.filter(self)
@@ -561,8 +599,12 @@ class RSPModelPHA(RSPModel):
         # x could be channels or x, xhi could be energy|wave
 
         src = self.model.calc(p, self.xlo, self.xhi)
-        src = self.arf.apply_arf(src, *self.arfargs)
-        src = self.rmf.apply_rmf(src, *self.rmfargs)
+        rsp = self._get_response()
+        if rsp is not None and len(src) == rsp.nenergy:
+            src = rsp.fold(src * self.arf._rsp)
+        else:
+            src = self.arf.apply_arf(src, *self.arfargs)
+            src = self.rmf.apply_rmf(src, *self.rmfargs)
 
         # Assume any issues with the binning (between AREASCAL
         # and src) is related to the RMF rather than the ARF.
@@ -842,6 +884,9 @@ class ResponseNestedModel(Model):
 
 class MultiResponseSumModel(CompositeModel, ArithmeticModel):
 
+    # See RMFModel.
+    _memo_static = False
+
     def __init__(self, source, pha):
         self.channel = pha.channel
         self.mask = numpy.ones(len(pha.channel), dtype=bool)
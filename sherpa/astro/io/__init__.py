@@ -41,12 +41,13 @@ import os
 import os.path
 import sys
 import importlib
+import weakref
 
 import numpy
 
 import sherpa.io
 from sherpa.utils.err import IOErr
-from sherpa.utils import SherpaFloat
+from sherpa.utils import NoNewAttributesAfterInit, SherpaFloat
 from sherpa.data import Data2D, Data1D, BaseData, Data2DInt
 from sherpa.astro.data import DataIMG, DataIMGInt, DataARF, DataRMF, DataPHA, DataRosatRMF
 from sherpa.astro.utils import reshape_2d_arrays
@@ -74,6 +75,9 @@ else:
     if ogip_emin <= 0.0:
         raise ValueError(emsg)
 
+share_responses = config.getboolean('ogip', 'share_responses',
+                                   fallback=True)
+
 if io_opt.startswith('pycrates') or io_opt.startswith('crates'):
     io_opt = 'crates_backend'
 
@@ -95,7 +99,8 @@ info = logging.getLogger(__name__).info
 
 __all__ = ('read_table', 'read_image', 'read_arf', 'read_rmf', 'read_arrays',
            'read_pha', 'write_image', 'write_pha', 'write_table',
-           'pack_table', 'pack_image', 'pack_pha', 'read_table_blocks')
+           'pack_table', 'pack_image', 'pack_pha', 'read_table_blocks',
+           'ResponseRegistry')
 
 
 def _is_subclass(t1, t2):
@@ -344,6 +349,156 @@ def read_image(arg, coord='logical', dstype=DataIMG):
     return dataset
 
 
+class ResponseRegistry(NoNewAttributesAfterInit):
+    """Share the arrays of the responses read in from files.
+
+    An ARF or RMF file is often used by many data sets, such as the
+    source and background spectra of an observation, or a set of
+    observations with the same calibration. The registry ensures
+    that the arrays in the response - in particular the RMF matrix -
+    are only stored once, however many times the file is read in.
+    Each read still creates a new `sherpa.astro.data.DataARF` or
+    `sherpa.astro.data.DataRMF` object, since these objects store
+    the channel filter of the data set they are used with.
+
+    .. versionadded:: 4.14.0
+
+    Notes
+    -----
+    A file is identified by its canonical path, size, and
+    modification time. Arrays are only shared between responses
+    read from the same file, not between copies of a file.
+
+    The registry only holds weak references to the arrays, so it
+    does not stop the memory being re-used once the responses are
+    deleted.
+
+    The arrays are read only, since a change to one response would
+    otherwise change every response read from the file. To change
+    a response, assign a new array - e.g. ``arf.specresp =
+    arf.specresp * 0.9`` - which is only used by that response.
+    The arrays are views of writeable arrays, which are sent to the
+    compiled routines in place of the views, since the routines copy
+    read-only arrays each time they are called.
+
+    The matrix of an RMF is read in when the file is read, rather
+    than when it is first used.
+
+    Examples
+    --------
+
+    >>> rmf1 = read_rmf('src.rmf')
+    >>> rmf2 = read_rmf('src.rmf')
+    >>> rmf1 is rmf2
+    False
+    >>> rmf1.matrix is rmf2.matrix
+    True
+    >>> rmf1.matrix.flags.writeable
+    False
+
+    """
+
+    def __init__(self):
+        self._files = {}
+        NoNewAttributesAfterInit.__init__(self)
+
+    def __len__(self):
+        """The number of files in the registry."""
+        return len(self._files)
+
+    def clear(self):
+        """Remove all the files from the registry."""
+        self._files.clear()
+
+    @staticmethod
+    def _share(arr):
+        """Return a read-only view of the array."""
+
+        if not isinstance(arr, numpy.ndarray):
+            return arr
+
+        out = arr.view()
+        out.flags.writeable = False
+        return out
+
+    def read(self, kind, arg, reader):
+        """Read in the response, re-using the arrays if possible.
+
+        Parameters
+        ----------
+        kind : str
+            The type of the response, such as "ARF" or "RMF".
+        arg
+            The argument to send to reader. The registry is only
+            used when this is the name of a file.
+        reader : callable
+            The routine that reads in the file. It is called with
+            arg and returns a dictionary of the response values and
+            the name of the file.
+
+        Returns
+        -------
+        data, filename : dict, str
+            The values returned by reader, with the arrays replaced
+            by the shared, read-only, versions.
+
+        """
+
+        if not isinstance(arg, str):
+            return reader(arg)
+
+        try:
+            stat = os.stat(arg)
+        except OSError:
+            return reader(arg)
+
+        key = (kind, os.path.realpath(arg))
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        try:
+            oldstamp, refs, others, filename = self._files[key]
+        except KeyError:
+            oldstamp = None
+
+        if oldstamp == stamp:
+            data = {name: ref() for name, ref in refs.items()}
+            if all(value is not None for value in data.values()):
+                for name, value in others.items():
+                    data[name] = dict(value) if isinstance(value, dict) \
+                        else value
+
+                return data, filename
+
+        data, filename = reader(arg)
+        data = {name: self._share(value) for name, value in data.items()}
+
+        refs = {}
+        others = {}
+        for name, value in data.items():
+            if isinstance(value, numpy.ndarray):
+                refs[name] = weakref.ref(value)
+            else:
+                others[name] = dict(value) if isinstance(value, dict) \
+                    else value
+
+        self._files[key] = (stamp, refs, others, filename)
+        return data, filename
+
+
+# The registry used by read_arf and read_rmf, or None if responses
+# are not shared.
+#
+response_registry = ResponseRegistry() if share_responses else None
+
+
+def _read_response(kind, arg, reader):
+    """Read in a response, using the registry if set."""
+
+    if response_registry is None:
+        return reader(arg)
+
+    return response_registry.read(kind, arg, reader)
+
+
 def read_arf(arg):
     """Create a DataARF object.
 
@@ -358,8 +513,14 @@ def read_arf(arg):
     -------
     data : sherpa.astro.data.DataARF
 
+    Notes
+    -----
+    The arrays read from a file are shared with any other ARF read
+    from the same file, and so are read only (see
+    `ResponseRegistry`).
+
     """
-    data, filename = backend.get_arf_data(arg)
+    data, filename = _read_response('ARF', arg, backend.get_arf_data)
 
     # It is unlikely that the backend will set this, but allow
     # it to override the config setting.
@@ -384,8 +545,14 @@ def read_rmf(arg):
     -------
     data : sherpa.astro.data.DataRMF
 
+    Notes
+    -----
+    The arrays read from a file are shared with any other RMF read
+    from the same file, and so are read only (see
+    `ResponseRegistry`).
+
     """
-    data, filename = backend.get_rmf_data(arg)
+    data, filename = _read_response('RMF', arg, backend.get_rmf_data)
 
     # It is unlikely that the backend will set this, but allow
     # it to override the config setting.
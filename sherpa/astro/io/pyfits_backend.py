@@ -37,8 +37,14 @@ References
 
 """
 
+from configparser import ConfigParser
+import hashlib
 import logging
 import os
+import pickle
+import re
+import shutil
+import tempfile
 import warnings
 
 import numpy
@@ -47,15 +53,31 @@ from numpy.compat import basestring
 from astropy.io import fits
 from astropy.io.fits.column import _VLF
 
+from sherpa import get_config
 from sherpa.utils.err import IOErr
 from sherpa.utils import SherpaInt, SherpaUInt, SherpaFloat
 import sherpa.utils
+from sherpa.astro.utils import _flatten_rmf_groups, _flatten_rmf_matrix, \
+    _gather_rows
 from sherpa.io import get_ascii_data, write_arrays
 
 
 warning = logging.getLogger(__name__).warning
 error = logging.getLogger(__name__).error
 
+config = ConfigParser()
+config.read(get_config())
+
+# The directory used to cache the contents of RMF files, or None.
+#
+rmf_cache_dir = config.get('ogip', 'rmf_cache_dir', fallback='None')
+if rmf_cache_dir.strip().upper() == 'NONE':
+    rmf_cache_dir = None
+
+# Change this when the format of the cached RMF data changes.
+#
+_RMF_CACHE_VERSION = 1
+
 transformstatus = False
 try:
     from sherpa.astro.io.wcs import WCS
@@ -627,13 +649,173 @@ def get_arf_data(arg, make_copy=False):
     return data, filename
 
 
+def _read_vlf_column(hdu, name, rows):
+    """Read the rows of a variable-length column from the heap.
+
+    Accessing a variable-length column with astropy creates an array
+    for each row, which is slow for the large response matrices of
+    grating and other high-resolution instruments, so the values are
+    read directly from the heap using the array descriptors.
+
+    Parameters
+    ----------
+    hdu : BinTableHDU
+    name : str
+        The column name.
+    rows : ndarray
+        The rows to read (a boolean mask).
+
+    Returns
+    -------
+    values : ndarray or None
+        The values of the selected rows, one after the other, or
+        None if the column is not a variable-length array of numbers
+        or the heap can not be accessed (it relies on the internals
+        of astropy).
+
+    """
+
+    fmt = str(hdu.columns[name].format).strip().upper()
+    match = re.match(r'^[01]?([PQ])([BIJKED])', fmt)
+    if match is None:
+        return None
+
+    dtype = {'B': 'u1', 'I': '>i2', 'J': '>i4', 'K': '>i8',
+             'E': '>f4', 'D': '>f8'}[match.group(2)]
+    try:
+        desc = numpy.recarray.field(hdu.data, name)
+        heap = hdu.data._get_heap_data()
+    except Exception:
+        return None
+
+    desc = numpy.asarray(desc)
+    if desc.shape != (len(rows), 2):
+        return None
+
+    desc = desc[rows]
+    return _gather_rows(heap, desc[:, 0], desc[:, 1], dtype)
+
+
+def _rmf_cache_file(filename):
+    """The name of the cache directory for this RMF, or None.
+
+    The name depends on the path, size, and modification time of
+    the file, so the cache is not used if the file changes.
+    """
+
+    if rmf_cache_dir is None or not isinstance(filename, basestring):
+        return None
+
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+
+    key = (os.path.abspath(filename), stat.st_size, stat.st_mtime_ns,
+           _RMF_CACHE_VERSION)
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return os.path.join(rmf_cache_dir, 'rmf-{}'.format(digest))
+
+
+def _read_rmf_cache(cachefile):
+    """Return the cached RMF data, or None if it can not be read.
+
+    The arrays are memory mapped, so they are only read in when
+    they are used. They are mapped copy-on-write, so changes to the
+    arrays are not written to the cache.
+    """
+
+    try:
+        with open(os.path.join(cachefile, 'data.pkl'), 'rb') as fh:
+            data, arrays = pickle.load(fh)
+
+        for name in arrays:
+            arr = numpy.load(os.path.join(cachefile, name + '.npy'),
+                             mmap_mode='c')
+            data[name] = numpy.asarray(arr)
+
+    except Exception:
+        # The cache does not exist or is invalid.
+        return None
+
+    return data
+
+
+def _write_rmf_cache(cachefile, data):
+    """Save the RMF data, warning the user if it fails.
+
+    The arrays are written out as separate NumPy files, so that
+    they can be memory mapped, and the remaining values are
+    pickled.
+    """
+
+    tmpname = None
+    try:
+        os.makedirs(rmf_cache_dir, exist_ok=True)
+        tmpname = tempfile.mkdtemp(dir=rmf_cache_dir, suffix='.tmp')
+
+        other = {}
+        arrays = []
+        for name, value in data.items():
+            if isinstance(value, numpy.ndarray) and value.dtype.kind in 'biuf':
+                numpy.save(os.path.join(tmpname, name + '.npy'), value)
+                arrays.append(name)
+            else:
+                other[name] = value
+
+        with open(os.path.join(tmpname, 'data.pkl'), 'wb') as fh:
+            pickle.dump((other, arrays), fh, pickle.HIGHEST_PROTOCOL)
+
+        # Ensure other processes never see a partially-written
+        # cache. It is not an error if another process has already
+        # created it.
+        try:
+            os.rename(tmpname, cachefile)
+        except OSError:
+            if not os.path.isdir(cachefile):
+                raise
+
+    except OSError as exc:
+        warning("Unable to write to the RMF cache %s: %s",
+                rmf_cache_dir, exc)
+
+    finally:
+        if tmpname is not None and os.path.exists(tmpname):
+            shutil.rmtree(tmpname, ignore_errors=True)
+
+
+def _no_rmf_offset(filename):
+    # QUS: should this actually be an error, rather than just
+    #      something that is logged to screen?
+    error("Failed to locate TLMIN keyword for F_CHAN" +
+          " column in RMF file '%s'; " % filename +
+          'Update the offset value in the RMF data set to' +
+          ' appropriate TLMIN value prior to fitting')
+
+
 def get_rmf_data(arg, make_copy=False):
     """arg is a filename or a HDUList object.
 
+    .. versionchanged:: 4.14.0
+       The MATRIX, F_CHAN, and N_CHAN columns are flattened without
+       looping over each row, and the results can be cached (see
+       Notes).
+
     Notes
     -----
     The RMF format is described in [1]_.
 
+    When the ``rmf_cache_dir`` setting in the ``ogip`` section of
+    the Sherpa configuration file is set (it can also be changed
+    with the ``rmf_cache_dir`` attribute of this module), the data
+    read from an RMF file is saved in this directory, and re-used
+    the next time the file is read. The cache is only used when arg
+    is a file name, and it is ignored if the size or modification
+    time of the file changes. The arrays read from the cache are
+    memory mapped, so the matrix is only read from disk when it is
+    used. The directory should only be
+    writeable by the user, since the cache files are pickled.
+
     References
     ----------
 
@@ -645,6 +827,25 @@ def get_rmf_data(arg, make_copy=False):
 
     """
 
+    cachefile = _rmf_cache_file(arg)
+    if cachefile is not None:
+        data = _read_rmf_cache(cachefile)
+        if data is not None:
+            if 'offset' not in data:
+                _no_rmf_offset(arg)
+
+            return data, arg
+
+    data, filename = _read_rmf_data(arg)
+    if cachefile is not None:
+        _write_rmf_cache(cachefile, data)
+
+    return data, filename
+
+
+def _read_rmf_data(arg):
+    """Read in the RMF data (see get_rmf_data)."""
+
     rmf, filename = _get_file_contents(arg, exptype="BinTableHDU",
                                        nobinary=True)
 
@@ -673,13 +874,21 @@ def get_rmf_data(arg, make_copy=False):
                                       dtype=SherpaUInt)
 
         # Read MATRIX as-is -- we will flatten it below, because
-        # we need to remove all rows corresponding to n_grp[row] == 0
+        # we need to remove all rows corresponding to n_grp[row] == 0,
+        # unless it is a variable-length column which can be read
+        # directly from the heap (in which case only the good rows
+        # are read).
         #
         # TODO: I would expect this to error out if MATRIX is not available
         #
+        good = (data['n_grp'] > 0)
         data['matrix'] = None
+        flattened = False
         if 'MATRIX' in hdu.columns.names:
-            data['matrix'] = hdu.data.field('MATRIX')
+            data['matrix'] = _read_vlf_column(hdu, 'MATRIX', good)
+            flattened = data['matrix'] is not None
+            if not flattened:
+                data['matrix'] = hdu.data.field('MATRIX')
 
         data['header'] = _get_meta_data(hdu)
         data['header'].pop('DETCHANS', None)
@@ -691,12 +900,7 @@ def get_rmf_data(arg, make_copy=False):
         if tlmin is not None:
             data['offset'] = tlmin
         else:
-            # QUS: should this actually be an error, rather than just
-            #      something that is logged to screen?
-            error("Failed to locate TLMIN keyword for F_CHAN" +
-                  " column in RMF file '%s'; " % filename +
-                  'Update the offset value in the RMF data set to' +
-                  ' appropriate TLMIN value prior to fitting')
+            _no_rmf_offset(filename)
 
         if _has_hdu(rmf, 'EBOUNDS'):
             hdu = rmf['EBOUNDS']
@@ -712,81 +916,51 @@ def get_rmf_data(arg, make_copy=False):
         else:
             data['e_min'] = None
             data['e_max'] = None
-    finally:
-        rmf.close()
-
-    # Remove any rows from the MATRIX and F_CHAN/N_CHAN where N_GRP is 0,
-    # since they do not add any data. This is to match the Crates backend.
-    # Note that crates uses the sherpa.astro.utils.resp_init routine,
-    # but it's not clear why, so it is not used here for now.
-    #
-    good = (data['n_grp'] > 0)
-    data['matrix'] = data['matrix'][good]
-
-    if isinstance(data['matrix'], _VLF):
-        data['matrix'] = numpy.concatenate([numpy.asarray(row) for
-                                            row in data['matrix']])
 
-    else:
-        # Flatten the array. There are two cases here:
-        # a) the full matrix is given (that is, n_grp is 1 and n_chan
-        #    = number of channels for each row)
-        # b) a rectangular matrix is given, but a row can contain
-        #    unused data (outside the f_chan range)
+        # Remove any rows from the MATRIX and F_CHAN/N_CHAN where N_GRP
+        # is 0, since they do not add any data. This is to match the
+        # Crates backend. Note that crates uses the
+        # sherpa.astro.utils.resp_init routine, but it's not clear why,
+        # so it is not used here for now.
         #
-        # Case a can be handled easily, but it's probably not worth
-        # having a special case for this.
+        # This is done before the file is closed, since the MATRIX
+        # column may be read lazily.
         #
         matrix = data['matrix']
-        n_grp = data['n_grp'][good]
-        f_chan = data['f_chan'][good]
-        n_chan = data['n_chan'][good]
-
-        rowdata = []
-        for mrow, ng, ncs in zip(matrix, n_grp, n_chan):
-            # Need a RMF which ng>1 to test this with.
-            if numpy.isscalar(ncs):
-                ncs = [ncs]
-
-            start = 0
-            for nc in ncs:
-                # n_chan can be an unsigned integer. Adding a Python
-                # integer to a NumPy unsigned integer appears to return
-                # a float.
-                end = start + int(nc)
 
-                # "perfect" RMFs may have mrow as a scalar
-                try:
-                    rdata = mrow[start:end]
-                except IndexError as ie:
-                    if start != 0 or end != 1:
-                        raise IOErr('bad', 'format', 'MATRIX column formatting') from ie
+        if flattened:
+            pass
 
-                    rdata = [mrow]
+        elif isinstance(matrix, _VLF):
+            # The rows are already the right length.
+            matrix = [row for row, flag in zip(matrix, good) if flag]
+            matrix = numpy.concatenate(matrix) if matrix else \
+                numpy.zeros(0)
 
-                rowdata.append(rdata)
-                start = end
+        else:
+            # Flatten the array. There are two cases here:
+            # a) the full matrix is given (that is, n_grp is 1 and n_chan
+            #    = number of channels for each row)
+            # b) a rectangular matrix is given, but a row can contain
+            #    unused data (outside the f_chan range)
+            #
+            matrix = _flatten_rmf_matrix(numpy.asarray(matrix)[good],
+                                         data['n_chan'][good])
 
-        data['matrix'] = numpy.concatenate(rowdata)
+        data['matrix'] = matrix.astype(SherpaFloat)
 
-    data['matrix'] = data['matrix'].astype(SherpaFloat)
+    finally:
+        rmf.close()
 
     # Flatten f_chan and n_chan vectors into 1D arrays as crates does
     # according to group
     #
     if data['f_chan'].ndim > 1 and data['n_chan'].ndim > 1:
-        f_chan = []
-        n_chan = []
-        for grp, fch, nch, in zip(data['n_grp'], data['f_chan'],
-                                  data['n_chan']):
-            for i in range(grp):
-                f_chan.append(fch[i])
-                n_chan.append(nch[i])
-
         # This automatically filters out rows where N_GRP is 0.
         #
-        data['f_chan'] = numpy.asarray(f_chan, SherpaUInt)
-        data['n_chan'] = numpy.asarray(n_chan, SherpaUInt)
+        data['f_chan'], data['n_chan'] = \
+            _flatten_rmf_groups(data['n_grp'], data['f_chan'],
+                                data['n_chan'])
     else:
         if len(data['n_grp']) == len(data['f_chan']):
             # filter out groups with zeroes.
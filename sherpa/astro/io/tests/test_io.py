@@ -17,6 +17,7 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
+import os
 from tempfile import NamedTemporaryFile
 import struct
 
@@ -312,3 +313,133 @@ def test_read_ideal_rmf():
     expected = 100 * 0.01 * np.asarray([2, 3, 2.5, 2, 2])
     y = 100 * r.eval_model(mdl)
     assert y == pytest.approx(expected, rel=2e-6)
+
+
+@requires_fits
+def test_read_rmf_cache(tmp_path, monkeypatch):
+    """The pyfits backend can cache the RMF data."""
+
+    from sherpa.astro import io
+    from sherpa.astro.io import read_rmf
+
+    if io.backend.__name__ != "sherpa.astro.io.pyfits_backend":
+        pytest.skip("RMF cache is only supported by pyfits")
+
+    cachedir = tmp_path / 'cache'
+    monkeypatch.setattr(io.backend, 'rmf_cache_dir', str(cachedir))
+    monkeypatch.setattr(io, 'response_registry', None)
+
+    infile = str(tmp_path / 'test.rmf')
+    fake_rmf(infile)
+    r1 = read_rmf(infile)
+    assert len(list(cachedir.iterdir())) == 1
+
+    def fail(arg):
+        raise RuntimeError("the file should not be read")
+
+    with monkeypatch.context() as m:
+        m.setattr(io.backend, '_read_rmf_data', fail)
+        r2 = read_rmf(infile)
+
+    assert r2.name == infile
+    assert r2.detchans == r1.detchans
+    assert r2.offset == r1.offset
+    for field in ['energ_lo', 'energ_hi', 'n_grp', 'f_chan', 'n_chan',
+                  'matrix', 'e_min', 'e_max']:
+        assert getattr(r2, field) == pytest.approx(getattr(r1, field))
+
+    # A changed file is re-read.
+    st = os.stat(infile)
+    os.utime(infile, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    read_rmf(infile)
+    assert len(list(cachedir.iterdir())) == 2
+
+
+@requires_data
+@requires_fits
+def test_read_rmf_grating(make_data_path):
+    """The groups are flattened correctly."""
+
+    from sherpa.astro.io import read_rmf
+
+    r = read_rmf(make_data_path("3c120_meg_-1.rmf.gz"))
+    assert r.f_chan.size == r.n_grp.sum()
+    assert r.n_chan.size == r.n_grp.sum()
+    assert r.matrix.size == r.n_chan.sum()
+
+
+@requires_fits
+def test_read_rmf_shared(tmp_path, monkeypatch):
+    """The arrays of responses read from the same file are shared."""
+
+    from sherpa.astro import io
+    from sherpa.astro.io import ResponseRegistry, read_rmf
+
+    monkeypatch.setattr(io, 'response_registry', ResponseRegistry())
+
+    infile = str(tmp_path / 'test.rmf')
+    fake_rmf(infile)
+    r1 = read_rmf(infile)
+    r2 = read_rmf(infile)
+    assert r1 is not r2
+    assert r1.matrix is r2.matrix
+    assert r1.n_chan is r2.n_chan
+    assert len(io.response_registry) == 1
+
+    # The channel filter is not shared.
+    r1.notice([True, False, False, False, False])
+    assert r2.get_indep()[0].size == 5
+
+    # The arrays can not be changed in place, but a response can be
+    # given a new array.
+    assert not r1.matrix.flags.writeable
+    with pytest.raises(ValueError):
+        r1.matrix[0] = 2
+
+    r2.matrix = r2.matrix * 2
+    assert r1.matrix == pytest.approx(r2.matrix / 2)
+
+    # The arrays of a copy of the file are not shared.
+    copyfile = str(tmp_path / 'copy.rmf')
+    fake_rmf(copyfile)
+    r3 = read_rmf(copyfile)
+    assert r3.matrix is not r1.matrix
+    assert r3.matrix == pytest.approx(r1.matrix)
+    assert len(io.response_registry) == 2
+
+    # The registry can be turned off.
+    monkeypatch.setattr(io, 'response_registry', None)
+    r4 = read_rmf(infile)
+    assert r4.matrix is not r1.matrix
+    assert r4.matrix == pytest.approx(r1.matrix)
+
+
+@requires_fits
+def test_response_registry(tmp_path):
+    """The registry only re-uses the arrays of the same file."""
+
+    from sherpa.astro.io import ResponseRegistry
+
+    nreads = []
+
+    def reader(arg):
+        nreads.append(arg)
+        return {'specresp': np.arange(5.0), 'header': {'A': 1}}, arg
+
+    infile = tmp_path / 'a.arf'
+    infile.write_text('a')
+    registry = ResponseRegistry()
+    d1, name = registry.read('ARF', str(infile), reader)
+    d2, _ = registry.read('ARF', str(infile), reader)
+    assert name == str(infile)
+    assert nreads == [str(infile)]
+    assert d2['specresp'] is d1['specresp']
+    assert not d1['specresp'].flags.writeable
+    assert d2['header'] == {'A': 1}
+    assert d2['header'] is not d1['header']
+
+    other = tmp_path / 'b.arf'
+    other.write_text('a')
+    d3, _ = registry.read('ARF', str(other), reader)
+    assert d3['specresp'] is not d1['specresp']
+    assert len(registry) == 2
@@ -21,7 +21,8 @@
 import numpy
 
 from sherpa.models.parameter import Parameter, tinyval
-from sherpa.models.model import ArithmeticModel, RegriddableModel2D, RegriddableModel1D, modelCacher1d
+from sherpa.models.model import ArithmeticModel, RegriddableModel2D, RegriddableModel1D, modelCacher1d, \
+    batch_failed, batch_grid1d, batch_grid2d, batch_parameters, batch_radius2
 from sherpa.astro.utils import apply_pileup
 from sherpa.utils.err import ModelErr
 from sherpa.utils import _guess_ampl_scale, bool_cast, get_fwhm, \
@@ -305,6 +306,19 @@ class Beta1D(RegriddableModel1D):
         return _modelfcts.beta1d(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is not None:
+            # The integrated form is calculated numerically.
+            return RegriddableModel1D.calc_batch(self, p, xlo[0], xhi[0],
+                                                 **kwargs)
+
+        r0, beta, xpos, ampl = batch_parameters(self, p)
+        batch_failed(r0 == 0)
+        return ampl * numpy.power(1.0 + ((xlo - xpos) / r0)**2,
+                                  -3.0 * beta + 0.5)
+
+
 class BPL1D(RegriddableModel1D):
     """One-dimensional broken power-law function.
 
@@ -365,6 +379,23 @@ class BPL1D(RegriddableModel1D):
         return _modelfcts.bpl1d(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is not None:
+            return RegriddableModel1D.calc_batch(self, p, xlo[0], xhi[0],
+                                                 **kwargs)
+
+        gamma1, gamma2, eb, ref, ampl = batch_parameters(self, p)
+        batch_failed((ref == 0) & numpy.any(xlo >= 0))
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            lo = ampl * numpy.power(xlo / ref, -gamma1)
+            norm = ampl * numpy.power(eb / ref, gamma2) * \
+                numpy.power(eb / ref, -gamma1)
+            hi = norm * numpy.power(xlo / ref, -gamma2)
+
+        return numpy.select([xlo < 0, xlo <= eb], [0.0, lo], hi)
+
+
 # TODO: what are the units of the independent axis: Angstrom?
 
 class Dered(RegriddableModel1D):
@@ -614,6 +645,22 @@ class Lorentz1D(RegriddableModel1D):
         return _modelfcts.lorentz1d(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        fwhm, pos, ampl = batch_parameters(self, p)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        hwhm = fwhm / 2
+        if xhi is None:
+            return (ampl / numpy.pi) * hwhm / (hwhm * hwhm + (xlo - pos)**2)
+
+        # The compiled code uses pi / 2 when x == pos, rather than
+        # the value from atan2, which depends on the sign of fwhm.
+        angle1 = numpy.where(xlo == pos, numpy.pi / 2,
+                             numpy.arctan2(hwhm, xlo - pos))
+        angle2 = numpy.where(xhi == pos, numpy.pi / 2,
+                             numpy.arctan2(hwhm, xhi - pos))
+        return -ampl * (angle2 - angle1) / numpy.pi
+
+
 class Voigt1D(RegriddableModel1D):
     """One dimensional Voigt profile.
 
@@ -942,6 +989,22 @@ class Schechter(RegriddableModel1D):
         return _modelfcts.schechter(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        if not self.integrate:
+            raise ModelErr('alwaysint', self.name)
+
+        alpha, ref, norm = batch_parameters(self, p)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is None:
+            return numpy.zeros((len(alpha), xlo.size))
+
+        batch_failed(ref == 0)
+        xthis = xlo / ref
+        xnext = xhi / ref
+        return norm * numpy.power(xthis, alpha) * numpy.exp(-xthis) * \
+            (xnext - xthis)
+
+
 class Beta2D(RegriddableModel2D):
     """Two-dimensional beta model function.
 
@@ -1034,6 +1097,17 @@ class Beta2D(RegriddableModel2D):
         return _modelfcts.beta2d(*args, **kwargs)
 
 
+    def calc_batch(self, p, *args, **kwargs):
+        grid = batch_grid2d(self, *args)
+        if grid is None:
+            return RegriddableModel2D.calc_batch(self, p, *args, **kwargs)
+
+        r0, xpos, ypos, ellip, theta, ampl, alpha = batch_parameters(self, p)
+        r2 = batch_radius2(xpos, ypos, ellip, theta, *grid)
+        batch_failed(r0 == 0)
+        return ampl * numpy.power(1.0 + r2 / (r0 * r0), -alpha)
+
+
 class DeVaucouleurs2D(RegriddableModel2D):
     """Two-dimensional de Vaucouleurs model.
 
@@ -1276,6 +1350,18 @@ class Lorentz2D(RegriddableModel2D):
         return _modelfcts.lorentz2d(*args, **kwargs)
 
 
+    def calc_batch(self, p, *args, **kwargs):
+        grid = batch_grid2d(self, *args)
+        if grid is None:
+            return RegriddableModel2D.calc_batch(self, p, *args, **kwargs)
+
+        fwhm, xpos, ypos, ellip, theta, ampl = batch_parameters(self, p)
+        r2 = batch_radius2(xpos, ypos, ellip, theta, *grid)
+        batch_failed((fwhm == 0) & (r2 == 0))
+        hwhm2 = (fwhm / 2)**2
+        return ampl * hwhm2 / (r2 + hwhm2)
+
+
 class JDPileup(RegriddableModel1D):
     """A CCD pileup model for the ACIS detectors on Chandra.
 
@@ -1546,6 +1632,14 @@ class Disk2D(RegriddableModel2D):
         return numpy.select([r2 <= p[3] ** 2], [p[2]])
 
 
+    def calc_batch(self, p, x, y, *args, **kwargs):
+        xpos, ypos, ampl, r0 = batch_parameters(self, p)
+        x = numpy.asarray(x).reshape(1, -1)
+        y = numpy.asarray(y).reshape(1, -1)
+        r2 = (x - xpos) ** 2 + (y - ypos) ** 2
+        return numpy.where(r2 <= r0 ** 2, ampl, 0.0)
+
+
 # DOC-NOTE: TODO finish the functional form description
 
 class Shell2D(RegriddableModel2D):
@@ -127,3 +127,37 @@ def test_set_center(cls):
     model = cls()
     model.set_center(12.1)
     assert model.pos.val == 12.1
+
+
+@pytest.mark.parametrize('cls', [models.Beta1D, models.BPL1D,
+                                 models.Lorentz1D, models.Schechter])
+def test_calc_batch_1d(cls):
+    """calc_batch matches calling calc for each set of parameters."""
+
+    mdl = cls()
+    rng = np.random.RandomState(3912)
+    base = np.asarray([p.val for p in mdl.pars])
+    pars = base * (1 + 0.2 * rng.normal(size=(3, base.size))) + 0.1
+
+    x = np.linspace(0.5, 20, 26)
+    expected = [mdl.calc(p.copy(), x[:-1], x[1:]) for p in pars]
+    got = mdl.calc_batch(pars, x[:-1], x[1:])
+    assert got == pytest.approx(np.asarray(expected), rel=1e-10)
+
+
+@pytest.mark.parametrize('cls', [models.Beta2D, models.Lorentz2D,
+                                 models.Disk2D])
+def test_calc_batch_2d(cls):
+
+    mdl = cls()
+    rng = np.random.RandomState(2763)
+    base = np.asarray([p.val for p in mdl.pars])
+    pars = base * (1 + 0.2 * rng.normal(size=(3, base.size))) + 0.1
+
+    x0, x1 = np.meshgrid(np.linspace(-3, 3, 5), np.linspace(-2, 2, 4))
+    x0 = x0.flatten()
+    x1 = x1.flatten()
+
+    expected = [mdl.calc(p.copy(), x0, x1) for p in pars]
+    got = mdl.calc_batch(pars, x0, x1)
+    assert got == pytest.approx(np.asarray(expected), rel=1e-10)
@@ -72,6 +72,7 @@ class FullBayes(PragBayes):
 
             arf.specresp = self.simarf.add_deviations(specresp, old_rr,
                                                       self.rrsig)
+            self._update_models()
             new_rr = self.simarf.rrout
 
             stat_temp = self.calc_fit_stat(self._mu)
@@ -95,6 +96,7 @@ class FullBayes(PragBayes):
             else:
                 # Restore to previous ARF
                 arf.specresp = arf_dict['current']
+                self._update_models()
                 self.reject_arf()
 
         else:
@@ -102,6 +104,7 @@ class FullBayes(PragBayes):
             # Update the ARFs with new deviates
 
             arf.specresp = self.simarf.add_deviations(specresp)
+            self._update_models()
 
             stat_temp = self.calc_fit_stat(self._mu)
             accept_pr = 0
@@ -119,6 +122,7 @@ class FullBayes(PragBayes):
             else:
                 # Restore to previous ARF
                 arf.specresp = arf_dict['current']
+                self._update_models()
                 self.reject_arf()
 
     def accept_arf(self):
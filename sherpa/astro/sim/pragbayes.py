@@ -21,6 +21,7 @@
 import logging
 import numpy as np
 from sherpa.fit import Fit
+from sherpa.models.model import CompositeModel
 from sherpa.estmethods import Covariance
 from sherpa.sim.mh import MetropolisMH, rmvt, CovarError, Walk, LimitError
 read_table_blocks = None
@@ -78,19 +79,46 @@ class PCA1DAdd():
         self.ncomp = len(self.component)
         self.rrout = None
 
+        # The eigenvectors scaled by the eigenvalues, so that the
+        # deviations are a matrix product.
+        self.components = np.asarray(eigenval)[:, np.newaxis] * \
+            np.asarray(eigenvec)
+
     def add_deviations(self, specresp, rrin=None, rrsig=None):
+        """Add random deviations to the ARF.
+
+        .. versionchanged:: 4.14.0
+           The specresp argument can be a 2D array, with each row
+           being an ARF.
+
+        Parameters
+        ----------
+        specresp : array
+            The ARF. If 2D then each row is perturbed separately, in
+            the same order as repeated calls would.
+        rrin, rrsig : array or None, optional
+            When both are set, the component weights are drawn from a
+            normal distribution with mean rrin and standard deviation
+            rrsig, rather than the standard normal.
+
+        Returns
+        -------
+        arf : array
+            The perturbed ARF, with the same shape as specresp. The
+            component weights are stored in the rrout attribute.
+
+        """
+
         # copy the old ARF (use new memory for deviations)
         new_arf = np.add(specresp, self.bias)
 
-        rrout = np.random.standard_normal(self.ncomp)
+        rrout = np.random.standard_normal(new_arf.shape[:-1] +
+                                          (self.ncomp, ))
         if rrin is not None and rrsig is not None:
             rrout = rrin + rrsig * rrout
         self.rrout = rrout
 
-        tmp = self.eigenvec * \
-            self.eigenval[:, np.newaxis] * \
-            rrout[:, np.newaxis]
-        return np.add(new_arf, tmp.sum(axis=0), new_arf)
+        return np.add(new_arf, rrout @ self.components, new_arf)
 
 
 class SIM1DAdd():
@@ -102,11 +130,23 @@ class SIM1DAdd():
         self.ncomp = len(self.component)
 
     def add_deviations(self, specresp):
+        """Add a randomly-selected simulated deviation to the ARF.
+
+        .. versionchanged:: 4.14.0
+           The specresp argument can be a 2D array, with each row
+           being an ARF.
+
+        """
+
         # copy the old ARF (use new memory for deviations)
         new_arf = np.add(specresp, self.bias)
         # Include the perturbed effective area in each iteration.
-        rr = np.random.randint(self.ncomp)
-        return np.add(new_arf, self.simcomp[rr], new_arf)
+        if new_arf.ndim == 1:
+            rr = np.random.randint(self.ncomp)
+        else:
+            rr = np.random.randint(self.ncomp, size=new_arf.shape[:-1])
+
+        return np.add(new_arf, np.asarray(self.simcomp)[rr], new_arf)
 
 
 def search_arfs(fit):
@@ -158,6 +198,27 @@ def flatten_arfs(src, bkg):
     return arfs
 
 
+def search_rsp_models(fit, arfs):
+    """Return the models of the fit which fold through one of the ARFs.
+
+    The models are returned with the index of the ARF they use.
+    """
+
+    models = [fit.model]
+    if isinstance(fit.model, CompositeModel):
+        models.extend(fit.model._get_parts())
+
+    out = []
+    for model in models:
+        orig = getattr(model, '_arf', None)
+        for idx, arf in enumerate(arfs):
+            if orig is arf:
+                out.append((idx, model))
+                break
+
+    return out
+
+
 class WalkWithSubIters(Walk):
 
     def __init__(self, sampler=None, niter=1000):
@@ -181,18 +242,9 @@ class WalkWithSubIters(Walk):
         pars, stat = self._sampler.init(**kwargs)
 
         # setup proposal variables
-        npars = len(pars)
         nsubiter = int(self.nsubiter)
         niter = self.niter
-        nelem = niter + 1
-
-        proposals = np.zeros((nelem, npars), dtype=float)
-        proposals[0] = pars.copy()
-
-        stats = np.zeros(nelem, dtype=float)
-        stats[0] = stat
-
-        acceptflag = np.zeros(nelem, dtype=bool)
+        proposals, stats, acceptflag, start = self._allocate(pars, stat)
 
         # Iterations
         # - no burn in at present
@@ -205,7 +257,7 @@ class WalkWithSubIters(Walk):
         # tstart = time.time()
 
         try:
-            for ii in range(niter):
+            for ii in range(start, niter):
                 jump = ii + 1
 
                 current_params = proposals[ii]
@@ -275,8 +327,11 @@ class WalkWithSubIters(Walk):
                         proposals[jump] = np.array(current_params)
                         stats[jump] = current_stat
 
+                self._checkpoint(jump)
+
         finally:
             self._sampler.tear_down()
+            self._close()
             # progress_bar(niter, niter, tstart,
             #              self._sampler.__class__.__name__)
 
@@ -298,6 +353,10 @@ class PragBayes(MetropolisMH):
         self.arfs = flatten_arfs(self.srcarfs, self.bkgarfs)
         self.backup_arfs = [arf.specresp.copy() for arf in self.arfs]
 
+        # The response models of the fit, which use a filtered copy
+        # of the ARF while the model is in use.
+        self.rspmodels = search_rsp_models(fit, self.arfs)
+
         self.simarf = None
 
     def init(self, log=False, inv=False, defaultprior=True, priorshape=False,
@@ -361,15 +420,37 @@ class PragBayes(MetropolisMH):
         proposal = rmvt(current, self._sigma, self._dof)
         return proposal
 
+    def _draw_independent(self):
+        # The MH jumps start at the current position, so they can not
+        # be drawn in blocks.
+        return None
+
     def perturb_arf(self, current_params, current_stat):
         if self.simarf is not None:
-            # add deviations starting with original ARF for each iter
-            for specresp, arf in zip(self.backup_arfs, self.arfs):
-                arf.specresp = self.simarf.add_deviations(specresp)
+            # add deviations starting with original ARF for each iter;
+            # the deviations for all the ARFs are calculated at once.
+            if len(self.arfs) > 0:
+                specresps = self.simarf.add_deviations(
+                    np.asarray(self.backup_arfs))
+                for specresp, arf in zip(specresps, self.arfs):
+                    arf.specresp = specresp
+
+                self._update_models()
 
             # When ARF is updated, set scale to None
             self._sigma = None
 
+    def _update_models(self):
+        """Send the current ARFs to the response models of the fit."""
+
+        for idx, model in self.rspmodels:
+            if model.arf is not model._arf:
+                model.arf.specresp = self.arfs[idx].specresp
+
+        # Any evaluations with the old ARFs are no-longer valid.
+        if hasattr(self._fit.model, 'cache_clear'):
+            self._fit.model.cache_clear()
+
     def tear_down(self):
         MetropolisMH.tear_down(self)
 
@@ -378,3 +459,5 @@ class PragBayes(MetropolisMH):
         # Restore ARF to original state
         for specresp, arf in zip(self.backup_arfs, self.arfs):
             arf.specresp = specresp
+
+        self._update_models()
@@ -21,7 +21,18 @@
 This is based on sherpa/sim/tests_sim_unit.py.
 """
 
+import numpy
+
+import pytest
+
 from sherpa.astro import sim
+from sherpa.astro.data import DataPHA
+from sherpa.astro.instrument import RSPModelPHA, create_arf, \
+    create_delta_rmf
+from sherpa.astro.sim.pragbayes import PCA1DAdd, PragBayes, SIM1DAdd
+from sherpa.fit import Fit
+from sherpa.models.basic import Const1D
+from sherpa.stats import Cash
 
 
 # This is part of #397
@@ -46,3 +57,105 @@ def test_list_samplers_contents():
     samplers = sim.MCMC().list_samplers()
     for expected in ['mh', 'metropolismh', 'pragbayes', 'fullbayes']:
         assert expected in samplers
+
+
+def make_pca(ncomp=3, nbins=20):
+    rng = numpy.random.RandomState(8273)
+    return PCA1DAdd(rng.normal(size=nbins) * 0.1, numpy.arange(ncomp),
+                    numpy.ones(ncomp), numpy.linspace(1, 0.1, ncomp),
+                    rng.normal(size=(ncomp, nbins)))
+
+
+@pytest.mark.parametrize("rrin", [None, 0.5])
+def test_pca1dadd_many(rrin):
+    """Perturbing several ARFs at once matches doing it one at a time."""
+
+    simarf = make_pca()
+    specresps = numpy.linspace(100, 200, 80).reshape(4, 20)
+    rrsig = None if rrin is None else 0.1
+
+    numpy.random.seed(2734)
+    expected = []
+    rrout = []
+    for specresp in specresps:
+        expected.append(simarf.add_deviations(specresp, rrin, rrsig))
+        rrout.append(simarf.rrout)
+
+    numpy.random.seed(2734)
+    got = simarf.add_deviations(specresps, rrin, rrsig)
+    assert got == pytest.approx(numpy.asarray(expected))
+    assert simarf.rrout == pytest.approx(numpy.asarray(rrout))
+
+    # The input is not changed.
+    assert specresps == pytest.approx(numpy.linspace(100, 200, 80).reshape(4, 20))
+
+
+def test_pca1dadd_deviations():
+    """Check the deviations are the sum of the scaled components."""
+
+    simarf = make_pca()
+    specresp = numpy.full(20, 100.0)
+
+    numpy.random.seed(73)
+    got = simarf.add_deviations(specresp)
+
+    expected = specresp + simarf.bias
+    for rr, val, vec in zip(simarf.rrout, simarf.eigenval, simarf.eigenvec):
+        expected += rr * val * vec
+
+    assert got == pytest.approx(expected)
+
+
+def test_sim1dadd_many():
+    """Perturbing several ARFs at once matches doing it one at a time."""
+
+    rng = numpy.random.RandomState(9283)
+    simarf = SIM1DAdd(rng.normal(size=20), numpy.arange(5),
+                      rng.normal(size=(5, 20)))
+    specresps = numpy.linspace(100, 200, 60).reshape(3, 20)
+
+    numpy.random.seed(2734)
+    expected = [simarf.add_deviations(specresp) for specresp in specresps]
+
+    numpy.random.seed(2734)
+    got = simarf.add_deviations(specresps)
+    assert got == pytest.approx(numpy.asarray(expected))
+
+
+def test_pragbayes_perturb_arf_model():
+    """The perturbed ARF is used by the model during a fit."""
+
+    egrid = numpy.linspace(0.1, 2.1, 21)
+    elo, ehi = egrid[:-1], egrid[1:]
+    arf = create_arf(elo, ehi, numpy.ones(20) * 100)
+    rmf = create_delta_rmf(elo, ehi, e_min=elo, e_max=ehi)
+    pha = DataPHA('x', numpy.arange(1, 21), numpy.ones(20) * 5)
+    pha.set_arf(arf)
+    pha.set_rmf(rmf)
+    pha.units = 'energy'
+    pha.notice(0.5, 1.5)
+
+    mdl = RSPModelPHA(arf, rmf, pha, Const1D())
+    fit = Fit(pha, mdl, Cash())
+
+    sampler = PragBayes(lambda p: 0, numpy.eye(1), numpy.ones(1), 1, fit)
+    deviation = numpy.arange(20) * 10.0
+    sampler.init(simarf=SIM1DAdd(numpy.zeros(20), numpy.arange(1),
+                                 deviation[numpy.newaxis, :]))
+
+    # The model uses a filtered copy of the ARF while it is started.
+    mdl.startup(True)
+    try:
+        before = pha.eval_model_to_fit(mdl)
+        assert before == pytest.approx(numpy.full(10, 10))
+
+        sampler.perturb_arf(None, None)
+        after = pha.eval_model_to_fit(mdl)
+        assert after == pytest.approx(0.1 * (100 + deviation[4:14]))
+
+        sampler.tear_down()
+        assert pha.eval_model_to_fit(mdl) == pytest.approx(before)
+    finally:
+        mdl.teardown()
+
+    assert arf.specresp == pytest.approx(numpy.full(20, 100))
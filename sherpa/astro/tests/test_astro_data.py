@@ -26,6 +26,7 @@ import pytest
 
 from sherpa.astro.ui.utils import Session
 from sherpa.astro.data import DataARF, DataPHA, DataRMF
+from sherpa.astro.utils import rmf_fold, _writeable
 from sherpa.utils import parse_expr
 from sherpa.utils.err import DataErr
 from sherpa.utils.testing import requires_data, requires_fits
@@ -377,6 +378,75 @@ def create_delta_rmf(rmflo, rmfhi, startchan=1,
                    ethresh=ethresh)
 
 
+def test_arf_specresp_keeps_filter():
+    """Changing the ARF values does not remove the filter."""
+
+    energy = np.arange(0.1, 1.2, 0.1)
+    arf = create_arf(energy[:-1], energy[1:], np.ones(10))
+    mask = np.arange(10) > 3
+    arf.notice(mask)
+    assert arf.get_dep() == pytest.approx(np.ones(6))
+
+    arf.specresp = np.arange(10.0)
+    assert arf.specresp == pytest.approx(np.arange(10))
+    assert arf.get_dep() == pytest.approx(np.arange(4, 10))
+
+    arf.notice()
+    assert arf.get_dep() == pytest.approx(np.arange(10))
+
+
+def readonly(arr):
+    out = np.asarray(arr).view()
+    out.flags.writeable = False
+    return out
+
+
+def test_writeable():
+    """The compiled routines are sent the array being viewed."""
+
+    arr = np.arange(5.0)
+    view = readonly(arr)
+    assert _writeable(view) is arr
+    assert _writeable(arr) is arr
+
+    # Other read-only arrays are not changed.
+    assert _writeable(readonly(arr)[1:]).base is arr
+    assert not _writeable(readonly(arr)[1:]).flags.writeable
+
+
+def test_response_read_only():
+    """Read-only responses, as shared by read_arf and read_rmf."""
+
+    energy = np.arange(0.1, 1.2, 0.1)
+    arf = DataARF('arf', readonly(energy[:-1]), readonly(energy[1:]),
+                  readonly(np.arange(1.0, 11.0)))
+    with pytest.raises(ValueError):
+        arf.specresp[0] = 2
+
+    src = np.ones(10)
+    assert arf.apply_arf(src) == pytest.approx(np.arange(1, 11))
+
+    def make_rmf(conv):
+        return DataRMF('rmf', 5, conv(energy[:-1]), conv(energy[1:]),
+                       conv(np.ones(10, dtype=np.int16)),
+                       conv(np.arange(10, dtype=np.int16) // 2 + 1),
+                       conv(np.ones(10, dtype=np.int16)),
+                       conv(np.ones(10)))
+
+    rmf = make_rmf(readonly)
+    expected = np.asarray([2, 2, 2, 2, 2])
+    assert rmf.apply_rmf(src) == pytest.approx(expected)
+    assert rmf.apply_rmf(np.asarray([src, 2 * src])) == \
+        pytest.approx(np.asarray([expected, 2 * expected]))
+
+    # Filtering matches a writeable response.
+    rmf2 = make_rmf(np.copy)
+    chans = np.asarray([2, 3])
+    assert rmf.notice(chans) == pytest.approx(rmf2.notice(chans))
+    src = np.arange(rmf.get_indep()[0].size)
+    assert rmf.apply_rmf(src) == pytest.approx(rmf2.apply_rmf(src))
+
+
 @pytest.mark.parametrize("ethresh", [0.0, -1e-10, -100])
 def test_arf_with_non_positive_thresh(ethresh):
     """Check the error-handling works when ethresh <= 0"""
@@ -2586,3 +2656,52 @@ def test_pha_check_limit_channel(ignore, lo, hi, evals):
         expected = [vout] * c1 + [vin] * c2 + [vout] * c3
         assert pha.mask == pytest.approx(pha.get_mask())
         assert pha.mask == pytest.approx(expected)
+
+
+def make_gauss_rmf():
+    """A RMF with a simple gaussian response."""
+
+    nchans = 20
+    egrid = np.linspace(0.5, 2.5, 21)
+    chans = np.arange(nchans)
+    n_grp = np.ones(20, dtype=int)
+    f_chan = np.ones(20, dtype=int)
+    n_chan = np.full(20, nchans)
+    matrix = np.exp(-0.5 * (chans[None, :] - chans[:, None])**2 / 4)
+    matrix /= matrix.sum(axis=1)[:, None]
+    return DataRMF('gauss', nchans, egrid[:-1], egrid[1:], n_grp, f_chan,
+                   n_chan, matrix.flatten())
+
+
+def test_rmf_get_rmf_matrix_cached():
+    """The matrix is re-used until the filter changes"""
+
+    rmf = make_gauss_rmf()
+    mat = rmf.get_rmf_matrix()
+    assert rmf.get_rmf_matrix() is mat
+    assert mat.nenergy == 20
+
+    rmf.notice(np.arange(5, 10))
+    mat2 = rmf.get_rmf_matrix()
+    assert mat2 is not mat
+    assert mat2.nenergy == len(rmf._lo)
+
+
+def test_rmf_apply_rmf_many():
+    """Several spectra can be folded at once"""
+
+    rmf = make_gauss_rmf()
+    src = np.arange(1, 61).reshape(3, 20)
+    got = rmf.apply_rmf(src)
+    assert got.shape == (3, 20)
+    for row, src_row in zip(got, src):
+        assert row == pytest.approx(rmf.apply_rmf(src_row))
+
+    # Check with a filter
+    mask = rmf.notice(np.arange(5, 10))
+    src = src[:, mask]
+    got = rmf.apply_rmf(src)
+    for row, src_row in zip(got, src):
+        expected = rmf_fold(src_row, rmf._grp, rmf._fch, rmf._nch,
+                            rmf._rsp, rmf.detchans, rmf.offset)
+        assert row == pytest.approx(expected)
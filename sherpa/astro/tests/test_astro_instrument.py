@@ -48,6 +48,7 @@ from sherpa.astro.instrument import ARF1D, ARFModelNoPHA, ARFModelPHA, \
     PSFModel, has_pha_response
 from sherpa.fit import Fit
 from sherpa.astro.data import DataPHA, DataRMF
+from sherpa.astro.utils import rmf_fold
 from sherpa.astro import hc
 from sherpa.models.basic import Box1D, Const1D, Gauss1D, Polynom1D, PowLaw1D
 from sherpa.utils.err import DataErr
@@ -1780,3 +1781,121 @@ def test_has_pha_response():
     # reflexivity check
     assert has_pha_response(rsp(m1) + m2)
     assert has_pha_response(rsp(m1) + rsp(m2))
+
+
+@pytest.mark.parametrize("expr", [False, True])
+def test_arfmodelpha_cache(expr):
+    """The response output is not cached during a fit.
+
+    The response can be changed in place during a fit, so the cache
+    is not used, even when the response is part of an expression.
+    """
+
+    egrid = np.arange(0.1, 0.8, 0.025)
+    elo = egrid[:-1]
+    ehi = egrid[1:]
+    adata = create_arf(elo, ehi, 2.4 * np.ones(elo.size))
+
+    channels = np.arange(1, elo.size + 1, dtype=np.int16)
+    pha = DataPHA('test-pha', channel=channels,
+                  counts=np.ones(elo.size, dtype=np.int16))
+    pha.set_arf(adata)
+
+    mdl = Const1D('flat')
+    wrapped = ARFModelPHA(adata, pha, mdl)
+    if expr:
+        bgnd = Const1D('bgnd')
+        bgnd.c0 = 0
+        wrapped = wrapped + bgnd
+
+    wrapped.startup(cache=True)
+    try:
+        out1 = wrapped(elo, ehi)
+        adata.specresp *= 3
+        out2 = wrapped(elo, ehi)
+        assert_allclose(out2, 3 * out1)
+        assert wrapped._memo is None
+
+    finally:
+        wrapped.teardown()
+
+
+def make_blurred_response(nbins):
+    """An ARF and a RMF which spreads each energy over 3 channels."""
+
+    egrid = np.linspace(0.1, 1.1, nbins + 1)
+    elo = egrid[:-1]
+    ehi = egrid[1:]
+    specresp = np.linspace(2, 4, nbins)
+    adata = create_arf(elo, ehi, specresp)
+
+    n_grp = np.ones(nbins, dtype=int)
+    f_chan = np.clip(np.arange(nbins), 1, nbins - 2)
+    n_chan = np.full(nbins, 3)
+    matrix = np.tile([0.2, 0.6, 0.2], nbins)
+    rdata = DataRMF('blur', nbins, elo, ehi, n_grp, f_chan, n_chan, matrix,
+                    e_min=elo, e_max=ehi)
+    return adata, rdata
+
+
+def test_rspmodelpha_combined_response():
+    """The source is folded through the response cached by the RMF."""
+
+    nbins = 20
+    adata, rdata = make_blurred_response(nbins)
+    channels = np.arange(1, nbins + 1)
+    pha = DataPHA('test-pha', channel=channels,
+                  counts=np.ones(nbins))
+    pha.set_arf(adata)
+    pha.set_rmf(rdata)
+    pha.units = 'channel'
+    pha.notice(5, 12)
+
+    mdl = Polynom1D()
+    mdl.c1 = 2
+    wrapped = RSPModelPHA(adata, rdata, pha, mdl)
+    wrapped.startup()
+    try:
+        out = wrapped(channels)
+        rsp = wrapped._get_response()
+        assert rsp is wrapped.rmf.get_rmf_matrix()
+
+        # The dense form of the response is not needed.
+        assert rsp._dense is None
+
+        src = mdl(wrapped.xlo, wrapped.xhi) * wrapped.arf._rsp
+        expected = rmf_fold(src, wrapped.rmf._grp, wrapped.rmf._fch,
+                            wrapped.rmf._nch, wrapped.rmf._rsp, nbins, 1)
+        assert_allclose(out, expected)
+
+        # The response is re-used
+        mdl.c0 = 1
+        wrapped(channels)
+        assert wrapped._get_response() is rsp
+
+    finally:
+        wrapped.teardown()
+
+
+def test_rspmodelpha_combined_response_arf_changes():
+    """Changes to the ARF are used."""
+
+    nbins = 20
+    adata, rdata = make_blurred_response(nbins)
+    channels = np.arange(1, nbins + 1)
+    pha = DataPHA('test-pha', channel=channels,
+                  counts=np.ones(nbins))
+
+    mdl = Const1D()
+    wrapped = RSPModelPHA(adata, rdata, pha, mdl)
+    out1 = wrapped(channels)
+
+    adata.specresp = 3 * adata.specresp
+    adata.notice()
+    out2 = wrapped(channels)
+    assert_allclose(out2, 3 * out1)
+
+    # Changing the values in place is also recognized.
+    adata.specresp *= 2
+    out3 = wrapped(channels)
+    assert_allclose(out3, 6 * out1)
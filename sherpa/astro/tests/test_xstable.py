@@ -0,0 +1,429 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+import itertools
+import pickle
+
+import numpy as np
+
+import pytest
+
+from sherpa.astro import hc
+from sherpa.astro.xstable import TableGrid, XSTableGridModel, \
+    read_table_grid, read_xstable_grid
+from sherpa.utils.err import IOErr, ParameterErr
+from sherpa.utils.testing import requires_fits, requires_xspec
+
+
+# The table values are chosen so that the interpolation is exact:
+# linear in the first parameter and in log of the second.
+#
+P1 = np.asarray([0.0, 1.0, 3.0])
+P2 = np.asarray([1.0, 10.0, 100.0, 1000.0])
+ELO = np.arange(1.0, 11.0)
+EHI = ELO + 1
+BASE = np.linspace(1, 2, ELO.size)
+EXTRA = np.linspace(0.5, 0.1, ELO.size)
+
+
+def spectrum(p1, p2):
+    return (1 + p1) * (2 + np.log10(p2)) * BASE
+
+
+def card(key, value):
+    if isinstance(value, bool):
+        value = 'T' if value else 'F'
+        text = '{:<8s}= {:>20s}'.format(key, value)
+    elif isinstance(value, str):
+        text = "{:<8s}= '{:<8s}'".format(key, value.replace("'", "''"))
+    else:
+        text = '{:<8s}= {:>20}'.format(key, value)
+
+    return '{:<80s}'.format(text).encode('ascii')
+
+
+def hdu(keys, data=b''):
+    cards = b''.join(card(k, v) for k, v in keys) + \
+        '{:<80s}'.format('END').encode('ascii')
+    cards += b' ' * (-len(cards) % 2880)
+    return cards + data + b'\0' * (-len(data) % 2880)
+
+
+def bintable(name, columns, nrows, extra=()):
+    """columns is a list of (name, tform, big-endian array)."""
+
+    dtype = np.dtype([(cname, arr.dtype, arr.shape[1:])
+                      for cname, _, arr in columns])
+    rows = np.zeros(nrows, dtype=dtype)
+    for cname, _, arr in columns:
+        rows[cname] = arr
+
+    keys = [('XTENSION', 'BINTABLE'), ('BITPIX', 8), ('NAXIS', 2),
+            ('NAXIS1', dtype.itemsize), ('NAXIS2', nrows),
+            ('PCOUNT', 0), ('GCOUNT', 1), ('TFIELDS', len(columns))]
+    for idx, (cname, tform, _) in enumerate(columns, 1):
+        keys.extend([('TTYPE{}'.format(idx), cname),
+                     ('TFORM{}'.format(idx), tform)])
+
+    keys.append(('EXTNAME', name))
+    keys.extend(extra)
+    return hdu(keys, rows.tobytes())
+
+
+def write_table(path, addmodel=True, redshift=False, nadd=0,
+                shuffle=False, extra=()):
+    """Write out a table model with parameters p1 and p2.
+
+    The extra keywords are added to the SPECTRA block.
+    """
+
+    nvals = max(P1.size, P2.size)
+    values = np.zeros((2 + nadd, nvals))
+    values[0, :P1.size] = P1
+    values[1, :P2.size] = P2
+
+    def col(vals, dtype='>f4'):
+        return np.asarray(vals).astype(dtype)
+
+    names = np.asarray(['p1', 'p2'] +
+                       ['add{}'.format(i + 1) for i in range(nadd)],
+                       dtype='S12')
+    npars = 2 + nadd
+    params = [('NAME', '12A', names),
+              ('METHOD', 'J', col([0, 1] + [0] * nadd, '>i4')),
+              ('INITIAL', 'E', col([1, 10] + [0] * nadd)),
+              ('DELTA', 'E', col([0.01] * npars)),
+              ('MINIMUM', 'E', col([0, 1] + [-10] * nadd)),
+              ('BOTTOM', 'E', col([0, 1] + [-10] * nadd)),
+              ('TOP', 'E', col([3, 1000] + [10] * nadd)),
+              ('MAXIMUM', 'E', col([3, 1000] + [10] * nadd)),
+              ('NUMBVALS', 'J', col([P1.size, P2.size] + [0] * nadd,
+                                    '>i4')),
+              ('VALUE', '{}E'.format(nvals), col(values))]
+
+    energies = [('ENERG_LO', 'E', col(ELO)),
+                ('ENERG_HI', 'E', col(EHI))]
+
+    grid = list(itertools.product(P1, P2))
+    if shuffle:
+        grid = [grid[i] for i in
+                np.random.RandomState(3).permutation(len(grid))]
+
+    nbins = ELO.size
+    rows = [('PARAMVAL', '2E', col(grid)),
+            ('INTPSPEC', '{}E'.format(nbins),
+             col([spectrum(*g) for g in grid]))]
+    for idx in range(nadd):
+        rows.append(('ADDSP{:03d}'.format(idx + 1), '{}E'.format(nbins),
+                     col([(idx + 1) * EXTRA for g in grid])))
+
+    primary = hdu([('SIMPLE', True), ('BITPIX', 8), ('NAXIS', 0),
+                   ('EXTEND', True), ('HDUCLAS1', 'XSPEC TABLE MODEL'),
+                   ('MODLNAME', 'test'), ('ADDMODEL', addmodel),
+                   ('REDSHIFT', redshift)])
+    with open(path, 'wb') as fh:
+        fh.write(primary)
+        fh.write(bintable('PARAMETERS', params, npars,
+                          [('NINTPARM', 2), ('NADDPARM', nadd)]))
+        fh.write(bintable('ENERGIES', energies, ELO.size))
+        fh.write(bintable('SPECTRA', rows, len(grid), extra))
+
+    return str(path)
+
+
+@pytest.mark.parametrize("shuffle", [False, True])
+def test_grid_read(shuffle, tmp_path):
+    """The grid is read in, whatever the order of the rows."""
+
+    grid = TableGrid(write_table(tmp_path / 'tbl.fits', shuffle=shuffle))
+    assert grid.addmodel
+    assert not grid.redshift
+    assert grid.parnames == ['p1', 'p2']
+    assert (grid.nint, grid.nadd) == (2, 0)
+    assert grid.values[0] == pytest.approx(P1)
+    assert grid.values[1] == pytest.approx(P2)
+    assert grid.energ_lo == pytest.approx(ELO)
+    assert grid.energ_hi == pytest.approx(EHI)
+
+    # The grid points are returned exactly.
+    for p1, p2 in itertools.product(P1, P2):
+        assert grid.interpolate([p1, p2]) == pytest.approx(spectrum(p1, p2))
+
+
+def test_grid_interpolate(tmp_path):
+    """Linear and logarithmic interpolation."""
+
+    grid = TableGrid(write_table(tmp_path / 'tbl.fits'))
+    pars = np.asarray([[0.5, 10], [2.2, 3.7], [1, 500], [0, 1000]])
+    got = grid.interpolate(pars)
+    assert got.shape == (4, ELO.size)
+    for pvals, row in zip(pars, got):
+        assert row == pytest.approx(spectrum(*pvals), rel=1e-6)
+
+
+def test_grid_interpolate_outside(tmp_path):
+    """Values outside the grid are moved to the edge."""
+
+    grid = TableGrid(write_table(tmp_path / 'tbl.fits'))
+    got = grid.interpolate([5, 0.5])
+    assert got == pytest.approx(spectrum(3, 1))
+
+
+def test_grid_additional(tmp_path):
+    """The additional parameters are included."""
+
+    grid = TableGrid(write_table(tmp_path / 'tbl.fits', nadd=2))
+    assert grid.parnames == ['p1', 'p2', 'add1', 'add2']
+    assert (grid.nint, grid.nadd) == (2, 2)
+    got = grid.interpolate([0.5, 100, 2, -0.5])
+    expected = spectrum(0.5, 100) + 2 * EXTRA - 0.5 * 2 * EXTRA
+    assert got == pytest.approx(expected, rel=1e-6)
+
+
+def test_grid_missing_row(tmp_path):
+    """Every point of the parameter grid must be present."""
+
+    infile = write_table(tmp_path / 'tbl.fits')
+    with open(infile, 'rb') as fh:
+        data = bytearray(fh.read())
+
+    # Change the p1 value of the first spectrum from 0 to 1 (the
+    # first column of the first row of the last block).
+    start = data.rfind(b'PARAMVAL')
+    start = data.index(b'END ', start)
+    start += 2880 - start % 2880
+    data[start:start + 4] = np.asarray([1], dtype='>f4').tobytes()
+    with open(infile, 'wb') as fh:
+        fh.write(data)
+
+    with pytest.raises(IOErr,
+                       match="does not cover the parameter grid"):
+        TableGrid(infile)
+
+
+def test_grid_not_a_table(tmp_path):
+    infile = tmp_path / 'tbl.fits'
+    infile.write_bytes(hdu([('SIMPLE', True), ('BITPIX', 8),
+                            ('NAXIS', 0)]))
+    with pytest.raises(IOErr, match="HDUCLAS1 is not set"):
+        TableGrid(str(infile))
+
+
+@pytest.mark.parametrize("key,value,msg",
+                         [('TSCAL2', 2.0, 'is scaled'),
+                          ('TZERO2', 1.0, 'is scaled'),
+                          ('TDIM2', '(5,2)', 'has TDIM')])
+def test_grid_scaled_column(key, value, msg, tmp_path):
+    """Columns which can not be used as stored are rejected."""
+
+    infile = write_table(tmp_path / 'tbl.fits', extra=[(key, value)])
+    with pytest.raises(IOErr, match="column INTPSPEC " + msg):
+        TableGrid(infile)
+
+
+def test_grid_unscaled_column(tmp_path):
+    """The default values of the keywords are accepted."""
+
+    infile = write_table(tmp_path / 'tbl.fits',
+                         extra=[('TSCAL2', 1.0), ('TZERO2', 0),
+                                ('TDIM2', '(10)')])
+    grid = TableGrid(infile)
+    assert grid.interpolate([1, 10]) == pytest.approx(spectrum(1, 10))
+
+
+def test_grid_is_shared(tmp_path):
+    """The file is only read in once."""
+
+    infile = write_table(tmp_path / 'tbl.fits')
+    grid = read_table_grid(infile)
+    assert read_table_grid(infile) is grid
+    assert XSTableGridModel(infile).grid is grid
+
+
+def test_grid_pickle(tmp_path):
+    grid = TableGrid(write_table(tmp_path / 'tbl.fits'))
+    new = pickle.loads(pickle.dumps(grid))
+    assert new.parnames == grid.parnames
+    assert new.interpolate([1, 20]) == pytest.approx(grid.interpolate([1, 20]))
+
+
+def test_model_pars(tmp_path):
+    mdl = read_xstable_grid('tbl', write_table(tmp_path / 'tbl.fits',
+                                               redshift=True, nadd=1))
+    assert isinstance(mdl, XSTableGridModel)
+    assert mdl.name == 'tbl'
+    assert [p.name for p in mdl.pars] == ['p1', 'p2', 'add1', 'redshift',
+                                          'norm']
+    assert [p.frozen for p in mdl.pars] == [False, False, True, True,
+                                            False]
+    assert mdl.p2.val == pytest.approx(10)
+    assert mdl.p2.min == pytest.approx(1)
+    assert mdl.p2.max == pytest.approx(1000)
+
+
+def test_model_additive(tmp_path):
+    """The table is rebinned onto the requested grid."""
+
+    mdl = XSTableGridModel(write_table(tmp_path / 'tbl.fits'))
+    mdl.p1 = 1
+    mdl.p2 = 100
+    mdl.norm = 2
+    spec = 2 * spectrum(1, 100)
+
+    # Matching bins, merged bins, and bins outside the table.
+    assert mdl(ELO, EHI) == pytest.approx(spec, rel=1e-6)
+    assert mdl([1, 3], [3, 5]) == pytest.approx([spec[0] + spec[1],
+                                                 spec[2] + spec[3]],
+                                                rel=1e-6)
+    assert mdl([0.5, 1.5, 20], [1.5, 2, 30]) == \
+        pytest.approx([spec[0] / 2, spec[0] / 2, 0], rel=1e-6)
+
+    # A single grid, as used by the XSPEC models.
+    got = mdl(np.append(ELO, EHI[-1]))
+    assert got[:-1] == pytest.approx(spec, rel=1e-6)
+    assert got[-1] == 0
+
+
+
+def test_model_wavelength(tmp_path):
+    """The grid is in Angstrom when xlo decreases, as with XSPEC."""
+
+    mdl = XSTableGridModel(write_table(tmp_path / 'tbl.fits'))
+    mdl.p1 = 3
+    mdl.p2 = 10
+    spec = spectrum(3, 10)
+
+    # Each bin has xlo < xhi, but the bins are in decreasing
+    # wavelength order.
+    assert mdl(hc / EHI, hc / ELO) == pytest.approx(spec, rel=1e-6)
+
+    # A single grid in decreasing wavelength, where the last bin is
+    # zero.
+    got = mdl(hc / np.append(ELO, EHI[-1]))
+    assert got == pytest.approx(np.append(spec, 0), rel=1e-6)
+
+    # A single bin is in keV.
+    assert mdl([2], [3]) == pytest.approx(spec[1:2], rel=1e-6)
+
+
+def test_model_wavelength_invalid(tmp_path):
+    mdl = XSTableGridModel(write_table(tmp_path / 'tbl.fits'))
+    with pytest.raises(ValueError, match="^Wavelength must be > 0"):
+        mdl([2, 1, 0], [3, 2, 1])
+
+
+def test_model_redshift(tmp_path):
+    mdl = XSTableGridModel(write_table(tmp_path / 'tbl.fits',
+                                       redshift=True))
+    mdl.p1 = 0
+    mdl.p2 = 10
+    mdl.redshift = 1
+    spec = spectrum(0, 10)
+
+    # The bin 0.5-1 keV is 1-2 keV in the rest frame.
+    got = mdl([0.5, 1, 6], [1, 1.5, 7])
+    assert got == pytest.approx([spec[0] / 2, spec[1] / 2, 0], rel=1e-6)
+
+
+@pytest.mark.parametrize("etable", [False, True])
+def test_model_multiplicative(etable, tmp_path):
+    mdl = XSTableGridModel(write_table(tmp_path / 'tbl.fits',
+                                       addmodel=False),
+                           etable=etable)
+    assert not mdl.addmodel
+    assert [p.name for p in mdl.pars] == ['p1', 'p2']
+    mdl.p1 = 3
+    mdl.p2 = 1
+    spec = spectrum(3, 1)
+
+    # Bins are averaged, and the parts outside the table use the
+    # default value.
+    got = mdl([1, 1, 10, 20], [2, 3, 12, 30])
+    expected = np.asarray([spec[0], (spec[0] + spec[1]) / 2,
+                           spec[-1] / 2, 0])
+    default = 0 if etable else 1
+    expected[2] += default / 2
+    expected[3] = default
+    if etable:
+        expected = np.exp(-expected)
+
+    assert got == pytest.approx(expected, rel=1e-6)
+
+
+def test_model_limits(tmp_path):
+    mdl = XSTableGridModel(write_table(tmp_path / 'tbl.fits'))
+    with pytest.raises(ParameterErr):
+        mdl.calc([4, 10, 1], ELO, EHI)
+
+
+def test_model_batch(tmp_path):
+    """calc_batch matches calc."""
+
+    mdl = XSTableGridModel(write_table(tmp_path / 'tbl.fits',
+                                       redshift=True, nadd=1))
+    pars = np.asarray([[0.5, 3, 1, 0, 1],
+                       [2.2, 700, -2, 0.5, 3],
+                       [1, 10, 0, 2, 0.1]])
+    egrid = np.linspace(0.5, 12, 20)
+    got = mdl.calc_batch(pars, egrid[:-1], egrid[1:])
+    assert got.shape == (3, 19)
+    for pvals, row in zip(pars, got):
+        assert row == pytest.approx(mdl.calc(pvals, egrid[:-1], egrid[1:]))
+
+    got = mdl.calc_batch(pars, egrid)
+    assert got.shape == (3, 20)
+    assert (got[:, -1] == 0).all()
+
+
+def test_model_pickle(tmp_path):
+    mdl = XSTableGridModel(write_table(tmp_path / 'tbl.fits'))
+    mdl.p1 = 2
+    new = pickle.loads(pickle.dumps(mdl))
+    assert new.p1.val == pytest.approx(2)
+    assert new(ELO, EHI) == pytest.approx(mdl(ELO, EHI))
+
+
+@requires_xspec
+@requires_fits
+@pytest.mark.parametrize("wave", [False, True])
+@pytest.mark.parametrize("addmodel,etable",
+                         [(True, False), (False, False), (False, True)])
+def test_model_matches_xspec(addmodel, etable, wave, tmp_path):
+    """The model matches the XSPEC table model."""
+
+    from sherpa.astro.xspec import read_xstable_model
+
+    infile = write_table(tmp_path / 'tbl.fits', addmodel=addmodel,
+                         redshift=True, nadd=1)
+    mdl = read_xstable_grid('grid', infile, etable=etable)
+    xsmdl = read_xstable_model('xs', infile, etable=etable)
+    assert [p.name for p in mdl.pars] == [p.name for p in xsmdl.pars]
+
+    for pvals in [[0.5, 3, 1, 0.2], [2.2, 700, -2, 0], [3, 10, 0, 1]]:
+        for par, xspar, val in zip(mdl.pars, xsmdl.pars, pvals):
+            par.val = val
+            xspar.val = val
+
+        egrid = np.linspace(0.5, 12, 20)
+        if wave:
+            egrid = hc / egrid
+
+        assert mdl(egrid[:-1], egrid[1:]) == \
+            pytest.approx(xsmdl(egrid[:-1], egrid[1:]), rel=1e-5)
+        assert mdl(egrid) == pytest.approx(xsmdl(egrid), rel=1e-5)
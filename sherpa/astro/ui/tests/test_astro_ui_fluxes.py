@@ -34,8 +34,10 @@ from sherpa.utils.testing import requires_data, requires_fits, \
     requires_plotting, requires_xspec
 from sherpa.utils.err import ArgumentErr, ArgumentTypeErr, FitErr, \
     IdentifierErr, IOErr, ModelErr
+import sherpa.astro.flux
 import sherpa.astro.utils
 from sherpa.astro import hc, charge_e
+from sherpa.astro.flux import calc_flux
 
 
 def fail(*arg):
@@ -1343,6 +1345,99 @@ def test_sample_flux_1d_int():
     # to get this far
 
 
+def setup_calc_flux(link=False):
+    """Create a dataset, model, and samples for calc_flux"""
+
+    egrid = np.linspace(0.1, 10, 101)
+    data = ui.Data1DInt('x', egrid[:-1], egrid[1:], np.ones(100))
+
+    pl = ui.create_model_component('powlaw1d', 'pl')
+    gl = ui.create_model_component('gauss1d', 'gl')
+    gl.pos = 3
+    src = pl + gl
+    if link:
+        gl.ampl = pl.ampl / 2
+
+    rng = np.random.RandomState(2389)
+    nsamples = 30
+    samples = [rng.normal(1.7, 0.1, nsamples),
+               rng.normal(1, 0.1, nsamples)]
+    if not link:
+        samples.append(rng.normal(1, 0.1, nsamples))
+
+    samples.extend([rng.normal(3, 0.1, nsamples),
+                    rng.normal(2, 0.1, nsamples)])
+    return data, src, np.column_stack(samples)
+
+
+def expected_calc_flux(method, data, src, samples, lo, hi):
+    orig = src.thawedpars
+    try:
+        expected = []
+        for sample in samples:
+            src.thawedpars = sample
+            expected.append(method(data, src, lo, hi))
+    finally:
+        src.thawedpars = orig
+
+    return np.asarray(expected)
+
+
+@pytest.mark.parametrize("link", [False, True])
+@pytest.mark.parametrize("lo,hi", [(0.5, 7), (None, None), (2.15, None)])
+@pytest.mark.parametrize("method", [sherpa.astro.utils.calc_energy_flux,
+                                    sherpa.astro.utils.calc_photon_flux])
+def test_calc_flux_weights(method, lo, hi, link, clean_astro_ui):
+    """The precomputed weights give the same flux as method."""
+
+    data, src, samples = setup_calc_flux(link=link)
+    orig = src.thawedpars
+
+    expected = expected_calc_flux(method, data, src, samples, lo, hi)
+    got = calc_flux(data, src, samples, method, lo, hi, numcores=1)
+
+    assert got.shape == (samples.shape[0], samples.shape[1] + 1)
+    assert got[:, 0] == pytest.approx(expected, rel=1e-10)
+    assert got[:, 1:] == pytest.approx(samples)
+    assert src.thawedpars == pytest.approx(orig)
+
+
+def test_calc_flux_batch_subset(clean_astro_ui, monkeypatch):
+    """The samples are evaluated in blocks with calc_batch."""
+
+    data, src, samples = setup_calc_flux()
+    method = sherpa.astro.utils.calc_energy_flux
+    expected = expected_calc_flux(method, data, src, samples, 0.5, 7)
+
+    # Add an extra column to check subset and use small blocks.
+    extra = np.column_stack((np.ones(samples.shape[0]), samples))
+    monkeypatch.setattr(sherpa.astro.flux, '_BATCH_SIZE', 500)
+
+    nbatch = []
+    orig_calc_batch = type(src).calc_batch
+
+    def calc_batch(self, p, *args, **kwargs):
+        nbatch.append(len(p))
+        return orig_calc_batch(self, p, *args, **kwargs)
+
+    monkeypatch.setattr(type(src), 'calc_batch', calc_batch)
+    got = calc_flux(data, src, extra, method, 0.5, 7, numcores=1,
+                    subset=[1, 2, 3, 4, 5])
+
+    assert got[:, 0] == pytest.approx(expected, rel=1e-10)
+    assert got[:, 1:] == pytest.approx(extra)
+    assert nbatch == [5] * 6
+
+
+def test_calc_flux_no_bins(clean_astro_ui):
+    """The flux is 0 when the pass band does not overlap the data."""
+
+    data, src, samples = setup_calc_flux()
+    got = calc_flux(data, src, samples, lo=20, hi=30, numcores=1)
+    assert got[:, 0] == pytest.approx(np.zeros(samples.shape[0]))
+    assert got[:, 1:] == pytest.approx(samples)
+
+
 @requires_data
 @requires_fits
 @requires_xspec
@@ -17,11 +17,12 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
+import copy
 import logging
 
 import numpy
 
-from sherpa.utils import get_position, filter_bins
+from sherpa.utils import SherpaFloat, SherpaUInt, get_position, filter_bins
 from sherpa.utils.err import IOErr, DataErr
 
 from ._utils import arf_fold, do_group, expand_grouped_mask, \
@@ -37,7 +38,7 @@ __all__ = ['arf_fold', 'rmf_fold', 'do_group', 'apply_pileup',
            'calc_source_sum', 'compile_energy_grid',
            'calc_kcorr',
            'expand_grouped_mask', 'resp_init', 'is_in',
-           'get_xspec_position']
+           'get_xspec_position', 'RMFMatrix']
 
 
 warning = logging.getLogger(__name__).warning
@@ -121,6 +122,364 @@ def compile_energy_grid(arglist):
     return [elo, ehi, htable]
 
 
+def _flatten_rmf_matrix(matrix, n_chan):
+    """Return the MATRIX values used by each row as a 1D array.
+
+    Each row of a fixed-width MATRIX column contains the response
+    for all the groups in the row, one after the other, padded to
+    the width of the column. The number of values used by a row is
+    therefore the sum of its N_CHAN values.
+
+    Parameters
+    ----------
+    matrix : ndarray
+        The MATRIX column, with the rows where N_GRP is 0 removed.
+        It is a 1D array for a "perfect" RMF, in which case each
+        row must contain a single channel.
+    n_chan : ndarray
+        The N_CHAN column for the same rows. It can be 1D or 2D.
+
+    Returns
+    -------
+    matrix : ndarray
+        The flattened values.
+
+    """
+
+    nrows = len(matrix)
+    if nrows == 0:
+        return numpy.zeros(0, dtype=matrix.dtype)
+
+    ncs = numpy.asarray(n_chan).reshape(nrows, -1).astype(numpy.int64)
+    if matrix.ndim == 1:
+        if ncs.shape[1] != 1 or (ncs != 1).any():
+            raise IOErr('bad', 'format', 'MATRIX column formatting')
+
+        return matrix
+
+    matrix = matrix.reshape(nrows, -1)
+    used = ncs.sum(axis=1)
+    mask = numpy.arange(matrix.shape[1]) < used[:, None]
+    return matrix[mask]
+
+
+def _flatten_rmf_groups(n_grp, f_chan, n_chan):
+    """Return the F_CHAN and N_CHAN values for each group.
+
+    The first n_grp values of each row are used, which drops the
+    rows where N_GRP is 0.
+    """
+
+    f_chan = numpy.asarray(f_chan)
+    n_chan = numpy.asarray(n_chan)
+    ngrps = numpy.asarray(n_grp).astype(numpy.int64)
+    if ngrps.size > 0 and (ngrps.max() > f_chan.shape[1] or
+                           ngrps.max() > n_chan.shape[1]):
+        raise IOErr('bad', 'format', 'F_CHAN/N_CHAN column formatting')
+
+    mask = numpy.arange(f_chan.shape[1]) < ngrps[:, None]
+    fchan = numpy.asarray(f_chan[mask], SherpaUInt)
+
+    mask = numpy.arange(n_chan.shape[1]) < ngrps[:, None]
+    nchan = numpy.asarray(n_chan[mask], SherpaUInt)
+    return fchan, nchan
+
+
+def _gather_rows(heap, counts, offsets, dtype):
+    """Return the values of variable-length rows stored in a heap.
+
+    This is used to read the variable-length columns of a FITS
+    binary table, where each row is stored as a count and a byte
+    offset into the heap.
+
+    Parameters
+    ----------
+    heap : ndarray
+        The heap, as a 1D array of bytes.
+    counts, offsets : ndarray
+        The number of elements in each row, and the offset, in
+        bytes, of its first element from the start of the heap.
+    dtype : numpy.dtype
+        The type of the elements.
+
+    Returns
+    -------
+    values : ndarray
+        The values of each row, one after the other.
+
+    """
+
+    heap = numpy.ascontiguousarray(heap, dtype=numpy.uint8)
+    dtype = numpy.dtype(dtype)
+    size = dtype.itemsize
+    counts = numpy.asarray(counts, dtype=numpy.int64)
+    offsets = numpy.asarray(offsets, dtype=numpy.int64)
+    total = int(counts.sum())
+    if total == 0:
+        return numpy.zeros(0, dtype=dtype)
+
+    if (counts < 0).any() or (offsets < 0).any() or \
+       (offsets + counts * size > heap.size)[counts > 0].any():
+        raise IOErr('bad', 'format', 'variable-length array descriptor')
+
+    # The position of each element within its row.
+    starts = numpy.cumsum(counts) - counts
+    elem = numpy.arange(total) - numpy.repeat(starts, counts)
+
+    if (offsets % size == 0).all():
+        values = heap[:heap.size - heap.size % size].view(dtype)
+        return values[numpy.repeat(offsets // size, counts) + elem]
+
+    # The rows are not aligned, so select the bytes.
+    idx = numpy.repeat(offsets, counts) + elem * size
+    idx = idx[:, None] + numpy.arange(size)
+    return heap[idx].view(dtype).ravel()
+
+
+def _writeable(arr):
+    """Return the writeable array that arr is a read-only view of.
+
+    The compiled routines copy arrays which are not writeable, which
+    is expensive for the read-only response arrays shared by
+    `sherpa.astro.io.ResponseRegistry`. These routines do not change
+    their input arrays, so they can be sent the array which is being
+    viewed instead.
+    """
+
+    if not isinstance(arr, numpy.ndarray) or arr.flags.writeable:
+        return arr
+
+    base = arr.base
+    if isinstance(base, numpy.ndarray) and base.flags.writeable and \
+       base.dtype == arr.dtype and base.shape == arr.shape and \
+       base.strides == arr.strides and \
+       base.__array_interface__['data'][0] == \
+       arr.__array_interface__['data'][0]:
+        return base
+
+    return arr
+
+
+class RMFMatrix():
+    """The response from an RMF, ready for folding.
+
+    The compressed OGIP form of the response is checked once, and
+    then used to fold one or more source spectra through the
+    response. When the response is densely populated it is also
+    stored as a two-dimensional array, so that multiple source spectra
+    can be folded with a single matrix multiplication. It gives the
+    same result as `rmf_fold`.
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    n_grp, f_chan, n_chan, matrix : array_like
+        The compressed response, as used by `rmf_fold`.
+    nchans : int
+        The number of channels in the output.
+    offset : int, optional
+        The first channel number.
+    dense : bool or None, optional
+        Should the response be stored as a dense matrix? If None then
+        the decision is made based on the number of elements and the
+        fraction of them that are non-zero.
+
+    Attributes
+    ----------
+    nenergy : int
+        The number of energy bins.
+    nchans : int
+        The number of channels.
+    dense : ndarray or None
+        The response, with shape (nenergy, nchans), when stored as a
+        dense matrix. It is only created when first used.
+
+    Raises
+    ------
+    ValueError
+        The response is invalid or inconsistent.
+
+    Notes
+    -----
+    A single spectrum is always folded with `rmf_fold`, since it only
+    loops over the non-zero elements of the response. The dense matrix
+    is used when folding multiple spectra, as the BLAS routines used
+    by NumPy for the multiplication can use multiple threads, and so
+    it is only created the first time multiple spectra are folded.
+
+    """
+
+    dense_limit = 2**22
+    """The maximum number of elements in a dense matrix."""
+
+    dense_fraction = 0.25
+    """The fraction of non-zero elements needed for a dense matrix."""
+
+    def __init__(self, n_grp, f_chan, n_chan, matrix, nchans, offset=1,
+                 dense=None):
+
+        n_grp = numpy.asarray(n_grp, dtype=numpy.uintc).ravel()
+        f_chan = numpy.asarray(f_chan, dtype=numpy.uintc).ravel()
+        n_chan = numpy.asarray(n_chan, dtype=numpy.uintc).ravel()
+        matrix = numpy.asarray(matrix, dtype=SherpaFloat).ravel()
+        nchans = int(nchans)
+        offset = int(offset)
+
+        def invalid(flag):
+            if numpy.any(flag):
+                raise ValueError("RMF data is invalid or inconsistent")
+
+        # The same checks as rmf_fold.
+        invalid(f_chan.size != n_chan.size)
+        ngroups = int(n_grp.sum())
+        invalid(ngroups > f_chan.size)
+        first = f_chan[:ngroups].astype(numpy.int64) - offset
+        nchan = n_chan[:ngroups].astype(numpy.int64)
+        invalid((first < 0) | (first + nchan > nchans))
+        nelem = int(nchan.sum())
+        invalid(nelem > matrix.size)
+
+        self.nenergy = n_grp.size
+        self.nchans = nchans
+        self.offset = offset
+        self.n_grp = n_grp
+        self.f_chan = f_chan
+        self.n_chan = n_chan
+        self.matrix = matrix
+        self._energy = None
+
+        nfull = self.nenergy * nchans
+        if dense is None:
+            dense = nfull <= self.dense_limit and \
+                nelem >= self.dense_fraction * nfull
+
+        self._use_dense = bool(dense)
+        self._dense = None
+
+    def __repr__(self):
+        form = 'dense' if self._use_dense else 'compressed'
+        return '<RMFMatrix: {} energies, {} channels, {}>'.format(
+            self.nenergy, self.nchans, form)
+
+    @property
+    def dense(self):
+        if not self._use_dense:
+            return None
+
+        if self._dense is None:
+            # The energy and channel of each element of the response.
+            ngroups = int(self.n_grp.sum())
+            first = self.f_chan[:ngroups].astype(numpy.int64) - self.offset
+            nchan = self.n_chan[:ngroups].astype(numpy.int64)
+            energy = self._energy_index()
+            nelem = energy.size
+            start = numpy.cumsum(nchan) - nchan
+            chans = numpy.arange(nelem) - numpy.repeat(start - first, nchan)
+            flat = numpy.bincount(energy * self.nchans + chans,
+                                  weights=self.matrix[:nelem],
+                                  minlength=self.nenergy * self.nchans)
+            self._dense = flat.reshape(self.nenergy, self.nchans)
+
+        return self._dense
+
+    def _energy_index(self):
+        """The energy bin of each non-zero element of the response."""
+
+        if self._energy is None:
+            ngroups = int(self.n_grp.sum())
+            nchan = self.n_chan[:ngroups].astype(numpy.int64)
+            self._energy = numpy.repeat(
+                numpy.repeat(numpy.arange(self.nenergy),
+                             self.n_grp.astype(numpy.int64)),
+                nchan)
+
+        return self._energy
+
+    def scale(self, weights, out=None):
+        """Return a copy of the response with each energy bin scaled.
+
+        Only the compressed form of the response is copied. The
+        dense form, if used, is created from the scaled response
+        when it is needed.
+
+        Parameters
+        ----------
+        weights : array_like
+            The scaling factor for each energy bin (e.g. the ARF).
+        out : RMFMatrix or None, optional
+            If set, the scaled response is written to this object,
+            which must have been created by a previous call to this
+            method, rather than a new copy. This avoids re-allocating
+            the response when only the weights change.
+
+        Returns
+        -------
+        rmf : RMFMatrix
+
+        """
+
+        weights = numpy.asarray(weights, dtype=SherpaFloat)
+        if weights.shape != (self.nenergy, ):
+            raise TypeError("Expected {} energy bins, not {}".format(
+                self.nenergy, weights.shape))
+
+        if out is None:
+            out = copy.copy(self)
+            out.matrix = self.matrix.copy()
+
+        elif out.matrix.shape != self.matrix.shape or \
+                out._use_dense != self._use_dense:
+            raise TypeError("The output does not match the response")
+
+        energy = self._energy_index()
+        nelem = energy.size
+        numpy.multiply(self.matrix[:nelem], weights[energy],
+                       out=out.matrix[:nelem])
+        out._dense = None
+        return out
+
+    def fold(self, src):
+        """Fold the source spectrum or spectra through the response.
+
+        Parameters
+        ----------
+        src : array_like
+            The source values, either a one-dimensional array with
+            nenergy elements or a two-dimensional array with shape
+            (nsamples, nenergy).
+
+        Returns
+        -------
+        counts : ndarray
+            The folded values, with shape (nchans, ) or (nsamples,
+            nchans).
+
+        """
+
+        src = numpy.asarray(src, dtype=SherpaFloat)
+        if src.ndim not in (1, 2) or src.shape[-1] != self.nenergy:
+            raise TypeError("Expected {} energy bins, not {}".format(
+                self.nenergy, src.shape[-1:]))
+
+        if src.ndim == 1:
+            return self._fold(src)
+
+        if self.dense is not None:
+            return src @ self.dense
+
+        out = numpy.empty((src.shape[0], self.nchans), dtype=SherpaFloat)
+        for row, vals in zip(out, src):
+            row[:] = self._fold(vals)
+
+        return out
+
+    def _fold(self, src):
+        return rmf_fold(src, _writeable(self.n_grp),
+                        _writeable(self.f_chan), _writeable(self.n_chan),
+                        _writeable(self.matrix), self.nchans, self.offset)
+
+
 def bounds_check(lo, hi):
     if lo is not None and hi is not None and lo > hi:
         raise IOErr('boundscheck', lo, hi)
@@ -287,7 +646,35 @@ def range_overlap_1dint(axislist, lo, hi):
     return scale if ascending else scale[::-1]
 
 
-def _flux(data, lo, hi, src, eflux=False, srcflux=False):
+def _flux_weights(data, lo, hi, eflux=False, srcflux=False):
+    """Return the grid and weights used to calculate a flux.
+
+    The flux is the sum of the source model, evaluated on the grid,
+    multiplied by the weights. This means that the weights only
+    need to be calculated once when the flux is calculated for many
+    sets of parameter values.
+
+    Parameters
+    ----------
+    data
+       The data object to use.
+    lo, hi : number or None
+       The pass band, as used by calc_energy_flux.
+    eflux : bool, optional
+       Is this an energy flux?
+    srcflux : bool, optional
+       Should the model be divided by the bin width (only for
+       integrated grids)?
+
+    Returns
+    -------
+    grid, weights : tuple of ndarray, ndarray or None
+       The grid on which to evaluate the model and the weight for
+       each bin. The weights are None if there are no bins in the
+       pass band, in which case the flux is 0.
+
+    """
+
     lo, hi = bounds_check(lo, hi)
 
     try:
@@ -304,11 +691,39 @@ def _flux(data, lo, hi, src, eflux=False, srcflux=False):
     # about a nice error message
     assert dim > 0
 
-    # To make things simpler, evaluate on the full grid
-    y = src(*axislist)
+    # What bins do we use for the calculation? Linear interpolation
+    # is used for bin edges (for integrated data sets)
+    #
+    if dim == 1:
+        mask = filter_bins((lo,), (hi,), (axislist[0],))
+        assert mask is not None
+
+        # no bin found
+        if numpy.all(~mask):
+            return axislist, None
+
+        # convert boolean to numbers
+        weights = 1.0 * mask
+
+    else:
+        weights = range_overlap_1dint(axislist, lo, hi)
+        if weights is None:
+            return axislist, None
+
+        assert weights.max() > 0
+
+    # Originally a flux density was calculated if both lo and hi
+    # fell in the same bin, but this has been changed so that
+    # we only calculate a density if the lo and hi values are the
+    # same (which is set by bounds_check when a density is requested).
+    #
+    density = lo is not None and dim == 2 and lo == hi
+    if density:
+        assert weights.sum() == 1, \
+            'programmer error: sum={}'.format(weights.sum())
 
     if srcflux and dim == 2:
-        y /= numpy.asarray(axislist[1] - axislist[0])
+        weights = weights / numpy.asarray(axislist[1] - axislist[0])
 
     if eflux:
         # for energy flux, the sum of grid below must be in keV.
@@ -328,43 +743,26 @@ def _flux(data, lo, hi, src, eflux=False, srcflux=False):
             # why multiply by 0.5?
             ecorr = 0.5 * energ[0]
 
-        y *= ecorr
-
-    # What bins do we use for the calculation? Linear interpolation
-    # is used for bin edges (for integrated data sets)
-    #
-    if dim == 1:
-        mask = filter_bins((lo,), (hi,), (axislist[0],))
-        assert mask is not None
-
-        # no bin found
-        if numpy.all(~mask):
-            return 0.0
+        weights = weights * ecorr
 
-        # convert boolean to numbers
-        scale = 1.0 * mask
+    if density:
+        weights = weights / numpy.abs(axislist[1] - axislist[0])
 
-    else:
-        scale = range_overlap_1dint(axislist, lo, hi)
-        if scale is None:
-            return 0.0
+    if eflux:
+        weights = weights * charge_e
 
-        assert scale.max() > 0
+    return axislist, weights
 
-    # Originally a flux density was calculated if both lo and hi
-    # fell in the same bin, but this has been changed so that
-    # we only calculate a density if the lo and hi values are the
-    # same (which is set by bounds_check when a density is requested).
-    #
-    if lo is not None and dim == 2 and lo == hi:
-        assert scale.sum() == 1, 'programmer error: sum={}'.format(scale.sum())
-        y /= numpy.abs(axislist[1] - axislist[0])
 
-    flux = (scale * y).sum()
-    if eflux:
-        flux *= charge_e
+def _flux(data, lo, hi, src, eflux=False, srcflux=False):
+    axislist, weights = _flux_weights(data, lo, hi, eflux=eflux,
+                                      srcflux=srcflux)
+    if weights is None:
+        return 0.0
 
-    return flux
+    # To make things simpler, evaluate on the full grid
+    y = src(*axislist)
+    return (weights * y).sum()
 
 
 def _counts(data, lo, hi, func, *args):
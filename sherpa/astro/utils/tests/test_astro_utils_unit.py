@@ -21,7 +21,10 @@ import numpy as np
 import pytest
 
 from sherpa.astro import ui
-from sherpa.astro.utils import filter_resp, range_overlap_1dint
+from sherpa.astro.utils import filter_resp, range_overlap_1dint, \
+    rmf_fold, RMFMatrix, _flatten_rmf_groups, _flatten_rmf_matrix, \
+    _gather_rows
+from sherpa.utils.err import IOErr
 from sherpa.utils.testing import requires_data, requires_fits
 
 
@@ -143,3 +146,198 @@ def test_range_overlap_1dint_ascending(lo, hi, expected, reverse):
         return
 
     assert got == pytest.approx(expected)
+
+
+def make_rmf(nenergy, nchans, offset, seed=2873):
+    """Create a random RMF, in the OGIP compressed form."""
+
+    rng = np.random.RandomState(seed)
+    n_grp = rng.randint(0, 3, size=nenergy)
+    ngroups = n_grp.sum()
+    n_chan = rng.randint(0, 6, size=ngroups)
+    f_chan = rng.randint(0, nchans - 5, size=ngroups) + offset
+    matrix = rng.uniform(0, 1, size=n_chan.sum())
+    return n_grp, f_chan, n_chan, matrix
+
+
+@pytest.mark.parametrize("offset", [0, 1, 5])
+@pytest.mark.parametrize("dense", [None, True, False])
+def test_rmf_matrix_fold(offset, dense):
+    """RMFMatrix.fold matches rmf_fold"""
+
+    nenergy = 40
+    nchans = 25
+    resp = make_rmf(nenergy, nchans, offset)
+    rmf = RMFMatrix(*resp, nchans, offset=offset, dense=dense)
+    assert rmf.nenergy == nenergy
+    assert rmf.nchans == nchans
+    if dense is not None:
+        assert (rmf.dense is not None) == dense
+
+    src = np.random.RandomState(39).uniform(1, 10, size=nenergy)
+    expected = rmf_fold(src, *resp, nchans, offset)
+    assert rmf.fold(src) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("dense", [True, False])
+def test_rmf_matrix_fold_many(dense):
+    """Fold several spectra at once"""
+
+    nenergy = 40
+    nchans = 25
+    resp = make_rmf(nenergy, nchans, 1)
+    rmf = RMFMatrix(*resp, nchans, dense=dense)
+
+    src = np.random.RandomState(93).uniform(1, 10, size=(4, nenergy))
+    got = rmf.fold(src)
+    assert got.shape == (4, nchans)
+    for row, src_row in zip(got, src):
+        assert row == pytest.approx(rmf_fold(src_row, *resp, nchans, 1))
+
+
+@pytest.mark.parametrize("n_grp,f_chan,n_chan,matrix",
+                         [([1, 2], [1, 2], [1, 1], [1, 1]),
+                          ([1, 1], [1, 2], [1, 1], [1]),
+                          ([1, 1], [0, 2], [1, 1], [1, 1]),
+                          ([1, 1], [1, 4], [1, 2], [1, 1, 1]),
+                          ([1, 1], [1, 2], [1], [1, 1])])
+def test_rmf_matrix_invalid(n_grp, f_chan, n_chan, matrix):
+    with pytest.raises(ValueError,
+                       match="^RMF data is invalid or inconsistent$"):
+        RMFMatrix(n_grp, f_chan, n_chan, matrix, 4)
+
+
+def test_rmf_matrix_fold_invalid_size():
+    rmf = RMFMatrix([1, 1], [1, 2], [1, 1], [1, 1], 4)
+    with pytest.raises(TypeError):
+        rmf.fold([1, 2, 3])
+
+
+@pytest.mark.parametrize("dense", [True, False])
+def test_rmf_matrix_scale(dense):
+    """Scaling the response is the same as scaling the source"""
+
+    nenergy = 40
+    nchans = 25
+    resp = make_rmf(nenergy, nchans, 1)
+    rmf = RMFMatrix(*resp, nchans, dense=dense)
+    weights = np.linspace(0.5, 2, nenergy)
+    scaled = rmf.scale(weights)
+    assert (scaled.dense is not None) == dense
+
+    # The dense form is only created when needed.
+    rmf = RMFMatrix(*resp, nchans, dense=dense)
+    scaled = rmf.scale(weights)
+    assert rmf._dense is None
+    assert scaled._dense is None
+
+    src = np.random.RandomState(7).uniform(1, 10, size=(2, nenergy))
+    assert scaled.fold(src[0]) == pytest.approx(rmf.fold(src[0] * weights))
+    assert scaled.fold(src) == pytest.approx(rmf.fold(src * weights))
+
+    # The original is unchanged
+    assert rmf.fold(src[0]) == pytest.approx(rmf_fold(src[0], *resp,
+                                                      nchans, 1))
+
+
+@pytest.mark.parametrize("dense", [True, False])
+def test_rmf_matrix_scale_out(dense):
+    """The scaled response can be re-used"""
+
+    nenergy = 40
+    nchans = 25
+    resp = make_rmf(nenergy, nchans, 1)
+    rmf = RMFMatrix(*resp, nchans, dense=dense)
+    scaled = rmf.scale(np.linspace(0.5, 2, nenergy))
+    matrix = scaled.matrix
+
+    weights = np.linspace(3, 1, nenergy)
+    got = rmf.scale(weights, out=scaled)
+    assert got is scaled
+    assert got.matrix is matrix
+
+    expected = rmf.scale(weights)
+    assert got.matrix == pytest.approx(expected.matrix)
+    src = np.random.RandomState(7).uniform(1, 10, size=(2, nenergy))
+    assert got.fold(src) == pytest.approx(rmf.fold(src * weights))
+
+
+def test_rmf_matrix_scale_out_invalid():
+    rmf = RMFMatrix([1, 1], [1, 2], [1, 1], [1, 1], 4, dense=True)
+    out = RMFMatrix([1, 1], [1, 2], [1, 1], [1, 1], 4, dense=False)
+    with pytest.raises(TypeError):
+        rmf.scale([1, 2], out=out)
+
+
+def test_flatten_rmf_matrix():
+    """Only the first sum(N_CHAN) values of each row are used."""
+
+    matrix = np.asarray([[1, 2, 3, 0], [4, 0, 0, 0], [5, 6, 7, 8]])
+    n_chan = np.asarray([[2, 1], [1, 0], [1, 3]])
+    got = _flatten_rmf_matrix(matrix, n_chan)
+    assert got == pytest.approx([1, 2, 3, 4, 5, 6, 7, 8])
+
+    # A single group per row.
+    got = _flatten_rmf_matrix(matrix, np.asarray([3, 1, 2]))
+    assert got == pytest.approx([1, 2, 3, 4, 5, 6])
+
+
+def test_flatten_rmf_matrix_perfect():
+    matrix = np.asarray([0.5, 0.25, 1])
+    assert _flatten_rmf_matrix(matrix, np.ones(3)) is matrix
+    with pytest.raises(IOErr):
+        _flatten_rmf_matrix(matrix, np.asarray([1, 2, 1]))
+
+
+@pytest.mark.parametrize("matrix", [np.zeros((0, 4)), np.zeros(0)])
+def test_flatten_rmf_matrix_no_rows(matrix):
+    """All the rows had N_GRP=0."""
+
+    got = _flatten_rmf_matrix(matrix, np.zeros((0, 2)))
+    assert got.shape == (0, )
+
+
+def test_flatten_rmf_groups():
+    n_grp = np.asarray([2, 0, 1, 3])
+    f_chan = np.asarray([[1, 5, 0], [0, 0, 0], [3, 0, 0], [1, 4, 8]])
+    n_chan = np.asarray([[2, 1, 0], [0, 0, 0], [4, 0, 0], [1, 2, 3]])
+    fchan, nchan = _flatten_rmf_groups(n_grp, f_chan, n_chan)
+    assert fchan.tolist() == [1, 5, 3, 1, 4, 8]
+    assert nchan.tolist() == [2, 1, 4, 1, 2, 3]
+
+    fchan, nchan = _flatten_rmf_groups(np.zeros(4), f_chan, n_chan)
+    assert fchan.shape == nchan.shape == (0, )
+
+    with pytest.raises(IOErr):
+        _flatten_rmf_groups(np.asarray([4, 0, 1, 3]), f_chan, n_chan)
+
+
+@pytest.mark.parametrize("aligned", [True, False])
+def test_gather_rows(aligned):
+    """Read variable-length rows from a FITS heap."""
+
+    rows = [np.asarray([1.5, 2.5]), np.asarray([]), np.asarray([3.5]),
+            np.asarray([4.5, 5.5, 6.5])]
+
+    # Store the rows out of order, with gaps.
+    pad = b'\0' * (8 if aligned else 3)
+    heap = b''
+    offsets = {}
+    for idx in [2, 0, 3]:
+        heap += pad
+        offsets[idx] = len(heap)
+        heap += rows[idx].astype('>f8').tobytes()
+
+    counts = [len(row) for row in rows]
+    offs = [offsets.get(idx, 0) for idx in range(len(rows))]
+    heap = np.frombuffer(heap, dtype=np.uint8)
+    got = _gather_rows(heap, counts, offs, '>f8')
+    assert got == pytest.approx(np.concatenate(rows))
+
+    got = _gather_rows(heap, counts[1:3], offs[1:3], '>f8')
+    assert got == pytest.approx([3.5])
+
+    assert _gather_rows(heap, [0, 0], [0, 0], '>f8').shape == (0, )
+
+    with pytest.raises(IOErr):
+        _gather_rows(heap, [2, 20], offs[:2], '>f8')
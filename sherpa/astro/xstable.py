@@ -0,0 +1,853 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Evaluate XSPEC table models without the XSPEC library.
+
+The `sherpa.astro.xspec.XSTableModel` class uses the XSPEC model
+library to evaluate additive, multiplicative, and exponential table
+models [1]_. This module provides an alternative which does not need
+XSPEC, and which is designed for large tables:
+
+- the SPECTRA block of the file is memory mapped, so that only the
+  spectra needed to evaluate the model are read from disk;
+
+- the mapping from the parameter grid to the rows of the SPECTRA
+  block is calculated once, when the file is read;
+
+- the interpolation only uses the spectra at the corners of the
+  grid cell containing the parameter values;
+
+- many sets of parameter values can be evaluated at once, with the
+  ``calc_batch`` method.
+
+The file format is described in [2]_. Only uncompressed files can
+be memory mapped; gzip-compressed files are read into memory. The
+column values are used as stored, so files which scale (TSCALn or
+TZEROn) or reshape (TDIMn) the columns are not supported.
+
+.. versionadded:: 4.14.0
+
+References
+----------
+
+.. [1] https://heasarc.gsfc.nasa.gov/xanadu/xspec/manual/XSappendixLocal.html
+
+.. [2] https://heasarc.gsfc.nasa.gov/docs/heasarc/ofwg/docs/general/ogip_92_009/ogip_92_009.html
+
+Examples
+--------
+
+>>> from sherpa.astro.xstable import read_xstable_grid
+>>> mdl = read_xstable_grid('tbl', 'bbrefl_1xsolar.fits')
+>>> print(mdl)
+
+"""
+
+import gzip
+import itertools
+import mmap
+import os
+import re
+import string
+import weakref
+
+import numpy
+
+from sherpa.astro import hc
+from sherpa.models.model import ArithmeticModel, modelCacher1d, \
+    batch_parameters
+from sherpa.models.parameter import Parameter, hugeval
+from sherpa.utils import NoNewAttributesAfterInit, SherpaFloat
+from sherpa.utils.err import IOErr, ParameterErr
+
+__all__ = ('TableGrid', 'XSTableGridModel', 'read_table_grid',
+           'read_xstable_grid')
+
+
+# FITS files are stored in blocks of this many bytes, with headers
+# made up of 80-character cards.
+#
+_BLOCK = 2880
+_CARD = 80
+
+# The NumPy types of the binary-table column formats (the data is
+# big endian).
+#
+_TFORMS = {'L': 'S1', 'B': 'u1', 'I': '>i2', 'J': '>i4', 'K': '>i8',
+           'E': '>f4', 'D': '>f8', 'C': '>c8', 'M': '>c16'}
+
+
+def _parse_value(text):
+    """Convert the value of a header card to a Python value."""
+
+    text = text.strip()
+    if text.startswith("'"):
+        # A quote is included in a string by doubling it.
+        match = re.match(r"'((?:[^']|'')*)'", text)
+        if match is None:
+            return text
+
+        return match.group(1).replace("''", "'").rstrip()
+
+    text = text.split('/')[0].strip()
+    if text == 'T':
+        return True
+    if text == 'F':
+        return False
+
+    try:
+        return int(text)
+    except ValueError:
+        pass
+
+    try:
+        return float(text.replace('D', 'E'))
+    except ValueError:
+        return text or None
+
+
+def _read_header(buf, offset, filename):
+    """Read the header starting at offset.
+
+    Returns
+    -------
+    header, start : dict, int
+        The keywords (indexed by the upper-case name) and the
+        offset of the data.
+    """
+
+    header = {}
+    while True:
+        block = bytes(buf[offset:offset + _BLOCK])
+        if len(block) < _BLOCK:
+            raise IOErr('badtable', filename, 'the FITS header is truncated')
+
+        offset += _BLOCK
+        for start in range(0, _BLOCK, _CARD):
+            card = block[start:start + _CARD].decode('ascii', 'replace')
+            key = card[:8].strip().upper()
+            if key == 'END':
+                return header, offset
+
+            if card[8:10] == '= ':
+                header[key] = _parse_value(card[10:])
+
+
+def _read_hdus(buf, filename):
+    """Return the header and data offset of each HDU."""
+
+    out = []
+    offset = 0
+    while offset < len(buf):
+        header, start = _read_header(buf, offset, filename)
+        size = 0
+        naxis = header.get('NAXIS', 0)
+        if naxis > 0:
+            size = 1
+            for idx in range(1, naxis + 1):
+                size *= header['NAXIS{}'.format(idx)]
+
+        size = abs(header.get('BITPIX', 8)) // 8 * \
+            header.get('GCOUNT', 1) * (header.get('PCOUNT', 0) + size)
+        out.append((header, start))
+        offset = start + -(-size // _BLOCK) * _BLOCK
+
+    return out
+
+
+def _table_dtype(header, filename):
+    """The NumPy type of a row of a binary table."""
+
+    names = []
+    formats = []
+    offsets = []
+    offset = 0
+    for idx in range(1, header['TFIELDS'] + 1):
+        tform = str(header['TFORM{}'.format(idx)]).strip()
+        match = re.match(r'(\d*)([A-Z])', tform)
+        if match is None:
+            raise IOErr('badtable', filename,
+                        'unsupported column format {}'.format(tform))
+
+        repeat = int(match.group(1) or 1)
+        code = match.group(2)
+        if code == 'A':
+            fmt = 'S{}'.format(repeat)
+            nbytes = repeat
+        elif code == 'X':
+            nbytes = (repeat + 7) // 8
+            fmt = ('u1', (nbytes, ))
+        elif code in _TFORMS:
+            base = numpy.dtype(_TFORMS[code])
+            nbytes = base.itemsize * repeat
+            fmt = base if repeat == 1 else (base, (repeat, ))
+        else:
+            # This includes the variable-length array formats.
+            raise IOErr('badtable', filename,
+                        'unsupported column format {}'.format(tform))
+
+        name = str(header.get('TTYPE{}'.format(idx),
+                              'COL{}'.format(idx))).strip().upper()
+
+        # The data is used as stored, so columns which need to be
+        # scaled or reshaped are not supported.
+        if header.get('TSCAL{}'.format(idx), 1) != 1 or \
+           header.get('TZERO{}'.format(idx), 0) != 0:
+            raise IOErr('badtable', filename,
+                        'column {} is scaled (TSCAL/TZERO)'.format(name))
+
+        tdim = header.get('TDIM{}'.format(idx))
+        if tdim is not None and \
+           re.sub(r'\s', '', str(tdim)) != '({})'.format(repeat):
+            raise IOErr('badtable', filename,
+                        'column {} has TDIM={}'.format(name, tdim))
+        if nbytes > 0:
+            names.append(name)
+            formats.append(fmt)
+            offsets.append(offset)
+
+        offset += nbytes
+
+    return numpy.dtype({'names': names, 'formats': formats,
+                        'offsets': offsets, 'itemsize': header['NAXIS1']})
+
+
+def _read_tables(filename):
+    """Read the binary tables from a FITS file.
+
+    Returns
+    -------
+    primary, tables, headers : dict, dict, dict
+        The primary header, and the rows and header of each binary
+        table, indexed by the upper-case EXTNAME value. The rows are
+        views of the file, so they are only read when accessed.
+    """
+
+    if filename.endswith('.gz'):
+        with gzip.open(filename, 'rb') as fh:
+            buf = fh.read()
+    else:
+        with open(filename, 'rb') as fh:
+            buf = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+    hdus = _read_hdus(buf, filename)
+    tables = {}
+    headers = {}
+    for header, start in hdus[1:]:
+        if str(header.get('XTENSION', '')).strip() != 'BINTABLE':
+            continue
+
+        name = str(header.get('EXTNAME', '')).strip().upper()
+        dtype = _table_dtype(header, filename)
+        tables[name] = numpy.ndarray((header['NAXIS2'], ), dtype=dtype,
+                                     buffer=buf, offset=start)
+        headers[name] = header
+
+    return hdus[0][0], tables, headers
+
+
+def _column(table, name, filename, block):
+    """Return the column, or error out if it is missing."""
+
+    try:
+        return table[name]
+    except ValueError:
+        raise IOErr('reqcol', name, '{}[{}]'.format(filename, block)) \
+            from None
+
+
+def _as_str(value):
+    if isinstance(value, bytes):
+        value = value.decode('ascii', 'replace')
+
+    return value.strip()
+
+
+class TableGrid(NoNewAttributesAfterInit):
+    """The contents of a XSPEC table model file.
+
+    The parameter and energy grids are read into memory, but the
+    SPECTRA block is memory mapped, so that only the spectra needed
+    to evaluate the model are read in from disk.
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    filename : str
+        The name of the table model file.
+
+    Attributes
+    ----------
+    filename : str
+    addmodel : bool
+        Is this an additive model?
+    redshift : bool
+        Does the model include a redshift parameter?
+    parnames : list of str
+        The names of the interpolated parameters and then the
+        additional parameters.
+    initial, delta, minimum, bottom, top, maximum : ndarray
+        The settings for each parameter.
+    nint, nadd : int
+        The number of interpolated and additional parameters.
+    values : list of ndarray
+        The grid values for each interpolated parameter.
+    energ_lo, energ_hi : ndarray
+        The energy grid of the spectra, in keV.
+
+    See Also
+    --------
+    read_table_grid
+
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self._load()
+        NoNewAttributesAfterInit.__init__(self)
+
+    def __getstate__(self):
+        # The file is re-read rather than pickling the spectra.
+        return {'filename': self.filename}
+
+    def __setstate__(self, state):
+        object.__setattr__(self, 'filename', state['filename'])
+        self._load()
+        NoNewAttributesAfterInit.__init__(self)
+
+    def _load(self):
+        """Read in the file and set the attributes."""
+
+        # The attributes are set with object.__setattr__ so that
+        # this can be used by __setstate__.
+        def store(name, value):
+            object.__setattr__(self, name, value)
+
+        filename = self.filename
+        primary, tables, headers = _read_tables(filename)
+        if str(primary.get('HDUCLAS1', '')).strip().upper() != \
+           'XSPEC TABLE MODEL':
+            raise IOErr('badtable', filename, 'HDUCLAS1 is not set to ' +
+                        "'XSPEC TABLE MODEL'")
+
+        for block in ['PARAMETERS', 'ENERGIES', 'SPECTRA']:
+            if block not in tables:
+                raise IOErr('badtable', filename,
+                            'there is no {} block'.format(block))
+
+        store('addmodel', bool(primary.get('ADDMODEL', False)))
+        store('redshift', bool(primary.get('REDSHIFT', False)))
+
+        params = tables['PARAMETERS']
+        names = [_as_str(name) for name in
+                 _column(params, 'NAME', filename, 'PARAMETERS')]
+        store('parnames', names)
+        for col in ['INITIAL', 'DELTA', 'MINIMUM', 'BOTTOM', 'TOP',
+                    'MAXIMUM']:
+            vals = _column(params, col, filename, 'PARAMETERS')
+            store(col.lower(), numpy.asarray(vals, dtype=SherpaFloat))
+
+        nint = int(headers['PARAMETERS'].get('NINTPARM', len(names)))
+        nadd = int(headers['PARAMETERS'].get('NADDPARM', 0))
+
+        store('nint', nint)
+        store('nadd', nadd)
+
+        method = _column(params, 'METHOD', filename, 'PARAMETERS') \
+            if 'METHOD' in params.dtype.names else numpy.zeros(nint)
+        numbvals = _column(params, 'NUMBVALS', filename, 'PARAMETERS')
+        allvals = _column(params, 'VALUE', filename, 'PARAMETERS')
+        allvals = numpy.asarray(allvals, dtype=SherpaFloat).reshape(
+            len(names), -1)
+
+        values = []
+        for idx in range(nint):
+            vals = allvals[idx, :int(numbvals[idx])].copy()
+            if vals.size == 0 or (numpy.diff(vals) <= 0).any():
+                raise IOErr('badtable', filename,
+                            'the values of parameter {} '.format(names[idx]) +
+                            'are not increasing')
+
+            if method[idx] == 1 and vals[0] <= 0:
+                raise IOErr('badtable', filename,
+                            'parameter {} is '.format(names[idx]) +
+                            'logarithmic but has values <= 0')
+
+            values.append(vals)
+
+        store('values', values)
+        store('_logaxis', [bool(method[idx] == 1) for idx in range(nint)])
+
+        energies = tables['ENERGIES']
+        elo = _column(energies, 'ENERG_LO', filename, 'ENERGIES')
+        ehi = _column(energies, 'ENERG_HI', filename, 'ENERGIES')
+        store('energ_lo', numpy.asarray(elo, dtype=SherpaFloat))
+        store('energ_hi', numpy.asarray(ehi, dtype=SherpaFloat))
+
+        spectra = tables['SPECTRA']
+        store('_spectra', spectra)
+        store('_columns',
+              ['INTPSPEC'] + ['ADDSP{:03d}'.format(idx + 1)
+                              for idx in range(nadd)])
+        for col in self._columns:
+            _column(spectra, col, filename, 'SPECTRA')
+
+        store('_lookup', self._make_lookup(
+            _column(spectra, 'PARAMVAL', filename, 'SPECTRA')))
+
+    def _make_lookup(self, paramval):
+        """Map each point of the parameter grid to a row of SPECTRA.
+
+        The PARAMVAL column is used, rather than assuming an order
+        for the rows.
+        """
+
+        shape = tuple(vals.size for vals in self.values)
+        paramval = numpy.asarray(paramval,
+                                 dtype=SherpaFloat).reshape(-1, self.nint)
+        lookup = numpy.full(shape, -1, dtype=numpy.int64)
+
+        index = []
+        for axis, vals in enumerate(self.values):
+            pvals = paramval[:, axis]
+            idx = numpy.abs(pvals[:, None] - vals[None, :]).argmin(axis=1)
+            tol = 1e-6 * numpy.maximum(numpy.abs(vals[idx]), 1e-30)
+            if (numpy.abs(pvals - vals[idx]) > tol).any():
+                raise IOErr('badtable', self.filename,
+                            'PARAMVAL values do not match the grid of ' +
+                            'parameter {}'.format(self.parnames[axis]))
+
+            index.append(idx)
+
+        lookup[tuple(index)] = numpy.arange(paramval.shape[0])
+        if (lookup < 0).any():
+            raise IOErr('badtable', self.filename,
+                        'the SPECTRA block does not cover the parameter grid')
+
+        return lookup
+
+    def _weights(self, pars):
+        """The rows and weights of the corners for each sample.
+
+        Parameters
+        ----------
+        pars : ndarray
+            The interpolated parameter values, with shape
+            (nsamples, nint).
+
+        Returns
+        -------
+        rows, weights : ndarray, ndarray
+            The SPECTRA rows and their weights, both with shape
+            (nsamples, ncorners).
+
+        """
+
+        nsamples = pars.shape[0]
+        lower = []
+        fracs = []
+        active = []
+        for axis, vals in enumerate(self.values):
+            if vals.size == 1:
+                lower.append(numpy.zeros(nsamples, dtype=numpy.int64))
+                fracs.append(None)
+                continue
+
+            x = pars[:, axis]
+            idx = numpy.searchsorted(vals, x, side='right') - 1
+            idx = numpy.clip(idx, 0, vals.size - 2)
+            lo = vals[idx]
+            hi = vals[idx + 1]
+            if self._logaxis[axis]:
+                x = numpy.log(numpy.maximum(x, vals[0]))
+                lo = numpy.log(lo)
+                hi = numpy.log(hi)
+
+            lower.append(idx)
+            fracs.append(numpy.clip((x - lo) / (hi - lo), 0, 1))
+            active.append(axis)
+
+        corners = list(itertools.product((0, 1), repeat=len(active)))
+        rows = numpy.empty((nsamples, len(corners)), dtype=numpy.int64)
+        weights = numpy.ones((nsamples, len(corners)))
+        for cidx, corner in enumerate(corners):
+            index = list(lower)
+            for axis, step in zip(active, corner):
+                index[axis] = lower[axis] + step
+                frac = fracs[axis]
+                weights[:, cidx] *= frac if step else 1 - frac
+
+            rows[:, cidx] = self._lookup[tuple(index)]
+
+        return rows, weights
+
+    def interpolate(self, pars):
+        """Interpolate the spectra to the parameter values.
+
+        Parameters
+        ----------
+        pars : array_like
+            The values of the interpolated parameters followed by
+            the additional parameters, with shape (npars, ) or
+            (nsamples, npars), where npars is ``nint + nadd``.
+            Values outside the parameter grid are moved to the
+            nearest edge.
+
+        Returns
+        -------
+        spectra : ndarray
+            The spectra on the energy grid of the table, with shape
+            (nbins, ) or (nsamples, nbins).
+
+        """
+
+        pars = numpy.asarray(pars, dtype=SherpaFloat)
+        single = pars.ndim == 1
+        pars = numpy.atleast_2d(pars)
+        npars = self.nint + self.nadd
+        if pars.ndim != 2 or pars.shape[1] != npars:
+            raise TypeError("Expected {} parameter values, not {}".format(
+                npars, pars.shape[-1]))
+
+        rows, weights = self._weights(pars[:, :self.nint])
+
+        # Only read in the spectra that are needed, and combine them
+        # with a sparse weight matrix.
+        #
+        urows, inverse = numpy.unique(rows, return_inverse=True)
+        wmat = numpy.zeros((pars.shape[0], urows.size))
+        samples = numpy.repeat(numpy.arange(pars.shape[0]), rows.shape[1])
+        numpy.add.at(wmat, (samples, inverse.ravel()), weights.ravel())
+
+        spectra = self._spectra[urows]
+        out = wmat @ numpy.asarray(spectra['INTPSPEC'], dtype=SherpaFloat)
+        for idx, col in enumerate(self._columns[1:]):
+            add = wmat @ numpy.asarray(spectra[col], dtype=SherpaFloat)
+            out += pars[:, self.nint + idx:self.nint + idx + 1] * add
+
+        return out[0] if single else out
+
+    def rebin(self, spectra, elo, ehi, additive, default=0.0):
+        """Rebin the spectra onto a new energy grid.
+
+        The values are assumed to be constant across each bin of
+        the table.
+
+        Parameters
+        ----------
+        spectra : ndarray
+            The spectra, with shape (nsamples, nbins), where nbins
+            matches the energy grid of the table.
+        elo, ehi : ndarray
+            The energy grid, which can have shape (nout, ) or
+            (nsamples, nout).
+        additive : bool
+            If set the values are integrated over each output bin,
+            otherwise the average value is returned.
+        default : float, optional
+            The value used for the part of an output bin outside the
+            table when additive is False.
+
+        Returns
+        -------
+        values : ndarray
+            The values, with shape (nsamples, nout).
+
+        """
+
+        edges = numpy.append(self.energ_lo, self.energ_hi[-1])
+        widths = self.energ_hi - self.energ_lo
+        cumul = numpy.zeros((spectra.shape[0], edges.size))
+        if additive:
+            numpy.cumsum(spectra, axis=1, out=cumul[:, 1:])
+            dens = spectra / widths
+        else:
+            numpy.cumsum(spectra * widths, axis=1, out=cumul[:, 1:])
+            dens = spectra
+
+        def integ(x):
+            x = numpy.broadcast_to(x, (spectra.shape[0], x.shape[-1]))
+            idx = numpy.searchsorted(edges, x, side='right') - 1
+            idx = numpy.clip(idx, 0, widths.size - 1)
+            dx = numpy.clip(x - edges[idx], 0, widths[idx])
+            return numpy.take_along_axis(cumul, idx, axis=1) + \
+                dx * numpy.take_along_axis(dens, idx, axis=1)
+
+        elo = numpy.atleast_2d(elo)
+        ehi = numpy.atleast_2d(ehi)
+        out = integ(ehi) - integ(elo)
+        if additive:
+            return out
+
+        width = ehi - elo
+        covered = numpy.clip(numpy.minimum(ehi, edges[-1]) -
+                             numpy.maximum(elo, edges[0]), 0, None)
+        out = out + (width - covered) * default
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            return numpy.where(width > 0, out / width, default)
+
+
+# The grids which have been read in, so that the spectra are only
+# mapped once, however many models use them.
+#
+_grids = weakref.WeakValueDictionary()
+
+
+def read_table_grid(filename):
+    """Read in a XSPEC table model file.
+
+    The file is only read in once, as long as the returned object
+    is in use, unless it is changed.
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    filename : str
+        The name of the table model file.
+
+    Returns
+    -------
+    grid : TableGrid instance
+
+    """
+
+    stat = os.stat(filename)
+    key = (os.path.realpath(filename), stat.st_size, stat.st_mtime_ns)
+    grid = _grids.get(key)
+    if grid is None:
+        grid = TableGrid(filename)
+        _grids[key] = grid
+
+    return grid
+
+
+class XSTableGridModel(ArithmeticModel):
+    """A XSPEC table model which does not need the XSPEC library.
+
+    The parameters match those created by
+    `sherpa.astro.xspec.XSTableModel`, but the model is evaluated
+    by interpolating the spectra in the file (see
+    `TableGrid.interpolate`).
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    filename : str
+        The name of the FITS file containing the data for the XSPEC
+        table model.
+    name : str, optional
+        The name to use for the instance of the table model.
+    etable : bool, optional
+        When the model is not additive this defines whether the file
+        is a mtable model (False, the default) or an etable model
+        (True).
+
+    See Also
+    --------
+    read_xstable_grid
+
+    Notes
+    -----
+    The model is integrated over each energy bin, assuming that the
+    table values are constant across each of its bins. If the model
+    has a redshift parameter then the energy grid is multiplied by
+    (1 + redshift), and additive models are divided by (1 +
+    redshift). The model is zero outside the energy range of the
+    table for additive models, and one for multiplicative and
+    exponential models. As with the XSPEC models, the grid is taken
+    to be in Angstrom when the first element of the low edges is
+    larger than the last element.
+
+    """
+
+    def __init__(self, filename, name='xstbl', etable=False):
+
+        self.grid = read_table_grid(filename)
+        self.filename = filename
+        self.addmodel = self.grid.addmodel
+        self.etable = etable
+
+        # make translation table to turn reserved characters into '_'
+        bad = string.punctuation + string.whitespace
+        tbl = str.maketrans(bad, '_' * len(bad))
+
+        grid = self.grid
+        nint = grid.nint
+        pars = []
+        for idx, parname in enumerate(grid.parnames):
+            parname = parname.strip().lower().translate(tbl)
+            par = Parameter(name, parname, grid.initial[idx],
+                            grid.bottom[idx], grid.top[idx],
+                            grid.minimum[idx], grid.maximum[idx],
+                            frozen=nint <= 0)
+            self.__dict__[parname] = par
+            pars.append(par)
+            nint -= 1
+
+        if grid.redshift:
+            self.redshift = Parameter(name, 'redshift', 0., 0., 5.,
+                                      0.0, hugeval, frozen=True)
+            pars.append(self.redshift)
+
+        if self.addmodel:
+            self.norm = Parameter(name, 'norm', 1.0, 0.0, 1.0e24, 0.0,
+                                  hugeval)
+            pars.append(self.norm)
+
+        ArithmeticModel.__init__(self, name, pars)
+
+    def _check_limits(self, p):
+        """Error out if a parameter is outside its hard limits."""
+
+        p = numpy.atleast_2d(p)
+        for idx, param in enumerate(self.pars):
+            if (p[:, idx] < param._hard_min).any():
+                raise ParameterErr('edge', self.name, 'minimum',
+                                   param._hard_min)
+            if (p[:, idx] > param._hard_max).any():
+                raise ParameterErr('edge', self.name, 'maximum',
+                                   param._hard_max)
+
+    def _evaluate(self, p, elo, ehi):
+        """Evaluate the model for a (nsamples, npars) array."""
+
+        grid = self.grid
+        npars = grid.nint + grid.nadd
+        spectra = grid.interpolate(p[:, :npars])
+
+        elo = elo[numpy.newaxis, :]
+        ehi = ehi[numpy.newaxis, :]
+        zfactor = None
+        if grid.redshift:
+            zfactor = 1 + p[:, npars:npars + 1]
+            elo = elo * zfactor
+            ehi = ehi * zfactor
+
+        if self.addmodel:
+            out = grid.rebin(spectra, elo, ehi, additive=True)
+            if zfactor is not None:
+                out /= zfactor
+
+            return out * p[:, -1:]
+
+        if self.etable:
+            return numpy.exp(-grid.rebin(spectra, elo, ehi,
+                                         additive=False, default=0.0))
+
+        return grid.rebin(spectra, elo, ehi, additive=False, default=1.0)
+
+    @staticmethod
+    def _get_grid(xlo, xhi):
+        """Return the energy grid and the number of output values.
+
+        As with the XSPEC models, a single array is taken to be a
+        contiguous grid, and the last output value is then zero. The
+        grid is in Angstrom when the first value of xlo is larger
+        than the last value, in which case the grid is converted to
+        keV but the output values remain in the input order.
+        """
+
+        xlo = numpy.asarray(xlo, dtype=SherpaFloat)
+        is_wave = xlo.size > 1 and xlo[0] > xlo[-1]
+        if xhi is None:
+            elo, ehi = xlo[:-1], xlo[1:]
+        else:
+            xhi = numpy.asarray(xhi, dtype=SherpaFloat)
+            if xlo.size != xhi.size:
+                raise TypeError("1D model evaluation input array sizes " +
+                                "do not match, xlo: {} vs xhi: {}".format(
+                                    xlo.size, xhi.size))
+
+            # The high-energy edge of a bin is its low wavelength.
+            elo, ehi = (xhi, xlo) if is_wave else (xlo, xhi)
+
+        if is_wave:
+            for edges in (elo, ehi):
+                if (edges <= 0).any():
+                    raise ValueError("Wavelength must be > 0, sent " +
+                                     "{}".format(edges[edges <= 0][0]))
+
+            elo, ehi = hc / elo, hc / ehi
+
+        return elo, ehi, xlo.size
+
+    def _pad(self, vals, nout):
+        if vals.shape[-1] == nout:
+            return vals
+
+        pad = [(0, 0)] * (vals.ndim - 1) + [(0, nout - vals.shape[-1])]
+        return numpy.pad(vals, pad)
+
+    @modelCacher1d
+    def calc(self, p, xlo, xhi=None, *args, **kwargs):
+        p = numpy.asarray(p, dtype=SherpaFloat)
+        self._check_limits(p)
+        elo, ehi, nout = self._get_grid(xlo, xhi)
+        if elo.size == 0:
+            return numpy.zeros(nout)
+
+        out = self._evaluate(p[numpy.newaxis, :], elo, ehi)[0]
+        return self._pad(out, nout)
+
+    def calc_batch(self, p, xlo, xhi=None, *args, **kwargs):
+        p = numpy.column_stack(batch_parameters(self, p))
+        self._check_limits(p)
+        elo, ehi, nout = self._get_grid(xlo, xhi)
+        if elo.size == 0:
+            return numpy.zeros((p.shape[0], nout))
+
+        return self._pad(self._evaluate(p, elo, ehi), nout)
+
+
+def read_xstable_grid(modelname, filename, etable=False):
+    """Create a XSPEC table model which does not need XSPEC.
+
+    This is the equivalent of
+    `sherpa.astro.xspec.read_xstable_model`, but the returned
+    model is evaluated by Sherpa rather than the XSPEC library.
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    modelname : str
+       The identifier for this model component.
+    filename : str
+       The name of the FITS file containing the data, which should
+       match the XSPEC table model definition.
+    etable : bool, optional
+       Set if this is an etable (as there's no way to determine this
+       from the file itself). Defaults to False.
+
+    Returns
+    -------
+    tablemodel : XSTableGridModel instance
+
+    Examples
+    --------
+
+    >>> mdl = read_xstable_grid('xmdl', 'bbrefl_1xsolar.fits')
+    >>> print(mdl)
+
+    """
+
+    return XSTableGridModel(filename, name=modelname, etable=etable)
@@ -18,7 +18,11 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
+from concurrent.futures import Future, as_completed
 import logging
+import math
+import queue
+import threading
 
 try:
     import multiprocessing
@@ -29,7 +33,8 @@ import numpy
 
 from sherpa.utils import NoNewAttributesAfterInit, print_fields, Knuth_close, \
     is_iterable, list_to_open_interval, mysgn, quad_coef, \
-    demuller, zeroin, OutOfBoundErr, func_counter, _multi, _ncpus
+    demuller, zeroin, OutOfBoundErr, func_counter, sao_fcmp, _multi, _ncpus
+from sherpa.utils.parallel import bound_pool, in_worker
 
 import sherpa.estmethods._est_funcs
 
@@ -37,9 +42,11 @@ import sherpa.estmethods._est_funcs
 # TODO: this should not be set globally
 _ = numpy.seterr(invalid='ignore')
 
+warning = logging.getLogger(__name__).warning
+
 
 __all__ = ('EstNewMin', 'Covariance', 'Confidence',
-           'Projection', 'est_success', 'est_failure', 'est_hardmin',
+           'Projection', 'EstTasks', 'est_success', 'est_failure', 'est_hardmin',
            'est_hardmax', 'est_hardminmax', 'est_newmin', 'est_maxiter',
            'est_hitnan')
 
@@ -183,10 +190,70 @@ class EstMethod(NoNewAttributesAfterInit):
 
 
 class Covariance(EstMethod):
+    """Estimate errors using the covariance matrix.
+
+    The information matrix - the second derivatives of the statistic -
+    is calculated numerically at the best-fit location and inverted.
+
+    .. versionchanged:: 4.14.0
+       The numcores and jacobian options were added.
+
+    Notes
+    -----
+    The configuration options, in addition to ``sigma``, ``eps``,
+    ``maxiters``, and ``soft_limits``, are:
+
+    numcores
+        The number of processes used to evaluate the statistic. When
+        greater than one the points used to calculate the derivatives
+        are sent to the processes in batches.
+    jacobian
+        If ``True`` then the information matrix is approximated by
+        J^T J, where J is the Jacobian of the residuals, which only
+        needs two evaluations per parameter. It requires a chi-square
+        statistic.
+
+    """
+
+    # defined pre-instantiation for pickling
+    _added_config = {'numcores': 1,
+                     'jacobian': False}
 
     def __init__(self, name='covariance'):
         EstMethod.__init__(self, name, covariance)
 
+        # Update EstMethod.config dict with Covariance specifics
+        self.config.update(self._added_config)
+
+    def compute(self, statfunc, fitfunc, pars,
+                parmins, parmaxes, parhardmins,
+                parhardmaxes, limit_parnums, freeze_par, thaw_par,
+                report_progress, get_par_name,
+                statargs=(), statkwargs={}):
+
+        def stat_cb(pars):
+            return statfunc(pars)[0]
+
+        def resid_cb(pars):
+            return statfunc(pars)[1]
+
+        def fit_cb(scb, pars, parmins, parmaxes, i):
+            # parameter i is a no-op usually
+            return fitfunc(scb, pars, parmins, parmaxes)[2]
+
+        # covar needs to pass a reminimize flag to
+        # get_one_sided_interval; a value less than zero is
+        # interpreted as "never reminimize".
+        remin = -1.0
+        tol = -1.0
+        return self._estfunc(pars, parmins, parmaxes, parhardmins,
+                             parhardmaxes, self.sigma, self.eps,
+                             tol,
+                             self.maxiters, remin, limit_parnums,
+                             stat_cb, fit_cb, report_progress,
+                             numcores=self.numcores,
+                             resid_cb=resid_cb if self.jacobian else None)
+
 
 class Confidence(EstMethod):
 
@@ -232,7 +299,12 @@ class Confidence(EstMethod):
             # stat = fitfunc(scb, pars, parmins, parmaxes)[2]
             # thaw model parameter i
             thaw_par(i)
-            return stat
+
+            # Return the fitted values, so that the fit can be used as
+            # the starting point of a later fit.
+            fitted = numpy.array(pars, dtype=float, copy=True)
+            fitted[numpy.arange(fitted.size) != i] = fit_pars
+            return stat, fitted
 
         #
         # convert stat call back to have the same signature as fit call back
@@ -310,9 +382,366 @@ class Projection(EstMethod):
                              self.parallel, self.numcores)
 
 
+def _map(function, args, numcores):
+    """Call function on each element of args, using numcores processes."""
+
+    if numcores > 1 and _multi and len(args) > 1 and not in_worker():
+        with bound_pool(function, min(numcores, len(args))) as mapper:
+            return mapper(args)
+
+    return [function(arg) for arg in args]
+
+
+def _clip(value, hardmin, hardmax):
+    """Restrict value to the hard limits, returning the status too."""
+
+    if not value > hardmin:
+        return hardmin, est_hardmin
+    if not value < hardmax:
+        return hardmax, est_hardmax
+    return value, est_success
+
+
+def _onesided_interval(pars, parmins, parmaxes, parhardmins, parhardmaxes,
+                       parnum, min_stat, thr_stat, sigma, eps, maxiters,
+                       remin, upper, stat_cb):
+    """Estimate the scale of the error on one side of a parameter.
+
+    This is the get_onesided_interval routine used by the C version
+    of the information matrix calculation.
+
+    Returns
+    -------
+    status, bound, parval
+        The status code, the location of the bound (or None), and
+        the parameter value, which is only different to the input
+        value when status is est_newmin.
+
+    """
+
+    if sigma < 0 or eps < 0:
+        return est_failure, None, pars[parnum]
+
+    pars = numpy.array(pars, dtype=numpy.float64)
+    hardmin = parhardmins[parnum]
+    hardmax = parhardmaxes[parnum]
+
+    epshi = ((sigma + eps) / 2.0) ** 2
+    epslo = ((sigma - eps) / 2.0) ** 2
+    epsilon = abs(epshi - epslo)
+
+    initv = pars[parnum]
+    newmin = [min_stat, initv]
+
+    def get_stat():
+        stat = numpy.float64(stat_cb(pars))
+        if stat < newmin[0] and \
+           not pars[parnum] < parmins[parnum] and \
+           not pars[parnum] > parmaxes[parnum]:
+            newmin[0] = stat
+            newmin[1] = pars[parnum]
+        return stat
+
+    def set_step(step):
+        if step > 0:
+            val = initv + step if upper else initv - step
+        elif step < 0:
+            val = initv - step if upper else initv + step
+        else:
+            val = pars[parnum]
+        pars[parnum] = _clip(val, hardmin, hardmax)[0]
+
+    def at_boundary():
+        pars[parnum], status = _clip(pars[parnum], hardmin, hardmax)
+        return status
+
+    f = 1.0
+    diff = 0.0
+    iters = 0
+    status = est_success
+
+    if initv != 0.0:
+        frac = 0.01 * initv
+    else:
+        limit = parmaxes[parnum] if upper else parmins[parnum]
+        if (upper and limit > 0.0) or (not upper and limit < 0.0):
+            frac = limit / 100.0
+        else:
+            status = at_boundary()
+            frac = 1.0
+
+    if status == est_success:
+        set_step(f * frac)
+        if initv == 0.0:
+            while True:
+                new_stat = get_stat()
+                if new_stat > 1.2 * thr_stat:
+                    frac /= 10.0
+                    set_step(f * frac)
+                else:
+                    break
+
+                if abs(frac) < 1e-30:
+                    break
+
+    status = at_boundary()
+    if status == est_success:
+        new_stat = get_stat()
+        diff = new_stat - min_stat
+        while diff <= 0.0:
+            f = 1.3 * f
+            set_step(f * frac)
+            status = at_boundary()
+            if status != est_success:
+                break
+
+            new_stat = get_stat()
+            diff = new_stat - min_stat
+
+    if status == est_success:
+        set_step(f * frac * numpy.sqrt(abs(thr_stat - min_stat) / diff))
+        status = at_boundary()
+
+    # Now iterate to the final solution.
+    if status == est_success:
+        while iters < maxiters:
+            cur_stat = get_stat()
+            if abs(thr_stat - cur_stat) <= epsilon:
+                break
+
+            step = abs(pars[parnum] - initv) / 10.0
+            status = _clip(pars[parnum] + step, hardmin, hardmax)[1]
+            if status != est_success:
+                break
+
+            pars[parnum] += step
+            new_stat = get_stat()
+            deriv = (new_stat - cur_stat) / step
+            bound = pars[parnum] + (thr_stat - cur_stat) / deriv - step
+            if not upper and bound >= initv:
+                bound = initv - step
+            elif upper and bound <= initv:
+                bound = initv + step
+
+            bound, status = _clip(bound, hardmin, hardmax)
+            if status != est_success:
+                break
+
+            pars[parnum] = bound
+            iters += 1
+
+    if remin > 0.0 and sao_fcmp(min_stat, newmin[0], remin) > 0 and \
+       parmins[parnum] < pars[parnum] < parmaxes[parnum]:
+        return est_newmin, 1.0 if upper else -1.0, newmin[1]
+
+    if status == est_success and iters < maxiters:
+        return est_success, pars[parnum], initv
+
+    bound = hardmax - initv if upper else hardmin - initv
+    if status == est_success:
+        status = est_maxiter
+
+    return status, bound, initv
+
+
+def _neville(x, y, xinterp=0.0):
+    """Interpolate each row of (x, y) to xinterp.
+
+    Returns the interpolated values, which are None for rows where
+    two x values are equal.
+    """
+
+    p = y.copy()
+    failed = numpy.zeros(len(x), dtype=bool)
+    n = x.shape[1]
+    for jj in range(1, n):
+        for ii in range(n - 1, jj - 1, -1):
+            denom = x[:, ii] - x[:, ii - jj]
+            failed |= denom == 0.0
+            p[:, ii] = ((xinterp - x[:, ii - jj]) * p[:, ii] -
+                        (xinterp - x[:, ii]) * p[:, ii - 1]) / denom
+
+    out = p[:, n - 1]
+    out[failed] = numpy.nan
+    return out, failed
+
+
+def _second_derivative(h, f1, f2, min_stat):
+    """Extrapolate the central second derivatives to zero step size.
+
+    The result is -DBL_MAX for a row when a NaN is found or the
+    extrapolation fails.
+    """
+
+    d2f = ((2 * min_stat) - (f1 + f2)) / (h * h)
+    out, failed = _neville(h, d2f)
+    failed |= numpy.isnan(d2f).any(axis=1)
+    out[failed] = -numpy.finfo(numpy.float64).max
+    return out
+
+
+def _clip_points(points, parhardmins, parhardmaxes):
+    """Restrict the points to the hard limits, marking rows with NaN."""
+
+    points = numpy.where(points < parhardmins, parhardmins, points)
+    points = numpy.where(points > parhardmaxes, parhardmaxes, points)
+    return points, ~numpy.isnan(points).any(axis=1)
+
+
+def _info_matrix(pars, parmins, parmaxes, parhardmins, parhardmaxes,
+                 sigma, eps, maxiters, remin, stat_cb, numcores=1):
+    """Calculate the information matrix.
+
+    This follows the C version (``_est_funcs.info_matrix``), which is
+    used when the calculation is not run in parallel, but the
+    statistic evaluations are sent to a single set of numcores
+    processes in three batches: the step-size search for each
+    parameter and side, the diagonal terms, and then the off-diagonal
+    terms, which use the diagonal terms to normalize the steps and to
+    remove the single-parameter contributions, so each pair only needs
+    two evaluations per step.
+
+    If a new minimum is found then pars is changed and EstNewMin
+    raised.
+    """
+
+    if sigma < 0:
+        raise RuntimeError('covariance failed')
+
+    pars = numpy.asarray(pars)
+    parhardmins = numpy.asarray(parhardmins, dtype=numpy.float64)
+    parhardmaxes = numpy.asarray(parhardmaxes, dtype=numpy.float64)
+    npars = len(pars)
+    if any(len(vals) != npars for vals in
+           [parmins, parmaxes, parhardmins, parhardmaxes]):
+        raise RuntimeError('input array sizes do not match')
+
+    min_stat = numpy.float64(stat_cb(pars))
+    if numpy.isnan(min_stat):
+        raise RuntimeError('covariance failed')
+
+    thr_stat = min_stat + sigma ** 2
+
+    # The workers either estimate the scale of a parameter, from the
+    # lower or upper side, or evaluate the statistic at a point.
+    def run(task):
+        if task[0] is None:
+            return stat_cb(task[1])
+
+        return _onesided_interval(pars, parmins, parmaxes, parhardmins,
+                                  parhardmaxes, task[0], min_stat,
+                                  thr_stat, sigma, eps, maxiters, remin,
+                                  task[1], stat_cb)
+
+    with bound_pool(run, numcores) as mapper:
+        return _info_matrix_steps(pars, parhardmins, parhardmaxes,
+                                  min_stat, stat_cb, mapper)
+
+
+def _info_matrix_steps(pars, parhardmins, parhardmaxes, min_stat, stat_cb,
+                       mapper):
+    """The calculations for _info_matrix, using mapper for the statistic."""
+
+    npars = len(pars)
+    tasks = [(i, upper) for i in range(npars) for upper in (0, 1)]
+    scales = numpy.zeros(npars)
+    for (i, _), (status, bound, parval) in zip(tasks, mapper(tasks)):
+        if status == est_newmin:
+            pars[i] = parval
+            stat_cb(pars)
+            raise EstNewMin('new minimum found, restarting error method')
+
+        if status == est_success:
+            scales[i] += abs(bound - pars[i]) / 2.0
+        else:
+            scales[i] += abs(0.0 - pars[i]) / 2.0
+
+    def evaluate(points):
+        points, good = _clip_points(points, parhardmins, parhardmaxes)
+        stats = numpy.full(len(points), numpy.nan)
+        if good.any():
+            stats[good] = mapper([(None, point) for point in points[good]])
+        return stats
+
+    niter = 3
+    ratio = 0.707
+    steps = numpy.asarray([math.pow(ratio, niter - (k + 1))
+                           for k in range(niter)])
+
+    with numpy.errstate(divide='ignore', invalid='ignore',
+                        over='ignore'):
+
+        # The diagonal terms: the points are ordered by parameter,
+        # step, and then the side.
+        h = scales[:, numpy.newaxis] * steps
+        idx = numpy.arange(npars)
+        points = numpy.tile(pars, (npars, niter, 2, 1))
+        points[idx, :, 0, idx] = pars[:, numpy.newaxis] + h
+        points[idx, :, 1, idx] = pars[:, numpy.newaxis] - h
+        stats = evaluate(points.reshape(-1, npars)).reshape(npars, niter, 2)
+
+        diag = -_second_derivative(h, stats[:, :, 0], stats[:, :, 1],
+                                   min_stat)
+        info = numpy.diag(diag)
+
+        # The off-diagonal terms.
+        ii, jj = numpy.triu_indices(npars, 1)
+        if len(ii) > 0:
+            norm = numpy.sqrt(diag)
+            npairs = len(ii)
+            pidx = numpy.arange(npairs)
+            points = numpy.tile(pars, (npairs, niter, 2, 1))
+            for sign, side in [(1, 0), (-1, 1)]:
+                points[pidx, :, side, ii] = \
+                    pars[ii, numpy.newaxis] + \
+                    sign * steps / norm[ii, numpy.newaxis]
+                points[pidx, :, side, jj] = \
+                    pars[jj, numpy.newaxis] + \
+                    sign * steps / norm[jj, numpy.newaxis]
+
+            stats = evaluate(points.reshape(-1, npars)).reshape(npairs,
+                                                                niter, 2)
+            hs = numpy.tile(steps, (npairs, 1))
+            offdiag = _second_derivative(hs, stats[:, :, 0],
+                                         stats[:, :, 1], min_stat)
+            offdiag = -(offdiag + 2) * numpy.sqrt(diag[ii] * diag[jj]) / 2.
+            info[ii, jj] = offdiag
+            info[jj, ii] = offdiag
+
+    return info / 2.
+
+
+def _jacobian_info_matrix(pars, parhardmins, parhardmaxes, resid_cb,
+                          numcores=1):
+    """Approximate the information matrix as J^T J.
+
+    The Jacobian, J, of the residuals is calculated with central
+    differences (one-sided at the hard limits). This is only valid
+    when the statistic is the sum of the squared residuals.
+    """
+
+    pars = numpy.asarray(pars, dtype=numpy.float64)
+    npars = len(pars)
+    steps = numpy.finfo(numpy.float64).eps ** (1 / 3) * \
+        numpy.maximum(numpy.abs(pars), 1.0)
+
+    hi = numpy.minimum(pars + steps, parhardmaxes)
+    lo = numpy.maximum(pars - steps, parhardmins)
+    points = numpy.tile(pars, (2 * npars, 1))
+    idx = numpy.arange(npars)
+    points[2 * idx, idx] = hi
+    points[2 * idx + 1, idx] = lo
+
+    resids = numpy.asarray(_map(resid_cb, points, numcores))
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        jac = (resids[0::2] - resids[1::2]) / (hi - lo)[:, numpy.newaxis]
+
+    return jac @ jac.T
+
+
 def covariance(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
                tol, maxiters, remin, limit_parnums, stat_cb, fit_cb,
-               report_progress):
+               report_progress, numcores=1, resid_cb=None):
     # Do nothing with tol
     # Do nothing with report_progress (generally fast enough we don't
     # need to report back per-parameter progress)
@@ -320,11 +749,25 @@ def covariance(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
     # Even though we only want limits on certain parameters, we have to
     # compute the matrix for *all* thawed parameters.  So we will do that,
     # and then pick the parameters of interest out of the result.
+    #
+    # The C code is used unless the statistic can be evaluated in
+    # parallel or the J^T J approximation is requested.
+
+    if numcores is None:
+        numcores = _ncpus
 
     try:
-        info = _est_funcs.info_matrix(pars, parmins, parmaxes, parhardmins,
-                                      parhardmaxes, sigma, eps, maxiters,
-                                      remin, stat_cb)
+        if resid_cb is not None:
+            info = _jacobian_info_matrix(pars, parhardmins, parhardmaxes,
+                                         resid_cb, numcores)
+        elif numcores > 1 and _multi and not in_worker():
+            info = _info_matrix(pars, parmins, parmaxes, parhardmins,
+                                parhardmaxes, sigma, eps, maxiters,
+                                remin, stat_cb, numcores)
+        else:
+            info = _est_funcs.info_matrix(pars, parmins, parmaxes,
+                                          parhardmins, parhardmaxes, sigma,
+                                          eps, maxiters, remin, stat_cb)
     except EstNewMin:
         # catch the EstNewMin exception and attach the modified
         # parameter values to the exception obj.  These modified
@@ -439,17 +882,12 @@ def projection(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
             # parvals determine the new lower statistic.
             raise EstNewMin(pars)
 
-        if lock is not None:
-            lock.acquire()
-
-        report_progress(singleparnum, singlebounds[0], singlebounds[1])
-
-        if lock is not None:
-            lock.release()
-
         return (singlebounds[0][0], singlebounds[1][0], singlebounds[2][0],
                 singlebounds[3], None)
 
+    def report(i, singlebounds):
+        report_progress(limit_parnums[i], singlebounds[0], singlebounds[1])
+
     if numsearched < 2 or not _multi or numcores < 2:
         do_parallel = False
 
@@ -460,6 +898,7 @@ def projection(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
         nfits = 0
         for i, pnum in enumerate(limit_parnums):
             singlebounds = func(i, pnum)
+            report(i, singlebounds)
             lower_limits[i] = singlebounds[0]
             upper_limits[i] = singlebounds[1]
             eflags[i] = singlebounds[2]
@@ -467,7 +906,8 @@ def projection(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
 
         return (lower_limits, upper_limits, eflags, nfits, None)
 
-    return parallel_est(func, limit_parnums, pars, numcores)
+    return parallel_est(func, limit_parnums, pars, numcores,
+                        callback=report)
 
 #################################confidence###################################
 
@@ -536,6 +976,67 @@ class ConfBlog():
         return 'ConfBlog::__rep__( )'
 
 
+class ConfProfile():
+    """Store the fits made when a parameter is fixed at a value.
+
+    The fits are used as the starting point for the fit at a
+    nearby value, and to avoid re-fitting the same value. The table
+    is not shared between processes, so when the lower and upper
+    bounds of a parameter are calculated in parallel each search
+    only starts from its own fits.
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    x : number
+        The value of the parameter at the best-fit location.
+    stat : number
+        The statistic at the best-fit location.
+    pars : sequence of number
+        The best-fit parameter values.
+
+    """
+
+    def __init__(self, x, stat, pars):
+        self.xs = []
+        self.stats = []
+        self.pars = []
+        self.add(x, stat, pars)
+
+    def __len__(self):
+        return len(self.xs)
+
+    def add(self, x, stat, pars):
+        """Add the fit for the value x.
+
+        Parameters
+        ----------
+        x : number
+            The value of the parameter.
+        stat : number
+            The statistic value after the fit.
+        pars : sequence of number
+            The parameter values after the fit (including x).
+        """
+        self.xs.append(x)
+        self.stats.append(stat)
+        self.pars.append(numpy.array(pars, dtype=float, copy=True))
+
+    def get(self, x):
+        """Return the statistic for x, or None if it has not been fit."""
+        for xval, stat in zip(self.xs, self.stats):
+            if xval == x:
+                return stat
+
+        return None
+
+    def nearest(self, x):
+        """Return a copy of the parameter values closest to x."""
+        idx = numpy.argmin(numpy.abs(numpy.asarray(self.xs) - x))
+        return self.pars[idx].copy()
+
+
 class ConfBracket():
 
     """The class ConfBracket is reponsible for bracketing the root within
@@ -981,25 +1482,37 @@ def confidence(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
     # Work in the translated coordinate. Hence the 'errors/confidence'
     # are the zeros/roots in the translated coordinate system.
     #
-    def translated_fit_cb(fcn, myargs):
+    # The fit starts from the parameter values of the closest point
+    # that has already been fit, and a point that has already been
+    # fit is not re-fit. The fit callback returns the statistic, or
+    # the statistic and the fitted parameter values, which are then
+    # used as the starting point of later fits. If only the statistic
+    # is returned then the starting values are re-used.
+    #
+    def translated_fit_cb(fcn, myargs, profile):
         def translated_fit_cb_wrapper(x, *args):
             hlimit = myargs.hlimit
             slimit = myargs.slimit
             hmin = hlimit[0]
             hmax = hlimit[1]
-            xpars = myargs.xpars
             ith_par = myargs.ith_par
             # The parameter must be within the hard limits
             if x < hmin[ith_par] or x > hmax[ith_par]:
                 raise OutOfBoundErr
-            smin = slimit[0]
-            smax = slimit[1]
-            orig_ith_xpar = xpars[ith_par]
-            xpars[ith_par] = x
-            translated_stat = fcn(
-                xpars, smin, smax, ith_par) - myargs.target_stat
-            xpars[ith_par] = orig_ith_xpar
-            return translated_stat
+
+            stat = profile.get(x)
+            if stat is None:
+                smin = slimit[0]
+                smax = slimit[1]
+                xpars = profile.nearest(x)
+                xpars[ith_par] = x
+                stat = fcn(xpars, smin, smax, ith_par)
+                if isinstance(stat, tuple):
+                    stat, xpars = stat
+
+                profile.add(x, stat, xpars)
+
+            return stat - myargs.target_stat
         return translated_fit_cb_wrapper
 
     def verbose_fitcb(fcn, bloginfo):
@@ -1057,15 +1570,16 @@ def confidence(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
 
     dict = {}
 
-    def func(counter, singleparnum, lock=None):
+    def func(counter, singleparnum, lock=None, dirs=(0, 1)):
 
         # nfev contains the number of times it was fitted
         nfev, counter_cb = func_counter(fit_cb)
 
         #
-        # These are the bounds to be returned by this method
+        # These are the bounds to be returned by this method; dirs
+        # selects the bounds to calculate (0 is lower, 1 is upper).
         #
-        conf_int = [[], []]
+        conf_int = [[None], [None]]
         error_flags = []
 
         #
@@ -1075,7 +1589,11 @@ def confidence(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
         #
         myargs.ith_par = singleparnum
 
-        fitcb = translated_fit_cb(counter_cb, myargs)
+        # The fits are shared by the lower and upper searches, unless
+        # they are run by separate processes, when each search only
+        # uses its own fits.
+        profile = ConfProfile(myargs.get_par(), orig_min_stat, pars)
+        fitcb = translated_fit_cb(counter_cb, myargs, profile)
 
         par_name = get_par_name(myargs.ith_par)
 
@@ -1095,7 +1613,7 @@ def confidence(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
                    verbose_fitcb(fitcb,
                                  ConfBlog(sherpablog, prefix[1], verbose, lock))]
 
-        for dir in range(2):
+        for dir in dirs:
 
             #
             # trial_points stores the history of the points for the
@@ -1118,7 +1636,7 @@ def confidence(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
 
             delta_zero = get_delta_root(myzero, dir, pars[myargs.ith_par])
 
-            conf_int[dir].append(delta_zero)
+            conf_int[dir][0] = delta_zero
 
             status_prefix = get_prefix(counter, par_name, ['lower bound',
                                                            'upper bound'])
@@ -1135,7 +1653,10 @@ def confidence(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
         return (conf_int[0][0], conf_int[1][0], error_flags[0],
                 nfev[0], None)
 
-    if len(limit_parnums) < 2 or not _multi or numcores < 2:
+    def report(i, bounds):
+        report_progress(limit_parnums[i], bounds[0], bounds[1])
+
+    if len(limit_parnums) < 1 or not _multi or numcores < 2:
         do_parallel = False
 
     if not do_parallel:
@@ -1146,102 +1667,276 @@ def confidence(pars, parmins, parmaxes, parhardmins, parhardmaxes, sigma, eps,
         for i in range(len(limit_parnums)):
             lower_limit, upper_limit, flags, nfit, extra = func(
                 i, limit_parnums[i])
+            report(i, (lower_limit, upper_limit))
             lower_limits.append(lower_limit)
             upper_limits.append(upper_limit)
             eflags.append(flags)
             nfits += nfit
         return (lower_limits, upper_limits, eflags, nfits, None)
 
-    return parallel_est(func, limit_parnums, pars, numcores)
+    # When there are fewer parameters than processes the bounds are
+    # searched for separately, so that the processes are kept busy,
+    # but then the search for the upper bound does not use the points
+    # from the lower-bound search.
+    split = len(limit_parnums) < numcores
+    return parallel_est(func, limit_parnums, pars, numcores, split=split,
+                        callback=report)
 
 #################################confidence###################################
 
 
-def parallel_est(estfunc, limit_parnums, pars, numcores=_ncpus):
+def _est_worker(estfunc, parnums, pars, task_q, out_q, lock):
+    """Run the tasks from task_q until a None is found."""
 
-    tasks = []
+    while True:
+        task = task_q.get()
+        if task is None:
+            return
 
-    def worker(out_q, err_q, parids, parnums, parvals, lock):
-        results = []
-        for parid, singleparnum in zip(parids, parnums):
-            try:
-                result = estfunc(parid, singleparnum, lock)
-                results.append((parid, result))
-            except EstNewMin:
-                # catch the EstNewMin exception and include the exception
-                # class and the modified parameter values to the error queue.
-                # These modified parvals determine the new lower statistic.
-                # The exception class will be instaniated re-raised with the
-                # parameter values attached.  C++ Python exceptions are not
-                # picklable for use in the queue.
-                err_q.put(EstNewMin(parvals))
-                return
-            except Exception as e:
-                # err_q.put( e.__class__() )
-                err_q.put(e)
-                return
-
-        out_q.put(results)
-
-    # The multiprocessing manager provides references to process-safe
-    # shared objects like Queue and Lock
-    manager = multiprocessing.Manager()
-    out_q = manager.Queue()
-    err_q = manager.Queue()
-    lock = manager.Lock()
-
-    size = len(limit_parnums)
-    parids = numpy.arange(size)
-
-    # if len(limit_parnums) is less than numcores, only use length number of
-    # processes
-    if size < numcores:
-        numcores = size
-
-    # group limit_parnums into numcores-worth of chunks
-    limit_parnums = numpy.array_split(limit_parnums, numcores)
-    parids = numpy.array_split(parids, numcores)
-
-    tasks = [multiprocessing.Process(target=worker,
-                                     args=(out_q, err_q, parid, parnum, pars, lock))
-             for parid, parnum in zip(parids, limit_parnums)]
-
-    return run_tasks(tasks, out_q, err_q, size)
-
-
-def run_tasks(tasks, out_q, err_q, size):
-
-    die = (lambda tasks: [task.terminate() for task in tasks
-                          if task.exitcode is None])
+        parid, dir = task
+        args = (parid, parnums[parid], lock)
+        if dir is not None:
+            args += (dir, )
 
-    try:
-        for task in tasks:
-            task.start()
+        try:
+            out_q.put((task, estfunc(*args), None))
+        except EstNewMin:
+            # Include the modified parameter values, which
+            # determine the new lower statistic, since C++ Python
+            # exceptions are not picklable for use in the queue.
+            out_q.put((task, None, EstNewMin(pars)))
+            return
+        except Exception as e:
+            out_q.put((task, None, e))
+            return
 
-        for task in tasks:
-            task.join()
 
-    except KeyboardInterrupt as e:
-        # kill all slave processes on ctrl-C
-        die(tasks)
-        raise e
+class EstTasks():
+    """Run error estimates in parallel, returning a future for each.
+
+    Each parameter - or, when split is set, each bound of each
+    parameter - is a separate task. The tasks are placed on a queue,
+    and each process takes the next task when it has finished its
+    current one, so a parameter which takes a long time to process
+    does not stop the other processes from working.
+
+    The processes are given estfunc when they are created, so the
+    "fork" start method must be used, since estfunc is normally a
+    closure. The `parallel_est` function, which is how the error
+    estimates use this class, combines the futures into a single
+    result.
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    estfunc : callable
+        The function which calculates the bounds. It is called with
+        the arguments (parid, parnum, lock), where parid is the
+        index into limit_parnums and parnum the parameter number,
+        and returns (lower, upper, eflag, nfits, extra). When split is
+        set it is also given the dirs argument, which is (0,) for the
+        lower bound and (1,) for the upper bound.
+    limit_parnums : sequence of int
+        The parameters to process.
+    pars : ndarray
+        The parameter values, which are attached to the EstNewMin
+        exception if it is raised.
+    numcores : int
+        The number of processes to use.
+    split : bool, optional
+        Should the lower and upper bounds be calculated separately?
+
+    Attributes
+    ----------
+    futures : list of concurrent.futures.Future
+        The result of estfunc for each element of limit_parnums. If
+        any task fails then the remaining processes are stopped and
+        the unfinished futures are given the error.
+
+    See Also
+    --------
+    parallel_est
+
+    """
+
+    def __init__(self, estfunc, limit_parnums, pars, numcores, split=False):
 
-    if not err_q.empty():
-        die(tasks)
-        raise err_q.get()
+        self._estfunc = estfunc
+        self._parnums = list(limit_parnums)
+        self._split = split
+
+        size = len(self._parnums)
+        dirs = [(0, ), (1, )] if split else [None]
+        self._tasks = [(parid, dir) for parid in range(size)
+                       for dir in dirs]
+        self._results = [{} for _ in range(size)]
+
+        self.futures = [Future() for _ in range(size)]
+        for future in self.futures:
+            future.set_running_or_notify_cancel()
+
+        # The multiprocessing manager provides references to
+        # process-safe shared objects like Queue and Lock. The
+        # references are kept until the processes have finished, as
+        # the manager removes an object once the references to it
+        # have gone, which can happen before a new process has
+        # registered its own reference.
+        manager = multiprocessing.Manager()
+        task_q = manager.Queue()
+        self._out_q = manager.Queue()
+        lock = manager.Lock()
+        self._shared = (task_q, lock)
+
+        numcores = max(1, min(numcores, len(self._tasks)))
+        for task in self._tasks:
+            task_q.put(task)
+        for _ in range(numcores):
+            task_q.put(None)
+
+        self._procs = [multiprocessing.Process(target=_est_worker,
+                                               args=(estfunc, self._parnums,
+                                                     pars, task_q,
+                                                     self._out_q, lock))
+                       for _ in range(numcores)]
+
+        self._manager = manager
+        for proc in self._procs:
+            proc.start()
+
+        self._thread = threading.Thread(target=self._collect, daemon=True)
+        self._thread.start()
+
+    def _collect(self):
+        """Set the futures as the results arrive."""
 
-    lower_limits = size * [None]
-    upper_limits = size * [None]
-    eflags = size * [None]
-    nfits = 0
+        try:
+            for _ in range(len(self._tasks)):
+                (parid, dir), result, error = self._get()
+                if error is not None:
+                    self._fail(error)
+                    return
+
+                results = self._results[parid]
+                results[dir] = result
+                if self._split and len(results) < 2:
+                    continue
+
+                if self._split:
+                    lower = results[(0, )]
+                    upper = results[(1, )]
+                    eflag = lower[2] if lower[2] != est_success else upper[2]
+                    result = (lower[0], upper[1], eflag,
+                              lower[3] + upper[3], None)
+
+                self.futures[parid].set_result(result)
+
+        except Exception as e:
+            self._fail(e)
+            return
+
+        for proc in self._procs:
+            proc.join()
 
-    while not out_q.empty():
-        for parid, singlebounds in out_q.get():
-            # Have to guarantee that the tuple returned by projection
-            # is always (array, array, array, int) for this to work.
-            lower_limits[parid] = singlebounds[0]
-            upper_limits[parid] = singlebounds[1]
-            eflags[parid] = singlebounds[2]
-            nfits += singlebounds[3]
+        self._manager.shutdown()
 
+    def _get(self):
+        """Wait for the next result, checking the processes are running."""
+
+        while True:
+            try:
+                return self._out_q.get(timeout=0.1)
+            except queue.Empty:
+                if all(proc.exitcode is not None for proc in self._procs):
+                    raise RuntimeError("error estimate processes stopped")
+
+    def _fail(self, error):
+        self.terminate()
+        for future in self.futures:
+            if not future.done():
+                future.set_exception(error)
+
+    def terminate(self):
+        """Stop the processes."""
+        for proc in self._procs:
+            if proc.exitcode is None:
+                proc.terminate()
+
+        for proc in self._procs:
+            proc.join()
+
+        self._manager.shutdown()
+
+
+def parallel_est(estfunc, limit_parnums, pars, numcores=_ncpus, split=False,
+                 callback=None):
+    """Calculate the error estimates in parallel.
+
+    .. versionchanged:: 4.14.0
+       The tasks are now run by EstTasks, so a process starts on the
+       next parameter as soon as it has finished, and the split and
+       callback arguments were added.
+
+    Parameters
+    ----------
+    estfunc : callable
+        The function which calculates the bounds (see `EstTasks`).
+    limit_parnums : sequence of int
+        The parameters to process.
+    pars : ndarray
+        The parameter values.
+    numcores : int, optional
+        The number of processes to use.
+    split : bool, optional
+        Should the lower and upper bounds be calculated separately?
+    callback : callable or None, optional
+        If set, called with the index into limit_parnums and the
+        result of estfunc for each parameter, in the order they
+        are completed.
+
+    Returns
+    -------
+    lower, upper, eflags, nfits, extra
+        The combined results.
+
+    Notes
+    -----
+    The parameters are processed in serial, in order, unless the
+    multiprocessing start method is "fork" (see `EstTasks`), and a
+    warning is displayed when this happens.
+
+    """
+
+    method = multiprocessing.get_start_method()
+    if method != 'fork':
+        warning("The multiprocessing start method is '%s', not 'fork', "
+                "so the errors are calculated in serial", method)
+        results = []
+        for i, parnum in enumerate(limit_parnums):
+            result = estfunc(i, parnum, None)
+            if callback is not None:
+                callback(i, result)
+
+            results.append(result)
+
+    else:
+        tasks = EstTasks(estfunc, limit_parnums, pars, numcores,
+                         split=split)
+        try:
+            if callback is not None:
+                index = {future: i for i, future in enumerate(tasks.futures)}
+                for future in as_completed(tasks.futures):
+                    callback(index[future], future.result())
+
+            results = [future.result() for future in tasks.futures]
+
+        except KeyboardInterrupt:
+            # kill all slave processes on ctrl-C
+            tasks.terminate()
+            raise
+
+    lower_limits = [result[0] for result in results]
+    upper_limits = [result[1] for result in results]
+    eflags = [result[2] for result in results]
+    nfits = sum(result[3] for result in results)
     return (lower_limits, upper_limits, eflags, nfits, None)
@@ -23,8 +23,8 @@ import pytest
 
 from sherpa.fit import Fit
 from sherpa.data import Data1D
-from sherpa.models.basic import Polynom1D
-from sherpa.estmethods import Confidence
+from sherpa.models.basic import Gauss1D, Polynom1D
+from sherpa.estmethods import Confidence, ConfProfile, confidence
 from sherpa import ui
 
 
@@ -98,3 +98,112 @@ def tst_ui(thaw_c1, setUp, clean_ui):
     ui.conf()
     result = ui.get_conf_results()
     cmp_results(result)
+
+
+def test_conf_profile():
+    profile = ConfProfile(1.0, 2.0, [1.0, 5.0])
+    assert len(profile) == 1
+    assert profile.get(1.0) == 2.0
+    assert profile.get(1.5) is None
+
+    profile.add(3.0, 6.0, [3.0, 7.0])
+    assert len(profile) == 2
+    assert profile.get(3.0) == 6.0
+    assert profile.nearest(1.9) == pytest.approx([1.0, 5.0])
+    assert profile.nearest(2.1) == pytest.approx([3.0, 7.0])
+
+    # a copy is returned
+    pars = profile.nearest(3.2)
+    pars[0] = 4.0
+    assert profile.nearest(3.2) == pytest.approx([3.0, 7.0])
+
+
+def test_conf_reuses_fits(hide_logging):
+    """Fits are re-used and start from the closest previous fit.
+
+    Before the fits were re-used this took 23 fits.
+    """
+
+    x = np.linspace(-5, 5, 41)
+    rng = np.random.RandomState(3)
+    mdl = Gauss1D()
+    mdl.fwhm = 2
+    mdl.ampl = 10
+    y = mdl(x) + rng.normal(0, 0.5, x.size)
+    data = Data1D('x', x, y, staterror=np.ones(x.size) * 0.5)
+
+    mdl.fwhm = 3
+    mdl.ampl = 5
+    mdl.pos = 0.3
+    f = Fit(data, mdl, estmethod=Confidence())
+    f.fit()
+    f.estmethod.parallel = False
+
+    result = f.est_errors()
+    assert result.nfits < 23
+    assert result.parmins == pytest.approx([-0.0596636, -0.025099, -0.250509],
+                                           rel=1e-5)
+    assert result.parmaxes == pytest.approx([0.0609137, 0.025099, 0.250509],
+                                            rel=1e-5)
+
+
+def test_confidence_fit_cb_returns_stat():
+    """The fit callback only has to return the statistic."""
+
+    centers = np.asarray([1.0, 2.0])
+    sigmas = np.asarray([1.0, 2.0])
+
+    def stat_cb(pars, *args):
+        return np.sum(((pars - centers) / sigmas)**2)
+
+    # The other parameter is always at its best-fit location.
+    def fit_cb(pars, parmins, parmaxes, i):
+        return ((pars[i] - centers[i]) / sigmas[i])**2
+
+    mins = np.asarray([-100.0, -100.0])
+    maxs = np.asarray([100.0, 100.0])
+    result = confidence(centers.copy(), mins, maxs, mins, maxs, 1, 0.01,
+                        0.2, 5, 0.01, False, [0, 1], stat_cb, fit_cb,
+                        lambda *args: None, lambda i: 'p{}'.format(i),
+                        False, 1, False)
+
+    assert result[0] == pytest.approx(-sigmas, rel=1e-3)
+    assert result[1] == pytest.approx(sigmas, rel=1e-3)
+
+
+def test_confidence_fit_cb_returns_pars():
+    """The fitted values returned by the fit callback are re-used."""
+
+    centers = np.asarray([1.0, 2.0])
+    sigmas = np.asarray([1.0, 2.0])
+
+    # Use a quartic so that several fits are needed.
+    def stat_cb(pars, *args):
+        return np.sum(((pars - centers) / sigmas)**4)
+
+    # The fitted value of the other parameter is not used by the
+    # statistic, so a marker value can be returned.
+    starts = []
+
+    def fit_cb(pars, parmins, parmaxes, i):
+        starts.append(pars.copy())
+        fitted = pars.copy()
+        fitted[1 - i] = 42.0
+        return ((pars[i] - centers[i]) / sigmas[i])**4, fitted
+
+    pars = centers.copy()
+    mins = np.asarray([-100.0, -100.0])
+    maxs = np.asarray([100.0, 100.0])
+    result = confidence(pars, mins, maxs, mins, maxs, 1, 0.01,
+                        0.2, 5, 0.01, False, [0], stat_cb, fit_cb,
+                        lambda *args: None, lambda i: 'p{}'.format(i),
+                        False, 1, False)
+
+    assert result[0] == pytest.approx([-1], rel=1e-2)
+    assert result[1] == pytest.approx([1], rel=1e-2)
+
+    # The first fit starts at the best-fit location, and later fits
+    # can start from a previous fit.
+    assert starts[0][1] == 2.0
+    assert any(start[1] == 42.0 for start in starts[1:])
+    assert pars == pytest.approx(centers)
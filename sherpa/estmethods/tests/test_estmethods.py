@@ -18,11 +18,19 @@
 #  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 #
 
+import multiprocessing
+
 import numpy
 
 import pytest
 
-from sherpa.estmethods import Covariance, Projection
+import time
+
+from sherpa import estmethods
+from sherpa.estmethods import Covariance, Projection, EstNewMin, \
+    EstTasks, parallel_est, est_success, est_failure, est_hardmax, \
+    _info_matrix, _est_funcs
+from sherpa.utils.parallel import bound_pool
 
 
 # Test data arrays -- together this makes a line best fit with a
@@ -97,6 +105,12 @@ def stat(p):
     return ((fvec * fvec).sum(), )
 
 
+def stat_fvec(p):
+    errors = 1.0 + numpy.sqrt(y + 0.75)
+    fvec = (y - gauss_func(p)) / errors
+    return ((fvec * fvec).sum(), fvec)
+
+
 # Easiest "fit" function for unit tests is actually just to
 # return current parameter values.  In this test, that will
 # have the effect of making projection act like the old
@@ -186,6 +200,91 @@ def test_covar():
     assert results[1] == pytest.approx(expected)
 
 
+def test_info_matrix_matches_c():
+    """The Python version gives the same result as the C code."""
+
+    def stat_cb(p):
+        return stat(p)[0]
+
+    expected = _est_funcs.info_matrix(fittedpars, minpars, maxpars,
+                                      hardminpars, hardmaxpars, 1, 0.01,
+                                      200, -1.0, stat_cb)
+    got = _info_matrix(fittedpars, minpars, maxpars,
+                       hardminpars, hardmaxpars, 1, 0.01, 200, -1.0,
+                       stat_cb, numcores=2)
+    assert got == pytest.approx(expected, rel=0, abs=0)
+
+
+def test_info_matrix_one_pool(monkeypatch):
+    """The same processes are used for all the evaluations."""
+
+    calls = []
+
+    def counter(function, numcores):
+        calls.append(numcores)
+        return bound_pool(function, numcores)
+
+    monkeypatch.setattr(estmethods, 'bound_pool', counter)
+
+    cov = Covariance()
+    cov.numcores = 2
+    results = cov.compute(stat, None, fittedpars,
+                          minpars, maxpars,
+                          hardminpars, hardmaxpars,
+                          limit_parnums, freeze_par, thaw_par,
+                          report_progress, get_par_name)
+
+    expected = numpy.array([0.4935702, 0.26405554, 2.58857314])
+    assert results[1] == pytest.approx(expected)
+    assert calls == [2]
+
+
+@pytest.mark.parametrize("numcores", [1, 2])
+def test_covar_numcores(numcores):
+
+    cov = Covariance()
+    assert cov.numcores == 1
+    cov.numcores = numcores
+
+    results = cov.compute(stat, None, fittedpars,
+                          minpars, maxpars,
+                          hardminpars, hardmaxpars,
+                          limit_parnums, freeze_par, thaw_par,
+                          report_progress, get_par_name)
+
+    expected = numpy.array([0.4935702, 0.26405554, 2.58857314])
+    assert results[1] == pytest.approx(expected)
+
+
+def test_covar_numcores_invalid():
+    cov = Covariance()
+    cov.numcores = 2
+    with pytest.raises(RuntimeError):
+        cov.compute(stat, fitter, fittedpars, numpy.array([1, 2]),
+                    maxpars, hardminpars, hardmaxpars, limit_parnums,
+                    freeze_par, thaw_par, report_progress, get_par_name)
+
+
+@pytest.mark.parametrize("numcores", [1, 2])
+def test_covar_jacobian(numcores):
+    """The J^T J approximation is close to the full calculation."""
+
+    cov = Covariance()
+    assert not cov.jacobian
+    cov.jacobian = True
+    cov.numcores = numcores
+
+    results = cov.compute(stat_fvec, None, fittedpars,
+                          minpars, maxpars,
+                          hardminpars, hardmaxpars,
+                          limit_parnums, freeze_par, thaw_par,
+                          report_progress, get_par_name)
+
+    expected = numpy.array([0.4935702, 0.26405554, 2.58857314])
+    assert results[1] == pytest.approx(expected, rel=0.05)
+    assert results[0] == pytest.approx(-results[1])
+
+
 # There is no guarantee we can run with parallel=True but try to do so.
 #
 @pytest.mark.parametrize("parallel", [True, False])
@@ -209,3 +308,108 @@ def test_projection(parallel):
     #
     assert results[0] == pytest.approx(standard_elo)
     assert results[1] == pytest.approx(standard_ehi)
+
+
+def fake_est(parid, parnum, lock, dirs=(0, 1)):
+    """Return the bounds -parnum and parnum, after parnum / 10 seconds."""
+    time.sleep(parnum / 10)
+    lower = -parnum if 0 in dirs else None
+    upper = parnum if 1 in dirs else None
+    eflag = est_hardmax if parnum == 2 and 1 in dirs else est_success
+    return (lower, upper, eflag, len(dirs), None)
+
+
+@pytest.mark.parametrize("split", [False, True])
+def test_parallel_est(split):
+
+    parnums = [3, 0, 2, 1]
+    order = []
+    results = parallel_est(fake_est, parnums, fittedpars, numcores=2,
+                           split=split,
+                           callback=lambda i, r: order.append(parnums[i]))
+
+    assert results[0] == [-3, 0, -2, -1]
+    assert results[1] == [3, 0, 2, 1]
+    assert results[2] == [est_success, est_success, est_hardmax, est_success]
+    assert results[3] == 8
+    assert sorted(order) == [0, 1, 2, 3]
+
+
+def test_parallel_est_dynamic():
+    """A slow parameter does not hold up the other parameters.
+
+    The slow parameter waits until the other parameters have been
+    processed, which only happens if the other process takes the
+    remaining tasks.
+    """
+
+    ndone = multiprocessing.Value('i', 0)
+    done = multiprocessing.Event()
+
+    def est(parid, parnum, lock):
+        if parnum == 6:
+            eflag = est_success if done.wait(timeout=10) else est_failure
+        else:
+            eflag = est_success
+            with ndone.get_lock():
+                ndone.value += 1
+                if ndone.value == 3:
+                    done.set()
+
+        return (-parnum, parnum, eflag, 1, None)
+
+    parnums = [6, 0, 2, 1]
+    results = parallel_est(est, parnums, fittedpars, numcores=2)
+    assert results[0] == [-6, 0, -2, -1]
+    assert results[2] == [est_success] * 4
+
+
+def test_parallel_est_not_fork(monkeypatch, caplog):
+    """The parameters are processed in order when fork is not used."""
+
+    monkeypatch.setattr(estmethods.multiprocessing, 'get_start_method',
+                        lambda: 'spawn')
+
+    parnums = [6, 0, 2, 1]
+    order = []
+    results = parallel_est(lambda *args: fake_est(*args), parnums,
+                           fittedpars, numcores=2, split=True,
+                           callback=lambda i, r: order.append(parnums[i]))
+    assert order == parnums
+    assert results[0] == [-6, 0, -2, -1]
+    assert results[1] == [6, 0, 2, 1]
+
+    assert len(caplog.records) == 1
+    assert caplog.records[0].levelname == 'WARNING'
+    assert caplog.records[0].getMessage() == \
+        "The multiprocessing start method is 'spawn', not 'fork', " + \
+        "so the errors are calculated in serial"
+
+
+def test_est_tasks_futures():
+
+    tasks = EstTasks(fake_est, [1, 0], fittedpars, 2)
+    assert tasks.futures[1].result() == (0, 0, est_success, 2, None)
+    assert tasks.futures[0].result() == (-1, 1, est_success, 2, None)
+
+
+def test_parallel_est_error():
+
+    def est(parid, parnum, lock):
+        if parnum == 1:
+            raise ValueError("bad parameter")
+        return fake_est(parid, parnum, lock)
+
+    with pytest.raises(ValueError, match="^bad parameter$"):
+        parallel_est(est, [0, 1, 2], fittedpars, numcores=2)
+
+
+def test_parallel_est_newmin():
+
+    def est(parid, parnum, lock):
+        raise EstNewMin()
+
+    with pytest.raises(EstNewMin) as excinfo:
+        parallel_est(est, [0, 1], fittedpars, numcores=2)
+
+    assert excinfo.value.args[0] == pytest.approx(fittedpars)
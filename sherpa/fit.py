@@ -20,6 +20,7 @@
 
 import logging
 import os
+import pickle
 import signal
 
 from functools import wraps
@@ -29,11 +30,13 @@ import numpy as np
 from numpy import arange, array, abs, iterable, sqrt, where, \
     ones_like, isnan, isinf, any
 from sherpa.utils import NoNewAttributesAfterInit, print_fields, erf, \
-    bool_cast, is_in, is_iterable, list_to_open_interval, sao_fcmp
+    bool_cast, is_in, is_iterable, list_to_open_interval, sao_fcmp, \
+    _multi, _ncpus
+from sherpa.utils.parallel import get_pool, in_worker
 from sherpa.utils.err import FitErr, EstErr, SherpaErr
 from sherpa.utils import formatting
 from sherpa.data import DataSimulFit
-from sherpa.estmethods import Covariance, EstNewMin
+from sherpa.estmethods import Confidence, Covariance, EstNewMin
 from sherpa.models import SimulFitModel
 from sherpa.optmethods import LevMar, NelderMead
 from sherpa.stats import Chi2, Chi2Gehrels, Cash, Chi2ModVar, \
@@ -539,6 +542,106 @@ class ErrorEstResults(NoNewAttributesAfterInit):
         return myformat(hfmt, s, lowstr, lownum, highstr, highnum)
 
 
+class _SimulFitWorker():
+    """Evaluate the model for one data set of a simultaneous fit.
+
+    This is sent to the worker processes of a SimulFitEvaluator,
+    so it must be picklable.
+    """
+
+    def __init__(self, data, model):
+        self.data = data
+        self.model = model
+
+    def __call__(self, idx, parvals):
+        # Set the internal value so that links (and the frozen
+        # state) are not changed.
+        for par, val in zip(self.model.pars, parvals):
+            par._val = val
+
+        dset = self.data.datasets[idx]
+        return dset.eval_model_to_fit(self.model.parts[idx])
+
+
+class SimulFitEvaluator(NoNewAttributesAfterInit):
+    """Evaluate the models of a simultaneous fit in parallel.
+
+    The data sets and models are sent to the worker processes once,
+    when the object is created, and then each evaluation only sends
+    the parameter values, with each data set evaluated by a separate
+    worker. The workers are shared by all evaluators (see
+    `sherpa.utils.parallel.get_pool`) and they persist between fits.
+
+    Parameters
+    ----------
+    data : sherpa.data.DataSimulFit instance
+        The data sets.
+    model : sherpa.models.model.SimulFitModel instance
+        The models for each data set.
+    numcores : int
+        The number of worker processes to use.
+
+    Notes
+    -----
+    Changes to the data or model, other than the parameter values,
+    are not seen by the workers, so a new evaluator must be created
+    if they change. The `close` method should be called when the
+    evaluator is no-longer needed. Functions and classes used by
+    the models - such as the function of a user model - are sent by
+    name, so the workers are re-started when they have changed since
+    the workers were started. If this is not possible, because the
+    workers are in use, a `pickle.PicklingError` is raised.
+
+    The models are evaluated in the calling process when it is not
+    the process that created the evaluator, or it is a worker
+    process, such as when the optimiser evaluates the statistic in
+    parallel. Such processes can not use the pipes to the shared
+    workers, since they are also used by the creating process.
+
+    """
+
+    def __init__(self, data, model, numcores):
+        self.ndata = len(data.datasets)
+        self._pool = get_pool(numcores)
+        self._key = ('simulfit', id(self))
+        self._local = _SimulFitWorker(data, model)
+        self._pid = os.getpid()
+        self._pool.register(self._key, self._local)
+        NoNewAttributesAfterInit.__init__(self)
+
+    def _use_pool(self):
+        """Can the shared workers be used by this process?"""
+        return os.getpid() == self._pid and not in_worker()
+
+    def eval_model_to_fit(self, modelfuncs):
+        """Evaluate the models for each data set.
+
+        Parameters
+        ----------
+        modelfuncs : sherpa.models.model.SimulFitModel instance
+            The model expressions. Only the parameter values are
+            used, so it must be the model used to create the object.
+
+        Returns
+        -------
+        modeldata : array of numbers
+            The model values for all the data sets.
+        """
+
+        parvals = [par._val for par in modelfuncs.pars]
+        if not self._use_pool():
+            return np.concatenate([self._local(idx, parvals)
+                                   for idx in range(self.ndata)])
+
+        args = [(idx, parvals) for idx in range(self.ndata)]
+        return np.concatenate(self._pool.call(self._key, args))
+
+    def close(self):
+        """Remove the data and models from the worker processes."""
+        if self._use_pool():
+            self._pool.unregister(self._key)
+
+
 class IterFit(NoNewAttributesAfterInit):
 
     def __init__(self, data, model, stat, method, itermethod_opts=None):
@@ -557,12 +660,13 @@ class IterFit(NoNewAttributesAfterInit):
             self.model = SimulFitModel('simulfit model', (model,))
         self.stat = stat
         self.method = method
-        # Data set attributes needed to store fitting values between
-        # calls to fit
-        self._dep = None
-        # self.extra_args = None
-        self._staterror = None
-        self._syserror = None
+        # The data values needed by the statistic (a FitContext),
+        # stored between calls to fit so that they are not
+        # re-calculated for every evaluation of the statistic.
+        self._context = None
+        # The number of processes to use when evaluating the models
+        # of a simultaneous fit (None means use all the cores).
+        self.numcores = 1
         self._nfev = 0
         self._file = None
         # Options to send to iterative fitting method
@@ -583,7 +687,7 @@ class IterFit(NoNewAttributesAfterInit):
     def _sig_handler(self, signum, frame):
         raise KeyboardInterrupt()
 
-    def _get_callback(self, outfile=None, clobber=False):
+    def _get_callback(self, outfile=None, clobber=False, numcores=1):
         if len(self.model.thawedpars) == 0:
             raise FitErr('nothawedpar')
 
@@ -593,10 +697,9 @@ class IterFit(NoNewAttributesAfterInit):
         except ValueError as e:
             warning(e)
 
-        self._dep, self._staterror, self._syserror = self.data.to_fit(
-            self.stat.calc_staterror)
+        self.numcores = numcores
+        self._update_context()
 
-        # self.extra_args = self.get_extra_args(self._dep)
         self._nfev = 0
         if outfile is not None:
             if not clobber and os.path.isfile(outfile):
@@ -612,7 +715,7 @@ class IterFit(NoNewAttributesAfterInit):
             # linked parameters
 
             self.model.thawedpars = pars
-            stat = self.stat.calc_stat(self.data, self.model)
+            stat = self.stat.calc_stat_from_context(self._context)
 
             if self._file is not None:
                 vals = ['%5e %5e' % (self._nfev, stat[0])]
@@ -624,6 +727,41 @@ class IterFit(NoNewAttributesAfterInit):
 
         return cb
 
+    def _update_context(self):
+        """Re-calculate the data values used by the statistic.
+
+        This must be called whenever the data changes during a fit,
+        such as when the filter or the statistical errors are changed.
+        If there are multiple data sets and the numcores attribute
+        allows it then the models are evaluated in parallel.
+        """
+        self._close_context()
+        self._context = self.stat.get_fit_context(self.data, self.model)
+
+        numcores = _ncpus if self.numcores is None else self.numcores
+        ndata = len(self._context.data.datasets)
+        if not _multi or numcores < 2 or ndata < 2:
+            return
+
+        numcores = min(numcores, ndata)
+        try:
+            evaluator = SimulFitEvaluator(self._context.data,
+                                          self._context.model,
+                                          numcores)
+        except (pickle.PicklingError, AttributeError, TypeError) as exc:
+            # e.g. a user model that can not be sent to the workers
+            warning("unable to evaluate the models in parallel: %s", exc)
+            return
+
+        self._context.evaluator = evaluator
+
+    def _close_context(self):
+        """Release any resources used to evaluate the models."""
+        if self._context is not None and \
+           self._context.evaluator is not None:
+            self._context.evaluator.close()
+            self._context.evaluator = None
+
     def primini(self, statfunc, pars, parmins, parmaxes, statargs=(),
                 statkwargs=None):
         r"""An iterative scheme, where the variance is computed from
@@ -721,6 +859,8 @@ class IterFit(NoNewAttributesAfterInit):
             staterror_original.append(st)
             d.staterror = ones_like(st)
 
+        self._update_context()
+
         # Keep record of current and previous statistics;
         # when these are within some tolerace, Primini's method
         # is done.
@@ -757,6 +897,8 @@ class IterFit(NoNewAttributesAfterInit):
                     d.staterror = self.stat.calc_staterror(
                         d.eval_model(next(model_iterator)))
 
+                self._update_context()
+
             # Final number of function evaluations is the sum
             # of the numbers of function evaluations from all calls
             # to the fit function.
@@ -768,6 +910,8 @@ class IterFit(NoNewAttributesAfterInit):
             for d in self.data.datasets:
                 d.staterror = staterror_original.pop()
 
+            self._update_context()
+
         # Return results from Primini's iterative fitting method
         return final_fit_results
 
@@ -885,8 +1029,7 @@ class IterFit(NoNewAttributesAfterInit):
             while rejected and iters < maxiters:
                 # Update stored y, staterror and syserror values
                 # from data, so callback function will work properly
-                self._dep, self._staterror, self._syserror = self.data.to_fit(
-                    self.stat.calc_staterror)
+                self._update_context()
                 self.model.startup(cache)
                 final_fit_results = self.method.fit(statfunc,
                                                     self.model.thawedpars,
@@ -959,13 +1102,11 @@ class IterFit(NoNewAttributesAfterInit):
 
             # Update stored y, staterror and syserror values
             # from data, so callback function will work properly
-            self._dep, self._staterror, self._syserror = self.data.to_fit(
-                self.stat.calc_staterror)
+            self._update_context()
             self.model.startup(cache)
             raise
 
-        self._dep, self._staterror, self._syserror = self.data.to_fit(
-            self.stat.calc_staterror)
+        self._update_context()
 
         # QUS: shouldn't this be teardown, not startup?
         self.model.startup(cache)
@@ -1198,6 +1339,10 @@ class Fit(NoNewAttributesAfterInit):
            Determines if the output file can be overwritten.
         numcores : int or None, optional
            The number of cores to use in fitting simultaneous data.
+           When there are multiple data sets, the models for each
+           data set are evaluated in parallel by a set of worker
+           processes that persist between fits. If `None` then all
+           the available cores are used.
 
         Returns
         -------
@@ -1241,11 +1386,15 @@ class Fit(NoNewAttributesAfterInit):
 
         init_stat = self.calc_stat()
         # output = self.method.fit ...
-        tmp = self._iterfit._get_callback(outfile, clobber)
-        output = self._iterfit.fit(tmp,
-                                   self.model.thawedpars,
-                                   self.model.thawedparmins,
-                                   self.model.thawedparmaxes)
+        tmp = self._iterfit._get_callback(outfile, clobber, numcores)
+        try:
+            output = self._iterfit.fit(tmp,
+                                       self.model.thawedpars,
+                                       self.model.thawedparmins,
+                                       self.model.thawedparmaxes)
+        finally:
+            self._iterfit._close_context()
+
         # LevMar always calculate chisquare, so call calc_stat
         # just in case statistics is something other then chisquare
         self.model.thawedpars = output[1]
@@ -1282,7 +1431,7 @@ class Fit(NoNewAttributesAfterInit):
         return FitResults(self, output, init_stat, param_warnings.strip("\n"))
 
     @evaluates_model
-    def simulfit(self, *others):
+    def simulfit(self, *others, numcores=1):
         """Fit multiple data sets and models simultaneously.
 
         The current fit object is combined with the other fit
@@ -1294,6 +1443,9 @@ class Fit(NoNewAttributesAfterInit):
         *others : sherpa.fit.Fit instances
             The ``data`` and ``model`` attributes of these arguments
             are used, along with those from the object.
+        numcores : int or None, optional
+            The number of cores to use when evaluating the models
+            of the data sets (see `fit`).
 
         Returns
         -------
@@ -1305,17 +1457,17 @@ class Fit(NoNewAttributesAfterInit):
 
         """
         if len(others) == 0:
-            return self.fit()
+            return self.fit(numcores=numcores)
 
         fits = (self,) + others
         d = DataSimulFit('simulfit data', tuple(f.data for f in fits))
         m = SimulFitModel('simulfit model', tuple(f.model for f in fits))
 
         f = Fit(d, m, self.stat, self.method)
-        return f.fit()
+        return f.fit(numcores=numcores)
 
     @evaluates_model
-    def est_errors(self, methoddict=None, parlist=None):
+    def est_errors(self, methoddict=None, parlist=None, callback=None):
         """Estimate errors.
 
         Calculate the low and high errors for one or more of the
@@ -1332,6 +1484,11 @@ class Fit(NoNewAttributesAfterInit):
             The names of the parameters for which the errors should
             be calculated. If set to `None` then all the thawed
             parameters are used.
+        callback : callable or `None`, optional
+            If set, it is called with the parameter and the lower and
+            upper bounds calculated for it, as each parameter is
+            completed, so the results can be displayed before all the
+            parameters have been processed.
 
         Returns
         -------
@@ -1364,6 +1521,15 @@ class Fit(NoNewAttributesAfterInit):
         likelihood-based statistics) or :py:class:`~sherpa.optmethods.LevMar`
         (for chi-square based statistics) whilst calculating the
         errors.
+
+        The callback is called in the order the parameters are
+        completed, which need not match parlist when the errors are
+        calculated in parallel. It is called with the values
+        calculated by the method, before the hard limits are checked,
+        and the :py:class:`~sherpa.estmethods.Covariance` method only
+        calls it once all the parameters have been processed. If a new
+        minimum is found then the callback is called again for each
+        parameter with the new bounds.
         """
 
         # Define functions to freeze and thaw a parameter before
@@ -1398,11 +1564,22 @@ class Fit(NoNewAttributesAfterInit):
 
         # Call from a parameter estimation method, to report
         # that limits for a given parameter have been found
+        reported = set()
+
         def report_progress(i, lower, upper):
             if i < 0:
                 pass
             else:
-                name = self.model.pars[self.thaw_indices[i]].fullname
+                par = self.model.pars[self.thaw_indices[i]]
+                if callback is not None:
+                    reported.add(i)
+                    callback(par, lower, upper)
+
+                # confidence displays the bounds itself
+                if isinstance(self.estmethod, Confidence):
+                    return
+
+                name = par.fullname
                 if isnan(lower) or isinf(lower):
                     info("%s \tlower bound: -----" % name)
                 else:
@@ -1420,6 +1597,12 @@ class Fit(NoNewAttributesAfterInit):
         if type(self.stat) is LeastSq:
             raise EstErr('noerr4least2', type(self.stat).__name__)
 
+        # The J^T J approximation needs the residuals.
+        if (type(self.estmethod) is Covariance and
+                bool_cast(self.estmethod.jacobian) and
+                not isinstance(self.stat, Chi2)):
+            raise FitErr('needchi2', 'Jacobian covariance')
+
         if type(self.stat) is not Cash:
             dep, staterror, syserror = self.data.to_fit(
                 self.stat.calc_staterror)
@@ -1570,7 +1753,7 @@ class Fit(NoNewAttributesAfterInit):
             warning("New best-fit parameters:\n" + results.format())
 
             # Now, recompute errors for new best-fit parameters
-            results = self.est_errors(methoddict, parlist)
+            results = self.est_errors(methoddict, parlist, callback)
             self.model.thawedparmins = startsoftmins
             self.model.thawedparmaxes = startsoftmaxs
             self.method = oldmethod
@@ -1595,6 +1778,14 @@ class Fit(NoNewAttributesAfterInit):
         self.model.thawedpars = startpars
         self.model.thawedparmins = startsoftmins
         self.model.thawedparmaxes = startsoftmaxs
+
+        # Report any parameters the method did not report itself
+        if callback is not None:
+            for parnum, lower, upper in zip(parnums, output[0], output[1]):
+                if parnum not in reported:
+                    callback(self.model.pars[self.thaw_indices[parnum]],
+                             lower, upper)
+
         results = ErrorEstResults(self, output, parlist)
         self.method = oldmethod
         if hasattr(self.estmethod, "remin"):
@@ -40,7 +40,129 @@ string_types = (str, )
 
 
 __all__ = ('Kernel', 'PSFKernel', 'RadialProfileKernel', 'PSFModel',
-           'ConvolutionModel', 'PSFSpace2D')
+           'ConvolutionModel', 'PSFSpace2D', 'FFTWorkspace',
+           'get_halo_mask')
+
+
+class FFTWorkspace(NoNewAttributesAfterInit):
+    """Convolve data with a kernel using real-input FFTs.
+
+    The padded data array and the transform of the kernel are kept
+    between calls, so repeated convolutions with the same kernel
+    only need one forward and one inverse transform of the data.
+    The results match the TCD convolution used by `Kernel`: the
+    arrays are zero-padded to the larger of the two shapes (and,
+    for more than one dimension, to a size that is a product of
+    small primes) and convolved with periodic boundary conditions.
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    dshape : sequence of int
+        The dimensions of the data, with the fastest-varying axis
+        first (the same order as `Kernel.dshape`).
+    kshape : sequence of int
+        The dimensions of the kernel, with the fastest-varying axis
+        first.
+    origin : sequence of int
+        The location of the origin of the kernel, with the
+        fastest-varying axis first.
+
+    """
+
+    def __init__(self, dshape, kshape, origin):
+        dshape = numpy.atleast_1d(dshape)
+        kshape = numpy.atleast_1d(kshape)
+        origin = numpy.atleast_1d(origin)
+        if len(dshape) != len(kshape) or len(kshape) != len(origin):
+            raise TypeError("input array sizes do not match, " +
+                            "dshape: {} vs kshape: {} vs origin: {}".format(
+                                len(dshape), len(kshape), len(origin)))
+
+        self.dshape = tuple(int(d) for d in dshape)
+        self.kshape = tuple(int(k) for k in kshape)
+        self.origin = tuple(int(o) for o in origin)
+
+        padded = _padded_shape(self.dshape, self.kshape)
+
+        # The arrays use the NumPy ordering, so the axes are reversed.
+        self.shape = tuple(reversed(padded))
+        self._dslice = tuple(slice(0, n) for n in reversed(self.dshape))
+        self._kslice = tuple(slice(0, n) for n in reversed(self.kshape))
+        self._data = numpy.zeros(self.shape)
+        self._kernel_fft = None
+        NoNewAttributesAfterInit.__init__(self)
+
+    def __repr__(self):
+        return "<%s dshape=%s kshape=%s>" % (type(self).__name__,
+                                             self.dshape, self.kshape)
+
+    @property
+    def has_kernel(self):
+        """Has the kernel transform been calculated?"""
+        return self._kernel_fft is not None
+
+    def clear_kernel(self):
+        """Remove the kernel transform."""
+        self._kernel_fft = None
+
+    def set_kernel(self, kernel):
+        """Calculate the transform of the kernel.
+
+        Parameters
+        ----------
+        kernel : array_like
+            The kernel values, which must match kshape.
+        """
+
+        kernel = numpy.asarray(kernel, dtype=float)
+        if kernel.size != numpy.prod(self.kshape):
+            raise TypeError("input array size do not match dimensions, " +
+                            "kernel size: {} vs kernel dim: {}".format(
+                                kernel.size, numpy.prod(self.kshape)))
+
+        padded = numpy.zeros(self.shape)
+        padded[self._kslice] = kernel.reshape(tuple(reversed(self.kshape)))
+
+        # Move the origin of the kernel to the first pixel.
+        shift = [-(o % k) for o, k in zip(self.origin, self.kshape)]
+        padded = numpy.roll(padded, shift[::-1],
+                            axis=tuple(range(padded.ndim)))
+        self._kernel_fft = numpy.fft.rfftn(padded)
+
+    def convolve(self, data):
+        """Convolve the data with the kernel.
+
+        Parameters
+        ----------
+        data : array_like
+            The data values, which must match dshape.
+
+        Returns
+        -------
+        vals : ndarray
+            The convolved values, as a 1D array. For one-dimensional
+            data this includes the padding.
+        """
+
+        if self._kernel_fft is None:
+            raise PSFErr('notset')
+
+        data = numpy.asarray(data)
+        if data.size != numpy.prod(self.dshape):
+            raise TypeError("input array size do not match dimensions, " +
+                            "source size: {} vs source dim: {}".format(
+                                data.size, numpy.prod(self.dshape)))
+
+        # The padding is never written to, so it remains zero.
+        self._data[self._dslice] = data.reshape(tuple(reversed(self.dshape)))
+        vals = numpy.fft.irfftn(numpy.fft.rfftn(self._data) *
+                                self._kernel_fft, s=self.shape)
+        if vals.ndim > 1:
+            vals = vals[self._dslice]
+
+        return vals.ravel()
 
 
 class ConvolutionModel(CompositeModel, ArithmeticModel):
@@ -74,9 +196,111 @@ class ConvolutionModel(CompositeModel, ArithmeticModel):
                              self.lhs.calc, self.rhs.calc, *args, **kwargs)
 
 
+def _padded_shape(dshape, kshape):
+    """The padded size used for the convolution (fastest axis first)."""
+
+    padded = [max(d, k) for d, k in zip(dshape, kshape)]
+    if len(padded) > 1:
+        padded = [get_padsize(n) for n in padded]
+
+    return padded
+
+
+def get_halo_mask(mask, dshape, kshape, origin):
+    """Return the pixels needed to convolve the selected pixels.
+
+    The convolution of the data at the selected pixels only depends
+    on the data within the kernel footprint of these pixels. The
+    convolution uses periodic boundary conditions on the padded
+    grid, so the footprint wraps around the edges in the same way.
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    mask : array_like of bool
+        The selected pixels, as a flattened array.
+    dshape : sequence of int
+        The dimensions of the data, with the fastest-varying axis
+        first.
+    kshape : sequence of int
+        The dimensions of the kernel, with the fastest-varying axis
+        first.
+    origin : sequence of int
+        The location of the origin of the kernel, with the
+        fastest-varying axis first.
+
+    Returns
+    -------
+    halo : ndarray of bool
+        The pixels which are needed, as a flattened array. This
+        includes the pixels selected by mask.
+
+    """
+
+    dshape = [int(d) for d in numpy.atleast_1d(dshape)]
+    kshape = [int(k) for k in numpy.atleast_1d(kshape)]
+    origin = [int(o) for o in numpy.atleast_1d(origin)]
+
+    padded = _padded_shape(dshape, kshape)
+    dslice = tuple(slice(0, n) for n in reversed(dshape))
+
+    halo = numpy.zeros(tuple(reversed(padded)), dtype=numpy.int32)
+    halo[dslice] = numpy.reshape(mask, tuple(reversed(dshape)))
+
+    # A pixel q is needed if a selected pixel lies within
+    # [q - origin, q + kshape - 1 - origin] along each axis; this is
+    # calculated with a cumulative sum over a periodic extension.
+    #
+    for axis, k, o in zip(range(halo.ndim), reversed(kshape),
+                          reversed(origin)):
+        o = o % k
+        n = halo.shape[axis]
+        idx = numpy.arange(-o, n + k - 1 - o) % n
+        csum = numpy.cumsum(numpy.take(halo, idx, axis=axis), axis=axis)
+        zero = numpy.zeros_like(numpy.take(csum, [0], axis=axis))
+        csum = numpy.concatenate((zero, csum), axis=axis)
+        upper = numpy.take(csum, numpy.arange(k, n + k), axis=axis)
+        lower = numpy.take(csum, numpy.arange(n), axis=axis)
+        halo = ((upper - lower) > 0).astype(numpy.int32)
+
+    return halo[dslice].astype(bool).ravel()
+
+
+def _needs_full_grid(model):
+    """Can the model only be evaluated on the full grid of the data?"""
+
+    if model is None:
+        return False
+
+    parts = [model]
+    if isinstance(model, CompositeModel):
+        parts.extend(model._get_parts())
+
+    return any(getattr(part, '_needs_full_grid', False) for part in parts)
+
+
 class Kernel(NoNewAttributesAfterInit):
     "Base class for convolution kernels"
 
+    use_rfft = True
+    """Should `PSFKernel` use real-input FFTs (`FFTWorkspace`)?
+
+    When False the TCD library is used, which uses complex FFTs.
+    """
+
+    use_halo = True
+    """Should `PSFKernel` only evaluate the model where it is needed?
+
+    When a 2D dataset has been filtered, the model is only evaluated
+    at the noticed pixels and the pixels within the kernel footprint
+    of them (see `get_halo_mask`); the remaining pixels are set to 0.
+    Models which can only be evaluated on the full grid, such as a
+    TableModel with no independent axis, set the ``_needs_full_grid``
+    attribute, and the full grid is used for any expression which
+    contains them.
+    """
+
     def __init__(self, dshape, kshape, norm=False, frozen=True,
                  center=None, args=[], kwargs={},
                  do_pad=False, pad_mask=None, origin=None):
@@ -99,15 +323,21 @@ class Kernel(NoNewAttributesAfterInit):
         self.pad_mask = pad_mask
         self.frac = None
         self._tcd = tcdData()
+        self._fft = None
+        self._halo = None
         NoNewAttributesAfterInit.__init__(self)
 
     def __setstate__(self, state):
         state['_tcd'] = tcdData()
+        state['_fft'] = None
+        state['_halo'] = None
         self.__dict__.update(state)
 
     def __getstate__(self):
         state = self.__dict__.copy()
         state.pop('_tcd')
+        state.pop('_fft', None)
+        state.pop('_halo', None)
         return state
 
     def __repr__(self):
@@ -135,7 +365,7 @@ class Kernel(NoNewAttributesAfterInit):
 
     def init_kernel(self, kernel):
         if not self.frozen:
-            self._tcd.clear_kernel_fft()
+            self.clear_kernel_fft()
 
         renorm_shape = []
         for axis in self.dshape:
@@ -169,9 +399,38 @@ class Kernel(NoNewAttributesAfterInit):
             vals = vals[self.pad_mask]
         return vals
 
+    def clear_kernel_fft(self):
+        """Remove the stored transform of the kernel."""
+        self._tcd.clear_kernel_fft()
+        if self._fft is not None:
+            self._fft.clear_kernel()
+
     def convolve(self, data, dshape, kernel, kshape):
         return self._tcd.convolve(data, kernel, dshape, kshape, self.origin)
 
+    def _rfft_convolve(self, data, dshape, kernel, kshape, origin):
+        """Convolve using the FFTWorkspace for these shapes.
+
+        The workspace is re-created when the shapes or origin
+        change, and the kernel transform is re-used until
+        clear_kernel_fft is called.
+        """
+
+        def totuple(vals):
+            return tuple(int(v) for v in numpy.atleast_1d(vals))
+
+        fft = self._fft
+        if fft is None or fft.dshape != totuple(dshape) or \
+           fft.kshape != totuple(kshape) or \
+           fft.origin != totuple(origin):
+            fft = FFTWorkspace(dshape, kshape, origin)
+            self._fft = fft
+
+        if not fft.has_kernel:
+            fft.set_kernel(kernel)
+
+        return fft.convolve(data)
+
     def calc(self, pl, pr, lhs, rhs, *args, **kwargs):
         if self.do_pad and len(args[0]) == numpy.prod(self.dshape):
             self.do_pad = False
@@ -316,13 +575,119 @@ class PSFKernel(Kernel):
         if self.is_model and not self.frozen:
             # if the kernel model has thawed parameters, clear the old FFT and
             # recompute the kernel FFT at each model evaluation
-            self._tcd.clear_kernel_fft()
+            self.clear_kernel_fft()
 
         return (kernel, kshape)
 
     def init_data(self, data):
         return (data, self.dshape)
 
+    def convolve(self, data, dshape, kernel, kshape):
+        if not self.use_rfft:
+            return Kernel.convolve(self, data, dshape, kernel, kshape)
+
+        return self._rfft_convolve(data, dshape, kernel, kshape, self.origin)
+
+    def _get_halo(self):
+        """Where to evaluate the model and calculate the convolution.
+
+        Returns
+        -------
+        plan : tuple or None
+            None if the model is to be evaluated at all pixels,
+            otherwise (halo, box), where halo is the pixel mask from
+            get_halo_mask and box is None or the slices (in NumPy
+            order) of the region to convolve.
+        """
+
+        if not (self.use_halo and self.do_pad) or len(self.dshape) != 2:
+            return None
+
+        npix = numpy.prod(self.dshape)
+        mask = numpy.asarray(self.pad_mask)
+        if mask.size != npix or \
+           any(numpy.size(arg) != npix for arg in self.args):
+            return None
+
+        key = (tuple(numpy.atleast_1d(self.skshape)),
+               tuple(numpy.atleast_1d(self.origin)))
+        if self._halo is None or self._halo[0] != key:
+            self._halo = (key, self._make_plan(mask))
+
+        return self._halo[1]
+
+    def _make_plan(self, mask):
+        """Create the evaluation plan for _get_halo."""
+
+        halo = get_halo_mask(mask, self.dshape, self.skshape, self.origin)
+        if halo.all():
+            return None
+
+        # If the kernel footprint of the selected pixels does not
+        # wrap around the edges of the data then only the bounding
+        # box of the footprint needs to be convolved.
+        #
+        box = []
+        image = mask.reshape(tuple(reversed(self.dshape)))
+        kshape = reversed(numpy.atleast_1d(self.skshape))
+        origin = reversed(numpy.atleast_1d(self.origin))
+        for axis, k, o in zip(range(image.ndim), kshape, origin):
+            k = int(k)
+            o = int(o) % k
+            other = tuple(ax for ax in range(image.ndim) if ax != axis)
+            idx = numpy.flatnonzero(image.any(axis=other))
+            start = idx[0] - (k - 1 - o)
+            end = idx[-1] + o + 1
+            if start < 0 or end > image.shape[axis]:
+                box = None
+                break
+
+            box.append(slice(start, end))
+
+        if box is not None:
+            box = tuple(box)
+
+        return halo, box
+
+    def calc(self, pl, pr, lhs, rhs, *args, **kwargs):
+        if self.do_pad and len(args[0]) == numpy.prod(self.dshape):
+            self.do_pad = False
+
+        if self.kernel is None or not self.frozen:
+            kernel = lhs(pl, *self.args, **self.kwargs)
+            (self.kernel, self.skshape) = self.init_kernel(kernel)
+
+        # rhs is the calc method of the model being convolved.
+        plan = self._get_halo()
+        if plan is not None and \
+           _needs_full_grid(getattr(rhs, '__self__', None)):
+            plan = None
+
+        if plan is None:
+            data = rhs(pr, *self.args, **self.kwargs)
+            (data, dshape) = self.init_data(data)
+            vals = self.convolve(data, dshape, self.kernel, self.skshape)
+            return self.deinit(vals)
+
+        halo, box = plan
+        data = numpy.zeros(halo.size)
+        data[halo] = rhs(pr, *[arg[halo] for arg in self.args],
+                         **self.kwargs)
+        (data, dshape) = self.init_data(data)
+
+        # The TCD code caches the kernel transform for a single
+        # data shape, so the box is only used with FFTWorkspace.
+        if box is None or not self.use_rfft:
+            vals = self.convolve(data, dshape, self.kernel, self.skshape)
+            return self.deinit(vals)
+
+        image = data.reshape(tuple(reversed(dshape)))[box]
+        vals = numpy.zeros(tuple(reversed(dshape)))
+        vals[box] = self._rfft_convolve(image.ravel(), image.shape[::-1],
+                                        self.kernel, self.skshape,
+                                        self.origin).reshape(image.shape)
+        return self.deinit(vals.ravel())
+
 
 class RadialProfileKernel(PSFKernel):
     "class for 1D radial profile PSF convolution kernels"
@@ -360,6 +725,9 @@ class RadialProfileKernel(PSFKernel):
         if self.radialsize is not None:
             origin = self.origin + (numpy.asarray(dshape) -
                                     numpy.asarray(self.radialsize))
+        if self.use_rfft:
+            return self._rfft_convolve(data, dshape, kernel, kshape, origin)
+
         return self._tcd.convolve(data, kernel, dshape, kshape, origin)
 
     def calc(self, pl, pr, lhs, rhs, *args, **kwargs):
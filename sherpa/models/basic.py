@@ -23,7 +23,7 @@ import logging
 import numpy
 
 from sherpa.utils.err import ModelErr
-from sherpa.utils import bool_cast, get_position, guess_amplitude, \
+from sherpa.utils import bool_cast, erf, get_position, guess_amplitude, \
     guess_amplitude_at_ref, \
     guess_amplitude2d, guess_bounds, guess_fwhm, guess_position, \
     guess_reference, interpolate, linear_interp, param_apply_limits, \
@@ -31,7 +31,9 @@ from sherpa.utils import bool_cast, get_position, guess_amplitude, \
 
 from .parameter import Parameter, tinyval
 from .model import ArithmeticModel, modelCacher1d, CompositeModel, \
-    ArithmeticFunctionModel, RegriddableModel2D, RegriddableModel1D
+    ArithmeticFunctionModel, RegriddableModel2D, RegriddableModel1D, \
+    batch_failed, batch_grid1d, batch_grid2d, batch_parameters, \
+    batch_radius2
 from . import _modelfcts
 
 warning = logging.getLogger(__name__).warning
@@ -47,6 +49,33 @@ __all__ = ('Box1D', 'Const1D', 'Cos', 'Delta1D', 'Erf', 'Erfc', 'Exp', 'Exp10',
 
 DBL_EPSILON = numpy.finfo(float).eps
 
+# The constants used by the gaussian models: 4 log(2) and its square root.
+_GFACTOR = 4 * numpy.log(2)
+_SQRT_GFACTOR = numpy.sqrt(_GFACTOR)
+
+
+def _erf(x):
+    """The error function for a multi-dimensional array."""
+    x = numpy.asarray(x)
+    return erf(x.ravel()).reshape(x.shape)
+
+
+def _exp_batch(offset, coeff, ampl, xlo, xhi, scale):
+    """Evaluate the Exp and Exp10 models for calc_batch.
+
+    The scale argument is 1 for Exp and log(10) for Exp10.
+    """
+
+    if xhi is None:
+        return ampl * numpy.exp(scale * coeff * (xlo - offset))
+
+    y1 = scale * coeff * (xlo - offset)
+    y2 = scale * coeff * (xhi - offset)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        out = ampl / coeff / scale * (numpy.exp(y2) - numpy.exp(y1))
+
+    return numpy.where(coeff != 0, out, ampl * (xhi - xlo))
+
 
 class Box1D(RegriddableModel1D):
     """One-dimensional box function.
@@ -105,6 +134,18 @@ class Box1D(RegriddableModel1D):
         return _modelfcts.box1d(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        xmin, xmax, ampl = batch_parameters(self, p)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is None:
+            return numpy.where((xlo < xmin) | (xlo > xmax), 0.0,
+                               ampl * numpy.ones_like(xlo))
+
+        width = numpy.minimum(xhi, xmax) - numpy.maximum(xlo, xmin)
+        return numpy.where((xmax <= xlo) | (xmin >= xhi), 0.0,
+                           ampl * width)
+
+
 class Const(ArithmeticModel):
     def __init__(self, name='const'):
         self.c0 = Parameter(name, 'c0', 1)
@@ -160,6 +201,15 @@ class Const1D(RegriddableModel1D, Const):
         return _modelfcts.const1d(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        c0, = batch_parameters(self, p)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is None:
+            return c0 * numpy.ones_like(xlo)
+
+        return c0 * (xhi - xlo)
+
+
 class Cos(RegriddableModel1D):
     """One-dimensional cosine function.
 
@@ -203,6 +253,19 @@ class Cos(RegriddableModel1D):
         return _modelfcts.cos(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        period, offset, ampl = batch_parameters(self, p)
+        batch_failed(period == 0)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is None:
+            return ampl * numpy.cos(2 * numpy.pi * (xlo - offset) / period)
+
+        tmp1 = 2 * numpy.pi * (xlo - offset) / period
+        tmp2 = 2 * numpy.pi * (xhi - offset) / period
+        return ampl * period * (numpy.sin(tmp2) - numpy.sin(tmp1)) / \
+            (2 * numpy.pi)
+
+
 class Delta1D(RegriddableModel1D):
     """One-dimensional delta function.
 
@@ -404,6 +467,12 @@ class Exp(RegriddableModel1D):
         return _modelfcts.exp(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        offset, coeff, ampl = batch_parameters(self, p)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        return _exp_batch(offset, coeff, ampl, xlo, xhi, 1.0)
+
+
 class Exp10(RegriddableModel1D):
     """One-dimensional exponential function, base 10.
 
@@ -443,6 +512,12 @@ class Exp10(RegriddableModel1D):
         return _modelfcts.exp10(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        offset, coeff, ampl = batch_parameters(self, p)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        return _exp_batch(offset, coeff, ampl, xlo, xhi, numpy.log(10))
+
+
 class Gauss1D(RegriddableModel1D):
     """One-dimensional gaussian function.
 
@@ -530,6 +605,19 @@ class Gauss1D(RegriddableModel1D):
         return _modelfcts.gauss1d(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        fwhm, pos, ampl = batch_parameters(self, p)
+        batch_failed(fwhm == 0)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is None:
+            return ampl * numpy.exp(-_GFACTOR * (xlo - pos)**2 / fwhm**2)
+
+        z1 = _SQRT_GFACTOR * (xlo - pos) / fwhm
+        z2 = _SQRT_GFACTOR * (xhi - pos) / fwhm
+        return ampl * fwhm * numpy.sqrt(numpy.pi) * \
+            (_erf(z2) - _erf(z1)) / (2 * _SQRT_GFACTOR)
+
+
 class Log(RegriddableModel1D):
     """One-dimensional natural logarithm function.
 
@@ -658,6 +746,20 @@ class LogParabola(RegriddableModel1D):
         return _modelfcts.logparabola(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is not None:
+            # The integrated form is calculated numerically.
+            return RegriddableModel1D.calc_batch(self, p, xlo[0], xhi[0],
+                                                 **kwargs)
+
+        ref, c1, c2, ampl = batch_parameters(self, p)
+        batch_failed(ref == 0)
+        frac = xlo / ref
+        batch_failed(frac <= 0)
+        return ampl * numpy.power(frac, -c1 - c2 * numpy.log10(frac))
+
+
 _gfactor = numpy.sqrt(numpy.pi / (4 * numpy.log(2)))
 
 
@@ -724,6 +826,20 @@ class NormGauss1D(RegriddableModel1D):
         return _modelfcts.ngauss1d(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        fwhm, pos, ampl = batch_parameters(self, p)
+        batch_failed(fwhm == 0)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is None:
+            norm = numpy.sqrt(numpy.pi / _GFACTOR) * fwhm
+            return (ampl / norm) * \
+                numpy.exp(-_GFACTOR * (xlo - pos)**2 / fwhm**2)
+
+        z1 = _SQRT_GFACTOR * (xlo - pos) / fwhm
+        z2 = _SQRT_GFACTOR * (xhi - pos) / fwhm
+        return ampl * (_erf(z2) - _erf(z1)) / 2
+
+
 class Poisson(RegriddableModel1D):
     """One-dimensional Poisson function.
 
@@ -889,6 +1005,27 @@ class Polynom1D(RegriddableModel1D):
         return _modelfcts.poly1d(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        pars = batch_parameters(self, p)
+        coeffs, offset = pars[:9], pars[9]
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is None:
+            xtemp = xlo - offset
+            out = coeffs[8]
+            for coeff in coeffs[7::-1]:
+                out = out * xtemp + coeff
+
+            return out * numpy.ones_like(xlo)
+
+        xtemp1 = xlo - offset
+        xtemp2 = xhi - offset
+        out = 0.0
+        for i, coeff in enumerate(coeffs, 1):
+            out = out + coeff * (xtemp2**i - xtemp1**i) / i
+
+        return out
+
+
 class PowLaw1D(RegriddableModel1D):
     """One-dimensional power-law function.
 
@@ -947,6 +1084,30 @@ class PowLaw1D(RegriddableModel1D):
         return _modelfcts.powlaw(pars, *args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        gamma, ref, ampl = batch_parameters(self, p)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        batch_failed(xlo < 0)
+        if xhi is None:
+            with numpy.errstate(divide='ignore'):
+                return ampl * numpy.power(xlo / ref, -gamma)
+
+        # As with calc, treat gamma values close to 1 as 1.
+        unit = numpy.abs(gamma - 1.0) <= 1e-10 * numpy.abs(gamma)
+        gamma = numpy.where(unit, 1.0, gamma)
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            # Use the same minimum value as the compiled code.
+            xmin = numpy.where(xlo > 0, xlo, 1e-120)
+            logval = ampl * ref * (numpy.log(xhi) - numpy.log(xmin))
+
+            p1 = numpy.power(xlo, 1.0 - gamma) / (1.0 - gamma)
+            p2 = numpy.power(xhi, 1.0 - gamma) / (1.0 - gamma)
+            powval = ampl / numpy.power(ref, -gamma) * (p2 - p1)
+
+        return numpy.where(unit, logval, powval)
+
+
 class Scale1D(Const1D):
     """A constant model for one-dimensional data.
 
@@ -1024,6 +1185,19 @@ class Sin(RegriddableModel1D):
         return _modelfcts.sin(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        period, offset, ampl = batch_parameters(self, p)
+        batch_failed(period == 0)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is None:
+            return ampl * numpy.sin(2 * numpy.pi * (xlo - offset) / period)
+
+        tmp1 = 2 * numpy.pi * (xlo - offset) / period
+        tmp2 = 2 * numpy.pi * (xhi - offset) / period
+        return -ampl * period * (numpy.cos(tmp2) - numpy.cos(tmp1)) / \
+            (2 * numpy.pi)
+
+
 class Sqrt(RegriddableModel1D):
     """One-dimensional square root function.
 
@@ -1108,6 +1282,16 @@ class StepHi1D(RegriddableModel1D):
         return _modelfcts.stephi1d(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        xcut, ampl = batch_parameters(self, p)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is None:
+            return numpy.where(xlo >= xcut, ampl, 0.0)
+
+        return numpy.select([(xlo <= xcut) & (xhi >= xcut), xlo > xcut],
+                            [(xhi - xcut) * ampl, (xhi - xlo) * ampl])
+
+
 class StepLo1D(RegriddableModel1D):
     """One-dimensional step function.
 
@@ -1157,6 +1341,16 @@ class StepLo1D(RegriddableModel1D):
         return _modelfcts.steplo1d(*args, **kwargs)
 
 
+    def calc_batch(self, p, xlo, xhi=None, **kwargs):
+        xcut, ampl = batch_parameters(self, p)
+        xlo, xhi = batch_grid1d(self, xlo, xhi)
+        if xhi is None:
+            return numpy.where(xlo <= xcut, ampl, 0.0)
+
+        return numpy.select([(xlo <= xcut) & (xhi >= xcut), xhi < xcut],
+                            [(xcut - xlo) * ampl, (xhi - xlo) * ampl])
+
+
 class Tan(RegriddableModel1D):
     """One-dimensional tan function.
 
@@ -1269,6 +1463,17 @@ class Box2D(RegriddableModel2D):
         return _modelfcts.box2d(*args, **kwargs)
 
 
+    def calc_batch(self, p, *args, **kwargs):
+        grid = batch_grid2d(self, *args)
+        if grid is None:
+            return RegriddableModel2D.calc_batch(self, p, *args, **kwargs)
+
+        x0, x1 = grid
+        xlow, xhi, ylow, yhi, ampl = batch_parameters(self, p)
+        outside = (xhi <= x0) | (xlow >= x0) | (yhi <= x1) | (ylow >= x1)
+        return numpy.where(outside, 0.0, ampl * numpy.ones_like(x0))
+
+
 class Const2D(RegriddableModel2D, Const):
     """A constant model for two-dimensional data.
 
@@ -1303,6 +1508,15 @@ class Const2D(RegriddableModel2D, Const):
         return _modelfcts.const2d(*args, **kwargs)
 
 
+    def calc_batch(self, p, *args, **kwargs):
+        grid = batch_grid2d(self, *args)
+        if grid is None:
+            return RegriddableModel2D.calc_batch(self, p, *args, **kwargs)
+
+        c0, = batch_parameters(self, p)
+        return c0 * numpy.ones_like(grid[0])
+
+
 class Scale2D(Const2D):
     """A constant model for two-dimensional data.
 
@@ -1491,6 +1705,17 @@ class Gauss2D(RegriddableModel2D):
         return _modelfcts.gauss2d(*args, **kwargs)
 
 
+    def calc_batch(self, p, *args, **kwargs):
+        grid = batch_grid2d(self, *args)
+        if grid is None:
+            return RegriddableModel2D.calc_batch(self, p, *args, **kwargs)
+
+        fwhm, xpos, ypos, ellip, theta, ampl = batch_parameters(self, p)
+        r2 = batch_radius2(xpos, ypos, ellip, theta, *grid)
+        batch_failed(fwhm == 0)
+        return ampl * numpy.exp(-r2 / fwhm**2 * _GFACTOR)
+
+
 class SigmaGauss2D(Gauss2D):
     """Two-dimensional gaussian function (varying sigma).
 
@@ -1572,6 +1797,24 @@ class SigmaGauss2D(Gauss2D):
         return _modelfcts.sigmagauss2d(*args, **kwargs)
 
 
+    def calc_batch(self, p, *args, **kwargs):
+        grid = batch_grid2d(self, *args)
+        if grid is None:
+            return RegriddableModel2D.calc_batch(self, p, *args, **kwargs)
+
+        sigma_a, sigma_b, xpos, ypos, theta, ampl = \
+            batch_parameters(self, p)
+        batch_failed((sigma_a == 0) | (sigma_b == 0))
+        x0, x1 = grid
+        dx = x0 - xpos
+        dy = x1 - ypos
+        cost = numpy.cos(theta)
+        sint = numpy.sin(theta)
+        a = (dx * cost + dy * sint) / sigma_a
+        b = (dy * cost - dx * sint) / sigma_b
+        return ampl * numpy.exp(-(a * a + b * b) / 2)
+
+
 class NormGauss2D(RegriddableModel2D):
     """Two-dimensional normalised gaussian function.
 
@@ -1672,6 +1915,19 @@ class NormGauss2D(RegriddableModel2D):
         return _modelfcts.ngauss2d(*args, **kwargs)
 
 
+    def calc_batch(self, p, *args, **kwargs):
+        grid = batch_grid2d(self, *args)
+        if grid is None:
+            return RegriddableModel2D.calc_batch(self, p, *args, **kwargs)
+
+        fwhm, xpos, ypos, ellip, theta, ampl = batch_parameters(self, p)
+        r2 = batch_radius2(xpos, ypos, ellip, theta, *grid)
+        batch_failed(fwhm == 0)
+        norm = (numpy.pi / _GFACTOR) * fwhm * fwhm * \
+            numpy.sqrt(1.0 - ellip * ellip)
+        return (ampl / norm) * numpy.exp(-r2 / fwhm**2 * _GFACTOR)
+
+
 class Polynom2D(RegriddableModel2D):
     """Two-dimensional polynomial function.
 
@@ -1782,6 +2038,21 @@ class Polynom2D(RegriddableModel2D):
         return _modelfcts.poly2d(*args, **kwargs)
 
 
+    def calc_batch(self, p, *args, **kwargs):
+        grid = batch_grid2d(self, *args)
+        if grid is None:
+            return RegriddableModel2D.calc_batch(self, p, *args, **kwargs)
+
+        x0, x1 = grid
+        coeffs = batch_parameters(self, p)
+        out = 0.0
+        for ix in range(3):
+            for iy in range(3):
+                out = out + coeffs[3 * ix + iy] * x0**ix * x1**iy
+
+        return out * numpy.ones_like(x0)
+
+
 class TableModel(ArithmeticModel):
     """Tabulated values in this model are simply linearly scaled.
 
@@ -1877,6 +2148,13 @@ class TableModel(ArithmeticModel):
     def get_y(self):
         return self.__y
 
+    @property
+    def _needs_full_grid(self):
+        # Without an independent axis there is a value for each
+        # element of the data, so the model can not be evaluated
+        # on a subset of the grid (see sherpa.instrument.PSFKernel).
+        return self.__x is None
+
     def fold(self, data):
         mask = data.mask
         if self.__x is None and numpy.iterable(mask):
@@ -293,7 +293,28 @@ methods of a sherpa.fit.Fit object.
 
 The cache_clear and cache_status methods of ArithmeticModel and
 CompositeModel allow you to clear the cache and display to the
-standard output the cache status of each model component.
+standard output the cache status of each model component, and the
+cache_stats method returns the same information as a dictionary.
+
+Each model keeps up to `cache` evaluations, discarding the least
+recently used value when it is full. There is also a limit on the
+total memory used by the caches of all the models, which is set by
+the cache_memory setting in the models section of the Sherpa
+configuration file and can be changed with set_cache_budget. The
+evaluation grid is identified by a hash of its values. During a fit
+- that is, between the startup and teardown calls - the grid arrays
+are assumed not to change, so the hash is only calculated once for
+each array.
+
+The compositeCacher decorator applies the same idea to composite
+models, such as the combination of two models, during a fit. The
+cached value is identified by the parameter values of the components
+and the grid, so that when only one component changes - e.g. when the
+optimiser calculates a numerical derivative - the unchanged parts of
+the expression are not re-calculated. The terms of an expression
+which use modelCacher1d are not cached again. Expressions containing
+an instrument response are not cached, since the response can change
+during a fit.
 
 Example
 =======
@@ -318,14 +339,19 @@ sherpa.models.basic.Scale1D and sherpa.models.basic.Scale2D)::
 """
 
 
+from collections import OrderedDict
+from configparser import ConfigParser
 import functools
 import logging
 import warnings
+import weakref
 
 import numpy
 
+from sherpa import get_config
+
 from sherpa.models.regrid import EvaluationSpace1D, ModelDomainRegridder1D, EvaluationSpace2D, ModelDomainRegridder2D
-from sherpa.utils import SherpaFloat, NoNewAttributesAfterInit
+from sherpa.utils import SherpaFloat, NoNewAttributesAfterInit, bool_cast
 from sherpa.utils.err import ModelErr
 from sherpa.utils import formatting
 
@@ -345,10 +371,327 @@ except ImportError:
 info = logging.getLogger(__name__).info
 warning = logging.getLogger(__name__).warning
 
+config = ConfigParser()
+config.read(get_config())
+
+
+def _read_cache_memory():
+    """The cache_memory setting, in bytes, or None for no limit."""
+
+    value = config.get('models', 'cache_memory', fallback='256')
+    if value.strip().upper() == 'NONE':
+        return None
+
+    return int(float(value) * 1024 * 1024)
+
+
+class CacheBudget():
+    """Limit the memory used by the model caches.
+
+    The entries of all the model caches are tracked in least-recently
+    used order, so that the oldest entries - whichever model they
+    belong to - are removed when the total size exceeds the limit.
+
+    Parameters
+    ----------
+    maxbytes : int or None, optional
+        The maximum number of bytes to use, or None for no limit.
+
+    """
+
+    def __init__(self, maxbytes=None):
+        self.maxbytes = maxbytes
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._refs = {}
+
+    def __repr__(self):
+        return '<CacheBudget: {} bytes used of {}>'.format(self.nbytes,
+                                                           self.maxbytes)
+
+    def fits(self, nbytes):
+        """Can an entry of this size be stored?"""
+        return self.maxbytes is None or nbytes <= self.maxbytes
+
+    def add(self, cache, key, nbytes):
+        """Record a new entry and remove old entries if necessary."""
+
+        cid = id(cache)
+        if cid not in self._refs:
+            self._refs[cid] = weakref.ref(cache,
+                                          lambda ref: self._purge(cid, ref))
+
+        self._entries[cid, key] = nbytes
+        self.nbytes += nbytes
+        self.shrink()
+
+    def touch(self, cache, key):
+        """Mark the entry as the most-recently used."""
+        try:
+            self._entries.move_to_end((id(cache), key))
+        except KeyError:
+            pass
+
+    def remove(self, cache, key):
+        """Stop tracking the entry."""
+        nbytes = self._entries.pop((id(cache), key), None)
+        if nbytes is not None:
+            self.nbytes -= nbytes
+
+    def shrink(self):
+        """Remove the oldest entries until the limit is met."""
+
+        while self.maxbytes is not None and self.nbytes > self.maxbytes \
+              and self._entries:
+            cid, key = next(iter(self._entries))
+            ref = self._refs.get(cid)
+            cache = None if ref is None else ref()
+            if cache is None or key not in cache:
+                self.remove_id(cid, key)
+            else:
+                cache.evict(key)
+
+    def remove_id(self, cid, key):
+        nbytes = self._entries.pop((cid, key), None)
+        if nbytes is not None:
+            self.nbytes -= nbytes
+
+    def _purge(self, cid, ref):
+        """The cache has been deleted."""
+
+        if self._refs.get(cid) is not ref:
+            return
+
+        del self._refs[cid]
+        for key in [k for k in self._entries if k[0] == cid]:
+            self.remove_id(*key)
+
+    def stats(self):
+        """Return the current memory usage.
+
+        Returns
+        -------
+        stats : dict
+            The keys are 'nbytes', the number of bytes used,
+            'maxbytes', the limit (or None), and 'entries', the
+            number of cached evaluations.
+
+        """
+
+        return {'nbytes': self.nbytes, 'maxbytes': self.maxbytes,
+                'entries': len(self._entries)}
+
+
+_cache_budget = CacheBudget(_read_cache_memory())
+
+
+def get_cache_budget():
+    """Return the memory usage of the model caches.
+
+    .. versionadded:: 4.14.0
+
+    Returns
+    -------
+    stats : dict
+        The keys are 'nbytes', the number of bytes used by all
+        the caches, 'maxbytes', the limit (None means no limit),
+        and 'entries', the number of cached evaluations.
+
+    See Also
+    --------
+    set_cache_budget
+
+    """
+
+    return _cache_budget.stats()
+
+
+def set_cache_budget(maxbytes):
+    """Set the maximum memory used by the model caches.
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    maxbytes : int or None
+        The maximum number of bytes used by the caches of all
+        models. If the current usage is larger then the
+        least-recently used entries are removed. None means no
+        limit.
+
+    See Also
+    --------
+    get_cache_budget
+
+    """
+
+    if maxbytes is not None:
+        maxbytes = int(maxbytes)
+        if maxbytes < 0:
+            raise ValueError("maxbytes must be >= 0 or None")
+
+    _cache_budget.maxbytes = maxbytes
+    _cache_budget.shrink()
+
+
+class ModelCache(OrderedDict):
+    """The cached evaluations of a model.
+
+    The values are stored in least-recently used order and there is
+    a limit on the number of entries, as well as on the total memory
+    used by all caches (see `set_cache_budget`).
+
+    Parameters
+    ----------
+    size : int, optional
+        The maximum number of entries.
+
+    Attributes
+    ----------
+    size : int
+        The maximum number of entries.
+    counters : dict
+        The number of 'hits', 'misses', 'evictions', and 'check'
+        (all requests) for the cache.
+    nbytes : int
+        The number of bytes used by the cached values.
+
+    """
+
+    def __init__(self, size=1):
+        OrderedDict.__init__(self)
+        self.size = size
+        self.counters = {'hits': 0, 'misses': 0, 'check': 0, 'evictions': 0}
+        self.nbytes = 0
+
+    def __reduce__(self):
+        # The contents are not copied (so that model instances sent
+        # to other processes do not send the cached values).
+        return (type(self), (self.size, ))
+
+    def lookup(self, key):
+        """Return a copy of the cached values, or None."""
+
+        try:
+            vals = self[key]
+        except KeyError:
+            return None
+
+        self.move_to_end(key)
+        _cache_budget.touch(self, key)
+        self.counters['hits'] += 1
+        return vals.copy()
+
+    def store(self, key, vals):
+        """Add a copy of the values, removing old values if needed."""
+
+        if key in self:
+            self.discard(key)
+
+        vals = numpy.array(vals)
+        if self.size < 1 or not _cache_budget.fits(vals.nbytes):
+            return
+
+        while len(self) >= self.size:
+            self.evict(next(iter(self)))
+
+        self[key] = vals
+        self.nbytes += vals.nbytes
+        _cache_budget.add(self, key, vals.nbytes)
+
+    def discard(self, key):
+        """Remove the entry."""
+
+        vals = self.pop(key)
+        self.nbytes -= vals.nbytes
+        _cache_budget.remove(self, key)
+
+    def evict(self, key):
+        """Remove the entry to make space for other values."""
+
+        self.discard(key)
+        self.counters['evictions'] += 1
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+
+        for key in self:
+            _cache_budget.remove(self, key)
+
+        OrderedDict.clear(self)
+        self.nbytes = 0
+        for key in self.counters:
+            self.counters[key] = 0
+
+    def stats(self):
+        """Return the cache statistics.
+
+        Returns
+        -------
+        stats : dict
+            The 'size', 'entries', 'nbytes', 'hits', 'misses',
+            'evictions', and 'check' values.
+
+        """
+
+        out = {'size': self.size, 'entries': len(self),
+               'nbytes': self.nbytes}
+        out.update(self.counters)
+        return out
+
+
+# The hash of each evaluation grid, identified by the id of the
+# array. It is only used for models that have been told that the
+# grid does not change (i.e. during a fit), and is cleared at the
+# start of each fit.
+#
+_grid_tokens = {}
+
+
+def _remove_grid_token(key, ref):
+    if _grid_tokens.get(key, (None, ))[0] is ref:
+        del _grid_tokens[key]
+
+
+def _grid_token(grid, static=False):
+    """Return a hash of the grid values.
+
+    Parameters
+    ----------
+    grid : array_like
+        The grid.
+    static : bool, optional
+        If set, the hash is stored and re-used for later calls with
+        the same array.
+
+    Returns
+    -------
+    token : bytes
+
+    """
+
+    key = id(grid)
+    if static:
+        try:
+            ref, token = _grid_tokens[key]
+        except KeyError:
+            pass
+        else:
+            if ref() is grid:
+                return token
+
+    token = hashfunc(numpy.asarray(grid).tobytes()).digest()
+    if static and isinstance(grid, numpy.ndarray):
+        ref = weakref.ref(grid, functools.partial(_remove_grid_token, key))
+        _grid_tokens[key] = (ref, token)
+
+    return token
+
 
 __all__ = ('Model', 'CompositeModel', 'SimulFitModel',
            'ArithmeticConstantModel', 'ArithmeticModel', 'RegriddableModel1D', 'RegriddableModel2D',
            'UnaryOpModel', 'BinaryOpModel', 'FilterModel', 'modelCacher1d',
+           'compositeCacher',
            'ArithmeticFunctionModel', 'NestedModel', 'MultigridSumModel')
 
 
@@ -371,6 +714,155 @@ def boolean_to_byte(boolean_value):
     return bmap.get(boolean_value, b'0')
 
 
+def batch_parameters(model, pars):
+    """Check and split up the parameter values sent to calc_batch.
+
+    Parameters
+    ----------
+    model : Model instance
+        The model.
+    pars : array_like
+        The parameter values, with shape (nsamples, npars), where
+        npars is the number of parameters of the model.
+
+    Returns
+    -------
+    cols : list of ndarray
+        The parameter values as column vectors, with shape
+        (nsamples, 1), so that they broadcast against the grid.
+
+    Raises
+    ------
+    sherpa.utils.err.ModelErr
+        The parameter array has the wrong shape.
+
+    """
+
+    pars = numpy.asarray(pars, dtype=SherpaFloat)
+    npars = len(model.pars)
+    if pars.ndim != 2 or pars.shape[1] != npars:
+        raise ModelErr('batchshape', npars, pars.shape)
+
+    return [pars[:, i:i + 1] for i in range(npars)]
+
+
+def batch_grid1d(model, xlo, xhi=None):
+    """Return the 1D grid used by calc_batch.
+
+    Parameters
+    ----------
+    model : Model instance
+        The model, which is used to decide whether the grid is
+        integrated (by the integrate attribute).
+    xlo : array_like
+        The grid (point) or lower edges (integrated).
+    xhi : array_like or None, optional
+        The upper edges of the grid.
+
+    Returns
+    -------
+    xlo, xhi : ndarray, ndarray or None
+        The grid as row vectors, with shape (1, nbins), so that
+        they broadcast against the parameter values. The xhi value
+        is None unless the model is to be integrated across each
+        bin.
+
+    """
+
+    xlo = numpy.asarray(xlo, dtype=SherpaFloat).reshape(1, -1)
+    if xhi is None or not bool_cast(getattr(model, 'integrate', True)):
+        return xlo, None
+
+    xhi = numpy.asarray(xhi, dtype=SherpaFloat).reshape(1, -1)
+    if xhi.size != xlo.size:
+        raise TypeError("1D model evaluation input array sizes do not " +
+                        "match, xlo: {} vs xhi: {}".format(xlo.size,
+                                                          xhi.size))
+
+    return xlo, xhi
+
+
+def batch_grid2d(model, x0lo, x1lo, x0hi=None, x1hi=None):
+    """Return the 2D grid used by calc_batch.
+
+    Parameters
+    ----------
+    model : Model instance
+        The model, which is used to decide whether the grid is
+        integrated (by the integrate attribute).
+    x0lo, x1lo : array_like
+        The grid (point) or lower edges (integrated).
+    x0hi, x1hi : array_like or None, optional
+        The upper edges of the grid.
+
+    Returns
+    -------
+    grid : tuple of ndarray or None
+        The x0 and x1 values as row vectors, with shape (1, nbins),
+        so that they broadcast against the parameter values. It is
+        None when the model is to be integrated across each pixel,
+        as this is not supported.
+
+    """
+
+    if x0hi is not None and x1hi is not None and \
+       bool_cast(getattr(model, 'integrate', True)):
+        return None
+
+    x0 = numpy.asarray(x0lo, dtype=SherpaFloat).reshape(1, -1)
+    x1 = numpy.asarray(x1lo, dtype=SherpaFloat).reshape(1, -1)
+    return x0, x1
+
+
+def batch_radius2(xpos, ypos, ellip, theta, x0, x1):
+    """The squared elliptical radius used by the 2D models.
+
+    The arguments are expected to broadcast against each other, as
+    returned by `batch_parameters` and `batch_grid2d`.
+
+    Raises
+    ------
+    ValueError
+        The ellipticity is 1.
+
+    """
+
+    dx = x0 - xpos
+    dy = x1 - ypos
+    rot = ellip != 0
+    if not numpy.any(rot):
+        return dx * dx + dy * dy
+
+    batch_failed(ellip == 1)
+    cost = numpy.cos(theta)
+    sint = numpy.sin(theta)
+    newx = dx * cost + dy * sint
+    newy = dy * cost - dx * sint
+    ellip2 = (1 - ellip) * (1 - ellip)
+    r2 = (newx * newx * ellip2 + newy * newy) / ellip2
+    return numpy.where(rot, r2, dx * dx + dy * dy)
+
+
+def batch_failed(flags):
+    """Raise an error if any element is set.
+
+    This matches the error raised by the compiled models when they
+    are evaluated with invalid parameter values.
+
+    Parameters
+    ----------
+    flags : array_like of bool
+
+    Raises
+    ------
+    ValueError
+
+    """
+
+    if numpy.any(flags):
+        raise ValueError("model evaluation failed")
+
+
 def modelCacher1d(func):
     """A decorater to cache 1D ArithmeticModel evalutions.
 
@@ -396,13 +888,11 @@ def modelCacher1d(func):
     def cache_model(cls, pars, xlo, *args, **kwargs):
         use_caching = cls._use_caching
         cache = cls._cache
-        cache_ctr = cls._cache_ctr
-        queue = cls._queue
 
         # Counts all accesses, even those that do not use the cache.
-        cache_ctr['check'] += 1
+        cache.counters['check'] += 1
 
-        digest = ''
+        key = None
         if use_caching:
 
             # Up until Sherpa 4.12.2 we used the kwargs to define the
@@ -427,36 +917,109 @@ def modelCacher1d(func):
                 #
                 integrate = kwargs.get('integrate', False)
 
-            data = [numpy.array(pars).tobytes(),
-                    boolean_to_byte(integrate),
-                    numpy.asarray(xlo).tobytes()]
+            # The grid is identified by a hash of its values, which is
+            # re-used when the grid is known not to change.
+            #
+            static = getattr(cls, '_static_grid', False)
+            key = [numpy.array(pars).tobytes(),
+                   boolean_to_byte(integrate),
+                   _grid_token(xlo, static)]
             if args:
-                data.append(numpy.asarray(args[0]).tobytes())
+                key.append(_grid_token(args[0], static))
 
-            token = b''.join(data)
-            digest = hashfunc(token).digest()
-            if digest in cache:
-                cache_ctr['hits'] += 1
-                return cache[digest].copy()
+            key = tuple(key)
+            vals = cache.lookup(key)
+            if vals is not None:
+                return vals
 
         vals = func(cls, pars, xlo, *args, **kwargs)
 
         if use_caching:
-            # remove first item in queue and remove from cache
-            key = queue.pop(0)
-            cache.pop(key, None)
+            cache.store(key, vals)
+            cache.counters['misses'] += 1
 
-            # append newest model values to queue
-            queue.append(digest)
-            cache[digest] = vals.copy()
+        return vals
 
-            cache_ctr['misses'] += 1
+    # Composite models do not need to cache the output of the model.
+    cache_model._model_cacher = True
+    return cache_model
 
-        return vals
+
+def _composite_token(arg):
+    """Identify an argument to a composite model."""
+
+    if arg is None or isinstance(arg, (bool, int, float, str)):
+        return repr(arg).encode()
+
+    return _grid_token(arg, static=True)
+
+
+def compositeCacher(func):
+    """A decorator to cache the evaluations of a composite model.
+
+    Apply to the `calc` method of a `CompositeModel` so that the
+    result is cached during a fit (i.e. after a call to the startup
+    method with the cache argument set, and before teardown is
+    called). The decision is based on the parameter values sent to
+    calc and the evaluation grid, so the output must not depend on
+    anything else that changes during a fit. Models for which this
+    is not true should set the ``_memo_static`` attribute to
+    `False`, which turns off the cache for any expression they are
+    part of.
+
+    .. versionadded:: 4.14.0
+
+    Example
+    -------
+
+    Allow evaluations of `MyConvolution` to be cached::
+
+        class MyConvolution(CompositeModel, ArithmeticModel):
+            ...
+            @compositeCacher
+            def calc(self, p, *args, **kwargs):
+                ...
+
+    """
+
+    @functools.wraps(func)
+    def cache_model(self, p, *args, **kwargs):
+        return _composite_cached(self, b'', functools.partial(func, self),
+                                 p, args, kwargs)
 
     return cache_model
 
 
+def _composite_cached(model, tag, func, p, args, kwargs):
+    """Return func(p, *args, **kwargs) using the cache of model.
+
+    The tag is used to distinguish the values stored in the cache:
+    the empty string is used for the output of the model and other
+    values for its terms (see BinaryOpModel).
+    """
+
+    cache = model._memo
+    if not model._memo_active or cache is None:
+        return func(p, *args, **kwargs)
+
+    cache.counters['check'] += 1
+
+    key = [tag, numpy.asarray(p, dtype=SherpaFloat).tobytes()]
+    key.extend(_composite_token(arg) for arg in args)
+    for name in sorted(kwargs):
+        key.append((name, _composite_token(kwargs[name])))
+
+    key = tuple(key)
+    vals = cache.lookup(key)
+    if vals is not None:
+        return vals
+
+    vals = func(p, *args, **kwargs)
+    cache.store(key, vals)
+    cache.counters['misses'] += 1
+    return vals
+
+
 class Model(NoNewAttributesAfterInit):
     """The base class for Sherpa models.
 
@@ -618,6 +1181,62 @@ class Model(NoNewAttributesAfterInit):
         """
         raise NotImplementedError
 
+    def calc_batch(self, p, *args, **kwargs):
+        """Evaluate the model for multiple sets of parameter values.
+
+        The default behavior is to call `calc` for each set of
+        parameter values. Models can override this to evaluate all
+        the sets at once.
+
+        .. versionadded:: 4.14.0
+
+        Parameters
+        ----------
+        p : array_like
+            The parameter values to use, with shape (nsamples,
+            npars). The order of each row matches the ``pars``
+            field.
+        *args
+            The model grid, as used by `calc`.
+
+        Returns
+        -------
+        vals : ndarray
+            The model values, with shape (nsamples, nbins).
+
+        See Also
+        --------
+        calc
+
+        Notes
+        -----
+        As with `calc`, the values in ``p`` are used directly, so
+        it is up to the caller to ensure that any linked parameters
+        are set correctly.
+
+        Examples
+        --------
+
+        Evaluate a gaussian for three different amplitudes:
+
+        >>> mdl = Gauss1D()
+        >>> pars = [[10, 0, 1], [10, 0, 2], [10, 0, 4]]
+        >>> mdl.calc_batch(pars, [-5, 0, 5])
+        array([[0.5, 1. , 0.5],
+               [1. , 2. , 1. ],
+               [2. , 4. , 2. ]])
+
+        """
+
+        cols = batch_parameters(self, p)
+        pars = numpy.hstack(cols) if cols else \
+            numpy.zeros((numpy.asarray(p).shape[0], 0))
+
+        # Send in a copy as some models change the values.
+        vals = [numpy.atleast_1d(self.calc(row.copy(), *args, **kwargs))
+                for row in pars]
+        return numpy.asarray(vals)
+
     def teardown(self):
         """Called after a model may be evaluated multiple times.
 
@@ -834,8 +1453,23 @@ class CompositeModel(Model):
 
     """
 
+    # Used by compositeCacher. These are class attributes so that
+    # they exist for objects restored from older versions.
+    #
+    _memo = None
+    _memo_active = False
+
+    # Set to False when the output depends on more than the
+    # parameter values and the grid, such as the instrument models
+    # whose responses can be changed during a fit. The cache is not
+    # used by any expression which contains such a model.
+    #
+    _memo_static = True
+
     def __init__(self, name, parts):
         self.parts = tuple(parts)
+        self._memo = None
+        self._memo_active = False
         allpars = []
         model_with_dim = None
         for part in self.parts:
@@ -894,13 +1528,31 @@ class CompositeModel(Model):
         return parts
 
     def startup(self, cache=False):
-        pass
+        # The cache is only used during a fit, when the grid and
+        # the models are not expected to change.
+        self._memo_release()
+        if cache:
+            cache = all(getattr(part, '_memo_static', True)
+                        for part in [self] + self._get_parts())
+
+        self._memo_active = bool(cache)
+        if cache:
+            self._memo = ModelCache(int(getattr(self, 'cache', 5)))
 
     def teardown(self):
-        pass
+        self._memo_active = False
+        self._memo_release()
+
+    def _memo_release(self):
+        if self._memo is not None:
+            self._memo.clear()
+            self._memo = None
 
     def cache_clear(self):
         """Clear the cache for each component."""
+        if self._memo is not None:
+            self._memo.clear()
+
         for p in self.parts:
             try:
                 p.cache_clear()
@@ -927,6 +1579,38 @@ class CompositeModel(Model):
             except AttributeError:
                 pass
 
+    def cache_stats(self):
+        """Return the cache statistics of each component.
+
+        .. versionadded:: 4.14.0
+
+        Returns
+        -------
+        stats : dict
+            The keys are the component names and the values are
+            the output of the cache_stats method of the component.
+            Components without a cache are not included.
+
+        See Also
+        --------
+        cache_status
+
+        """
+
+        out = {}
+        for p in self.parts:
+            try:
+                stats = p.cache_stats()
+            except AttributeError:
+                continue
+
+            if isinstance(p, CompositeModel):
+                out.update(stats)
+            else:
+                out[p.name] = stats
+
+        return out
+
 
 class SimulFitModel(CompositeModel):
     """Store multiple models.
@@ -1037,6 +1721,11 @@ class ArithmeticConstantModel(Model):
     def calc(self, p, *args, **kwargs):
         return self.val
 
+    def calc_batch(self, p, *args, **kwargs):
+        # Return an array that will broadcast against the other
+        # terms in the expression.
+        return numpy.atleast_1d(self.val)[numpy.newaxis, :]
+
     def teardown(self):
         pass
 
@@ -1069,15 +1758,19 @@ class ArithmeticModel(Model):
         # Model caching ability
         self.cache = 5  # repeat the class definition
         self._use_caching = True  # FIXME: reduce number of variables?
-        self.cache_clear()
+        self._static_grid = False
+        self._cache = ModelCache()
         Model.__init__(self, name, pars)
 
+    @property
+    def _cache_ctr(self):
+        return self._cache.counters
+
     def cache_clear(self):
         """Clear the cache."""
-        # It is not obvious what to set the queue length to
-        self._queue = ['']
-        self._cache = {}
-        self._cache_ctr = {'hits': 0, 'misses': 0, 'check': 0}
+        # It is not obvious what to set the cache size to
+        self._cache.clear()
+        self._cache.size = 1
 
     def cache_status(self):
         """Display the cache status.
@@ -1092,11 +1785,39 @@ class ArithmeticModel(Model):
          powlaw1d.pl                size:    5  hits:   633  misses:   240  check=  873
 
         """
-        c = self._cache_ctr
-        info(f" {self.name:25s}  size: {len(self._queue):4d}  " +
+        c = self._cache.counters
+        info(f" {self.name:25s}  size: {self._cache.size:4d}  " +
              f"hits: {c['hits']:5d}  misses: {c['misses']:5d}  " +
              f"check: {c['check']:5d}")
 
+    def cache_stats(self):
+        """Return the cache statistics.
+
+        .. versionadded:: 4.14.0
+
+        Returns
+        -------
+        stats : dict
+            The maximum number of entries ('size'), the current
+            number of entries ('entries') and the memory they use
+            ('nbytes'), along with the number of 'hits', 'misses',
+            'evictions', and requests ('check').
+
+        See Also
+        --------
+        cache_status
+
+        Example
+        -------
+
+        >>> pl.cache_stats()
+        {'size': 5, 'entries': 5, 'nbytes': 4000, 'hits': 633,
+         'misses': 240, 'check': 873, 'evictions': 235}
+
+        """
+
+        return self._cache.stats()
+
     # Unary operations
     __neg__ = _make_unop(numpy.negative, '-')
     __abs__ = _make_unop(numpy.absolute, 'abs')
@@ -1117,12 +1838,15 @@ class ArithmeticModel(Model):
         if '_use_caching' not in state:
             self.__dict__['_use_caching'] = True
 
-        if '_queue' not in state:
-            self.__dict__['_queue'] = ['']
+        if '_static_grid' not in state:
+            self.__dict__['_static_grid'] = False
 
-        if '_cache' not in state:
-            self.__dict__['_cache'] = {}
-            self.__dict__['_cache_ctr'] = {'hits': 0, 'misses': 0, 'check': 0}
+        # Older versions used a dictionary and a list for the cache.
+        queue = self.__dict__.pop('_queue', None)
+        self.__dict__.pop('_cache_ctr', None)
+        if not isinstance(self.__dict__.get('_cache'), ModelCache):
+            size = 1 if queue is None else len(queue)
+            self.__dict__['_cache'] = ModelCache(size)
 
         if 'cache' not in state:
             self.__dict__['cache'] = 5
@@ -1133,14 +1857,17 @@ class ArithmeticModel(Model):
     def startup(self, cache=False):
         self.cache_clear()
         self._use_caching = cache
+        self._static_grid = cache
+        _grid_tokens.clear()
         if int(self.cache) > 0:
-            self._queue = [''] * int(self.cache)
+            self._cache.size = int(self.cache)
             frozen = numpy.array([par.frozen for par in self.pars], dtype=bool)
             if len(frozen) > 0 and frozen.all():
                 self._use_caching = cache
 
     def teardown(self):
         self._use_caching = False
+        self._static_grid = False
 
     def apply(self, outer, *otherargs, **otherkwargs):
         return NestedModel(outer, self, *otherargs, **otherkwargs)
@@ -1237,9 +1964,13 @@ class UnaryOpModel(CompositeModel, ArithmeticModel):
         CompositeModel.__init__(self, ('%s(%s)' % (opstr, self.arg.name)),
                                 (self.arg,))
 
+    @compositeCacher
     def calc(self, p, *args, **kwargs):
         return self.op(self.arg.calc(p, *args, **kwargs))
 
+    def calc_batch(self, p, *args, **kwargs):
+        return self.op(self.arg.calc_batch(p, *args, **kwargs))
+
 
 class BinaryOpModel(CompositeModel, RegriddableModel):
     """Combine two model expressions.
@@ -1313,10 +2044,25 @@ class BinaryOpModel(CompositeModel, RegriddableModel):
         self.rhs.teardown()
         CompositeModel.teardown(self)
 
+    def _calc_term(self, tag, term, p, args, kwargs):
+        """Evaluate a term, using the cache if it has no cache of its own."""
+
+        # Composite terms use their own cache, as do the models whose
+        # calc method uses modelCacher1d (when caching is turned on).
+        if isinstance(term, (CompositeModel, ArithmeticConstantModel)):
+            return term.calc(p, *args, **kwargs)
+
+        if getattr(term, '_use_caching', False) and \
+           getattr(type(term).calc, '_model_cacher', False):
+            return term.calc(p, *args, **kwargs)
+
+        return _composite_cached(self, tag, term.calc, p, args, kwargs)
+
+    @compositeCacher
     def calc(self, p, *args, **kwargs):
         nlhs = len(self.lhs.pars)
-        lhs = self.lhs.calc(p[:nlhs], *args, **kwargs)
-        rhs = self.rhs.calc(p[nlhs:], *args, **kwargs)
+        lhs = self._calc_term(b'lhs', self.lhs, p[:nlhs], args, kwargs)
+        rhs = self._calc_term(b'rhs', self.rhs, p[nlhs:], args, kwargs)
         try:
             val = self.op(lhs, rhs)
         except ValueError:
@@ -1325,6 +2071,19 @@ class BinaryOpModel(CompositeModel, RegriddableModel):
                               type(self.rhs).__name__, len(rhs)))
         return val
 
+    def calc_batch(self, p, *args, **kwargs):
+        p = numpy.asarray(p, dtype=SherpaFloat)
+        nlhs = len(self.lhs.pars)
+        lhs = self.lhs.calc_batch(p[:, :nlhs], *args, **kwargs)
+        rhs = self.rhs.calc_batch(p[:, nlhs:], *args, **kwargs)
+        try:
+            val = self.op(lhs, rhs)
+        except ValueError:
+            raise ValueError("shape mismatch between '%s: %i' and '%s: %i'" %
+                             (type(self.lhs).__name__, lhs.shape[-1],
+                              type(self.rhs).__name__, rhs.shape[-1]))
+        return val
+
 
 # TODO: do we actually make use of this functionality anywhere?
 # We only have 1 test that checks this class, and it is an existence
@@ -1394,6 +2153,10 @@ class ArithmeticFunctionModel(Model):
     def calc(self, p, *args, **kwargs):
         return self.func(*args, **kwargs)
 
+    def calc_batch(self, p, *args, **kwargs):
+        # The function does not depend on the parameter values.
+        return numpy.atleast_1d(self.func(*args, **kwargs))[numpy.newaxis, :]
+
     def startup(self, cache=False):
         pass
 
@@ -1452,6 +2215,7 @@ class NestedModel(CompositeModel, ArithmeticModel):
         self.outer.teardown()
         CompositeModel.teardown(self)
 
+    @compositeCacher
     def calc(self, p, *args, **kwargs):
         nouter = len(self.outer.pars)
         return self.outer.calc(p[:nouter],
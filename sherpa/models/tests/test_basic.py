@@ -27,6 +27,7 @@ from sherpa.models.parameter import hugeval
 from sherpa.models.model import ArithmeticModel, RegriddableModel1D, \
     RegriddableModel2D
 from sherpa.utils import SherpaFloat
+from sherpa.utils.err import ModelErr
 
 
 def userfunc(pars, x, *args, **kwargs):
@@ -248,3 +249,80 @@ def test_polynom2d_guess_y0():
 
     for par in mdl.pars:
         check(par, 0)
+
+
+def make_batch_pars(mdl, nsamples=4, seed=2873):
+    """Create parameter values around the default model values."""
+
+    rng = np.random.RandomState(seed)
+    base = np.asarray([p.val for p in mdl.pars])
+    scale = 1 + 0.2 * rng.normal(size=(nsamples, base.size))
+    return base * scale + 0.1 * np.abs(rng.normal(size=(nsamples, base.size)))
+
+
+@pytest.mark.parametrize("integrate", [True, False])
+@pytest.mark.parametrize("cls",
+                         [basic.Box1D, basic.Const1D, basic.Cos, basic.Exp,
+                          basic.Exp10, basic.Gauss1D, basic.LogParabola,
+                          basic.NormGauss1D, basic.Polynom1D,
+                          basic.PowLaw1D, basic.Scale1D, basic.Sin,
+                          basic.StepHi1D, basic.StepLo1D,
+                          # no vectorised version
+                          basic.Erf])
+def test_calc_batch_1d(cls, integrate):
+    """calc_batch matches calling calc for each set of parameters."""
+
+    mdl = cls()
+    mdl.integrate = integrate
+    pars = make_batch_pars(mdl)
+
+    x = np.linspace(0.1, 10, 21)
+    for grid in [(x, ), (x[:-1], x[1:])]:
+        expected = [mdl.calc(p.copy(), *grid) for p in pars]
+        got = mdl.calc_batch(pars, *grid)
+        assert got.shape == (4, grid[0].size)
+        assert got == pytest.approx(np.asarray(expected), rel=1e-10)
+
+
+@pytest.mark.parametrize("cls",
+                         [basic.Box2D, basic.Const2D, basic.Gauss2D,
+                          basic.SigmaGauss2D, basic.NormGauss2D,
+                          basic.Polynom2D])
+def test_calc_batch_2d(cls):
+
+    mdl = cls()
+    pars = make_batch_pars(mdl)
+    if 'ellip' in [p.name for p in mdl.pars]:
+        pars[:, [p.name for p in mdl.pars].index('ellip')] = 0.4
+
+    x0, x1 = np.meshgrid(np.linspace(-3, 3, 5), np.linspace(-2, 2, 4))
+    x0 = x0.flatten()
+    x1 = x1.flatten()
+
+    # The integrated version uses the fallback.
+    for grid in [(x0, x1), (x0 - 0.5, x1 - 0.5, x0 + 0.5, x1 + 0.5)]:
+        expected = [mdl.calc(p.copy(), *grid) for p in pars]
+        got = mdl.calc_batch(pars, *grid)
+        assert got.shape == (4, x0.size)
+        assert got == pytest.approx(np.asarray(expected), rel=1e-10)
+
+
+def test_calc_batch_failed():
+    """Invalid parameter values error out as calc does."""
+
+    mdl = basic.Gauss1D()
+    pars = [[10, 0, 1], [0, 0, 1]]
+    with pytest.raises(ValueError, match='^model evaluation failed$'):
+        mdl.calc(pars[1], [1, 2, 3])
+
+    with pytest.raises(ValueError, match='^model evaluation failed$'):
+        mdl.calc_batch(pars, [1, 2, 3])
+
+
+@pytest.mark.parametrize("pars", [[1, 2, 3], [[1, 2]], np.ones((2, 4))])
+def test_calc_batch_invalid_shape(pars):
+
+    mdl = basic.Gauss1D()
+    with pytest.raises(ModelErr,
+                       match=r'^expected parameter values with shape \(nsamples, 3\), got '):
+        mdl.calc_batch(pars, [1, 2, 3])
@@ -21,6 +21,7 @@
 from collections import namedtuple
 import logging
 import operator
+import pickle
 import warnings
 
 # Repeat the logic from sherpa/models/model.py
@@ -37,10 +38,12 @@ import pytest
 from sherpa.utils.err import ModelErr
 from sherpa.models.model import ArithmeticModel, ArithmeticConstantModel, \
     ArithmeticFunctionModel, BinaryOpModel, FilterModel, Model, NestedModel, \
-    UnaryOpModel, RegridWrappedModel, modelCacher1d
+    UnaryOpModel, RegridWrappedModel, ModelCache, modelCacher1d, \
+    get_cache_budget, set_cache_budget
+import sherpa.models.model
 from sherpa.models.parameter import Parameter, hugeval, tinyval
 from sherpa.models.basic import Sin, Const1D, Box1D, Polynom1D, Scale1D, \
-    Integrate1D
+    Integrate1D, Gauss1D
 
 
 def validate_warning(warning_capturer, parameter_name="norm",
@@ -743,16 +746,15 @@ def check_cache(mdl, expected, x, xhi=None):
     assert len(cache) == 1
 
     pars = [p.val for p in mdl.pars]
-    data = [numpy.asarray(pars).tobytes(),
-            b'1' if mdl.integrate else b'0',
-            x.tobytes()]
+    key = [numpy.asarray(pars).tobytes(),
+           b'1' if mdl.integrate else b'0',
+           hashfunc(x.tobytes()).digest()]
     if xhi is not None:
-        data.append(xhi.tobytes())
+        key.append(hashfunc(xhi.tobytes()).digest())
 
-    token = b''.join(data)
-    digest = hashfunc(token).digest()
-    assert digest in cache
-    assert cache[digest] == pytest.approx(expected)
+    key = tuple(key)
+    assert key in cache
+    assert cache[key] == pytest.approx(expected)
 
 
 def test_evaluate_no_cache1d():
@@ -952,9 +954,7 @@ class DoNotUseModel(Model):
 
     # We need this for modelCacher1d
     _use_caching = True
-    _cache = {}
-    _cache_ctr = {'hits': 0, 'misses': 0, 'check': 0}
-    _queue = ['']
+    _cache = ModelCache()
 
     @modelCacher1d
     def calc(self, p, *args, **kwargs):
@@ -983,14 +983,11 @@ def test_cache_integrate_fall_through_no_integrate():
     assert len(cache) == 1
 
     pars = []
-    data = [numpy.asarray(pars).tobytes(),
-            b'0', # not integrated
-            x.tobytes()]
-
-    token = b''.join(data)
-    digest = hashfunc(token).digest()
-    assert digest in cache
-    assert cache[digest] == pytest.approx(expected)
+    key = (numpy.asarray(pars).tobytes(),
+           b'0', # not integrated
+           hashfunc(x.tobytes()).digest())
+    assert key in cache
+    assert cache[key] == pytest.approx(expected)
 
 
 def test_cache_integrate_fall_through_integrate_true():
@@ -1010,14 +1007,11 @@ def test_cache_integrate_fall_through_integrate_true():
     assert len(cache) == 1
 
     pars = []
-    data = [numpy.asarray(pars).tobytes(),
-            b'1', # integrated
-            x.tobytes()]
-
-    token = b''.join(data)
-    digest = hashfunc(token).digest()
-    assert digest in cache
-    assert cache[digest] == pytest.approx(expected)
+    key = (numpy.asarray(pars).tobytes(),
+           b'1', # integrated
+           hashfunc(x.tobytes()).digest())
+    assert key in cache
+    assert cache[key] == pytest.approx(expected)
 
 
 def test_cache_integrate_fall_through_integrate_false():
@@ -1037,14 +1031,11 @@ def test_cache_integrate_fall_through_integrate_false():
     assert len(cache) == 1
 
     pars = []
-    data = [numpy.asarray(pars).tobytes(),
-            b'0', # not integrated
-            x.tobytes()]
-
-    token = b''.join(data)
-    digest = hashfunc(token).digest()
-    assert digest in cache
-    assert cache[digest] == pytest.approx(expected)
+    key = (numpy.asarray(pars).tobytes(),
+           b'0', # not integrated
+           hashfunc(x.tobytes()).digest())
+    assert key in cache
+    assert cache[key] == pytest.approx(expected)
 
 
 def test_cache_status_single(caplog):
@@ -1224,3 +1215,286 @@ def test_cache_clear_multiple(caplog):
     assert c._cache_ctr['check'] == 0
     assert c._cache_ctr['hits'] == 0
     assert c._cache_ctr['misses'] == 0
+
+
+def test_cache_lru():
+    """The least-recently used value is removed."""
+
+    p = Polynom1D()
+    p.cache = 2
+    p.startup(cache=True)
+
+    x = numpy.asarray([1, 2, 3])
+    for c0 in [1, 2, 1, 3]:
+        p.c0 = c0
+        p(x)
+
+    # c0=2 was removed when c0=3 was added since c0=1 had been used
+    # more recently.
+    assert p.cache_stats() == {'size': 2, 'entries': 2, 'nbytes': 48,
+                               'hits': 1, 'misses': 3, 'check': 4,
+                               'evictions': 1}
+
+    p.c0 = 1
+    p(x)
+    assert p.cache_stats()['hits'] == 2
+
+    p.c0 = 2
+    p(x)
+    assert p.cache_stats()['hits'] == 2
+    assert p.cache_stats()['evictions'] == 2
+
+    p.teardown()
+
+
+def test_cache_stats_multiple():
+
+    p = Polynom1D()
+    b = Box1D()
+    mdl = 2 * (p + b) + p
+
+    mdl([1, 2, 3])
+    mdl([1, 2, 3])
+
+    stats = mdl.cache_stats()
+    assert set(stats.keys()) == set(['polynom1d', 'box1d'])
+    assert stats['polynom1d']['check'] == 4
+    assert stats['polynom1d']['hits'] == 3
+    assert stats['box1d']['check'] == 2
+    assert stats['box1d']['hits'] == 1
+
+
+def test_cache_budget():
+    """The memory limit applies to all models."""
+
+    orig = get_cache_budget()['maxbytes']
+    p1 = Polynom1D('p1')
+    p2 = Polynom1D('p2')
+    for p in [p1, p2]:
+        p.startup(cache=True)
+
+    x = numpy.arange(100)
+    try:
+        set_cache_budget(2000)
+
+        p1(x)
+        p2(x)
+        assert p1.cache_stats()['entries'] == 1
+        assert p2.cache_stats()['entries'] == 1
+
+        # Adding a third value removes the oldest entry, which
+        # is from a different model.
+        p2.c0 = 2
+        p2(x)
+        assert p1.cache_stats()['entries'] == 0
+        assert p1.cache_stats()['evictions'] == 1
+        assert p2.cache_stats()['entries'] == 2
+        assert p2.cache_stats()['nbytes'] == 1600
+
+        # A value larger than the limit is not cached.
+        set_cache_budget(400)
+        assert p2.cache_stats()['entries'] == 0
+        assert p2.cache_stats()['evictions'] == 2
+
+        p2(x)
+        assert p2.cache_stats()['entries'] == 0
+
+    finally:
+        set_cache_budget(orig)
+        for p in [p1, p2]:
+            p.teardown()
+
+
+def test_cache_budget_invalid():
+    with pytest.raises(ValueError, match='^maxbytes must be >= 0 or None$'):
+        set_cache_budget(-1)
+
+
+def test_cache_clear_budget():
+    """Clearing the cache releases the memory."""
+
+    p = Polynom1D()
+    start = get_cache_budget()['nbytes']
+    p(numpy.arange(10))
+    assert get_cache_budget()['nbytes'] == start + 80
+
+    p.cache_clear()
+    assert get_cache_budget()['nbytes'] == start
+
+
+def test_cache_static_grid(monkeypatch):
+    """The grid is only hashed once during a fit."""
+
+    ncalls = []
+
+    def hashfunc_count(arg):
+        ncalls.append(len(arg))
+        return hashfunc(arg)
+
+    monkeypatch.setattr(sherpa.models.model, 'hashfunc', hashfunc_count)
+
+    p = Polynom1D()
+    x = numpy.arange(100)
+    p.startup(cache=True)
+    for c0 in [1, 2, 3]:
+        p.c0 = c0
+        p(x)
+
+    assert ncalls == [800]
+    p.teardown()
+
+    # Outside of a fit the grid is hashed for each call.
+    p._use_caching = True
+    del ncalls[:]
+    for c0 in [1, 2, 3]:
+        p.c0 = c0
+        p(x)
+
+    assert ncalls == [800] * 3
+
+
+def test_cache_pickle():
+    """The cache contents are not pickled."""
+
+    p = Polynom1D()
+    p.startup(cache=True)
+    p([1, 2, 3])
+    assert p.cache_stats()['entries'] == 1
+
+    p2 = pickle.loads(pickle.dumps(p))
+    assert p2.cache_stats()['size'] == 5
+    assert p2.cache_stats()['entries'] == 0
+    assert p2([1, 2, 3]) == pytest.approx([1, 1, 1])
+    p.teardown()
+
+
+class CountingModel(ArithmeticModel):
+    """Count the number of times the model is evaluated."""
+
+    def __init__(self, name='counting'):
+        self.c0 = Parameter(name, 'c0', 2)
+        self.ncalls = 0
+        ArithmeticModel.__init__(self, name, (self.c0, ))
+
+    def calc(self, p, x, *args, **kwargs):
+        self.ncalls += 1
+        return p[0] * numpy.ones(len(x))
+
+
+def test_composite_cache_terms():
+    """Only the terms whose parameters change are re-evaluated."""
+
+    m1 = CountingModel('m1')
+    m2 = CountingModel('m2')
+    m3 = CountingModel('m3')
+    mdl = m1 * (m2 + m3)
+
+    x = numpy.asarray([1, 2, 3])
+    mdl.startup(cache=True)
+    assert mdl(x) == pytest.approx([8, 8, 8])
+    assert [m.ncalls for m in [m1, m2, m3]] == [1, 1, 1]
+
+    m3.c0 = 4
+    assert mdl(x) == pytest.approx([12, 12, 12])
+    assert [m.ncalls for m in [m1, m2, m3]] == [1, 1, 2]
+
+    m1.c0 = 3
+    assert mdl(x) == pytest.approx([18, 18, 18])
+    assert [m.ncalls for m in [m1, m2, m3]] == [2, 1, 2]
+
+    # A previous set of values is still available.
+    m1.c0 = 2
+    m3.c0 = 2
+    assert mdl(x) == pytest.approx([8, 8, 8])
+    assert [m.ncalls for m in [m1, m2, m3]] == [2, 1, 2]
+
+    # A different grid
+    assert mdl([1, 2]) == pytest.approx([8, 8])
+    assert [m.ncalls for m in [m1, m2, m3]] == [3, 2, 3]
+
+    mdl.teardown()
+    assert mdl(x) == pytest.approx([8, 8, 8])
+    assert [m.ncalls for m in [m1, m2, m3]] == [4, 3, 4]
+
+
+def test_composite_cache_skips_cached_terms():
+    """Terms which cache their own evaluations are not stored again."""
+
+    m1 = CountingModel('m1')
+    m2 = Polynom1D()
+    mdl = m1 + m2
+
+    x = numpy.asarray([1, 2, 3])
+    mdl.startup(cache=True)
+    assert mdl(x) == pytest.approx([3, 3, 3])
+    assert mdl(x + 1) == pytest.approx([3, 3, 3])
+
+    # The output of the expression and of m1, for each grid.
+    tags = sorted(key[0] for key in mdl._memo)
+    assert tags == [b'', b'', b'lhs', b'lhs']
+    assert m2.cache_stats()['entries'] == 2
+    mdl.teardown()
+
+
+def test_composite_cache_not_used_by_default():
+    """The composite cache is only used during a fit."""
+
+    m1 = CountingModel('m1')
+    m2 = CountingModel('m2')
+    mdl = -(m1 + 2 * m2)
+
+    x = numpy.asarray([1, 2, 3])
+    for _ in range(2):
+        assert mdl(x) == pytest.approx([-6, -6, -6])
+
+    assert m1.ncalls == 2
+    assert m2.ncalls == 2
+
+
+def test_composite_cache_size_zero():
+    """The cache can be turned off by setting the cache size to 0."""
+
+    m1 = CountingModel('m1')
+    m2 = CountingModel('m2')
+    mdl = m1 + m2
+    mdl.cache = 0
+
+    mdl.startup(cache=True)
+    for _ in range(2):
+        assert mdl([1, 2]) == pytest.approx([4, 4])
+
+    mdl.teardown()
+    assert m1.ncalls == 2
+    assert m2.ncalls == 2
+
+
+def test_composite_cache_fit():
+    """A fit gives the same answer but evaluates fewer terms."""
+
+    from sherpa.data import Data1D
+    from sherpa.fit import Fit
+    from sherpa.optmethods import LevMar
+    from sherpa.stats import LeastSq
+
+    x = numpy.linspace(-5, 5, 11)
+    y = 2 + 3 * numpy.exp(-0.5 * x * x)
+    data = Data1D('x', x, y)
+
+    def make():
+        m1 = CountingModel('m1')
+        m2 = Gauss1D()
+        return m1, m2, m1 + m2
+
+    m1, m2, mdl = make()
+    fit = Fit(data, mdl, LeastSq(), LevMar())
+    res1 = fit.fit()
+    ncalls = m1.ncalls
+
+    m1, m2, mdl = make()
+    mdl.cache = 0
+    fit = Fit(data, mdl, LeastSq(), LevMar())
+    res2 = fit.fit()
+
+    assert res1.parvals == pytest.approx(res2.parvals)
+    assert res1.statval == pytest.approx(res2.statval)
+    assert ncalls < m1.ncalls
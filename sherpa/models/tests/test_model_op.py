@@ -281,3 +281,36 @@ def test_load_table_model(make_data_path):
     s.load_table_model('tbl', make_data_path('double.dat'))
     tbl = s.get_model_component('tbl')
     assert tbl.ndim is None
+
+
+@pytest.mark.parametrize("integrate", [True, False])
+def test_calc_batch_expression(integrate):
+    """calc_batch works for a model expression."""
+
+    g1 = basic.Gauss1D()
+    g2 = basic.Gauss1D()
+    c = basic.Const1D()
+    lg = basic.Erf()
+    for cpt in [g1, g2, c, lg]:
+        cpt.integrate = integrate
+
+    mdl = 2 * (g1 + g2) - c / 4 + abs(-g1) * lg
+    npars = len(mdl.pars)
+
+    rng = np.random.RandomState(7163)
+    pars = np.abs(rng.normal(loc=2, size=(5, npars)))
+
+    x = np.linspace(1, 5, 9)
+    for grid in [(x, ), (x[:-1], x[1:])]:
+        expected = [mdl.calc(p.copy(), *grid) for p in pars]
+        got = mdl.calc_batch(pars, *grid)
+        assert got.shape == (5, grid[0].size)
+        assert got == pytest.approx(np.asarray(expected), rel=1e-10)
+
+
+def test_calc_batch_constant_expression():
+    """The constant model broadcasts against the batch."""
+
+    mdl = basic.Const1D() + 2
+    got = mdl.calc_batch([[1], [3]], [1, 2, 3])
+    assert got == pytest.approx(np.asarray([[3, 3, 3], [5, 5, 5]]))
@@ -346,8 +346,11 @@ def test_regrid_binaryop_1d():
     result = fit.fit()
     assert result.numpoints == x.size
     assert result.statval < 1.0
-    assert mygauss.counter == myconst.counter
-    assert (result.nfev + 4) * x.size == mygauss.counter
+
+    # The terms of the BinaryOpModel are cached during the fit, so
+    # a term is only evaluated when its parameter values change.
+    assert myconst.counter < mygauss.counter
+    assert result.nfev * x.size == mygauss.counter
 
     mygauss.counter = 0
     myconst.counter = 0
@@ -67,6 +67,7 @@ Best-fit value: 4.0
 
 """
 
+from contextlib import ExitStack
 import random
 
 import numpy
@@ -74,7 +75,8 @@ import numpy
 from sherpa.optmethods.ncoresde import ncoresDifEvo
 from sherpa.optmethods.ncoresnm import ncoresNelderMead
 
-from sherpa.utils import parallel_map, func_counter
+from sherpa.utils import parallel_map, func_counter, _multi
+from sherpa.utils.parallel import bound_pool
 from sherpa.utils._utils import sao_fcmp
 
 from . import _saoopt
@@ -1196,7 +1198,11 @@ def lmdif(fcn, x0, xmin, xmax, ftol=EPSILON, xtol=EPSILON, gtol=EPSILON,
     def fcn_parallel(pars, fvec):
         fd_jac = fdJac(stat_cb1, fvec, pars)
         params = fd_jac.calc_params()
-        fjac = parallel_map(fd_jac, params, numcores)
+        # Map stat_cb1, rather than fd_jac, so that the workers
+        # bound to stat_cb1 for the duration of the fit are used.
+        wa = parallel_map(stat_cb1, [param[1:] for param in params],
+                          numcores)
+        fjac = [(wval - fvec) / fd_jac.h[ii] for ii, wval in enumerate(wa)]
         return numpy.concatenate(fjac)
 
     num_parallel_map, fcn_parallel_counter = func_counter(fcn_parallel)
@@ -1209,10 +1215,16 @@ def lmdif(fcn, x0, xmin, xmax, ftol=EPSILON, xtol=EPSILON, gtol=EPSILON,
     n = len(x)
     fjac = numpy.empty((m*n,))
 
-    x, fval, nfev, info, fjac = \
-        _saoopt.cpp_lmdif(stat_cb1, fcn_parallel_counter, numcores, m, x, ftol,
-                          xtol, gtol, maxfev, epsfcn, factor, verbose, xmin,
-                          xmax, fjac)
+    with ExitStack() as stack:
+        # Start the worker processes once, rather than for each
+        # evaluation of the Jacobian.
+        if _multi and numcores is not None and numcores > 1:
+            stack.enter_context(bound_pool(stat_cb1, numcores))
+
+        x, fval, nfev, info, fjac = \
+            _saoopt.cpp_lmdif(stat_cb1, fcn_parallel_counter, numcores, m, x,
+                              ftol, xtol, gtol, maxfev, epsfcn, factor,
+                              verbose, xmin, xmax, fjac)
 
     if info > 0:
         fjac = numpy.reshape(numpy.ravel(fjac, order='F'), (m, n), order='F')
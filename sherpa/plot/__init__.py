@@ -22,6 +22,7 @@
 A visualization interface to Sherpa
 """
 
+import itertools
 import logging
 import importlib
 
@@ -102,7 +103,7 @@ __all__ = ('Plot', 'Contour', 'Point', 'Histogram',
            'ResidContour',
            'RatioPlot',
            'RatioContour',
-           'Confidence1D', 'Confidence2D',
+           'GridCache', 'Confidence1D', 'Confidence2D',
            'IntervalProjection', 'IntervalUncertainty',
            'RegionProjection', 'RegionUncertainty',
            'begin', 'end', 'exceptions', 'backend', 'plotter')
@@ -2249,6 +2250,243 @@ class RatioContour(ModelContour):
                         **kwargs)
 
 
+def _grid_key(fit, log):
+    """The state of the fit which the grid values depend on."""
+
+    return (type(fit.stat).__name__, type(fit.method).__name__,
+            repr(sorted(fit.method.config.items())),
+            tuple((p.fullname, p.frozen, p.val) for p in fit.model.pars),
+            fit.calc_stat(), repr(log))
+
+
+def _snake_order(nx, ny):
+    """The order to visit a (ny, nx) grid so each point is next to the last.
+
+    The rows are traversed in alternate directions, so that the fit
+    for each point can start from the results of a neighbouring
+    point.
+    """
+
+    idx = numpy.arange(nx * ny).reshape(ny, nx)
+    idx[1::2] = idx[1::2, ::-1]
+    return idx.ravel()
+
+
+class GridCache(NoNewAttributesAfterInit):
+    """Remember the statistic values calculated on a grid.
+
+    The values are re-used when the grid is evaluated for the same
+    fit, so that re-creating a plot - for instance with different
+    contour levels, a larger range, or a finer grid - only requires
+    the new points to be calculated.
+
+    .. versionadded:: 4.14.0
+
+    Attributes
+    ----------
+    key
+        The state of the fit used to calculate the values. The
+        stored values are dropped when the key changes.
+    points : ndarray or None
+        The points, with shape (npoints, ndim).
+    values : ndarray or None
+        The statistic values for the points.
+    maxsize : int
+        The maximum number of points to store. The oldest points are
+        dropped when this is exceeded.
+
+    Notes
+    -----
+    Points match when they agree to within 1e-8 of the range of the
+    grid in each dimension, to allow for the round-off error in
+    creating the grids. The points are indexed by the cell they fall
+    in, when the grid is divided up using this tolerance, so only the
+    neighbouring cells need to be checked. The points outside the
+    range of the latest grid are dropped when it is evaluated.
+
+    """
+
+    def __init__(self):
+        self.key = None
+        self.points = None
+        self.values = None
+        self.maxsize = 100000
+        self._tol = None
+        self._index = {}
+        NoNewAttributesAfterInit.__init__(self)
+
+    def clear(self):
+        """Remove the stored values."""
+        self.key = None
+        self.points = None
+        self.values = None
+        self._tol = None
+        self._index = {}
+
+    def _cells(self, points):
+        """The cells containing the points."""
+        return [tuple(cell) for cell in numpy.rint(points / self._tol).tolist()]
+
+    def _set_points(self, points, values, tol=None):
+        """Replace the stored points and re-create the index."""
+
+        if len(points) > self.maxsize:
+            points = points[-self.maxsize:]
+            values = values[-self.maxsize:]
+
+        if tol is not None:
+            self._tol = tol
+
+        self.points = points
+        self.values = values
+        self._index = {cell: idx for idx, cell
+                       in enumerate(self._cells(points))}
+
+    def lookup(self, key, points):
+        """Return the stored values for the points.
+
+        Parameters
+        ----------
+        key
+            The state of the fit.
+        points : ndarray
+            The points, with shape (npoints, ndim).
+
+        Returns
+        -------
+        values, found : ndarray, ndarray
+            The statistic values, which are NaN for the points which
+            have not been calculated, and a boolean array indicating
+            which points were found.
+        """
+
+        npts = points.shape[0]
+        values = numpy.full(npts, numpy.nan)
+        found = numpy.zeros(npts, dtype=bool)
+        if self.key != key or self.points is None or \
+           self.points.shape[1] != points.shape[1]:
+            return values, found
+
+        # A matching point can be in a neighbouring cell.
+        offsets = list(itertools.product((0, -1, 1),
+                                         repeat=points.shape[1]))
+        for i, cell in enumerate(self._cells(points)):
+            for offset in offsets:
+                idx = self._index.get(tuple(c + o for c, o
+                                            in zip(cell, offset)))
+                if idx is None:
+                    continue
+
+                if numpy.all(numpy.abs(self.points[idx] - points[i]) <=
+                             self._tol):
+                    values[i] = self.values[idx]
+                    found[i] = True
+                    break
+
+        return values, found
+
+    def add(self, key, points, values):
+        """Store the values for the points.
+
+        Any existing values are dropped if key does not match the
+        stored key.
+        """
+
+        points = numpy.array(points, dtype=SherpaFloat, copy=True)
+        values = numpy.array(values, copy=True)
+        if self.key != key or self.points is None or \
+           self.points.shape[1] != points.shape[1]:
+            self.key = key
+            span = numpy.ptp(points, axis=0)
+            self._set_points(points, values,
+                             tol=1e-8 * numpy.where(span > 0, span, 1))
+            return
+
+        start = len(self.points)
+        self.points = numpy.vstack((self.points, points))
+        self.values = numpy.concatenate((self.values, values))
+        if len(self.points) > self.maxsize:
+            self._set_points(self.points, self.values)
+            return
+
+        self._index.update((cell, start + idx) for idx, cell
+                           in enumerate(self._cells(points)))
+
+    def restrict(self, key, points):
+        """Drop the stored points outside the range of the grid.
+
+        If the range of the grid has changed then the tolerance used
+        to match points is updated to match the new grid.
+
+        Parameters
+        ----------
+        key
+            The state of the fit.
+        points : ndarray
+            The grid, with shape (npoints, ndim).
+        """
+
+        if self.key != key or self.points is None or \
+           self.points.shape[1] != points.shape[1]:
+            return
+
+        lo = points.min(axis=0) - self._tol
+        hi = points.max(axis=0) + self._tol
+        keep = numpy.all((self.points >= lo) & (self.points <= hi), axis=1)
+
+        span = numpy.ptp(points, axis=0)
+        tol = 1e-8 * numpy.where(span > 0, span, 1)
+        if keep.all() and numpy.allclose(tol, self._tol, rtol=1e-6, atol=0):
+            return
+
+        self._set_points(self.points[keep], self.values[keep], tol=tol)
+
+    def evaluate(self, key, function, points, numcores=None, order=None):
+        """Calculate the statistic values for the points.
+
+        Parameters
+        ----------
+        key
+            The state of the fit.
+        function : callable
+            Called with a single point and returns the statistic.
+        points : ndarray
+            The points, with shape (npoints,) or (npoints, ndim).
+        numcores : int or None, optional
+            The number of processes to use.
+        order : ndarray or None, optional
+            The order in which to evaluate the points. The points are
+            split into contiguous blocks for each process, so
+            neighbouring points should be next to each other.
+
+        Returns
+        -------
+        values : ndarray
+            The statistic values for each point.
+        """
+
+        points = numpy.asarray(points)
+        shape = points.shape
+        grid = points.reshape(shape[0], -1)
+        values, found = self.lookup(key, grid)
+
+        if order is None:
+            order = numpy.arange(shape[0])
+
+        todo = order[~found[order]]
+        if todo.size > 0:
+            # Indexing creates a copy, so the function can change
+            # the elements it is sent.
+            new = points[todo]
+            values[todo] = parallel_map(function, new, numcores)
+
+        self.restrict(key, grid)
+        if todo.size > 0:
+            self.add(key, grid[todo], values[todo])
+
+        return values
+
+
 class Confidence1D(DataPlot):
 
     plot_prefs = backend.get_confid_plot_defaults()
@@ -2263,6 +2501,7 @@ class Confidence1D(DataPlot):
         self.parval = None
         self.stat = None
         self.numcores = None
+        self.cache = GridCache()
         DataPlot.__init__(self)
 
     def __setstate__(self, state):
@@ -2277,6 +2516,9 @@ class Confidence1D(DataPlot):
         if 'numcores' not in state:
             self.__dict__['numcores'] = None
 
+        if 'cache' not in state:
+            self.__dict__['cache'] = GridCache()
+
     def __str__(self):
         x = self.x
         if self.x is not None:
@@ -2455,6 +2697,7 @@ class Confidence2D(DataContour, Point):
         self.parval1 = None
         self.stat = None
         self.numcores = None
+        self.cache = GridCache()
         DataContour.__init__(self)
 
     def __setstate__(self, state):
@@ -2466,6 +2709,9 @@ class Confidence2D(DataContour, Point):
         if 'numcores' not in state:
             self.__dict__['numcores'] = None
 
+        if 'cache' not in state:
+            self.__dict__['cache'] = GridCache()
+
     def __str__(self):
         x0 = self.x0
         if self.x0 is not None:
@@ -2653,6 +2899,12 @@ class Confidence2D(DataContour, Point):
         x0, x1 = numpy.meshgrid(x[0], x[1])
         return numpy.array([x0.ravel(), x1.ravel()]).T
 
+    def _grid_order(self):
+        """The order to evaluate the grid created by _region_init."""
+        nx = numpy.unique(self.x0).size
+        ny = self.x0.size // nx
+        return _snake_order(nx, ny)
+
     def calc(self, fit, par0, par1):
         if type(fit.stat) in (LeastSq,):
             raise ConfidenceErr('badargconf', fit.stat.name)
@@ -2756,6 +3008,7 @@ class IntervalProjection(Confidence1D):
                             " for interval projection plot")
 
         xvals = self._interval_init(fit, par)
+        key = ('proj', par.fullname) + _grid_key(fit, self.log)
         oldpars = fit.model.thawedpars
         par.freeze()
 
@@ -2769,10 +3022,8 @@ class IntervalProjection(Confidence1D):
             teardown = fit.model.teardown
             fit.model.teardown = return_none
 
-            self.y = numpy.asarray(parallel_map(IntervalProjectionWorker(self.log, par, thawed, fit),
-                                                xvals,
-                                                self.numcores)
-                                   )
+            worker = IntervalProjectionWorker(self.log, par, thawed, fit)
+            self.y = self.cache.evaluate(key, worker, xvals, self.numcores)
 
         finally:
             # Set back data that we changed
@@ -2816,16 +3067,15 @@ class IntervalUncertainty(Confidence1D):
         oldpars = fit.model.thawedpars
 
         xvals = self._interval_init(fit, par)
+        key = ('unc', par.fullname) + _grid_key(fit, self.log)
 
         for i in thawed:
             i.freeze()
 
         try:
             fit.model.startup(cache)
-            self.y = numpy.asarray(parallel_map(IntervalUncertaintyWorker(self.log, par, fit),
-                                                xvals,
-                                                self.numcores)
-                                   )
+            worker = IntervalUncertaintyWorker(self.log, par, fit)
+            self.y = self.cache.evaluate(key, worker, xvals, self.numcores)
 
         finally:
             # Set back data that we changed
@@ -2926,14 +3176,19 @@ class RegionProjection(Confidence2D):
             fit.model.teardown = return_none
 
             grid = self._region_init(fit, par0, par1)
+            key = ('proj', par0.fullname, par1.fullname) + \
+                _grid_key(fit, self.log)
 
             par0.freeze()
             par1.freeze()
 
-            self.y = numpy.asarray(parallel_map(RegionProjectionWorker(self.log, par0, par1, thawed, fit),
-                                                grid,
-                                                self.numcores)
-                                   )
+            # Evaluate the points along a path through the grid, so
+            # that each fit starts near the previous result.
+            order = self._grid_order()
+            worker = RegionProjectionWorker(self.log, par0, par1,
+                                            thawed, fit)
+            self.y = self.cache.evaluate(key, worker, grid,
+                                         self.numcores, order=order)
 
         finally:
             # Set back data after we changed it
@@ -2987,14 +3242,14 @@ class RegionUncertainty(Confidence2D):
             fit.model.startup(cache)
 
             grid = self._region_init(fit, par0, par1)
+            key = ('unc', par0.fullname, par1.fullname) + \
+                _grid_key(fit, self.log)
 
             for i in thawed:
                 i.freeze()
 
-            self.y = numpy.asarray(parallel_map(RegionUncertaintyWorker(self.log, par0, par1, fit),
-                                                grid,
-                                                self.numcores)
-                                   )
+            worker = RegionUncertaintyWorker(self.log, par0, par1, fit)
+            self.y = self.cache.evaluate(key, worker, grid, self.numcores)
 
         finally:
             # Set back data after we changed it
@@ -765,3 +765,129 @@ def test_region_xxx_set_vars(ptype, kwargs, setup_confidence):
     #
     assert plotobj.y == pytest.approx([36.82967813, 35.94869461,
                                        35.90482971, 35.85479384], abs=1e-4)
+
+
+def test_snake_order():
+    order = sherpaplot._snake_order(3, 3)
+    assert order == pytest.approx([0, 1, 2, 5, 4, 3, 6, 7, 8])
+
+
+def test_grid_cache():
+    """Only the new points are calculated."""
+
+    calls = []
+
+    def func(x):
+        calls.append(x)
+        return x * x
+
+    cache = sherpaplot.GridCache()
+    assert cache.evaluate('a', func, numpy.arange(5), 1) == \
+        pytest.approx([0, 1, 4, 9, 16])
+    assert len(calls) == 5
+
+    # allow for round-off error in the grid
+    x = numpy.linspace(0, 4, 9) + 1e-12
+    assert cache.evaluate('a', func, x, 1) == pytest.approx(x * x)
+    assert calls[5:] == pytest.approx(x[1::2])
+
+    # A different key means everything is re-calculated.
+    del calls[:]
+    assert cache.evaluate('b', func, [2, 3], 1) == pytest.approx([4, 9])
+    assert calls == [2, 3]
+    assert cache.points.shape == (2, 1)
+
+    cache.clear()
+    assert cache.key is None
+    assert cache.points is None
+
+
+def test_grid_cache_range():
+    """The points outside the latest grid are dropped."""
+
+    calls = []
+
+    def func(x):
+        calls.append(x)
+        return x * x
+
+    cache = sherpaplot.GridCache()
+    cache.evaluate('a', func, numpy.linspace(0, 10, 11), 1)
+    assert cache.points.shape == (11, 1)
+
+    # Zooming in keeps the points in the new range, and the points
+    # are matched using the new range.
+    x = numpy.linspace(2, 4, 21)
+    del calls[:]
+    assert cache.evaluate('a', func, x, 1) == pytest.approx(x * x)
+    assert len(calls) == 18
+    assert cache.points.shape == (21, 1)
+    assert cache.points.min() == pytest.approx(2)
+    assert cache.points.max() == pytest.approx(4)
+
+    # The points match after the tolerance has changed.
+    del calls[:]
+    assert cache.evaluate('a', func, x + 1e-12, 1) == pytest.approx(x * x)
+    assert calls == []
+
+
+def test_grid_cache_maxsize():
+
+    cache = sherpaplot.GridCache()
+    cache.maxsize = 10
+    x = numpy.arange(8)
+    cache.evaluate('a', numpy.negative, x, 1)
+    cache.evaluate('a', numpy.negative, numpy.arange(0, 7.5, 0.5), 1)
+    assert cache.points.shape == (10, 1)
+
+    # The newest points are kept.
+    values, found = cache.lookup('a', numpy.arange(0, 7.5, 0.5)[:, None])
+    assert found.sum() == 7 + 3
+    assert values[found] == pytest.approx(-numpy.arange(0, 7.5, 0.5)[found])
+
+
+def test_grid_cache_order():
+    calls = []
+
+    def func(x):
+        calls.append(tuple(x))
+        return x.sum()
+
+    grid = numpy.asarray([[0, 0], [1, 0], [0, 1], [1, 1]])
+    cache = sherpaplot.GridCache()
+    ans = cache.evaluate('a', func, grid, 1, order=numpy.asarray([0, 1, 3, 2]))
+    assert ans == pytest.approx([0, 1, 1, 2])
+    assert calls == [(0, 0), (1, 0), (1, 1), (0, 1)]
+
+
+def test_region_projection_cache(setup_confidence):
+    """Re-calculating the same grid re-uses the values."""
+
+    rp = setup_confidence.rp
+    rp.prepare(fac=5, nloop=(5, 5))
+    rp.calc(setup_confidence.f, setup_confidence.g1.fwhm,
+            setup_confidence.g1.ampl)
+    y = rp.y.copy()
+    assert rp.cache.points.shape == (25, 2)
+
+    # Changing the levels does not add any points.
+    rp.prepare(fac=5, nloop=(5, 5), levels=[40, 50])
+    rp.calc(setup_confidence.f, setup_confidence.g1.fwhm,
+            setup_confidence.g1.ampl)
+    assert rp.y == pytest.approx(y)
+    assert rp.cache.points.shape == (25, 2)
+
+    # A finer grid only calculates the new points.
+    rp.prepare(fac=5, nloop=(9, 9))
+    rp.calc(setup_confidence.f, setup_confidence.g1.fwhm,
+            setup_confidence.g1.ampl)
+    assert rp.cache.points.shape == (81, 2)
+    assert rp.y.reshape(9, 9)[::2, ::2].ravel() == pytest.approx(y)
+
+    # Changing the fit means the values are re-calculated.
+    key = rp.cache.key
+    setup_confidence.g1.pos.freeze()
+    rp.calc(setup_confidence.f, setup_confidence.g1.fwhm,
+            setup_confidence.g1.ampl)
+    assert rp.cache.points.shape == (81, 2)
+    assert rp.cache.key != key
@@ -196,6 +196,7 @@ parameter::
 
 """
 
+import functools
 import logging
 
 import numpy
@@ -208,8 +209,10 @@ import numpy
 from sherpa.sim.simulate import *
 from sherpa.sim.sample import *
 from sherpa.sim.mh import *
+from sherpa.sim.diagnostics import *
 from sherpa.utils import NoNewAttributesAfterInit, get_keyword_defaults, \
-    sao_fcmp
+    parallel_map, sao_fcmp
+from sherpa.utils.parallel import bound_pool
 from sherpa.stats import Cash, CStat, WStat, LeastSq
 
 from sherpa.fit import Fit
@@ -291,6 +294,7 @@ class MCMC(NoNewAttributesAfterInit):
         self._sampler_opt = get_keyword_defaults(MetropolisMH.init)
         self.sample = None
         self.walk = lambda: None
+        self.diagnostics = None
         NoNewAttributesAfterInit.__init__(self)
 
     def __getstate__(self):
@@ -302,6 +306,7 @@ class MCMC(NoNewAttributesAfterInit):
     def __setstate__(self, state):
         self.walk = lambda: None
         self.sample = None
+        self.diagnostics = None
         self.__dict__.update(state)
 
     # ## DOC-TODO: include examples
@@ -646,7 +651,8 @@ class MCMC(NoNewAttributesAfterInit):
         """
         self._set_sampler_opt(opt, value)
 
-    def get_draws(self, fit, sigma, niter=1000, cache=True):
+    def get_draws(self, fit, sigma, niter=1000, cache=True,
+                  blocksize=None, numcores=1, nchains=None, filename=None):
         """Run the pyBLoCXS MCMC algorithm.
 
         The function runs a Markov Chain Monte Carlo (MCMC) algorithm
@@ -658,6 +664,10 @@ class MCMC(NoNewAttributesAfterInit):
         flag indicating whether the row represents a jump from the
         current location or not.
 
+        .. versionchanged:: 4.14.0
+           The blocksize, numcores, nchains, and filename parameters
+           were added.
+
         Parameters
         ----------
         fit
@@ -667,6 +677,38 @@ class MCMC(NoNewAttributesAfterInit):
            values.
         niter : int, optional
            The number of draws to use. The default is ``1000``.
+        cache : bool, optional
+           Should the model cache be used?
+        blocksize : int or None, optional
+           If set, the proposals which do not depend on the current
+           position of the chain - that is, the Metropolis-Hastings
+           jumps from the best-fit location - are drawn in blocks
+           of up to this size, and the statistic for each proposal
+           in a block calculated before the accept/reject step is run.
+           The chain is the same as when blocksize is None, for the
+           same random seed. It is ignored by samplers that do not
+           support it.
+        numcores : int or None, optional
+           The number of processes to use to calculate the statistics
+           for a block, when blocksize is set, or to run the chains,
+           when nchains is set. When nchains is set, a value of None
+           means all the available CPUs are used.
+        nchains : int or None, optional
+           If set, run this many chains, each with a different random
+           seed, and return the results for each chain. The chains
+           start at the same location (the current parameter values).
+           The seeds are created from the NumPy random state, so the
+           results are reproducible with `numpy.random.seed`.
+           The chains are only run in parallel when numcores is not
+           1, in which case each chain is run by a separate process
+           with its own copy of the fit.
+        filename : str, ChainFile, or None, optional
+           If set, the chain is written to this file, using the
+           `sherpa.sim.mh.ChainFile` class, as it is run rather than
+           being stored in memory. If the file contains a chain that
+           was stopped before it completed then it is continued from
+           the last time the data was written out. When nchains is
+           set the name has the chain number appended to it.
 
         Returns
         -------
@@ -680,13 +722,37 @@ class MCMC(NoNewAttributesAfterInit):
            boolean values, indicating whether the jump, or step, was
            accepted (``True``), so the parameter values and statistic
            change, or it wasn't, in which case there is no change to
-           the previous row.
+           the previous row. When nchains is set, the arrays have an
+           extra leading dimension of size nchains, and the
+           `diagnostics` attribute is set to a dictionary containing
+           the `rhat` and `ess` values for each parameter.
+
+        Examples
+        --------
+
+        Run four chains on four processes and check the chains have
+        converged:
+
+        >>> stats, accept, params = mcmc.get_draws(fit, covar, niter=5000,
+        ...                                        nchains=4, numcores=4)
+        >>> mcmc.diagnostics['rhat']
+
+        Write the chain to a file, so that it can be continued if it
+        is interrupted by re-running the same call:
+
+        >>> stats, accept, params = mcmc.get_draws(fit, covar, niter=100000,
+        ...                                        filename='chain.npy')
 
         """
         if not isinstance(fit.stat, (Cash, CStat, WStat)):
             raise ValueError("Fit statistic must be cash, cstat or " +
                              "wstat, not %s" % fit.stat.name)
 
+        if nchains is not None:
+            return self._get_draws_chains(fit, sigma, niter, cache,
+                                          blocksize, numcores, nchains,
+                                          filename)
+
         _level = _log.getEffectiveLevel()
         mu = fit.model.thawedpars
         dof = len(mu)
@@ -713,6 +779,10 @@ class MCMC(NoNewAttributesAfterInit):
         thawedparmins = fit.model.thawedparhardmins
         thawedparmaxes = fit.model.thawedparhardmaxes
 
+        # The data does not change during the chain, so only
+        # calculate the values needed by the statistic once.
+        context = fit.stat.get_fit_context(fit.data, fit.model)
+
         def calc_stat(proposed_params):
 
             # automatic rejection outside hard limits
@@ -732,7 +802,8 @@ class MCMC(NoNewAttributesAfterInit):
                 fit.model.thawedpars = proposed_params
 
                 # Calculate statistic on proposal, use likelihood
-                proposed_stat = -0.5 * fit.calc_stat()
+                statval = fit.stat.calc_stat_from_context(context)[0]
+                proposed_stat = -0.5 * statval
 
                 # _log.setLevel(level)
 
@@ -750,6 +821,16 @@ class MCMC(NoNewAttributesAfterInit):
             fit.model.startup(cache)
             self.sample = sampler(calc_stat, sigma, mu, dof, fit)
             self.walk = walker(self.sample, niter)
+            if filename is not None:
+                if not isinstance(filename, ChainFile):
+                    filename = ChainFile(filename)
+                self.walk.store = filename
+            if blocksize is not None:
+                self.walk.blocksize = int(blocksize)
+                self.walk.mapper = None
+                if numcores is not None and numcores > 1:
+                    self.walk.mapper = functools.partial(bound_pool,
+                                                         numcores=numcores)
             stats, accept, params = self.walk(**sampler_kwargs)
         finally:
             fit.model.teardown()
@@ -765,6 +846,61 @@ class MCMC(NoNewAttributesAfterInit):
 
         return (stats, accept, params)
 
+    def _get_draws_chains(self, fit, sigma, niter, cache, blocksize,
+                          numcores, nchains, filename):
+        """Run nchains chains, in parallel, and calculate diagnostics."""
+
+        nchains = int(nchains)
+        if nchains < 1:
+            raise ValueError("nchains must be >= 1, not {}".format(nchains))
+
+        base = numpy.random.randint(2**31)
+        seeds = [int(seq.generate_state(1)[0])
+                 for seq in numpy.random.SeedSequence(base).spawn(nchains)]
+
+        if filename is None:
+            filenames = [None] * nchains
+        else:
+            if isinstance(filename, ChainFile):
+                filename = filename.filename
+            if filename.endswith('.npy'):
+                filename = filename[:-4]
+            filenames = ['{}.{}.npy'.format(filename, idx)
+                         for idx in range(nchains)]
+
+        run_chain = _ChainRunner(self, fit, sigma, niter, cache, blocksize)
+        results = parallel_map(run_chain, list(zip(seeds, filenames)),
+                               numcores)
+        stats, accept, params = (numpy.asarray(vals)
+                                 for vals in zip(*results))
+
+        self.diagnostics = {'rhat': rhat(params), 'ess': ess(params)}
+        return (stats, accept, params)
+
+
+class _ChainRunner():
+    """Run a chain of a MCMC object for a given seed and file.
+
+    This is a class, rather than a closure, so that it can be sent
+    to the worker processes of `sherpa.utils.parallel.get_pool`.
+    """
+
+    def __init__(self, mcmc, fit, sigma, niter, cache, blocksize):
+        self.mcmc = mcmc
+        self.fit = fit
+        self.sigma = sigma
+        self.niter = niter
+        self.cache = cache
+        self.blocksize = blocksize
+
+    def __call__(self, args):
+        seed, chainfile = args
+        numpy.random.seed(seed)
+        return self.mcmc.get_draws(self.fit, self.sigma, niter=self.niter,
+                                   cache=self.cache,
+                                   blocksize=self.blocksize,
+                                   filename=chainfile)
+
 
 class ReSampleData(NoNewAttributesAfterInit):
     """Re-sample a 1D dataset using asymmetric errors.
@@ -0,0 +1,158 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Convergence diagnostics for multiple MCMC chains.
+
+The routines follow chapter 11 of Gelman, Carlin, Stern, Dunson,
+Vehtari, and Rubin (Bayesian Data Analysis, 3rd Edition, 2013,
+Chapman & Hall/CRC). The chains are given as an array with shape
+(nchains, ..., niter) - such as the params array returned by
+`sherpa.sim.MCMC.get_draws` when nchains is set - and the diagnostic
+is calculated for each of the other dimensions.
+
+.. versionadded:: 4.14.0
+
+"""
+
+import numpy
+
+
+__all__ = ('rhat', 'ess')
+
+
+def _prepare(chains, split):
+    """Return the chains as a (nchains, nvals, niter) array."""
+
+    chains = numpy.asarray(chains, dtype=float)
+    if chains.ndim < 2:
+        raise ValueError("chains must have at least 2 dimensions")
+
+    shape = chains.shape[1:-1]
+    niter = chains.shape[-1]
+    chains = chains.reshape(chains.shape[0], -1, niter)
+    if split:
+        half = niter // 2
+        chains = numpy.concatenate((chains[..., :half],
+                                    chains[..., niter - half:]))
+
+    if chains.shape[0] < 2 or chains.shape[-1] < 2:
+        raise ValueError("need at least two chains with two iterations")
+
+    return chains, shape
+
+
+def _variances(chains):
+    """Return the within-chain and combined variance estimates."""
+
+    niter = chains.shape[-1]
+    within = chains.var(axis=-1, ddof=1).mean(axis=0)
+    between = chains.mean(axis=-1).var(axis=0, ddof=1)
+    varplus = (niter - 1) / niter * within + between
+    return within, varplus
+
+
+def rhat(chains, split=True):
+    """The potential scale reduction factor for the chains.
+
+    Values close to 1 indicate that the chains have converged to the
+    same distribution.
+
+    Parameters
+    ----------
+    chains : array_like
+        The chains, with shape (nchains, ..., niter).
+    split : bool, optional
+        Should each chain be split in half (which also identifies
+        chains that have not converged within themselves)?
+
+    Returns
+    -------
+    rhat : ndarray
+        The value for each chain element, with shape equal to that
+        of chains with the first and last dimensions removed.
+
+    See Also
+    --------
+    ess
+
+    Examples
+    --------
+
+    >>> stats, accept, params = mcmc.get_draws(fit, covar, nchains=4)
+    >>> rhat(params)
+
+    """
+
+    chains, shape = _prepare(chains, split)
+    within, varplus = _variances(chains)
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        return numpy.sqrt(varplus / within).reshape(shape)
+
+
+def ess(chains, split=True):
+    """The effective sample size of the chains.
+
+    The autocorrelation of each chain is combined with the
+    cross-chain variance to estimate the number of independent
+    draws the chains are equivalent to.
+
+    Parameters
+    ----------
+    chains : array_like
+        The chains, with shape (nchains, ..., niter).
+    split : bool, optional
+        Should each chain be split in half?
+
+    Returns
+    -------
+    ess : ndarray
+        The value for each chain element, with shape equal to that
+        of chains with the first and last dimensions removed.
+
+    See Also
+    --------
+    rhat
+
+    """
+
+    chains, shape = _prepare(chains, split)
+    nchains, _, niter = chains.shape
+    within, varplus = _variances(chains)
+
+    # The autocovariance of each chain, calculated with a FFT.
+    resid = chains - chains.mean(axis=-1)[..., numpy.newaxis]
+    nfft = 2 * niter
+    power = numpy.fft.rfft(resid, n=nfft)
+    acov = numpy.fft.irfft(power * power.conj(), n=nfft)[..., :niter] / niter
+    acov = acov.mean(axis=0)
+
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        rho = 1 - (within[:, numpy.newaxis] - acov) / \
+            varplus[:, numpy.newaxis]
+        rho[:, 0] = 1
+
+        # Sum the pairs of autocorrelations up to the first negative
+        # pair (Geyer's initial positive sequence).
+        npairs = niter // 2
+        pairs = rho[:, 0:2 * npairs:2] + rho[:, 1:2 * npairs:2]
+        positive = numpy.cumprod(pairs > 0, axis=1, dtype=bool)
+        tau = -1 + 2 * (pairs * positive).sum(axis=1)
+        out = nchains * niter / tau
+
+    return out.reshape(shape)
@@ -60,6 +60,7 @@ http://hea-www.harvard.edu/AstroStat/pyBLoCXS/
 import inspect
 import logging
 import math
+import os
 
 import numpy as np
 
@@ -69,7 +70,7 @@ debug = logger.debug
 error = logger.error
 
 __all__ = ('LimitError', 'MetropolisMH', 'MH', 'Sampler',
-           'Walk', 'dmvt', 'dmvnorm')
+           'Walk', 'ChainFile', 'dmvt', 'dmvnorm')
 
 
 class LimitError(Exception):
@@ -181,11 +182,190 @@ def dmvnorm(x, mu, sigma, log=True):
 #     sys.stdout.flush()
 
 
+class ChainFile():
+    """Store a chain in a file so that it can be resumed.
+
+    The chain is written to a NumPy ``.npy`` file, which is memory
+    mapped so that the chain does not have to fit in memory. Every
+    ``flush`` iterations the file is written to disk, along with the
+    random state, in a second file (with ``.state.npz`` appended to
+    the file name). If the chain is stopped, it can be continued by
+    running it again with the same file name (the chain is the same as
+    if it had not been stopped).
+
+    .. versionadded:: 4.14.0
+
+    Parameters
+    ----------
+    filename : str
+        The name of the file. If it does not end in ``.npy`` then
+        the suffix is added.
+    flush : int, optional
+        The number of iterations between writing the data to disk.
+
+    Notes
+    -----
+    The file contains a structured array with fields ``stat``,
+    ``accept``, and ``params``, with niter + 1 rows, and can be read
+    with `numpy.load`. Only the rows up to the last flush are valid
+    if the chain has not finished.
+
+    """
+
+    def __init__(self, filename, flush=1000):
+        if not filename.endswith('.npy'):
+            filename += '.npy'
+
+        flush = int(flush)
+        if flush < 1:
+            raise ValueError("flush must be >= 1, not {}".format(flush))
+
+        self.filename = filename
+        self.statefile = filename + '.state.npz'
+        self.flush = flush
+        self.data = None
+        self._last = 0
+
+    def __repr__(self):
+        return '<ChainFile: {}>'.format(self.filename)
+
+    def open(self, pars, stat, niter):
+        """Create, or re-open, the chain.
+
+        Parameters
+        ----------
+        pars : ndarray
+            The starting parameter values.
+        stat : number
+            The statistic value at the starting location.
+        niter : int
+            The number of iterations.
+
+        Returns
+        -------
+        proposals, stats, acceptflag : ndarray
+            The arrays to store the chain.
+        start : int
+            The number of iterations that have been run.
+
+        """
+
+        npars = len(pars)
+        start = self._read_state(npars, niter)
+        if start is None:
+            dtype = [('stat', float), ('accept', bool),
+                     ('params', float, (npars, ))]
+            self.data = np.lib.format.open_memmap(self.filename, mode='w+',
+                                                  dtype=dtype,
+                                                  shape=(niter + 1, ))
+            self.data['params'][0] = pars
+            self.data['stat'][0] = stat
+            start = 0
+            self._save(0)
+        else:
+            self.data = np.load(self.filename, mmap_mode='r+')
+            if self.data.shape != (niter + 1, ) or \
+               self.data['params'].shape[1] != npars:
+                raise ValueError("The chain in {} does not match".format(
+                    self.filename))
+
+        self._last = start
+        return self.data['params'], self.data['stat'], \
+            self.data['accept'], start
+
+    def _read_state(self, npars, niter):
+        """Return the number of completed iterations, or None."""
+
+        if not os.path.exists(self.filename) or \
+           not os.path.exists(self.statefile):
+            return None
+
+        with np.load(self.statefile) as state:
+            if int(state['niter']) != niter or int(state['npars']) != npars:
+                raise ValueError("The chain in {} does not match".format(
+                    self.filename))
+
+            np.random.set_state((str(state['rng_name']),
+                                 state['rng_key'], int(state['rng_pos']),
+                                 int(state['rng_has_gauss']),
+                                 float(state['rng_gauss'])))
+            return int(state['nrows'])
+
+    def _save(self, nrows):
+        """Write the chain and then the current state."""
+
+        self.data.flush()
+        rng = np.random.get_state()
+        tmpname = self.statefile + '.tmp.npz'
+        np.savez(tmpname, nrows=nrows, niter=self.data.shape[0] - 1,
+                 npars=self.data['params'].shape[1],
+                 rng_name=rng[0], rng_key=rng[1], rng_pos=rng[2],
+                 rng_has_gauss=rng[3], rng_gauss=rng[4])
+        os.replace(tmpname, self.statefile)
+        self._last = nrows
+
+    def update(self, jump):
+        """Note that iteration jump is complete.
+
+        The data and random state are written to disk if flush
+        iterations have been run since the last write, or the chain
+        has finished. This must only be called when the random state
+        matches the chain.
+        """
+        if jump - self._last >= self.flush or \
+           jump == self.data.shape[0] - 1:
+            self._save(jump)
+
+    def close(self):
+        """Stop writing to the file.
+
+        Any iterations since the last call to update that wrote out
+        the data are lost, since the random state is not known.
+        """
+        if self.data is not None:
+            self.data.flush()
+            self.data = None
+
+
 class Walk():
+    """Run a chain using a sampler.
+
+    Parameters
+    ----------
+    sampler : Sampler instance or None, optional
+        The sampler to use.
+    niter : int, optional
+        The number of iterations.
+    blocksize : int or None, optional
+        If set, and the sampler supports it, proposals which do not
+        depend on the current position of the chain are drawn in
+        blocks of this size, and their statistics calculated together,
+        before the accept/reject step is run for each one. The chain
+        is the same as when blocksize is None.
+    mapper : callable or None, optional
+        Used to calculate the statistics for a block. It is called
+        with the function to evaluate, and must return a context
+        manager which returns a callable that, given a list of
+        arguments, returns a list of the function values (e.g.
+        `sherpa.utils.parallel.bound_pool` for a given number of
+        processes). If None the statistics are calculated in turn.
+
+    Attributes
+    ----------
+    store : ChainFile or None
+        If set, the chain is written to this file and, if the file
+        contains a partially-completed chain, it is continued.
+
+    """
 
-    def __init__(self, sampler=None, niter=1000):
+    store = None
+
+    def __init__(self, sampler=None, niter=1000, blocksize=None,
+                 mapper=None):
         self._sampler = sampler
         self.niter = int(niter)
+        self.blocksize = blocksize
+        self.mapper = mapper
 
     def set_sampler(self, sampler):
         self._sampler = sampler
@@ -196,20 +376,15 @@ class Walk():
             raise AttributeError("sampler object has not been set, " +
                                  "please use set_sampler()")
 
+        if self.blocksize is not None and self.blocksize > 0 and \
+           hasattr(self._sampler, 'draw_block'):
+            return self._walk_blocks(**kwargs)
+
         pars, stat = self._sampler.init(**kwargs)
 
         # setup proposal variables
-        npars = len(pars)
         niter = self.niter
-        nelem = niter+1
-
-        proposals = np.zeros((nelem, npars), dtype=float)
-        proposals[0] = pars.copy()
-
-        stats = np.zeros(nelem, dtype=float)
-        stats[0] = stat
-
-        acceptflag = np.zeros(nelem, dtype=bool)
+        proposals, stats, acceptflag, start = self._allocate(pars, stat)
 
         # Iterations
         # - no burn in at present
@@ -223,50 +398,179 @@ class Walk():
         # tstart = time.time()
 
         try:
-            for ii in range(niter):
+            for ii in range(start, niter):
 
                 # progress_bar(ii, niter, tstart, self._sampler.__class__.__name__)
 
-                jump = ii+1
+                self._step(proposals, stats, acceptflag, ii + 1)
+                self._checkpoint(ii + 1)
+
+        finally:
+            self._sampler.tear_down()
+            self._close()
+            # progress_bar(niter, niter, tstart, self._sampler.__class__.__name__)
+
+        params = proposals.transpose()
+        return (stats, acceptflag, params)
 
-                current_params = proposals[ii]
-                current_stat = stats[ii]
+    def _allocate(self, pars, stat):
+        """Create the arrays used to store the chain.
+
+        Returns
+        -------
+        proposals, stats, acceptflag : ndarray
+            The arrays, which have niter + 1 rows, with the first row
+            containing the starting location.
+        start : int
+            The number of iterations that have already been run. This
+            is only non-zero when a chain stored in a file is
+            continued.
+        """
 
-                # Assume proposal is rejected by default
-                proposals[jump] = current_params
-                stats[jump] = current_stat
-                # acceptflag[jump] = False
+        if self.store is not None:
+            return self.store.open(pars, stat, self.niter)
 
-                # Draw a proposal
+        nelem = self.niter + 1
+        proposals = np.zeros((nelem, len(pars)), dtype=float)
+        proposals[0] = pars.copy()
 
-                try:
-                    proposed_params = self._sampler.draw(current_params)
-                except CovarError:
-                    error("Covariance matrix failed! " + str(proposed_params))
-                    # automatically reject if the covar is malformed
-                    self._sampler.reject()
-                    continue
+        stats = np.zeros(nelem, dtype=float)
+        stats[0] = stat
+
+        acceptflag = np.zeros(nelem, dtype=bool)
+        return proposals, stats, acceptflag, 0
 
-                proposed_params = np.asarray(proposed_params)
-                try:
-                    proposed_stat = self._sampler.calc_stat(proposed_params)
-                except LimitError:
-                    # automatically reject the proposal if outside hard limits
-                    self._sampler.reject()
+    def _checkpoint(self, jump):
+        """Iteration jump has been completed."""
+        if self.store is not None:
+            self.store.update(jump)
+
+    def _close(self):
+        """The chain has finished or been stopped."""
+        if self.store is not None:
+            self.store.close()
+
+    def _step(self, proposals, stats, acceptflag, jump):
+        """Run iteration jump of the chain."""
+
+        current_params = proposals[jump - 1]
+        current_stat = stats[jump - 1]
+
+        # Assume proposal is rejected by default
+        proposals[jump] = current_params
+        stats[jump] = current_stat
+        # acceptflag[jump] = False
+
+        # Draw a proposal
+
+        try:
+            proposed_params = self._sampler.draw(current_params)
+        except CovarError:
+            error("Covariance matrix failed! " + str(current_params))
+            # automatically reject if the covar is malformed
+            self._sampler.reject()
+            return
+
+        proposed_params = np.asarray(proposed_params)
+        try:
+            proposed_stat = self._sampler.calc_stat(proposed_params)
+        except LimitError:
+            # automatically reject the proposal if outside hard limits
+            self._sampler.reject()
+            return
+
+        # Accept this proposal?
+        if self._sampler.accept(current_params, current_stat,
+                                proposed_params, proposed_stat):
+            proposals[jump] = proposed_params
+            stats[jump] = proposed_stat
+            acceptflag[jump] = True
+
+        else:
+            self._sampler.reject()
+
+    def _walk_blocks(self, **kwargs):
+        """Run the chain, evaluating independent proposals in blocks.
+
+        The random numbers are used in the same order as the serial
+        version, so the chain is unchanged. Each block contains the
+        proposals up to, but not including, the first one that
+        depends on the current position (which is then run as a
+        single step). Since a proposal outside the parameter limits
+        does not draw a random number to decide whether to accept it,
+        the random state is restored to the point after the
+        proposal, and the rest of the block is discarded.
+        """
+
+        sampler = self._sampler
+        pars, stat = sampler.init(**kwargs)
+
+        niter = self.niter
+        proposals, stats, acceptflag, start = self._allocate(pars, stat)
+
+        def calc_stat(proposal):
+            # Return the parameter values since calc_stat can change
+            # them.
+            try:
+                return sampler.calc_stat(proposal), proposal
+            except LimitError:
+                return None, proposal
+
+        def run(evaluate):
+            jump = start + 1
+            while jump <= niter:
+                block = sampler.draw_block(min(self.blocksize,
+                                               niter - jump + 1))
+                if len(block) == 0:
+                    self._step(proposals, stats, acceptflag, jump)
+                    self._checkpoint(jump)
+                    jump += 1
                     continue
 
-                # Accept this proposal?
-                if self._sampler.accept(current_params, current_stat,
-                                        proposed_params, proposed_stat):
-                    proposals[jump] = proposed_params
-                    stats[jump] = proposed_stat
-                    acceptflag[jump] = True
+                results = evaluate([np.asarray(b[0]) for b in block])
+                nused = 0
+                for (_, state, u), (proposed_stat, proposed_params) in \
+                        zip(block, results):
+
+                    nused += 1
+                    current_params = proposals[jump - 1]
+                    current_stat = stats[jump - 1]
+                    proposals[jump] = current_params
+                    stats[jump] = current_stat
+
+                    if proposed_stat is None:
+                        sampler.reject()
+                        np.random.set_state(state)
+                        jump += 1
+                        break
+
+                    alpha = sampler.accept_func(current_params, current_stat,
+                                                proposed_params,
+                                                proposed_stat)
+                    if u <= alpha:
+                        proposals[jump] = proposed_params
+                        stats[jump] = proposed_stat
+                        acceptflag[jump] = True
+                    else:
+                        sampler.reject()
+
+                    jump += 1
+
+                # Only the proposals before a rejected one are used.
+                sampler.record_block(nused)
+
+                # The random state is only valid at the end of a block.
+                self._checkpoint(jump - 1)
 
-                else:
-                    self._sampler.reject()
+        try:
+            if self.mapper is None:
+                run(lambda args: [calc_stat(arg) for arg in args])
+            else:
+                with self.mapper(calc_stat) as evaluate:
+                    run(evaluate)
         finally:
-            self._sampler.tear_down()
-            # progress_bar(niter, niter, tstart, self._sampler.__class__.__name__)
+            sampler.tear_down()
+            self._close()
 
         params = proposals.transpose()
         return (stats, acceptflag, params)
@@ -472,6 +776,65 @@ class MH(Sampler):
         self.accept_func = self.accept_mh
         return proposal
 
+    def draw_block(self, size):
+        """Draw the proposals that do not depend on the current position.
+
+        This is used by `Walk` to evaluate several proposals at once.
+        The proposals are drawn until size have been created or the
+        next proposal would depend on the current position of the
+        chain, in which case the random state is reset so that the
+        next call to `draw` re-creates it.
+
+        Parameters
+        ----------
+        size : int
+            The maximum number of proposals.
+
+        Returns
+        -------
+        block : list of (proposal, state, u)
+            The proposal, the random state after the proposal was
+            drawn, and the random number used to accept or reject it.
+
+        """
+
+        block = []
+        while len(block) < size:
+            proposal = self._draw_independent()
+            if proposal is None:
+                break
+
+            state = np.random.get_state()
+            u = np.random.uniform(0, 1, 1)
+            block.append((proposal, state, u))
+
+        return block
+
+    def record_block(self, nused):
+        """Record how many proposals from the last block were used.
+
+        The proposals after the first one outside the parameter
+        limits are discarded by `Walk`, and re-drawn later.
+
+        Parameters
+        ----------
+        nused : int
+            The number of proposals used from the block returned by
+            the last call to `draw_block`.
+
+        """
+        pass
+
+    def _draw_independent(self):
+        """Return a proposal if it does not depend on the current position.
+
+        If it does then None is returned and the random state is not
+        changed.
+        """
+        proposal = self.mh(None)
+        self.accept_func = self.accept_mh
+        return proposal
+
     def mh(self, current):
         """ MH jumping rule """
 
@@ -569,6 +932,20 @@ class MetropolisMH(MH):
 
         return proposal
 
+    def _draw_independent(self):
+        state = np.random.get_state()
+        u = np.random.uniform(0, 1, 1)
+        if u <= self.p_M:
+            np.random.set_state(state)
+            return None
+
+        return MH._draw_independent(self)
+
+    def record_block(self, nused):
+        # The proposals in a block all use the Metropolis-Hastings
+        # jumping rule.
+        self.num_mh += nused
+
     def metropolis(self, current):
         """ Metropolis Jumping Rule """
 
@@ -541,14 +541,16 @@ class Evaluate():
     python3 failing to execute the code.
 
     Note that this does not guarantee to reset the model
-    parameters after being run.
+    parameters after being run. The data values used by the
+    statistic are calculated once, when the object is created.
     """
     def __init__(self, fit):
         self.fit = fit
+        self.context = fit.stat.get_fit_context(fit.data, fit.model)
 
     def __call__(self, sample):
         self.fit.model.thawedpars = sample
-        return self.fit.calc_stat()
+        return self.fit.stat.calc_stat_from_context(self.context)[0]
 
 
 def _sample_stat(fit, samples, numcores=None, cache=True):
@@ -19,6 +19,7 @@
 
 from collections import namedtuple
 import logging
+import pickle
 
 import numpy
 import pytest
@@ -261,3 +262,315 @@ def test_metropolisMH(setup):
         stats, accept, params = mcmc.get_draws(setup.fit, cov, niter=1e2)
     finally:
         log.setLevel(level)
+
+
+def limited_stat(pars):
+    """A gaussian log-likelihood which rejects large first parameters."""
+    if pars[0] > 0.5:
+        raise sim.LimitError('out of bounds')
+    return -0.5 * numpy.sum(pars * pars)
+
+
+@pytest.mark.parametrize("sampler", [sim.MH, sim.MetropolisMH])
+@pytest.mark.parametrize("blocksize", [1, 7, 200])
+def test_walk_blocks_matches_serial(sampler, blocksize):
+    """The chain does not depend on the blocksize."""
+
+    mu = numpy.asarray([0.1, -0.2, 0.3])
+    sigma = numpy.diag([0.4, 0.2, 0.3])
+
+    def run(blocksize):
+        numpy.random.seed(2384)
+        walk = sim.Walk(sampler(limited_stat, sigma, mu, 3), 150,
+                        blocksize=blocksize)
+        return walk(p_M=0.2) if sampler is sim.MetropolisMH else walk()
+
+    expected = run(None)
+    got = run(blocksize)
+
+    # Check the limit is triggered.
+    assert expected[2][0].max() <= 0.5
+    assert expected[1].sum() > 10
+
+    for e, g in zip(expected, got):
+        assert g == pytest.approx(e, rel=0, abs=0)
+
+
+@pytest.mark.parametrize("blocksize", [7, 200])
+def test_walk_blocks_counts(blocksize):
+    """Discarded proposals are not counted."""
+
+    mu = numpy.asarray([0.1, -0.2, 0.3])
+    sigma = numpy.diag([0.4, 0.2, 0.3])
+
+    def run(blocksize):
+        numpy.random.seed(2384)
+        sampler = sim.MetropolisMH(limited_stat, sigma, mu, 3)
+        sim.Walk(sampler, 150, blocksize=blocksize)(p_M=0.2)
+        return sampler.num_mh, sampler.num_metropolis
+
+    expected = run(None)
+    assert sum(expected) == 150
+    assert run(blocksize) == expected
+
+
+def test_get_draws_blocksize(setup):
+    """The chain is the same when run in parallel."""
+
+    setup.fit.method = NelderMead()
+    setup.fit.stat = Cash()
+    setup.fit.fit()
+    cov = setup.fit.est_errors().extra_output
+
+    mcmc = sim.MCMC()
+    mcmc.set_sampler('MH')
+
+    log = logging.getLogger("sherpa")
+    level = log.level
+    log.setLevel(logging.ERROR)
+    try:
+        numpy.random.seed(2372)
+        expected = mcmc.get_draws(setup.fit, cov, niter=50)
+
+        numpy.random.seed(2372)
+        got = mcmc.get_draws(setup.fit, cov, niter=50, blocksize=20,
+                             numcores=2)
+    finally:
+        log.setLevel(level)
+
+    for e, g in zip(expected, got):
+        assert g == pytest.approx(e)
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.mark.parametrize("sampler", [sim.MH, sim.MetropolisMH])
+@pytest.mark.parametrize("blocksize", [None, 7])
+def test_walk_chainfile_resume(sampler, blocksize, tmp_path):
+    """A chain which is stopped can be continued."""
+
+    mu = numpy.asarray([0.1, -0.2, 0.3])
+    sigma = numpy.diag([0.4, 0.2, 0.3])
+    niter = 150
+    filename = str(tmp_path / 'chain.npy')
+
+    def run(stat, store=None):
+        numpy.random.seed(2384)
+        walk = sim.Walk(sampler(stat, sigma, mu, 3), niter,
+                        blocksize=blocksize)
+        walk.store = store
+        return walk(p_M=0.2) if sampler is sim.MetropolisMH else walk()
+
+    ncalls = [0]
+
+    def crash_stat(pars):
+        ncalls[0] += 1
+        if ncalls[0] > 100:
+            raise Crash()
+        return limited_stat(pars)
+
+    expected = run(limited_stat)
+
+    with pytest.raises(Crash):
+        run(crash_stat, sim.ChainFile(filename, flush=10))
+
+    # Only part of the chain was run.
+    with numpy.load(filename + '.state.npz') as state:
+        assert 0 < state['nrows'] < niter
+
+    # The random seed is over-written by the saved state.
+    got = run(limited_stat, sim.ChainFile(filename, flush=10))
+    for e, g in zip(expected, got):
+        assert g == pytest.approx(e, rel=0, abs=0)
+
+    saved = numpy.load(filename)
+    assert saved['stat'] == pytest.approx(expected[0], rel=0, abs=0)
+    assert saved['accept'] == pytest.approx(expected[1], rel=0, abs=0)
+    assert saved['params'] == pytest.approx(expected[2].T, rel=0, abs=0)
+
+    # A completed chain is not re-run: only the starting location is
+    # evaluated.
+    ncalls[0] = 99
+    got = run(crash_stat, sim.ChainFile(filename))
+    for e, g in zip(expected, got):
+        assert g == pytest.approx(e, rel=0, abs=0)
+
+
+def test_walk_chainfile_mismatch(tmp_path):
+
+    mu = numpy.asarray([0.1, -0.2, 0.3])
+    sigma = numpy.diag([0.4, 0.2, 0.3])
+    filename = str(tmp_path / 'chain')
+
+    walk = sim.Walk(sim.MH(limited_stat, sigma, mu, 3), 20)
+    walk.store = sim.ChainFile(filename)
+    walk()
+    assert walk.store.filename == filename + '.npy'
+
+    walk = sim.Walk(sim.MH(limited_stat, sigma, mu, 3), 30)
+    walk.store = sim.ChainFile(filename)
+    with pytest.raises(ValueError, match='does not match'):
+        walk()
+
+
+def test_chainfile_invalid_flush():
+    with pytest.raises(ValueError, match='^flush must be >= 1, not 0$'):
+        sim.ChainFile('chain.npy', flush=0)
+
+
+def test_get_draws_filename(setup, tmp_path):
+    """The chain is the same when written to a file."""
+
+    setup.fit.method = NelderMead()
+    setup.fit.stat = Cash()
+    setup.fit.fit()
+    cov = setup.fit.est_errors().extra_output
+
+    mcmc = sim.MCMC()
+    mcmc.set_sampler('MH')
+    filename = str(tmp_path / 'chain.npy')
+
+    log = logging.getLogger("sherpa")
+    level = log.level
+    log.setLevel(logging.ERROR)
+    try:
+        numpy.random.seed(2372)
+        expected = mcmc.get_draws(setup.fit, cov, niter=50)
+
+        numpy.random.seed(2372)
+        got = mcmc.get_draws(setup.fit, cov, niter=50, filename=filename)
+    finally:
+        log.setLevel(level)
+
+    for e, g in zip(expected, got):
+        assert g == pytest.approx(e)
+
+    assert numpy.load(filename)['stat'] == pytest.approx(-0.5 * expected[0])
+
+
+@pytest.mark.parametrize("numcores", [1, 2])
+def test_get_draws_nchains(setup, numcores):
+    """Run several chains."""
+
+    setup.fit.method = NelderMead()
+    setup.fit.stat = Cash()
+    setup.fit.fit()
+    cov = setup.fit.est_errors().extra_output
+    npars = len(setup.fit.model.thawedpars)
+
+    mcmc = sim.MCMC()
+
+    log = logging.getLogger("sherpa")
+    level = log.level
+    log.setLevel(logging.ERROR)
+    try:
+        numpy.random.seed(9823)
+        stats, accept, params = mcmc.get_draws(setup.fit, cov, niter=40,
+                                               nchains=3, numcores=numcores)
+    finally:
+        log.setLevel(level)
+
+    assert stats.shape == (3, 41)
+    assert accept.shape == (3, 41)
+    assert params.shape == (3, npars, 41)
+
+    # The chains start at the same place but are different.
+    assert params[0, :, 0] == pytest.approx(params[1, :, 0])
+    assert params[0, :, 0] == pytest.approx(params[2, :, 0])
+    assert not numpy.all(params[0] == params[1])
+
+    assert mcmc.diagnostics['rhat'].shape == (npars, )
+    assert mcmc.diagnostics['ess'].shape == (npars, )
+
+    # The parameter values are not changed.
+    assert setup.fit.model.thawedpars == pytest.approx(params[0, :, 0])
+
+
+def test_get_draws_nchains_picklable(setup):
+    """The chains can be sent to the persistent worker pool."""
+
+    setup.fit.method = NelderMead()
+    setup.fit.stat = Cash()
+    setup.fit.fit()
+    cov = setup.fit.est_errors().extra_output
+
+    runner = sim._ChainRunner(sim.MCMC(), setup.fit, cov, 10, True, None)
+    copy = pickle.loads(pickle.dumps(runner))
+
+    log = logging.getLogger("sherpa")
+    level = log.level
+    log.setLevel(logging.ERROR)
+    try:
+        expected = runner((2843, None))
+        got = copy((2843, None))
+    finally:
+        log.setLevel(level)
+
+    for e, g in zip(expected, got):
+        assert g == pytest.approx(e)
+
+
+def test_get_draws_nchains_reproducible(setup):
+
+    setup.fit.method = NelderMead()
+    setup.fit.stat = Cash()
+    setup.fit.fit()
+    cov = setup.fit.est_errors().extra_output
+
+    mcmc = sim.MCMC()
+
+    log = logging.getLogger("sherpa")
+    level = log.level
+    log.setLevel(logging.ERROR)
+    try:
+        numpy.random.seed(9823)
+        expected = mcmc.get_draws(setup.fit, cov, niter=20, nchains=2,
+                                  numcores=1)
+        numpy.random.seed(9823)
+        got = mcmc.get_draws(setup.fit, cov, niter=20, nchains=2,
+                             numcores=2)
+    finally:
+        log.setLevel(level)
+
+    for e, g in zip(expected, got):
+        assert g == pytest.approx(e)
+
+
+def test_rhat_ess_iid():
+    """Independent draws have rhat ~ 1 and ess ~ the number of draws."""
+
+    rng = numpy.random.RandomState(3927)
+    chains = rng.normal(size=(4, 2, 2000))
+    assert sim.rhat(chains) == pytest.approx([1, 1], abs=0.01)
+    assert sim.ess(chains) == pytest.approx([8000, 8000], rel=0.1)
+
+
+def test_rhat_ess_correlated():
+    """Check an AR(1) process, where the ess is known."""
+
+    rng = numpy.random.RandomState(83)
+    phi = 0.8
+    niter = 10000
+    chains = numpy.zeros((4, niter))
+    noise = rng.normal(size=(4, niter))
+    for i in range(1, niter):
+        chains[:, i] = phi * chains[:, i - 1] + noise[:, i]
+
+    expected = 4 * niter * (1 - phi) / (1 + phi)
+    assert sim.ess(chains) == pytest.approx(expected, rel=0.15)
+    assert sim.rhat(chains) == pytest.approx(1, abs=0.01)
+
+
+def test_rhat_not_converged():
+    rng = numpy.random.RandomState(23)
+    chains = rng.normal(size=(3, 500))
+    chains[0] += 2
+    assert sim.rhat(chains) > 1.2
+
+
+@pytest.mark.parametrize("func", [sim.rhat, sim.ess])
+def test_diagnostics_invalid(func):
+    with pytest.raises(ValueError):
+        func([1, 2, 3])
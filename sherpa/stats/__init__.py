@@ -33,7 +33,7 @@ from . import _statfcts
 from sherpa import get_config
 
 
-__all__ = ('Stat', 'Cash', 'CStat', 'LeastSq',
+__all__ = ('FitContext', 'Stat', 'Cash', 'CStat', 'LeastSq',
            'Chi2Gehrels', 'Chi2ConstVar', 'Chi2DataVar', 'Chi2ModVar',
            'Chi2XspecVar', 'Chi2',
            'UserStat', 'WStat')
@@ -54,6 +54,178 @@ if (bool(truncation_flag) is False or truncation_flag == "FALSE" or
     truncation_value = 1.0e-25
 
 
+def _batch_failed(flags):
+    """Raise the error used by the compiled statistics on failure."""
+
+    if numpy.any(flags):
+        raise ValueError("statistic calculation failed")
+
+
+def _calc_chi2_batch(data, models, staterror, syserror):
+    """The chi-square statistic for each row of models."""
+
+    err = staterror
+    if syserror is not None:
+        err = numpy.sqrt(staterror * staterror + syserror * syserror)
+
+    # As with the compiled code, bins with a zero error are not
+    # normalized.
+    err = numpy.where(err == 0, 1.0, err)
+    fvec = (models - data) / err
+    return numpy.sum(fvec * fvec, axis=1)
+
+
+def _calc_lsq_batch(data, models, staterror, syserror):
+    """The least-squares statistic for each row of models."""
+
+    fvec = models - data
+    return numpy.sum(fvec * fvec, axis=1)
+
+
+def _calc_chi2modvar_batch(data, models, staterror, syserror):
+    """The chi-square statistic, using model variance, for each row."""
+
+    err2 = numpy.maximum(models, 1.0)
+    if syserror is not None:
+        err2 = err2 + syserror * syserror
+
+    fvec = data - models
+    return numpy.sum(fvec * fvec / err2, axis=1)
+
+
+def _calc_cstat_batch(data, models, trunc_value):
+    """The CStat statistic for each row of models."""
+
+    _batch_failed(data < 0)
+    models = numpy.where(models > 0, models, trunc_value)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        fvec = models - data + data * numpy.log(data / models)
+
+    fvec = numpy.where(data > 0, fvec, models)
+    return 2.0 * numpy.sum(fvec, axis=1)
+
+
+def _calc_cash_batch(data, models, trunc_value):
+    """The Cash statistic for each row of models."""
+
+    # The compiled code fails for negative data values since it
+    # also calculates the CStat values.
+    _batch_failed(data < 0)
+    models = numpy.where(models > 0, models, trunc_value)
+    fvec = numpy.where(data == 0, models, models - data * numpy.log(models))
+    return 2.0 * numpy.sum(fvec, axis=1)
+
+
+def _calc_wstat_batch(data, models, exp_src, exp_bkg, data_bkg, backscales,
+                      trunc_value):
+    """The W statistic for each row of models.
+
+    This follows the compiled version, including the use of
+    trunc_value, rather than its logarithm, when a logarithm can
+    not be calculated.
+    """
+
+    def trunc_log(x):
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            return numpy.where(x <= 0, trunc_value, numpy.log(x))
+
+    bkg_time = exp_bkg * backscales
+    src_bkg_time = exp_src + bkg_time
+    ln_ts = numpy.log(exp_src / src_bkg_time)
+    ln_tb = numpy.log(bkg_time / src_bkg_time)
+
+    msubi = models / exp_src
+    src = data
+    bkg = data_bkg
+
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        # S_i = 0
+        nosrc = models - bkg * ln_tb
+
+        # B_i = 0
+        nobkg = numpy.where(msubi < src / src_bkg_time,
+                            -bkg_time * msubi - src * ln_ts,
+                            models + src * (numpy.log(src) -
+                                            trunc_log(models) - 1))
+
+        # the general case
+        raw = src + bkg
+        tmp1 = src_bkg_time * msubi - raw
+        tmp2 = src_bkg_time * bkg * msubi
+        dsubi = numpy.sqrt(tmp1 * tmp1 + 4.0 * tmp2)
+        fsubi = (raw - src_bkg_time * msubi + dsubi) / (2.0 * src_bkg_time)
+        both = models + src_bkg_time * fsubi - \
+            src * trunc_log(models + exp_src * fsubi) - \
+            bkg * trunc_log(bkg_time * fsubi) - \
+            src * (1.0 - numpy.log(src)) - bkg * (1.0 - numpy.log(bkg))
+
+    fvec = numpy.select([src == 0, bkg == 0], [nosrc, nobkg], both)
+    return 2.0 * numpy.sum(fvec, axis=1)
+
+
+class FitContext(NoNewAttributesAfterInit):
+    """The data-side values needed to evaluate a statistic.
+
+    Calculating the statistic requires the data, and related values
+    such as the errors, to be filtered and grouped, but this does not
+    change as the model parameters are varied. A context is created
+    by `Stat.get_fit_context` and can then be passed to
+    `Stat.calc_stat_from_context` for each set of parameter values, so
+    that only the model has to be evaluated.
+
+    The context must be re-created if the data changes, such as when
+    the filter, grouping, or the error values are changed.
+
+    Attributes
+    ----------
+    data : a DataSimulFit instance
+        The data sets to use.
+    model : a SimulFitModel instance
+        The model expressions for each data set.
+    dep, staterror, syserror : array, array or None, array or None
+        The values returned by ``data.to_fit``.
+    extra : dict
+        Any statistic-specific values (e.g. the background
+        values needed by `WStat`).
+    evaluator : object or None
+        If set, the object used to evaluate the model instead of
+        ``data``. It must provide an ``eval_model_to_fit`` method
+        that behaves like `sherpa.data.DataSimulFit.eval_model_to_fit`.
+        This allows the model evaluation to be done in parallel.
+
+    """
+
+    def __init__(self, data, model, dep, staterror=None, syserror=None,
+                 extra=None):
+        self.data = data
+        self.model = model
+        self.dep = dep
+        self.staterror = staterror
+        self.syserror = syserror
+        self.extra = {} if extra is None else extra
+        self.evaluator = None
+        NoNewAttributesAfterInit.__init__(self)
+
+    def __repr__(self):
+        return "<FitContext for '{}' with {} bins>".format(self.data.name,
+                                                            len(self.dep))
+
+    def eval_model(self):
+        """Evaluate the model for the data sets.
+
+        Returns
+        -------
+        modeldata : array of numbers
+            The model values, filtered and grouped to match the
+            ``dep`` attribute.
+        """
+
+        if self.evaluator is None:
+            return self.data.eval_model_to_fit(self.model)
+
+        return self.evaluator.eval_model_to_fit(self.model)
+
+
 class Stat(NoNewAttributesAfterInit):
     """The base class for calculating a statistic given data and model."""
 
@@ -199,12 +371,161 @@ class Stat(NoNewAttributesAfterInit):
         self._check_sizes_match(data, model)
         return data, model
 
-    def _get_fit_model_data(self, data, model):
+    def get_fit_context(self, data, model):
+        """Validate and cache the data values needed by the statistic.
+
+        Parameters
+        ----------
+        data : a Data or DataSimulFit instance
+            The data set, or sets, to use.
+        model : a Model or SimulFitModel instance
+            The model expression, or expressions. If a SimulFitModel
+            is given then it must match the number of data sets in the
+            data parameter.
+
+        Returns
+        -------
+        context : FitContext instance
+            The filtered and grouped data values, for use with
+            `calc_stat_from_context`.
+
+        See Also
+        --------
+        calc_stat_from_context
+
+        """
+
         data, model = self._validate_inputs(data, model)
-        fitdata = data.to_fit(staterrfunc=self.calc_staterror)
-        modeldata = data.eval_model_to_fit(model)
+        dep, staterror, syserror = data.to_fit(
+            staterrfunc=self.calc_staterror)
+        return FitContext(data, model, dep, staterror, syserror)
+
+    def calc_stat_from_context(self, context):
+        """Return the statistic value using pre-calculated data values.
+
+        This is equivalent to ``calc_stat(data, model)`` but only the
+        model is evaluated, since the data values are taken from the
+        context.
+
+        Parameters
+        ----------
+        context : FitContext instance
+            The value returned by `get_fit_context`.
+
+        Returns
+        -------
+        statval, fvec : number, array of numbers
+            The statistic value and the per-bin "statistic" value.
+
+        See Also
+        --------
+        calc_stat, get_fit_context
+
+        Notes
+        -----
+        Classes which over-ride `calc_stat` - rather than
+        `_calc_stat_from_context` - do not benefit from the context,
+        and `calc_stat` is called with the context data and model.
+
+        """
+
+        if type(self).calc_stat is not Stat.calc_stat:
+            return self.calc_stat(context.data, context.model)
+
+        modeldata = context.eval_model()
+        return self._calc_stat_from_context(context, modeldata)
+
+    def _calc_stat_from_context(self, context, modeldata):
+        """Calculate the statistic given the context and model values.
+
+        Parameters
+        ----------
+        context : FitContext instance
+            The data values.
+        modeldata : array of numbers
+            The model evaluated for the data sets in the context.
+
+        Returns
+        -------
+        statval, fvec : number, array of numbers
+            The statistic value and the per-bin "statistic" value.
+
+        """
+
+        raise NotImplementedError
+
+    def calc_stat_batch(self, context, models):
+        """Return the statistic values for multiple model evaluations.
+
+        .. versionadded:: 4.14.0
+
+        Parameters
+        ----------
+        context : FitContext instance
+            The value returned by `get_fit_context`.
+        models : array_like
+            The model values, with shape (nsamples, nbins), where
+            each row matches the ``dep`` attribute of the context
+            (that is, it has been filtered and grouped).
+
+        Returns
+        -------
+        statvals : ndarray
+            The statistic value for each row of models.
+
+        See Also
+        --------
+        calc_stat_from_context, get_fit_context
+
+        Notes
+        -----
+        The per-bin values are not calculated. The `Chi2`, `Cash`,
+        `CStat`, and `WStat` statistics (and the variants of
+        `Chi2`) evaluate all the rows at once, otherwise each row is
+        sent to `calc_stat_from_context`. Classes which over-ride
+        `calc_stat` are not supported.
+
+        Examples
+        --------
+
+        Calculate the statistic for several amplitudes of a
+        constant model:
 
-        return fitdata, modeldata
+        >>> context = stat.get_fit_context(data, mdl)
+        >>> models = numpy.outer([1, 2, 3], numpy.ones(data.y.size))
+        >>> stat.calc_stat_batch(context, models)
+
+        """
+
+        models = numpy.asarray(models, dtype=numpy.float64)
+        if models.ndim != 2 or models.shape[1] != len(context.dep):
+            raise TypeError("statistic input array sizes do not match")
+
+        if type(self).calc_stat is not Stat.calc_stat:
+            raise NotImplementedError("calc_stat_batch is not supported " +
+                                      "by the {} statistic".format(self.name))
+
+        return self._calc_stat_batch(context, models)
+
+    def _calc_stat_batch(self, context, models):
+        """Calculate the statistic for each row of models.
+
+        Parameters
+        ----------
+        context : FitContext instance
+            The data values.
+        models : 2D array of numbers
+            The model values for each sample.
+
+        Returns
+        -------
+        statvals : array of numbers
+
+        """
+
+        statvals = [self._calc_stat_from_context(context, mvals)[0]
+                    for mvals in models]
+        return numpy.asarray(statvals)
 
     # TODO:
     #  - should this accept sherpa.data.Data input instead of
@@ -247,9 +568,15 @@ class Stat(NoNewAttributesAfterInit):
         statval, fvec : number, array of numbers
             The statistic value and the per-bin "statistic" value.
 
+        See Also
+        --------
+        calc_stat_from_context
+
         """
 
-        raise NotImplementedError
+        context = self.get_fit_context(data, model)
+        modeldata = context.eval_model()
+        return self._calc_stat_from_context(context, modeldata)
 
     def goodness_of_fit(self, statval, dof):
         """Return the reduced statistic and q value.
@@ -327,12 +654,17 @@ class Likelihood(Stat):
         self._check_background_subtraction(data)
         return data, model
 
-    def calc_stat(self, data, model):
-        fitdata, modeldata = self._get_fit_model_data(data, model)
-
-        return self._calc(fitdata[0], modeldata, None,
+    def _calc_stat_from_context(self, context, modeldata):
+        return self._calc(context.dep, modeldata, None,
                           truncation_value)
 
+    def _calc_stat_batch(self, context, models):
+        func = _likelihood_batch.get(self._calc)
+        if func is None:
+            return Stat._calc_stat_batch(self, context, models)
+
+        return func(context.dep, models, truncation_value)
+
 
 # DOC-TODO: where is the truncate/trunc_value stored for objects
 #           AHA: it appears to be taken straight from the config
@@ -555,14 +887,20 @@ class Chi2(Stat):
     def calc_staterror(data):
         raise StatErr('chi2noerr')
 
-    def calc_stat(self, data, model):
-        fitdata, modeldata = self._get_fit_model_data(data, model)
-
-        return self._calc(fitdata[0], modeldata,
-                          fitdata[1], fitdata[2],
+    def _calc_stat_from_context(self, context, modeldata):
+        return self._calc(context.dep, modeldata,
+                          context.staterror, context.syserror,
                           None,  # TODO: weights
                           truncation_value)
 
+    def _calc_stat_batch(self, context, models):
+        func = _chi2_batch.get(self._calc)
+        if func is None or context.staterror is None:
+            return Stat._calc_stat_batch(self, context, models)
+
+        return func(context.dep, models, context.staterror,
+                    context.syserror)
+
     def calc_chisqr(self, data, model):
         """Return the chi-square value for each bin.
 
@@ -854,16 +1192,17 @@ class UserStat(Stat):
             raise StatErr('nostat', self.name, 'calc_staterror()')
         return self.errfunc(data)
 
-    def calc_stat(self, data, model):
+    def get_fit_context(self, data, model):
         if not self._statfuncset:
             raise StatErr('nostat', self.name, 'calc_stat()')
 
-        fitdata, modeldata = self._get_fit_model_data(data, model)
+        return Stat.get_fit_context(self, data, model)
 
-        return self.statfunc(fitdata[0],
+    def _calc_stat_from_context(self, context, modeldata):
+        return self.statfunc(context.dep,
                              modeldata,
-                             staterror=fitdata[1],
-                             syserror=fitdata[2],
+                             staterror=context.staterror,
+                             syserror=context.syserror,
                              weight=None)  # TODO weights
 
 
@@ -935,7 +1274,7 @@ class WStat(Likelihood):
     def __init__(self, name='wstat'):
         Likelihood.__init__(self, name)
 
-    def calc_stat(self, data, model):
+    def get_fit_context(self, data, model):
 
         data, model = self._validate_inputs(data, model)
 
@@ -950,7 +1289,6 @@ class WStat(Likelihood):
         # original code used this approach.
         #
         data_src = []
-        data_model = data.eval_model_to_fit(model)
         data_bkg = []
         nelems = []
         exp_src = []
@@ -1041,13 +1379,35 @@ class WStat(Likelihood):
 
             exp_bkg.append(bset.exposure * ascal)
 
-        data_src = numpy.concatenate(data_src)
-        exp_src = numpy.concatenate(exp_src)
-        exp_bkg = numpy.concatenate(exp_bkg)
-        data_bkg = numpy.concatenate(data_bkg)
-        backscales = numpy.concatenate(backscales)
+        extra = {'nelems': nelems,
+                 'exp_src': numpy.concatenate(exp_src),
+                 'exp_bkg': numpy.concatenate(exp_bkg),
+                 'data_bkg': numpy.concatenate(data_bkg),
+                 'backscales': numpy.concatenate(backscales)}
 
-        return self._calc(data_src, data_model, nelems,
-                          exp_src, exp_bkg,
-                          data_bkg, backscales,
+        return FitContext(data, model, numpy.concatenate(data_src),
+                          extra=extra)
+
+    def _calc_stat_from_context(self, context, modeldata):
+        extra = context.extra
+        return self._calc(context.dep, modeldata, extra['nelems'],
+                          extra['exp_src'], extra['exp_bkg'],
+                          extra['data_bkg'], extra['backscales'],
                           truncation_value)
+
+    def _calc_stat_batch(self, context, models):
+        extra = context.extra
+        return _calc_wstat_batch(context.dep, models, extra['exp_src'],
+                                 extra['exp_bkg'], extra['data_bkg'],
+                                 extra['backscales'], truncation_value)
+
+
+# The vectorised versions of the compiled statistics, used by
+# calc_stat_batch.
+#
+_likelihood_batch = {_statfcts.calc_cash_stat: _calc_cash_batch,
+                     _statfcts.calc_cstat_stat: _calc_cstat_batch}
+
+_chi2_batch = {_statfcts.calc_chi2_stat: _calc_chi2_batch,
+               _statfcts.calc_lsq_stat: _calc_lsq_batch,
+               _statfcts.calc_chi2modvar_stat: _calc_chi2modvar_batch}
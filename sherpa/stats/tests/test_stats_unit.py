@@ -54,7 +54,9 @@ from sherpa.astro.models import Lorentz2D
 from sherpa.utils.err import FitErr, StatErr
 
 from sherpa.stats import LeastSq, Chi2, Chi2Gehrels, Chi2DataVar, \
-    Chi2ConstVar, Chi2ModVar, Chi2XspecVar, Cash, CStat, WStat, UserStat
+    Chi2ConstVar, Chi2ModVar, Chi2XspecVar, Cash, CStat, WStat, UserStat, \
+    FitContext, _statfcts
+from sherpa import stats
 
 
 def setup_single(stat, sys):
@@ -1343,3 +1345,151 @@ def test_stats_calc_stat_pha_multi(stat, usestat, usesys,
     # correct for the one missing bin in the second dataset
     expected = 2 * expected1 - delta
     assert_almost_equal(answer, expected)
+
+
+@pytest.mark.parametrize("stat,usestat,usesys,havebg,usebg", [
+    (LeastSq, True, True, True, True),
+    (Chi2, True, True, True, True),
+    (Chi2Gehrels, False, False, True, True),
+    (Chi2ModVar, False, False, False, False),
+    (Cash, False, False, False, False),
+    (CStat, True, True, False, False),
+    (WStat, False, False, True, False),
+])
+def test_stats_calc_stat_from_context(stat, usestat, usesys, havebg, usebg):
+    """The fit context gives the same answer as calc_stat"""
+
+    data, model = setup_multiple_pha(usestat, usesys, background=havebg)
+    if usebg:
+        for dset in data.datasets:
+            dset.subtract()
+
+    statobj = stat()
+    context = statobj.get_fit_context(data, model)
+    assert isinstance(context, FitContext)
+    assert context.dep.size == 5
+
+    # Change the model parameters after the context has been created
+    # to check the model is re-evaluated but the data is not.
+    #
+    for c0 in [7.9, 2.3, 12.4]:
+        model.parts[0].parts[1].c0 = c0
+        expected = statobj.calc_stat(data, model)
+        answer = statobj.calc_stat_from_context(context)
+        assert_almost_equal(answer[0], expected[0])
+        assert_almost_equal(answer[1], expected[1])
+
+
+def test_stats_calc_stat_from_context_override():
+    """A class which over-rides calc_stat does not use the context"""
+
+    class MyStat(LeastSq):
+
+        def calc_stat(self, data, model):
+            return 2.0, np.ones(2)
+
+    data, model = setup_single(True, False)
+    statobj = MyStat()
+    context = statobj.get_fit_context(data, model)
+    answer, fvec = statobj.calc_stat_from_context(context)
+    assert answer == pytest.approx(2.0)
+    assert_equal(fvec, [1, 1])
+
+
+@pytest.mark.parametrize("stat,usestat,usesys,havebg,usebg", [
+    (LeastSq, True, True, True, True),
+    (Chi2, True, True, True, True),
+    (Chi2, True, False, True, True),
+    (Chi2Gehrels, False, False, True, True),
+    (Chi2ModVar, False, True, False, False),
+    (Cash, False, False, False, False),
+    (CStat, True, True, False, False),
+    (WStat, False, False, True, False),
+    (UserStat, False, False, False, False)
+])
+def test_stats_calc_stat_batch(stat, usestat, usesys, havebg, usebg):
+    """The batch values match calc_stat_from_context"""
+
+    data, model = setup_multiple_pha(usestat, usesys, background=havebg)
+    if usebg:
+        for dset in data.datasets:
+            dset.subtract()
+
+    if stat == UserStat:
+        statobj = UserStat(statfunc=lambda d, m, **kw: (np.sum(d * m), d * m),
+                           errfunc=np.ones_like)
+    else:
+        statobj = stat()
+
+    context = statobj.get_fit_context(data, model)
+    mvals = context.eval_model()
+
+    # Include model values which are zero or negative.
+    scales = np.asarray([0.5, 1, 2.5, 0])
+    models = np.outer(scales, mvals)
+    models[0, 1] = 0
+    models[2, 0] = -1
+
+    answer = statobj.calc_stat_batch(context, models)
+    assert answer.shape == (4, )
+
+    expected = [statobj._calc_stat_from_context(context, m)[0]
+                for m in models]
+    assert answer == pytest.approx(expected, rel=1e-12)
+
+
+@pytest.mark.parametrize("models", [np.ones(5), np.ones((2, 4))])
+def test_stats_calc_stat_batch_invalid_size(models):
+
+    data, model = setup_multiple_pha(True, False)
+    statobj = Chi2()
+    context = statobj.get_fit_context(data, model)
+    with pytest.raises(TypeError,
+                       match='^statistic input array sizes do not match$'):
+        statobj.calc_stat_batch(context, models)
+
+
+def test_stats_calc_stat_batch_override():
+    """A class which over-rides calc_stat can not be batched"""
+
+    class MyStat(LeastSq):
+
+        def calc_stat(self, data, model):
+            return 2.0, np.ones(2)
+
+    data, model = setup_single(True, False)
+    statobj = MyStat()
+    context = statobj.get_fit_context(data, model)
+    with pytest.raises(NotImplementedError):
+        statobj.calc_stat_batch(context, np.ones((3, context.dep.size)))
+
+
+@pytest.mark.parametrize("stat", [Cash, CStat])
+def test_stats_calc_stat_batch_negative_data(stat):
+
+    data = Data1D('neg', np.asarray([1, 2, 3]), np.asarray([2, -1, 4]))
+    statobj = stat()
+    context = statobj.get_fit_context(data, Const1D())
+    with pytest.raises(ValueError,
+                       match='^statistic calculation failed$'):
+        statobj.calc_stat_batch(context, np.ones((2, 3)))
+
+
+def test_stats_wstat_batch_special_cases():
+    """Check the S_i and/or B_i = 0 cases of the W statistic."""
+
+    src = np.asarray([0, 0, 3, 3, 4, 5, 2])
+    bkg = np.asarray([0, 2, 0, 0, 3, 1, 7])
+    exp_src = np.full(7, 100.0)
+    exp_bkg = np.full(7, 400.0)
+    backscales = np.full(7, 0.8)
+
+    models = np.asarray([[0.1, 2, 0.001, 4, 3, 0, 2],
+                         [1, 0.5, 0.2, 0.02, 0, 5, 4]])
+    expected = [_statfcts.calc_wstat_stat(src, m, [7], exp_src, exp_bkg,
+                                          bkg, backscales, 1e-25)[0]
+                for m in models]
+
+    answer = stats._calc_wstat_batch(src, models, exp_src, exp_bkg, bkg,
+                                     backscales, 1e-25)
+    assert answer == pytest.approx(expected, rel=1e-12)
@@ -89,25 +89,31 @@
 # are just representative tests.
 #
 
+import sys
+import types
+
 import numpy as np
 from numpy.testing import assert_almost_equal
 
 import pytest
 
-from sherpa.fit import Fit, StatInfoResults
+from sherpa.fit import Fit, SimulFitEvaluator, StatInfoResults
 from sherpa.data import Data1D, DataSimulFit
 from sherpa.astro.data import DataPHA
 from sherpa.astro.instrument import create_delta_rmf
 from sherpa.models.model import SimulFitModel
-from sherpa.models.basic import Const1D, Gauss1D, Polynom1D, StepLo1D
+from sherpa.models.basic import Const1D, Gauss1D, Polynom1D, StepLo1D, \
+    UserModel
+from sherpa.models.parameter import Parameter
 from sherpa.utils.err import DataErr, EstErr, FitErr, StatErr
+from sherpa.utils.parallel import bound_pool, close_pool
 
 from sherpa.stats import LeastSq, Chi2, Chi2Gehrels, Chi2DataVar, \
     Chi2ConstVar, Chi2ModVar, Chi2XspecVar, Likelihood, \
     Cash, CStat, WStat, UserStat
 
 from sherpa.optmethods import LevMar, NelderMead, MonCar
-from sherpa.estmethods import Covariance, Confidence
+from sherpa.estmethods import Covariance, Confidence, Projection
 
 
 def setup_stat_single(stat, usestat, usesys):
@@ -2114,6 +2120,108 @@ def test_fit_multiple(stat, usestat, usesys, finalstat):
                         decimal=ndp)
 
 
+@pytest.mark.parametrize("stat,finalstat", [
+    (Chi2, fit_multi_chi2_tt),
+    (Cash, fit_multi_cash),
+    (CStat, fit_multi_cstat),
+])
+@pytest.mark.parametrize("numcores", [2, 3, None])
+def test_fit_multiple_numcores(stat, finalstat, numcores):
+    """Evaluating the models in parallel does not change the fit."""
+
+    fit, _ = setup_stat_multiple(stat(), True, True, 1)
+    fr = fit.fit(numcores=numcores)
+    assert fr.succeeded
+    assert_almost_equal(fr.statval, finalstat)
+
+    # The workers are released at the end of the fit.
+    assert fit._iterfit._context.evaluator is None
+
+    # A second fit reuses the worker processes. The likelihood fits
+    # are not well converged, so only check the statistic is close.
+    fit.model.parts[2].c0 = 1990
+    fr = fit.fit(numcores=numcores)
+    assert fr.succeeded
+    assert fr.statval == pytest.approx(finalstat)
+
+
+def test_simulfit_evaluator_nested():
+    """The evaluator can be used from other worker processes.
+
+    This happens when the optimiser evaluates the statistic in
+    parallel (e.g. LevMar with numcores > 1) during a fit which
+    evaluates the models in parallel. The workers can not share
+    the pipes to the model workers, so they evaluate the models
+    themselves.
+    """
+
+    fit, _ = setup_stat_multiple(Chi2(), True, True, 1)
+    evaluator = SimulFitEvaluator(fit.data, fit.model, 3)
+    try:
+        def evaluate(c0):
+            fit.model.parts[2].c0 = c0
+            return evaluator.eval_model_to_fit(fit.model)
+
+        c0s = np.linspace(1980, 2000, 8)
+        with bound_pool(evaluate, 4) as mapper:
+            got = mapper(c0s)
+
+        for c0, vals in zip(c0s, got):
+            assert vals == pytest.approx(evaluate(c0))
+
+    finally:
+        evaluator.close()
+
+
+def test_simulfit_numcores():
+    """simulfit with numcores matches the serial version."""
+
+    fit, fits = setup_stat_multiple(Chi2(), True, True, 1)
+    fr1 = fits[0].simulfit(fits[1], fits[2])
+
+    for mdl in fit.model.parts:
+        for par in mdl.pars:
+            par.reset()
+
+    fr2 = fits[0].simulfit(fits[1], fits[2], numcores=3)
+    assert fr2.succeeded
+    assert_almost_equal(fr2.statval, fr1.statval)
+    assert_almost_equal(fr2.parvals, fr1.parvals)
+
+
+def test_simulfit_numcores_redefined_model():
+    """A user model re-defined between fits uses the new code."""
+
+    session = types.ModuleType('sherpa_test_session')
+    sys.modules[session.__name__] = session
+    code = "def calc(p, x, *args, **kwargs):\n    return p[0] * x{}\n"
+
+    def fit_with(power, numcores):
+        exec(code.format(power), vars(session))
+        x = np.arange(1, 11)
+        fits = []
+        for scale in [2, 3]:
+            mdl = UserModel('m{}'.format(scale),
+                            (Parameter('m{}'.format(scale), 'a', 1), ))
+            mdl.calc = session.calc
+            data = Data1D('d', x, scale * x**2, np.ones(x.size))
+            fits.append(Fit(data, mdl, stat=Chi2()))
+
+        fr = fits[0].simulfit(fits[1], numcores=numcores)
+        assert fr.succeeded
+        return fr.parvals
+
+    try:
+        close_pool()
+        assert fit_with('', 2) == pytest.approx(fit_with('', 1))
+
+        # The workers were started with the original function.
+        assert fit_with(' * x', 2) == pytest.approx([2, 3])
+    finally:
+        del sys.modules[session.__name__]
+        close_pool()
+
+
 @pytest.mark.parametrize("method,estmethod,usestat,usesys", [
     (LevMar, Covariance, True, True),
     (NelderMead, Covariance, True, False),
@@ -2237,6 +2345,59 @@ def test_est_errors_single(stat, usestat, usesys):
     assert result.nfits == 0
 
 
+@pytest.mark.parametrize("stat", [Chi2, Chi2Gehrels, Cash, CStat])
+def test_est_errors_covar_numcores(stat):
+    """Evaluating the covariance in parallel gives the same answer."""
+
+    statobj = stat()
+    fit = setup_stat_single(statobj, stat in (Chi2, Chi2Gehrels), False)
+    fit.estmethod = Covariance()
+    fit.fit()
+
+    expected = fit.est_errors()
+    fit.estmethod.numcores = 2
+    result = fit.est_errors()
+
+    assert result.parmins == pytest.approx(expected.parmins)
+    assert result.parmaxes == pytest.approx(expected.parmaxes)
+    assert result.extra_output == pytest.approx(expected.extra_output)
+
+
+def test_est_errors_covar_jacobian():
+    """The J^T J approximation is close to the full calculation."""
+
+    x = np.arange(-5, 6)
+    y = np.asarray([3, 4, 8, 18, 33, 41, 35, 20, 9, 5, 2])
+    mdl = Gauss1D()
+    mdl.fwhm = 4
+    mdl.ampl = 40
+    fit = Fit(Data1D('test', x, y), mdl, stat=Chi2Gehrels(),
+              method=LevMar(), estmethod=Covariance())
+    fit.fit()
+
+    expected = fit.est_errors()
+    fit.estmethod.jacobian = True
+    result = fit.est_errors()
+
+    assert result.parmaxes == pytest.approx(expected.parmaxes, rel=0.15)
+
+
+@pytest.mark.parametrize("stat", [Cash, CStat])
+def test_est_errors_covar_jacobian_needs_chi2(stat):
+
+    fit = setup_stat_single(stat(), False, False)
+    fit.estmethod = Covariance()
+    fit.estmethod.jacobian = True
+    fit.fit()
+
+    with pytest.raises(FitErr) as excinfo:
+        fit.est_errors()
+
+    emsg = 'Jacobian covariance method requires a deviates array; ' + \
+        'use a chi-square  statistic'
+    assert str(excinfo.value) == emsg
+
+
 @pytest.mark.parametrize("stat", [Chi2, Chi2Gehrels, Cash, CStat])
 def test_est_errors_multiple(stat):
     """Check that the est_errors method works: multiple datasets, successful fit
@@ -2257,6 +2418,50 @@ def test_est_errors_multiple(stat):
     assert result.nfits == 0
 
 
+@pytest.mark.parametrize("estmethod", [Covariance, Confidence, Projection])
+@pytest.mark.parametrize("numcores", [1, 2])
+def test_est_errors_callback(estmethod, numcores):
+    """The callback is given the bounds of each parameter."""
+
+    x = np.arange(-5, 6)
+    y = np.asarray([3, 4, 8, 18, 33, 41, 35, 20, 9, 5, 2])
+    mdl = Gauss1D()
+    mdl.fwhm = 4
+    mdl.ampl = 40
+    fit = Fit(Data1D('test', x, y), mdl, stat=Chi2Gehrels(),
+              method=LevMar(), estmethod=estmethod())
+    fit.estmethod.numcores = numcores
+    fit.fit()
+
+    # Count the statistic evaluations to check that, when run in
+    # serial, each parameter is reported as soon as it is done.
+    nstat = [0]
+    calc_stat = fit.stat.calc_stat_from_context
+
+    def count(*args, **kwargs):
+        nstat[0] += 1
+        return calc_stat(*args, **kwargs)
+
+    fit.stat.calc_stat_from_context = count
+
+    reported = []
+    counts = []
+
+    def callback(*args):
+        reported.append(args)
+        counts.append(nstat[0])
+
+    result = fit.est_errors(callback=callback)
+
+    assert len(reported) == len(result.parnames)
+    if estmethod is not Covariance and numcores == 1:
+        assert counts == sorted(set(counts))
+    expected = dict(zip(result.parnames,
+                        zip(result.parmins, result.parmaxes)))
+    for par, lower, upper in reported:
+        assert (lower, upper) == pytest.approx(expected[par.fullname])
+
+
 @pytest.mark.parametrize("stat,scalar,usestat,usesys,filtflag", [
     (Chi2, False, True, True, False),
     (Chi2, False, True, True, True),
@@ -28,8 +28,9 @@ import numpy as np
 import pytest
 
 from sherpa.data import Data1D, Data2D
-from sherpa.instrument import PSFModel
-from sherpa.models.basic import Box1D, Box2D
+from sherpa.instrument import FFTWorkspace, PSFModel, get_halo_mask
+from sherpa.models.basic import Box1D, Box2D, Gauss2D, TableModel
+from sherpa.utils._psf import tcdData
 from sherpa.utils.err import PSFErr
 
 
@@ -311,3 +312,206 @@ def test_psf2d_kernel_model(caplog):
 
     assert ans.staterror is None
     assert ans.syserror is None
+
+
+@pytest.mark.parametrize("dshape,kshape,origin",
+                         [((20, ), (20, ), (10, )),
+                          ((20, ), (7, ), (3, )),
+                          ((7, ), (20, ), (3, )),
+                          ((12, 9), (5, 3), (2, 1)),
+                          ((12, 9), (12, 9), (6, 4)),
+                          ((10, 13), (4, 6), (0, 5))])
+def test_fft_workspace_matches_tcd(dshape, kshape, origin):
+    """The real-input FFT matches the TCD convolution."""
+
+    rng = np.random.RandomState(1)
+    data = rng.rand(np.prod(dshape))
+    kernel = rng.rand(np.prod(kshape))
+
+    expected = tcdData().convolve(data, kernel, dshape, kshape, origin)
+
+    fft = FFTWorkspace(dshape, kshape, origin)
+    assert not fft.has_kernel
+    fft.set_kernel(kernel)
+    assert fft.has_kernel
+    assert fft.convolve(data) == pytest.approx(expected)
+
+    # The padded buffer is re-used.
+    assert fft.convolve(data * 2) == pytest.approx(expected * 2)
+
+
+def test_fft_workspace_no_kernel():
+    fft = FFTWorkspace((10, ), (3, ), (1, ))
+    with pytest.raises(PSFErr):
+        fft.convolve(np.ones(10))
+
+
+def test_fft_workspace_invalid():
+    with pytest.raises(TypeError):
+        FFTWorkspace((10, 10), (3, ), (1, ))
+
+    fft = FFTWorkspace((10, ), (3, ), (1, ))
+    with pytest.raises(TypeError):
+        fft.set_kernel(np.ones(4))
+
+    fft.set_kernel(np.ones(3))
+    with pytest.raises(TypeError):
+        fft.convolve(np.ones(9))
+
+
+@pytest.mark.parametrize("use_rfft", [False, True])
+def test_psf2d_rfft(use_rfft):
+    """The PSF convolution does not depend on the FFT used."""
+
+    x1, x0 = np.mgrid[-5:6, -4:4]
+    x0 = x0.flatten()
+    x1 = x1.flatten()
+    kdata = np.exp(-0.5 * (x0 * x0 + x1 * x1) / 2)
+    kernel = Data2D('kernel', x0, x1, kdata, shape=(11, 8))
+
+    y1, y0 = np.mgrid[0:20, 0:15]
+    y0 = y0.flatten()
+    y1 = y1.flatten()
+    data = Data2D('data', y0, y1, np.zeros(y0.size), shape=(20, 15))
+
+    src = Gauss2D()
+    src.xpos = 6
+    src.ypos = 9
+    src.fwhm = 3
+
+    psf = PSFModel(kernel=kernel)
+    psf.fold(data)
+    psf.model.use_rfft = use_rfft
+    conv = psf(src)
+    got = conv(y0, y1)
+
+    psf.model.use_rfft = False
+    expected = psf.model.convolve(src(y0, y1), psf.model.dshape,
+                                  psf.model.kernel, psf.model.skshape)
+    assert got == pytest.approx(expected)
+    assert (psf.model._fft is not None) == use_rfft
+
+    # The kernel transform is only calculated once.
+    if use_rfft:
+        fft = psf.model._fft
+        assert conv(y0, y1) == pytest.approx(got)
+        assert psf.model._fft is fft
+
+
+@pytest.mark.parametrize("dshape,kshape,origin",
+                         [((30, 40), (8, 11), (4, 5)),
+                          ((30, 40), (8, 11), (0, 10)),
+                          ((20, 20), (20, 20), (3, 17))])
+def test_get_halo_mask(dshape, kshape, origin):
+    """The convolution at the selected pixels only needs the halo."""
+
+    rng = np.random.RandomState(2)
+    mask = rng.rand(np.prod(dshape)) < 0.02
+    halo = get_halo_mask(mask, dshape, kshape, origin)
+    assert halo[mask].all()
+
+    fft = FFTWorkspace(dshape, kshape, origin)
+    fft.set_kernel(rng.rand(np.prod(kshape)))
+    data = rng.rand(np.prod(dshape))
+    expected = fft.convolve(data)[mask]
+    assert fft.convolve(np.where(halo, data, 0))[mask] == \
+        pytest.approx(expected)
+
+
+def test_get_halo_mask_small():
+    """Check the footprint with an asymmetric origin."""
+
+    mask = np.zeros((5, 10), dtype=bool)
+    mask[2, 4] = True
+    halo = get_halo_mask(mask.ravel(), (10, 5), (3, 1), (0, 0))
+    expected = np.zeros((5, 10), dtype=bool)
+    expected[2, 2:5] = True
+    assert (halo == expected.ravel()).all()
+
+
+@pytest.mark.parametrize("use_rfft", [False, True])
+@pytest.mark.parametrize("xpos,cropped", [(3, False), (15, True)])
+def test_psf2d_halo(xpos, cropped, use_rfft):
+    """Only evaluating the model near the noticed pixels is exact."""
+
+    x1, x0 = np.mgrid[-5:6, -4:4]
+    x0 = x0.flatten()
+    x1 = x1.flatten()
+    kdata = np.exp(-0.5 * (x0 * x0 + x1 * x1) / 2)
+    kernel = Data2D('kernel', x0, x1, kdata, shape=(11, 8))
+
+    y1, y0 = np.mgrid[0:40, 0:30]
+    y0 = y0.flatten()
+    y1 = y1.flatten()
+
+    ans = []
+    for use_halo in [False, True]:
+        data = Data2D('data', y0, y1, np.zeros(y0.size), shape=(40, 30))
+        data.mask = (y0 - xpos)**2 + (y1 - 22)**2 < 9
+
+        src = Gauss2D()
+        src.xpos = xpos
+        src.ypos = 22
+        src.fwhm = 4
+
+        psf = PSFModel(kernel=kernel)
+        psf.fold(data)
+        psf.model.use_halo = use_halo
+        psf.model.use_rfft = use_rfft
+        ans.append(data.eval_model_to_fit(psf(src)))
+
+    # When xpos=3 the kernel footprint wraps around the edge of
+    # the image, so the full image is convolved.
+    halo, box = psf.model._halo[1]
+    assert halo.sum() < y0.size
+    assert (box is not None) == cropped
+
+    assert ans[0].max() > 0.1
+    assert ans[1] == pytest.approx(ans[0])
+
+
+def test_psf2d_halo_table_model():
+    """A model which needs the full grid is evaluated on the full grid."""
+
+    x1, x0 = np.mgrid[-2:3, -2:3]
+    kdata = np.exp(-0.5 * (x0 * x0 + x1 * x1)).flatten()
+    kernel = Data2D('kernel', x0.flatten(), x1.flatten(), kdata,
+                    shape=(5, 5))
+
+    y1, y0 = np.mgrid[0:40, 0:30]
+    y0 = y0.flatten()
+    y1 = y1.flatten()
+    mask = (y0 - 15)**2 + (y1 - 22)**2 < 25
+
+    tdata = np.exp(-0.5 * ((y0 - 15)**2 + (y1 - 20)**2) / 9)
+
+    ans = []
+    for use_halo in [False, True]:
+        data = Data2D('data', y0, y1, np.zeros(y0.size), shape=(40, 30))
+        data.mask = mask
+
+        tbl = TableModel()
+        tbl.load(None, tdata)
+        tbl.fold(data)
+
+        psf = PSFModel(kernel=kernel)
+        psf.fold(data)
+        psf.model.use_halo = use_halo
+        ans.append(data.eval_model_to_fit(psf(tbl)))
+
+        # The table model can also be part of an expression.
+        ans.append(data.eval_model_to_fit(psf(tbl + 0)))
+
+    assert ans[0].max() > 0.1
+    for got in ans[1:]:
+        assert got == pytest.approx(ans[0])
+
+
+def test_table_model_needs_full_grid():
+
+    tbl = TableModel()
+    tbl.load(None, [1, 2, 3])
+    assert tbl._needs_full_grid
+
+    tbl.load([1, 2, 3], [1, 2, 3])
+    assert not tbl._needs_full_grid
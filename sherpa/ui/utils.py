@@ -8817,10 +8817,20 @@ class Session(NoNewAttributesAfterInit):
            The precision of the calculated limits. The default is
            0.01.
 
+        ``jacobian``
+           Approximate the information matrix using the Jacobian of
+           the residuals, which requires fewer statistic evaluations
+           but can only be used with a chi-square statistic. The
+           default is ``False``.
+
         ``maxiters``
            The maximum number of iterations allowed before stopping
            for that parameter. The default is 200.
 
+        ``numcores``
+           The number of CPU cores to use when evaluating the
+           statistic. The default is 1.
+
         ``sigma``
            What is the error limit being calculated. The default is
            1.
@@ -8840,6 +8850,8 @@ class Session(NoNewAttributesAfterInit):
         maxiters    = 200
         soft_limits = False
         eps         = 0.01
+        numcores    = 1
+        jacobian    = False
 
         Change the ``sigma`` field to 1.9.
 
@@ -14980,6 +14992,10 @@ class Session(NoNewAttributesAfterInit):
         parameters in the source expression, other than the parameter
         being plotted, then the results will be the same.
 
+        The statistic values are remembered, so re-creating the plot
+        for the same fit - such as with a finer grid - only evaluates
+        the new points.
+
         Examples
         --------
 
@@ -15224,6 +15240,13 @@ class Session(NoNewAttributesAfterInit):
         free parameters in the model, other than the parameters
         being plotted, then the results will be the same.
 
+        The grid is evaluated along a path where each point is next
+        to the previous one, so that each fit starts close to the
+        best-fit location. The statistic values are remembered, so
+        re-creating the plot for the same fit - such as with
+        different levels, or a finer grid - only evaluates the new
+        points.
+
         Examples
         --------
 
@@ -26,6 +26,7 @@ import logging
 import operator
 import os
 import inspect
+import pickle
 from types import FunctionType as function
 from types import MethodType as instancemethod
 import string
@@ -40,7 +41,7 @@ import numpy.fft
 # Note: _utils.gsl_fcmp and _utils.ndtri are not exported from
 #       this module; is this intentional?
 from sherpa.utils._utils import hist1d, hist2d
-from sherpa.utils import _utils, _psf
+from sherpa.utils import _utils, _psf, parallel
 from sherpa.utils.err import IOErr
 
 from sherpa import get_config
@@ -61,6 +62,11 @@ _ncpus = None
 if not _ncpu_val.startswith('NONE'):
     _ncpus = int(_ncpu_val)
 
+# Should parallel_map re-use a set of worker processes rather than
+# starting new processes for each call?
+_persistent_pool = config.getboolean('parallel', 'persistent_pool',
+                                     fallback=True)
+
 _multi = False
 
 try:
@@ -2740,6 +2746,16 @@ def worker(f, ii, chunk, out_q, err_q, lock):
     out_q.put((ii, list(vals)))
 
 
+def _map_chunk(args):
+    """Apply a function to each element of a sequence.
+
+    This is used by parallel_map_funcs and takes a tuple of
+    (function, sequence).
+    """
+    func, chunk = args
+    return list(map(func, chunk))
+
+
 def run_tasks(procs, err_q, out_q, num):
 
     die = (lambda vals: [val.terminate() for val in vals
@@ -2810,6 +2826,16 @@ def parallel_map(function, sequence, numcores=None):
     chunk is run in parallel. There is no guarantee to the ordering
     of the tasks.
 
+    The chunks are sent to a set of worker processes which are
+    re-used between calls (see `sherpa.utils.parallel.get_pool`),
+    unless the 'persistent_pool' setting of the 'parallel' section
+    of Sherpa's preferences is False. If ``function`` can not be
+    pickled then new processes are started for each call, unless
+    ``function`` has been bound to a set of workers with
+    `sherpa.utils.parallel.bound_pool`. The same happens if the
+    function, or a class it uses, has been re-defined since the
+    workers were started and they can not be re-started.
+
     Examples
     --------
 
@@ -2854,12 +2880,26 @@ def parallel_map(function, sequence, numcores=None):
 
     size = len(sequence)
 
-    if not _multi or size == 1 or (numcores is not None and numcores < 2):
+    if not _multi or size == 1 or (numcores is not None and numcores < 2) \
+       or parallel.in_worker():
         return list(map(function, sequence))
 
     if numcores is None:
         numcores = _ncpus
 
+    pool = parallel.get_bound_pool(function)
+    if pool is not None:
+        return pool.map('bound', sequence)
+
+    if _persistent_pool:
+        try:
+            return parallel.get_pool(numcores).map(function, sequence)
+        except pickle.PicklingError:
+            # Fall back to starting a process for each chunk, which
+            # does not require the function to be picklable when
+            # the "fork" start method is used.
+            pass
+
     # Returns a started SyncManager object which can be used for sharing
     # objects between processes. The returned manager object corresponds
     # to a spawned child process and has methods which will create shared
@@ -2966,12 +3006,24 @@ def parallel_map_funcs(funcs, datasets, numcores=None):
         raise TypeError(msg)
 
     if not _multi or datasets_size == 1 or \
-            (numcores is not None and numcores < 2):
+            (numcores is not None and numcores < 2) or parallel.in_worker():
         return list(map(funcs[0], datasets))
 
     if numcores is None:
         numcores = _ncpus
 
+    if _persistent_pool:
+        try:
+            results = parallel.get_pool(numcores).map(_map_chunk,
+                                                      list(zip(funcs, datasets)))
+        except pickle.PicklingError:
+            pass
+        else:
+            vals = []
+            for r in results:
+                vals.extend(r)
+            return vals
+
     # Returns a started SyncManager object which can be used for sharing
     # objects between processes. The returned manager object corresponds
     # to a spawned child process and has methods which will create shared
@@ -289,6 +289,7 @@ class IOErr(SherpaErr):
             'writenoimg': "writing images in ASCII is not supported",
             'badext': "file '%s' does not contain a binary table extension",
             'notrsp': "file '%s' does not appear to be %s",
+            'badtable': "file '%s' is not a valid table model: %s",
             'bad': 'unknown %s: %s',
             'npconv1d': "numpy_convolution for 1D only",
             'start<stop': "start < stop, where start=%s stop=%s",
@@ -320,6 +321,7 @@ class ModelErr(SherpaErr):
             'nobkg': 'background model %s for data set %s has not been set',
             'nogrid': 'There is no grid on which to evaluate the model',
             'needspoint': 'A non-integrated grid is required for model evaluation',
+            'batchshape': 'expected parameter values with shape (nsamples, %d), got %s',
             }
 
     def __init__(self, key, *args):
@@ -0,0 +1,1173 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+"""Long-lived worker processes for parallel evaluation.
+
+The `parallel_map` routine in `sherpa.utils` used to start a new set
+of processes each time it was called, which is too expensive when the
+work has to be repeated many times, such as evaluating the model for
+each iteration of a fit. The `WorkerPool` class provides a set of
+processes which are started once and then re-used. Objects which are
+expensive to send to the workers - such as data sets and model
+expressions - can be registered with the pool once, and then called
+many times with only small arguments (e.g. the parameter values).
+
+There are two ways to send a function to the workers: it can be
+pickled for each call to `WorkerPool.map`, or - for functions which
+can not be pickled, such as the closures used by the optimisers -
+it can be bound to a pool when the pool is created, using the
+`bound_pool` context manager. When the "fork" start method is in
+use the bound function is inherited by the workers rather than
+being pickled. The lifetime of the pool is then limited to the
+context manager.
+
+When the elements of the sequence sent to `WorkerPool.map` are NumPy
+arrays with the same shape and type then they are sent to the
+workers using a block of shared memory, which is re-used between
+calls, rather than being pickled.
+
+Large NumPy arrays contained in the objects sent to the workers -
+such as the data, ARF, and RMF arrays of a `sherpa.fit.Fit` object -
+are copied into a shared-memory segment, rather than being pickled
+for each worker. The workers access them as views of this segment,
+so there is only one copy of the data however many workers there
+are. These arrays must not be changed by the workers, since the
+changes would be seen by all the workers. They are not marked as
+read only, as the compiled Sherpa routines copy read-only arrays
+each time they are called.
+The same is done for the results returned by the workers, which
+means that the pool does not rely on the "fork" start method to
+send data efficiently, and can be used with "spawn".
+
+Functions and classes are pickled by reference - that is, by their
+module and name - and so the workers use their own copy of the code,
+which is the version that existed when they were started. The pool
+records the functions and classes used by each object it sends, and
+the workers check that their copy matches, so that a function which
+has been re-defined (for instance in an interactive session), or
+which did not exist when the workers were started, is not silently
+replaced by the old version. When this happens the pool is re-started
+if it has no registered objects, and otherwise a
+`pickle.PicklingError` is raised, so that the caller can fall back
+to running the code in a new process.
+
+"""
+
+import atexit
+from contextlib import contextmanager
+import hashlib
+import importlib
+import io
+import itertools
+import multiprocessing
+import pickle
+import types
+import weakref
+
+import numpy
+
+try:
+    from multiprocessing import resource_tracker, shared_memory
+except ImportError:
+    # Python 3.7 and earlier
+    shared_memory = None
+
+
+__all__ = ('WorkerPool', 'bound_pool', 'get_bound_pool',
+           'get_pool', 'close_pool', 'in_worker')
+
+
+# Is this process a worker?
+#
+_in_worker = False
+
+# Arrays with at least this many bytes are sent to, and returned
+# from, the workers using shared memory rather than being pickled.
+#
+_SHARED_NBYTES = 2**16
+
+
+class _StaleCode(pickle.PicklingError):
+    """The workers do not have the current version of the code."""
+
+
+def in_worker():
+    """Is the code running in a worker process?
+
+    The worker processes can not start processes themselves, so
+    code which would normally run in parallel should be run
+    serially when this is `True`.
+
+    Returns
+    -------
+    flag : bool
+
+    """
+
+    return _in_worker
+
+
+class _SharedBlock():
+    """The location of a set of arguments in shared memory.
+
+    Each row of the array stored in the block is an argument.
+    """
+
+    def __init__(self, name, shape, dtype, start, stop):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.start = start
+        self.stop = stop
+
+
+def _get_args(chunk, segments, check_ids):
+    """Return the arguments for a map call.
+
+    The segments dictionary stores the shared-memory segments that
+    the worker has attached to, since re-attaching for each call is
+    expensive.
+    """
+
+    if not isinstance(chunk, _SharedBlock):
+        return _load_code(chunk, check_ids)[0]
+
+    try:
+        shm = segments[chunk.name]
+    except KeyError:
+        # The pool only uses one segment at a time, so close any
+        # existing segments.
+        for old in segments.values():
+            old.close()
+
+        segments.clear()
+        shm = shared_memory.SharedMemory(name=chunk.name)
+        segments[chunk.name] = shm
+
+    arr = numpy.ndarray(chunk.shape, dtype=chunk.dtype, buffer=shm.buf)
+
+    # Copy the arguments so that the caller can keep them.
+    return [numpy.array(row) for row in arr[chunk.start:chunk.stop]]
+
+
+class _Payload():
+    """A pickled object whose large arrays are in shared memory.
+
+    The name is None when the object contains no large arrays. The
+    refs field lists the functions and classes pickled by reference,
+    as (module, qualname, id, digest) tuples.
+    """
+
+    def __init__(self, data, name, refs=()):
+        self.data = data
+        self.name = name
+        self.refs = refs
+
+
+# The digests of the code objects, which can not change.
+#
+_digests = weakref.WeakKeyDictionary()
+
+
+def _code_digest(code):
+    """A digest of the byte code and constants of a code object.
+
+    This does not depend on the process, so it can be compared
+    between the pool and its workers.
+    """
+
+    try:
+        return _digests[code]
+    except KeyError:
+        pass
+
+    hsh = hashlib.sha1(code.co_code)
+    hsh.update(repr(code.co_names).encode())
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            hsh.update(_code_digest(const))
+        elif isinstance(const, frozenset):
+            # The order depends on the hash seed of the process.
+            hsh.update(repr(sorted(map(repr, const))).encode())
+        else:
+            hsh.update(repr(const).encode())
+
+    digest = hsh.digest()
+    _digests[code] = digest
+    return digest
+
+
+def _digest(obj):
+    """A digest of the code of a function or a class.
+
+    For a class only the methods it defines are included, so that
+    changes to its other attributes do not count.
+    """
+
+    if isinstance(obj, types.FunctionType):
+        return _code_digest(obj.__code__)
+
+    hsh = hashlib.sha1()
+    for name, value in sorted(vars(obj).items(), key=lambda kv: kv[0]):
+        if isinstance(value, (staticmethod, classmethod)):
+            value = value.__func__
+        elif isinstance(value, property):
+            value = value.fget
+
+        if isinstance(value, types.FunctionType):
+            hsh.update(name.encode())
+            hsh.update(_code_digest(value.__code__))
+
+    return hsh.digest()
+
+
+def _resolve(module, qualname):
+    """Find an object by name, as done when unpickling."""
+
+    obj = importlib.import_module(module)
+    for name in qualname.split('.'):
+        obj = getattr(obj, name)
+
+    return obj
+
+
+class _ArrayPickler(pickle.Pickler):
+    """Record the large arrays rather than pickling them.
+
+    The arrays are replaced by their location in a memory block,
+    which has to be created - and the arrays copied into it -
+    once the object has been pickled. An array which appears
+    multiple times is only stored once.
+    """
+
+    def __init__(self, file, protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__(file, protocol)
+        self.arrays = []
+        self.nbytes = 0
+        self._offsets = {}
+
+    def persistent_id(self, obj):
+        if type(obj) is not numpy.ndarray or \
+           obj.dtype.kind not in 'biufc' or obj.nbytes < _SHARED_NBYTES:
+            return None
+
+        try:
+            offset = self._offsets[id(obj)]
+        except KeyError:
+            offset = self.nbytes
+            self._offsets[id(obj)] = offset
+            self.arrays.append((offset, obj))
+            # Keep each array aligned on a 64-byte boundary.
+            self.nbytes += -(-obj.nbytes // 64) * 64
+
+        return (offset, obj.shape, obj.dtype.str)
+
+
+class _RefPickler(pickle.Pickler):
+    """Record the functions and classes pickled by reference.
+
+    This relies on the reducer_override method, which was added
+    in Python 3.8, so nothing is recorded with earlier versions.
+    """
+
+    def __init__(self, file, protocol=pickle.HIGHEST_PROTOCOL):
+        super().__init__(file, protocol)
+        self.refs = []
+        self._seen = set()
+
+    def reducer_override(self, obj):
+        if (isinstance(obj, (types.FunctionType, type)) and
+            id(obj) not in self._seen):
+            self._seen.add(id(obj))
+            module = getattr(obj, '__module__', None)
+            qualname = getattr(obj, '__qualname__', None)
+            if module not in (None, 'builtins') and qualname is not None:
+                # Only objects which can be found by name are pickled
+                # by reference (the others fail to pickle).
+                try:
+                    found = _resolve(module, qualname) is obj
+                except Exception:
+                    found = False
+
+                if found:
+                    self.refs.append((module, qualname, id(obj),
+                                      _digest(obj)))
+
+        return NotImplemented
+
+
+class _CodePickler(_RefPickler, _ArrayPickler):
+    """Record the large arrays and the code used by the object."""
+
+
+def _dump_args(args):
+    """Pickle the arguments of a call, recording the code they use.
+
+    Returns
+    -------
+    payload : _Payload
+    """
+
+    buf = io.BytesIO()
+    pickler = _RefPickler(buf)
+    try:
+        pickler.dump(args)
+    except Exception as exc:
+        raise pickle.PicklingError(str(exc)) from exc
+
+    return _Payload(buf.getvalue(), None, pickler.refs)
+
+
+class _ArrayUnpickler(pickle.Unpickler):
+    """Restore the arrays recorded by _ArrayPickler.
+
+    The arrays are either copied out of the memory block or are
+    views of it.
+    """
+
+    def __init__(self, file, buf, copy):
+        super().__init__(file)
+        self.buf = buf
+        self.copy = copy
+
+    def persistent_load(self, pid):
+        offset, shape, dtype = pid
+        arr = numpy.ndarray(shape, dtype=dtype, buffer=self.buf,
+                            offset=offset)
+        if self.copy:
+            return arr.copy()
+
+        return arr
+
+
+def _dump(obj, code=False):
+    """Pickle the object, moving large arrays to shared memory.
+
+    When code is set the functions and classes pickled by reference
+    are recorded, so that the workers can check them (see
+    `_load_code`).
+
+    Returns
+    -------
+    payload, shm : _Payload, SharedMemory or None
+        The shared-memory segment is None if there are no large
+        arrays. The caller is responsible for closing (and, when
+        no longer needed, unlinking) it.
+    """
+
+    buf = io.BytesIO()
+    pickler = _CodePickler(buf) if code else _ArrayPickler(buf)
+    pickler.dump(obj)
+    refs = getattr(pickler, 'refs', ())
+    if pickler.nbytes == 0 or shared_memory is None:
+        if pickler.nbytes > 0:
+            return _Payload(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL),
+                            None, refs), None
+
+        return _Payload(buf.getvalue(), None, refs), None
+
+    shm = shared_memory.SharedMemory(create=True, size=pickler.nbytes)
+    for offset, arr in pickler.arrays:
+        dest = numpy.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf,
+                             offset=offset)
+        dest[...] = arr
+
+    del dest
+    return _Payload(buf.getvalue(), shm.name, refs), shm
+
+
+def _load(payload, copy):
+    """Unpickle the payload.
+
+    Returns
+    -------
+    obj, shm : object, SharedMemory or None
+        When copy is False the arrays in obj are views into the
+        shared-memory segment, so it can only be closed once
+        obj has been deleted.
+    """
+
+    if payload.name is None:
+        return pickle.loads(payload.data), None
+
+    shm = shared_memory.SharedMemory(name=payload.name)
+    try:
+        obj = _ArrayUnpickler(io.BytesIO(payload.data), shm.buf,
+                              copy).load()
+    except BaseException:
+        shm.close()
+        raise
+
+    return obj, shm
+
+
+def _load_code(payload, check_ids):
+    """Unpickle an object sent by the pool to a worker.
+
+    The functions and classes pickled by reference must match the
+    versions used by the pool. When check_ids is set - that is, the
+    worker was forked from the pool - they must also be the same
+    objects, which catches a function which has been re-defined
+    with the same code but, for instance, different defaults.
+
+    Raises
+    ------
+    _StaleCode
+        The worker does not have the same code as the pool.
+    """
+
+    for module, qualname, ident, digest in payload.refs:
+        try:
+            obj = _resolve(module, qualname)
+        except Exception as exc:
+            raise _StaleCode("{}.{} is not available to the worker: {}".format(
+                module, qualname, exc)) from None
+
+        if (check_ids and id(obj) != ident) or _digest(obj) != digest:
+            raise _StaleCode("{}.{} has changed since the worker was "
+                             "started".format(module, qualname))
+
+    try:
+        return _load(payload, copy=False)
+    except (AttributeError, ImportError) as exc:
+        raise _StaleCode("unable to unpickle in the worker: {}".format(
+            exc)) from None
+
+
+def _close(shm, unlink=False):
+    """Close the segment, returning False if it is still in use."""
+
+    if shm is None:
+        return True
+
+    if unlink:
+        shm.unlink()
+
+    try:
+        shm.close()
+    except BufferError:
+        # There are still views of the memory.
+        return False
+
+    return True
+
+
+def _worker_loop(conn, registry, check_ids):
+    """Process requests sent by the pool until told to stop.
+
+    Each request is a tuple, where the first element is the command
+    name. Every command except 'close' is answered with a tuple of
+    (succeeded, value), where value is the exception on failure.
+    The check_ids flag is set when the worker was forked from the
+    pool (see `_load_code`).
+    """
+
+    global _in_worker
+    _in_worker = True
+
+    segments = {}
+
+    # The shared memory used by the registered objects, and any
+    # segments which could not be closed when they were finished
+    # with.
+    #
+    attached = {}
+    busy = []
+
+    def release(shm):
+        if not _close(shm):
+            busy.append(shm)
+
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        cmd = msg[0]
+        if cmd == 'close':
+            break
+
+        try:
+            if cmd == 'register':
+                obj, shm = _load_code(msg[2], check_ids)
+                registry[msg[1]] = obj
+                release(attached.pop(msg[1], None))
+                attached[msg[1]] = shm
+                out = None
+            elif cmd == 'unregister':
+                registry.pop(msg[1], None)
+                release(attached.pop(msg[1], None))
+                out = None
+            elif cmd == 'call':
+                args = _load_code(msg[2], check_ids)[0]
+                out = registry[msg[1]](*args)
+            elif cmd == 'map':
+                # The function is either pickled or the key of a
+                # registered object.
+                func = msg[1]
+                shm = None
+                if isinstance(func, _Payload):
+                    func, shm = _load_code(func, check_ids)
+                else:
+                    func = registry[func]
+
+                try:
+                    args = _get_args(msg[2], segments, check_ids)
+                    out = [func(arg) for arg in args]
+                finally:
+                    del func
+                    release(shm)
+
+            else:
+                raise ValueError("Unknown command '{}'".format(cmd))
+
+            reply = (True, out)
+
+        except Exception as exc:
+            reply = (False, exc)
+
+        shm = None
+        try:
+            if reply[0]:
+                out, shm = _dump(reply[1])
+                reply = (True, out)
+
+            conn.send(reply)
+        except Exception as exc:
+            # The result (or exception) could not be pickled.
+            conn.send((False, RuntimeError(str(exc))))
+
+        # The pool unlinks the segment once it has read the results.
+        _close(shm)
+        out = reply = None
+
+    registry.clear()
+    for shm in itertools.chain(segments.values(), attached.values(), busy):
+        _close(shm)
+
+
+def _split(size, numcores):
+    """Return the start and end indexes of each chunk."""
+
+    idx = [int(round(i * size / numcores)) for i in range(numcores + 1)]
+    return list(zip(idx[:-1], idx[1:]))
+
+
+def _as_block(sequence):
+    """Return the sequence as a 2D array, if possible.
+
+    This is only done when each element is a one-dimensional NumPy
+    array with the same length and numeric type, so that the function
+    is called with the same argument as if the sequence had not been
+    converted.
+    """
+
+    if isinstance(sequence, numpy.ndarray):
+        if sequence.ndim != 2:
+            return None
+
+        if sequence.dtype.kind not in 'biuf':
+            return None
+
+        return sequence
+
+    first = sequence[0]
+    if not isinstance(first, numpy.ndarray) or first.ndim != 1 or \
+       first.dtype.kind not in 'biuf':
+        return None
+
+    for elem in sequence[1:]:
+        if not isinstance(elem, numpy.ndarray) or \
+           elem.shape != first.shape or elem.dtype != first.dtype:
+            return None
+
+    return numpy.asarray(sequence)
+
+
+class WorkerPool():
+    """A set of worker processes which persist between calls.
+
+    The processes are started the first time they are needed, and
+    by default they use the multiprocessing start method selected
+    in the Sherpa configuration file. Each worker has its own pipe,
+    which allows objects to be registered with every worker and
+    tasks to be sent to a particular worker.
+
+    Parameters
+    ----------
+    numcores : int
+        The number of worker processes (must be 1 or greater).
+    objects : dict or None, optional
+        Objects which are made available to the workers when they
+        are started, indexed by their key. These are inherited,
+        rather than pickled, when the "fork" start method is used,
+        so they can be used with objects that can not be sent
+        with the `register` method. They are re-sent if the pool
+        is re-started.
+    start_method : {None, 'fork', 'spawn', 'forkserver'}, optional
+        The multiprocessing start method used for the workers. The
+        default is to use the method selected in the Sherpa
+        configuration file. Only picklable objects can be used with
+        the objects argument when the method is not "fork".
+
+    Notes
+    -----
+    NumPy arrays containing at least 64 kB of numeric data which are
+    part of an object sent to the workers - with `register`, or as
+    the function argument of `map` - are copied into a single block
+    of shared memory, which all the workers use. The arrays in the
+    results returned by the workers are sent back the same way.
+
+    See Also
+    --------
+    bound_pool, get_pool
+
+    Examples
+    --------
+
+    >>> pool = WorkerPool(2)
+    >>> pool.register('sum', sum)
+    >>> pool.call('sum', [([1, 2],), ([3, 4, 5],)])
+    [3, 12]
+    >>> pool.map(abs, [-1, 2, -3])
+    [1, 2, 3]
+    >>> pool.close()
+
+    The pool can be used as a context manager, in which case it is
+    closed on exit:
+
+    >>> with WorkerPool(2) as pool:
+    ...     pool.map(abs, [-1, 2, -3])
+    ...
+    [1, 2, 3]
+
+    """
+
+    def __init__(self, numcores, objects=None, start_method=None):
+        numcores = int(numcores)
+        if numcores < 1:
+            raise ValueError("numcores must be 1 or greater, not {}".format(numcores))
+
+        self.numcores = numcores
+        self._context = multiprocessing.get_context(start_method)
+        self._objects = {} if objects is None else dict(objects)
+        self._workers = []
+        self._registered = set(self._objects)
+        self._shm = None
+
+        # The shared memory used by each registered object.
+        self._segments = {}
+
+    def __repr__(self):
+        state = 'running' if self.running else 'stopped'
+        return '<{} with {} workers ({})>'.format(type(self).__name__,
+                                                  self.numcores, state)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def running(self):
+        """Have the worker processes been started?"""
+        return len(self._workers) > 0
+
+    def start(self):
+        """Start the worker processes (if not already running)."""
+
+        if self.running:
+            return
+
+        # Ensure the workers share the resource tracker with this
+        # process, so that they do not report the shared-memory
+        # segments as leaked when they exit.
+        if shared_memory is not None:
+            resource_tracker.ensure_running()
+
+        forked = self._context.get_start_method() == 'fork'
+        for _ in range(self.numcores):
+            parent, child = self._context.Pipe()
+            proc = self._context.Process(target=_worker_loop,
+                                         args=(child, dict(self._objects),
+                                               forked),
+                                         daemon=True)
+            proc.start()
+            child.close()
+            self._workers.append((proc, parent))
+
+    def close(self):
+        """Stop the worker processes.
+
+        The pool can be re-started, but any objects added with
+        `register` are lost.
+        """
+
+        for proc, conn in self._workers:
+            try:
+                conn.send(('close', ))
+            except (OSError, ValueError):
+                pass
+
+        for proc, conn in self._workers:
+            proc.join(timeout=1)
+            if proc.exitcode is None:
+                proc.terminate()
+                proc.join()
+
+            conn.close()
+
+        self._workers = []
+        self._registered = set(self._objects)
+        self._release_shm()
+        for shm in self._segments.values():
+            _close(shm, unlink=True)
+
+        self._segments = {}
+
+    def _release_shm(self):
+        """Remove the shared-memory segment, if it exists."""
+
+        if self._shm is None:
+            return
+
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+
+    def _send(self, conns, msgs):
+        """Send the messages to the connections and collect the answers.
+
+        The answers are returned in the same order as the messages.
+        All the replies are read, even if there is an error, so that
+        the pipes remain synchronized.
+        """
+
+        try:
+            for conn, msg in zip(conns, msgs):
+                conn.send_bytes(msg)
+
+            replies = [conn.recv() for conn in conns]
+
+        except BaseException:
+            # Things are in an unknown state (e.g. the user has
+            # interrupted the call) so restart the workers.
+            self.close()
+            raise
+
+        # Read all the results, even if there was an error, so that
+        # the shared memory they use is released.
+        #
+        error = None
+        out = []
+        for flag, value in replies:
+            if flag:
+                value, shm = _load(value, copy=True)
+                _close(shm, unlink=True)
+            elif error is None:
+                error = value
+
+            out.append(value)
+
+        if error is not None:
+            raise error
+
+        return out
+
+    def _restart(self, key=None):
+        """Re-start the workers so that they use the current code.
+
+        This is only done if no objects - other than key - have been
+        registered, since they would be lost.
+
+        Returns
+        -------
+        flag : bool
+            Were the workers re-started?
+        """
+
+        if not self._registered - {key} <= set(self._objects):
+            return False
+
+        self.close()
+        self.start()
+        return True
+
+    def _send_all(self, msg):
+        """Send the message to every worker."""
+
+        conns = [conn for _, conn in self._workers]
+        return self._send(conns, [msg] * len(conns))
+
+    def register(self, key, obj):
+        """Send an object to every worker.
+
+        The object is pickled once and then sent to each worker,
+        where it can be called via the `call` or `map` methods.
+        Large arrays in the object are stored in shared memory,
+        which is used by all the workers, so they must not be
+        changed by the object.
+
+        If the workers do not have the current version of the
+        functions and classes used by the object then they are
+        re-started, unless other objects have been registered.
+
+        Parameters
+        ----------
+        key : hashable
+            The label for the object. Any existing object with this
+            label is replaced.
+        obj : callable
+            The object, which must be picklable.
+
+        Raises
+        ------
+        pickle.PicklingError
+            The object can not be sent to the workers, or they do
+            not have the current version of its code and can not
+            be re-started.
+
+        See Also
+        --------
+        call, map, unregister
+
+        """
+
+        self.start()
+        payload, shm = _dump(obj, code=True)
+        msg = pickle.dumps(('register', key, payload), pickle.HIGHEST_PROTOCOL)
+        try:
+            try:
+                self._send_all(msg)
+            except _StaleCode:
+                if not self._restart(key):
+                    raise
+
+                self._send_all(msg)
+
+        except BaseException:
+            _close(shm, unlink=True)
+            raise
+
+        _close(self._segments.pop(key, None), unlink=True)
+        if shm is not None:
+            self._segments[key] = shm
+
+        self._registered.add(key)
+
+    def unregister(self, key):
+        """Remove the object from the workers.
+
+        Parameters
+        ----------
+        key : hashable
+            The label used when the object was registered. There is
+            no error if it does not exist.
+
+        """
+
+        if not self.running or key not in self._registered:
+            return
+
+        msg = pickle.dumps(('unregister', key))
+        self._send_all(msg)
+        self._registered.discard(key)
+        _close(self._segments.pop(key, None), unlink=True)
+
+    def call(self, key, arglist):
+        """Call a registered object with each set of arguments.
+
+        The calls are distributed between the workers in a
+        round-robin fashion, so the i-th set of arguments is
+        always sent to the same worker (which lets the workers
+        cache results).
+
+        Parameters
+        ----------
+        key : hashable
+            The label used when the object was registered.
+        arglist : sequence of tuples
+            The arguments for each call.
+
+        Returns
+        -------
+        results : list
+            The return value of each call, in the same order as
+            arglist.
+
+        Raises
+        ------
+        pickle.PicklingError
+            The arguments can not be sent to the workers, or they
+            do not have the current version of the code they use.
+
+        """
+
+        if key not in self._registered:
+            raise KeyError(key)
+
+        self.start()
+        workers = itertools.cycle([conn for _, conn in self._workers])
+        conns = [next(workers) for _ in arglist]
+        msgs = [pickle.dumps(('call', key, _dump_args(tuple(args))),
+                             pickle.HIGHEST_PROTOCOL)
+                for args in arglist]
+        return self._send(conns, msgs)
+
+    def _share(self, block):
+        """Copy the array into the shared-memory segment.
+
+        The segment is re-used if it is large enough.
+        """
+
+        if self._shm is None or self._shm.size < block.nbytes:
+            self._release_shm()
+            # Leave some room for growth.
+            self._shm = shared_memory.SharedMemory(create=True,
+                                                   size=2 * block.nbytes)
+
+        arr = numpy.ndarray(block.shape, dtype=block.dtype,
+                            buffer=self._shm.buf)
+        arr[:] = block
+        return self._shm.name
+
+    def map(self, function, sequence):
+        """Apply the function to each element of the sequence.
+
+        The sequence is split into `numcores` chunks (or fewer, if
+        the sequence is small), each of which is sent to a separate
+        worker.
+
+        Parameters
+        ----------
+        function : callable or hashable
+            The function to apply, which must be picklable, or the
+            key of a registered object.
+        sequence : sequence
+            The arguments for the function.
+
+        Returns
+        -------
+        results : list
+            The return value for each element of sequence, in the
+            same order.
+
+        Raises
+        ------
+        pickle.PicklingError
+            The function can not be sent to the workers, or they do
+            not have the current version of its code and can not be
+            re-started (because objects have been registered). The
+            function has not been called when this is raised.
+
+        """
+
+        size = len(sequence)
+        if size == 0:
+            return []
+
+        shm = None
+        if callable(function):
+            try:
+                function, shm = _dump(function, code=True)
+            except Exception as exc:
+                raise pickle.PicklingError(str(exc)) from exc
+
+        elif function not in self._registered:
+            raise KeyError(function)
+
+        try:
+            try:
+                return self._map(function, sequence)
+            except _StaleCode:
+                if not self._restart():
+                    raise
+
+                return self._map(function, sequence)
+
+        finally:
+            _close(shm, unlink=True)
+
+    def _map(self, function, sequence):
+        """Send the work to the workers.
+
+        The function is a _Payload or the key of a registered object.
+        """
+
+        size = len(sequence)
+        self.start()
+        numcores = min(self.numcores, size)
+        chunks = _split(size, numcores)
+
+        block = None
+        if shared_memory is not None:
+            block = _as_block(sequence)
+
+        if block is None:
+            args = [_dump_args(sequence[start:stop])
+                    for start, stop in chunks]
+        else:
+            name = self._share(block)
+            args = [_SharedBlock(name, block.shape, block.dtype,
+                                 start, stop)
+                    for start, stop in chunks]
+
+        msgs = [pickle.dumps(('map', function, arg), pickle.HIGHEST_PROTOCOL)
+                for arg in args]
+        conns = [conn for _, conn in self._workers[:numcores]]
+
+        out = []
+        for vals in self._send(conns, msgs):
+            out.extend(vals)
+
+        return out
+
+
+# The shared pools, indexed by the number of workers.
+#
+_pools = {}
+
+
+def get_pool(numcores):
+    """Return the shared worker pool.
+
+    The pool is created on first use. When a different number of
+    workers is requested a new pool is created, and the existing
+    pools are closed unless they have objects registered with them,
+    since the objects belong to other callers. The pools are closed
+    when Python exits.
+
+    Parameters
+    ----------
+    numcores : int
+        The number of worker processes.
+
+    Returns
+    -------
+    pool : WorkerPool instance
+
+    See Also
+    --------
+    close_pool
+
+    """
+
+    pool = _pools.get(numcores)
+    if pool is not None:
+        return pool
+
+    for ncores, other in list(_pools.items()):
+        if other._registered <= set(other._objects):
+            other.close()
+            del _pools[ncores]
+
+    pool = WorkerPool(numcores)
+    _pools[numcores] = pool
+    return pool
+
+
+@atexit.register
+def close_pool():
+    """Stop the shared worker pools, if they are running."""
+
+    for pool in _pools.values():
+        pool.close()
+
+    _pools.clear()
+
+
+# The pools created by bound_pool, indexed by the id of the
+# function. The function is also stored to ensure that the id
+# is not re-used.
+#
+_bound = {}
+
+
+def get_bound_pool(function):
+    """Return the pool bound to the function, if any.
+
+    Parameters
+    ----------
+    function : callable
+
+    Returns
+    -------
+    pool : WorkerPool instance or None
+        The pool created by `bound_pool` for this function,
+        or `None`.
+
+    """
+
+    try:
+        func, pool = _bound[id(function)]
+    except KeyError:
+        return None
+
+    return pool if func is function else None
+
+
+@contextmanager
+def bound_pool(function, numcores):
+    """Create a pool of workers for a single function.
+
+    The function is sent to the workers when they are started, which
+    means that it does not need to be picklable when the "fork"
+    start method is used. This means it can be used for closures -
+    such as the statistic callback used by the optimisers - which
+    can not be used with the shared pool. While the context is
+    active, calls to `sherpa.utils.parallel_map` with this function
+    use the pool.
+
+    Parameters
+    ----------
+    function : callable
+        The function to evaluate. Since the workers contain a copy
+        of the function, and its state, as it was when they were
+        started, the function should not depend on state that
+        changes while the context is active (other than the
+        arguments it is called with).
+    numcores : int
+        The number of worker processes.
+
+    Returns
+    -------
+    mapper : callable
+        Call with a sequence to evaluate the function on each
+        element in parallel, returning a list of the results.
+
+    Examples
+    --------
+
+    >>> with bound_pool(lambda x: x * x, 2) as mapper:
+    ...     mapper([1, 2, 3])
+    ...
+    [1, 4, 9]
+
+    """
+
+    pool = WorkerPool(numcores, {'bound': function})
+    _bound[id(function)] = (function, pool)
+    try:
+        with pool:
+            yield lambda sequence: pool.map('bound', sequence)
+    finally:
+        del _bound[id(function)]
@@ -0,0 +1,418 @@
+#
+#  Copyright (C) 2021  Smithsonian Astrophysical Observatory
+#
+#
+#  This program is free software; you can redistribute it and/or modify
+#  it under the terms of the GNU General Public License as published by
+#  the Free Software Foundation; either version 3 of the License, or
+#  (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License along
+#  with this program; if not, write to the Free Software Foundation, Inc.,
+#  51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+#
+
+import operator
+import os
+import pickle
+import sys
+import types
+
+import numpy
+
+import pytest
+
+from sherpa.utils import parallel, parallel_map, parallel_map_funcs
+from sherpa.utils.parallel import WorkerPool, bound_pool, close_pool, \
+    get_bound_pool, get_pool, in_worker
+
+
+def check_positive(x):
+    if x < 0:
+        raise ValueError("negative value: {}".format(x))
+    return x
+
+
+class Counter():
+    """Count the number of calls in this worker."""
+
+    def __init__(self):
+        self.ncalls = 0
+
+    def __call__(self):
+        self.ncalls += 1
+        return os.getpid(), self.ncalls
+
+
+class Scale():
+    """Return the array scaled by the argument.
+
+    Also returns whether the array was copied to the worker.
+    """
+
+    def __init__(self, arr):
+        self.arr = arr
+
+    def __call__(self, scale):
+        return self.arr * scale, self.arr.flags.owndata
+
+
+@pytest.mark.parametrize("numcores", [0, -2])
+def test_pool_invalid_numcores(numcores):
+    with pytest.raises(ValueError):
+        WorkerPool(numcores)
+
+
+def test_pool_lazy_start():
+    pool = WorkerPool(2)
+    assert not pool.running
+    assert str(pool) == '<WorkerPool with 2 workers (stopped)>'
+
+    with pool:
+        assert pool.running
+        assert str(pool) == '<WorkerPool with 2 workers (running)>'
+
+    assert not pool.running
+
+
+def test_pool_call():
+    with WorkerPool(2) as pool:
+        pool.register('sum', sum)
+        assert pool.call('sum', [([1, 2], ), ([3, 4, 5], ), ([], )]) == \
+            [3, 12, 0]
+
+
+def test_pool_call_unknown_key():
+    with WorkerPool(2) as pool:
+        with pytest.raises(KeyError):
+            pool.call('sum', [([1, 2], )])
+
+
+def test_pool_state_persists():
+    """The registered object lives in the worker between calls."""
+
+    with WorkerPool(2) as pool:
+        pool.register('count', Counter())
+        r1 = pool.call('count', [(), ()])
+        r2 = pool.call('count', [(), ()])
+
+    # Each worker has been called twice, with the same process used
+    # for the same position in the argument list.
+    assert [r[1] for r in r1] == [1, 1]
+    assert [r[1] for r in r2] == [2, 2]
+    assert [r[0] for r in r1] == [r[0] for r in r2]
+    assert r1[0][0] != r1[1][0]
+
+
+def test_pool_error():
+    """An error is re-raised and the pool can still be used."""
+
+    with WorkerPool(2) as pool:
+        pool.register('check', check_positive)
+        with pytest.raises(ValueError, match='^negative value: -2$'):
+            pool.call('check', [(1, ), (-2, ), (3, )])
+
+        assert pool.call('check', [(4, ), (5, )]) == [4, 5]
+
+
+def test_pool_unregister():
+    with WorkerPool(1) as pool:
+        pool.register('sum', sum)
+        pool.unregister('sum')
+        with pytest.raises(KeyError):
+            pool.call('sum', [([1, 2], )])
+
+        # unknown keys are ignored
+        pool.unregister('sum')
+
+
+def test_pool_close_loses_registry():
+    pool = WorkerPool(1)
+    pool.register('sum', sum)
+    pool.close()
+
+    pool.start()
+    try:
+        with pytest.raises(KeyError):
+            pool.call('sum', [([1, 2], )])
+    finally:
+        pool.close()
+
+
+def test_get_pool():
+    try:
+        pool1 = get_pool(2)
+        assert get_pool(2) is pool1
+
+        pool2 = get_pool(3)
+        assert pool2 is not pool1
+        assert pool2.numcores == 3
+
+        # The pool was not in use, so it has been closed.
+        assert not pool1.running
+        assert get_pool(2) is not pool1
+    finally:
+        close_pool()
+
+
+def test_get_pool_registered():
+    """A pool is not closed while it has registered objects."""
+
+    try:
+        pool1 = get_pool(2)
+        pool1.register('neg', operator.neg)
+        pool2 = get_pool(3)
+        assert pool2 is not pool1
+        assert pool1.running
+        assert pool1.call('neg', [(1, ), (2, )]) == [-1, -2]
+        assert get_pool(2) is pool1
+
+        # Once the object is removed the pool can be replaced.
+        pool1.unregister('neg')
+        get_pool(4)
+        assert not pool1.running
+        assert get_pool(3) is not pool2
+    finally:
+        close_pool()
+
+
+def test_pool_map():
+    with WorkerPool(2) as pool:
+        assert pool.map(abs, [-1, 2, -3, 4, -5]) == [1, 2, 3, 4, 5]
+        assert pool.map(abs, []) == []
+
+
+def test_pool_map_registered():
+    with WorkerPool(2) as pool:
+        pool.register('check', check_positive)
+        assert pool.map('check', [1, 2, 3]) == [1, 2, 3]
+
+        with pytest.raises(ValueError, match='^negative value: -2$'):
+            pool.map('check', [1, -2, 3])
+
+        with pytest.raises(KeyError):
+            pool.map('unknown', [1, 2, 3])
+
+
+def test_pool_map_not_picklable():
+    """The error is raised before the work is sent."""
+
+    with WorkerPool(2) as pool:
+        with pytest.raises(pickle.PicklingError):
+            pool.map(lambda x: x, [1, 2, 3])
+
+
+@pytest.mark.skipif(parallel.shared_memory is None,
+                    reason='shared memory is not available')
+@pytest.mark.parametrize("nrows", [1, 3, 8])
+def test_pool_map_shared_memory(nrows):
+    """Arrays are sent via shared memory, which is re-used."""
+
+    args = [numpy.arange(5) * i for i in range(nrows)]
+    with WorkerPool(3) as pool:
+        assert pool.map(numpy.sum, args) == [10 * i for i in range(nrows)]
+        name = pool._shm.name
+
+        # The segment is re-used for a smaller array.
+        args = numpy.ones((2, 4))
+        assert pool.map(numpy.sum, args) == [4, 4]
+        assert pool._shm.name == name
+
+        # A larger array needs a new segment.
+        args = numpy.ones((20, 40))
+        assert pool.map(numpy.sum, args) == [40] * 20
+        assert pool._shm.name != name
+
+    assert pool._shm is None
+
+
+def test_pool_map_shared_memory_mixed():
+    """Arrays with different shapes are pickled."""
+
+    args = [numpy.arange(5), numpy.arange(3), numpy.arange(2.0)]
+    with WorkerPool(2) as pool:
+        assert pool.map(numpy.sum, args) == [10, 3, 1]
+        assert pool._shm is None
+
+
+def test_bound_pool():
+    """The function does not have to be picklable."""
+
+    def func(x):
+        return x * x, in_worker()
+
+    assert get_bound_pool(func) is None
+    with bound_pool(func, 2) as mapper:
+        assert get_bound_pool(func) is not None
+        assert mapper([1, 2, 3]) == [(1, True), (4, True), (9, True)]
+
+    assert get_bound_pool(func) is None
+
+
+def test_parallel_map_uses_bound_pool():
+
+    offset = 10
+
+    def func(x):
+        return x + offset, in_worker()
+
+    with bound_pool(func, 2):
+        offset = 20
+        # The workers have the value when the pool was created.
+        assert parallel_map(func, [1, 2], 2) == [(11, True), (12, True)]
+
+
+def nested_map(x):
+    return parallel_map(abs, [x, -x], 2)
+
+
+def test_parallel_map_nested():
+    """Nested calls are run in serial in the workers."""
+
+    assert parallel_map(nested_map, [1, -2, 3], 2) == \
+        [[1, 1], [2, 2], [3, 3]]
+
+
+def test_parallel_map_not_picklable():
+    """Closures fall back to starting processes for each call."""
+
+    offset = 10
+    assert parallel_map(lambda x: x + offset, [1, 2, 3], 2) == [11, 12, 13]
+
+
+@pytest.mark.skipif(parallel.shared_memory is None,
+                    reason='shared memory is not available')
+def test_pool_register_shared_memory():
+    """Large arrays are stored once, in shared memory."""
+
+    arr = numpy.arange(10000.0)
+    with WorkerPool(2) as pool:
+        pool.register('scale', Scale(arr))
+        assert list(pool._segments) == ['scale']
+
+        out = pool.call('scale', [(2, ), (3, )])
+        assert [flag for _, flag in out] == [False, False]
+        assert out[0][0] == pytest.approx(2 * arr)
+        assert out[1][0] == pytest.approx(3 * arr)
+
+        # The results are copied out of shared memory.
+        assert out[0][0].flags.writeable
+
+        # Small arrays are pickled.
+        pool.register('scale', Scale(arr[:10]))
+        assert pool._segments == {}
+        assert pool.call('scale', [(2, )])[0][0] == pytest.approx(2 * arr[:10])
+
+        pool.register('scale', Scale(arr))
+        pool.unregister('scale')
+        assert pool._segments == {}
+
+
+@pytest.mark.skipif(parallel.shared_memory is None,
+                    reason='shared memory is not available')
+def test_pool_map_function_shared_memory():
+    """The arrays in the function are sent via shared memory."""
+
+    arr = numpy.arange(10000.0)
+    with WorkerPool(2) as pool:
+        out = pool.map(Scale(arr), [1, 2, 3])
+
+    assert [flag for _, flag in out] == [False] * 3
+    for scale, (vals, _) in zip([1, 2, 3], out):
+        assert vals == pytest.approx(scale * arr)
+
+
+@pytest.mark.skipif(parallel.shared_memory is None,
+                    reason='shared memory is not available')
+def test_pool_spawn():
+    """The pool works with the spawn start method."""
+
+    arr = numpy.arange(10000.0)
+    with WorkerPool(2, start_method='spawn') as pool:
+        pool.register('scale', Scale(arr))
+        out = pool.call('scale', [(2, ), (3, )])
+        assert out[1][0] == pytest.approx(3 * arr)
+        assert pool.map(abs, [-1, 2]) == [1, 2]
+
+
+@pytest.fixture
+def session():
+    """A module which acts like an interactive session."""
+
+    mod = types.ModuleType('sherpa_test_session')
+    sys.modules[mod.__name__] = mod
+    yield mod
+    del sys.modules[mod.__name__]
+
+
+def define(mod, code):
+    exec(code, vars(mod))
+
+
+def map_funcs(func, args, numcores):
+    return parallel_map_funcs([func] * len(args), [[x] for x in args],
+                              numcores)
+
+
+@pytest.mark.parametrize("mapper", [parallel_map, map_funcs])
+def test_parallel_map_redefined(mapper, session):
+    """The current version of the function is used."""
+
+    try:
+        define(session, "def f(x):\n    return x + 1\n")
+        assert mapper(session.f, [1, 2, 3, 4], 2) == [2, 3, 4, 5]
+        assert get_pool(2).running
+
+        define(session, "def f(x):\n    return x + 2\n")
+        assert mapper(session.f, [1, 2, 3, 4], 2) == [3, 4, 5, 6]
+
+        # The same code but a different object.
+        define(session, "def f(x, y=10):\n    return x + y\n")
+        assert mapper(session.f, [1, 2], 2) == [11, 12]
+        define(session, "def f(x, y=20):\n    return x + y\n")
+        assert mapper(session.f, [1, 2], 2) == [21, 22]
+
+        # A function which did not exist when the workers started.
+        define(session, "def g(x):\n    return -x\n")
+        assert mapper(session.g, [1, 2], 2) == [-1, -2]
+    finally:
+        close_pool()
+
+
+def test_parallel_map_redefined_class(session):
+    """The check includes the classes used by the function."""
+
+    code = "class Add:\n    def __call__(self, x):\n        return x + {}\n"
+    try:
+        define(session, code.format(1))
+        assert parallel_map(session.Add(), [1, 2], 2) == [2, 3]
+        define(session, code.format(5))
+        assert parallel_map(session.Add(), [1, 2], 2) == [6, 7]
+    finally:
+        close_pool()
+
+
+def test_pool_redefined_registered(session):
+    """The pool is not re-started when objects are registered."""
+
+    with WorkerPool(2) as pool:
+        define(session, "def f(x):\n    return x + 1\n")
+        pool.register('f', session.f)
+        define(session, "def f(x):\n    return x + 2\n")
+        pids = [p.pid for p, _ in pool._workers]
+        with pytest.raises(pickle.PicklingError,
+                           match="has changed since the worker"):
+            pool.map(session.f, [1, 2])
+
+        assert [p.pid for p, _ in pool._workers] == pids
+        assert pool.map('f', [1, 2]) == [2, 3]
+
+        # Re-registering the only object re-starts the pool.
+        pool.register('f', session.f)
+        assert [p.pid for p, _ in pool._workers] != pids
+        assert pool.map('f', [1, 2]) == [3, 4]